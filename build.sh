@@ -13,4 +13,14 @@ else
     echo "⚠️ Dataset base no se creó, se generará en el primer request"
 fi
 
+# Compilar artefactos de serving (embeddings, vecinos, filtros, popularidad, manifiesto)
+if [ -f "data/merged_anime.csv" ]; then
+    echo "🏗️ Compilando artefactos de serving..."
+    if python src/services/compile_artifacts.py; then
+        echo "✅ Artefactos listos en data/artifacts/$(cat data/artifacts/CURRENT)"
+    else
+        echo "⚠️ No se pudieron compilar los artefactos, se generarán en el primer request"
+    fi
+fi
+
 echo "✅ Build completado"
\ No newline at end of file
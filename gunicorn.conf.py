@@ -0,0 +1,61 @@
+# gunicorn.conf.py - Configuración de gunicorn (se carga automáticamente desde la raíz del proyecto)
+#
+#   gunicorn src.api.app:app
+#
+# Con preload_app la API se importa una sola vez en el proceso maestro y el motor
+# de recomendación se carga antes del fork: los arrays (embeddings, bitmaps de
+# filtros, catálogo por columnas) están mapeados desde data/artifacts/, así que
+# todos los workers comparten las mismas páginas y añadir workers no multiplica
+# la memoria ni vuelve a leer el catálogo.
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+
+# Cada worker vuelca sus métricas aquí y /api/metrics suma las de todos
+os.environ.setdefault('METRICS_MULTIPROC_DIR', os.path.join(ROOT_DIR, 'data', 'metrics'))
+# En Render (variable RENDER) las peticiones llegan a través de su proxy, que añade un salto a
+# X-Forwarded-For; fuera de Render no se confía en la cabecera salvo con TRUSTED_PROXIES explícito
+if os.environ.get('RENDER'):
+    os.environ.setdefault('TRUSTED_PROXIES', '1')
+# Al importar la app en el maestro no se arrancan hilos de fondo (ver post_fork)
+os.environ['BACKGROUND_THREADS_ON_IMPORT'] = '0'
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+# El pipeline por usuario (descarga + preparación) puede tardar en la primera petición
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '180'))
+preload_app = True
+
+
+def on_starting(server):
+    """Descarta las métricas de workers de ejecuciones anteriores"""
+    import shutil
+
+    shutil.rmtree(os.environ['METRICS_MULTIPROC_DIR'], ignore_errors=True)
+
+
+def when_ready(server):
+    """Abre en el maestro los artefactos ya compilados (mapeados, sin compilar ni arrancar hilos)"""
+    if os.environ.get('PRELOAD_ENGINE', '1') == '0':
+        return
+    try:
+        from services.recommendation_engine import preload_engine
+
+        engine = preload_engine()
+        if engine is None:
+            server.log.warning("⚠️ Sin artefactos vigentes: cada worker construirá el motor tras el fork")
+        else:
+            server.log.info(f"✅ Motor precargado antes del fork: {engine.n_rows} animes ({engine.version})")
+    except Exception as e:
+        # Sin datos todavía: cada worker lo cargará en su primera petición
+        server.log.warning(f"⚠️ No se pudo precargar el motor: {e}")
+
+
+def post_fork(server, worker):
+    """Hilos de fondo solo en los workers: calentamiento y refresco del modelo"""
+    from services.warmup import start_background_threads
+
+    start_background_threads()
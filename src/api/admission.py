@@ -0,0 +1,195 @@
+# src/api/admission.py - Control de admisión para los endpoints pesados
+"""
+Las recomendaciones pueden lanzar un pipeline en subproceso por petición. Sin
+límite, una ráfaga arranca tantos subprocesos como peticiones y puede agotar la
+memoria de la instancia. Cada endpoint pesado pasa por dos controles:
+
+  1. Token bucket por cliente (CLIENT_RATE_LIMIT peticiones/s, ráfagas de
+     CLIENT_BURST). Si se supera, responde 429 con Retry-After hasta el próximo token.
+  2. Límite de concurrencia (ADMISSION_MAX_CONCURRENT) con una cola de espera
+     acotada (ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT). Con la cola llena,
+     o si la espera vence, responde 503 con un Retry-After estimado a partir
+     del tiempo medio de servicio.
+
+Las peticiones en cola ocupan un hilo del worker, así que por defecto el límite
+y la cola dejan hilos libres (GUNICORN_THREADS) para los endpoints ligeros
+(status, health, lecturas de blacklist), que no pasan por aquí. Los límites son
+por proceso: con varios workers de gunicorn cada uno aplica los suyos.
+"""
+import os
+import math
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from monitoring.metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTIONS
+
+_THREADS = int(os.environ.get('GUNICORN_THREADS', '4'))
+MAX_CONCURRENT = int(os.environ.get('ADMISSION_MAX_CONCURRENT') or max(1, _THREADS // 2))
+MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE') or max(0, _THREADS - MAX_CONCURRENT - 1))
+QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', '2'))
+CLIENT_RATE_LIMIT = float(os.environ.get('CLIENT_RATE_LIMIT', '2'))
+CLIENT_BURST = int(os.environ.get('CLIENT_BURST', '10'))
+# Saltos de proxy de confianza delante de la API; con 0 (por defecto) se usa la IP de la conexión.
+# En Render lo activa gunicorn.conf.py (un salto)
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', '0'))
+# Clientes con token bucket en memoria (se descartan los menos recientes)
+MAX_TRACKED_CLIENTS = 10000
+
+
+class Rejected(Exception):
+    """Petición rechazada: `status` 429/503 y segundos de Retry-After"""
+
+    def __init__(self, reason, status, retry_after, message):
+        super().__init__(message)
+        self.reason = reason
+        self.status = status
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+class TokenBucket:
+    """`rate` peticiones por segundo con ráfagas de hasta `burst`"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+
+    def acquire(self):
+        """0 si la petición pasa; si no, segundos hasta que haya un token libre"""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self.rate
+
+
+class ClientRateLimiter:
+    """Un token bucket por cliente (rate=0 lo desactiva)"""
+
+    def __init__(self, rate=CLIENT_RATE_LIMIT, burst=CLIENT_BURST, max_clients=MAX_TRACKED_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, client):
+        if not self.rate:
+            return 0
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.rate, self.burst)
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            self._buckets.move_to_end(client)
+            return bucket.acquire()
+
+
+class ConcurrencyLimiter:
+    """
+    Como mucho `max_concurrent` peticiones a la vez y `max_queue` esperando
+    (max_concurrent=0 lo desactiva). La espera en cola dura como mucho `queue_timeout`.
+    """
+
+    def __init__(self, pool, max_concurrent=MAX_CONCURRENT, max_queue=MAX_QUEUE, queue_timeout=QUEUE_TIMEOUT):
+        self.pool = pool
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        # Media móvil del tiempo de servicio (s), para estimar Retry-After
+        self.service_time = 1.0
+        self._cond = threading.Condition()
+        ADMISSION_QUEUE_DEPTH.set(0, pool=pool)
+
+    def retry_after(self):
+        """Segundos estimados hasta que se libere un hueco para una petición nueva"""
+        slots = max(1, self.max_concurrent)
+        return self.service_time * (self.waiting + 1) / slots
+
+    def acquire(self):
+        if not self.max_concurrent:
+            return
+        with self._cond:
+            if self.active < self.max_concurrent and not self.waiting:
+                self.active += 1
+                return
+            if self.waiting >= self.max_queue:
+                raise Rejected('queue_full', 503, self.retry_after(),
+                               "Servidor saturado: demasiadas recomendaciones en curso")
+            self.waiting += 1
+            ADMISSION_QUEUE_DEPTH.inc(pool=self.pool)
+            try:
+                expires = time.monotonic() + self.queue_timeout
+                while self.active >= self.max_concurrent:
+                    remaining = expires - time.monotonic()
+                    if remaining <= 0:
+                        raise Rejected('queue_timeout', 503, self.retry_after(),
+                                       "Servidor saturado: la espera en cola superó el límite")
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+                ADMISSION_QUEUE_DEPTH.dec(pool=self.pool)
+            self.active += 1
+
+    def release(self, duration):
+        if not self.max_concurrent:
+            return
+        with self._cond:
+            self.active -= 1
+            self.service_time = 0.8 * self.service_time + 0.2 * duration
+            self._cond.notify()
+
+
+class Admission:
+    """Rate limit por cliente + límite de concurrencia de un grupo de endpoints"""
+
+    def __init__(self, pool, rate_limiter=None, limiter=None):
+        self.pool = pool
+        self.rate_limiter = rate_limiter or ClientRateLimiter()
+        self.limiter = limiter or ConcurrencyLimiter(pool)
+
+    @contextmanager
+    def admit(self, client):
+        """Ejecuta el bloque si se admite la petición; si no, lanza Rejected"""
+        try:
+            wait = self.rate_limiter.acquire(client)
+            if wait:
+                raise Rejected('rate_limited', 429, wait, "Demasiadas peticiones: espera antes de reintentar")
+            self.limiter.acquire()
+        except Rejected as e:
+            ADMISSION_REJECTIONS.inc(pool=self.pool, reason=e.reason)
+            raise
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self.limiter.release(time.monotonic() - t0)
+
+    def status(self):
+        return {
+            'active': self.limiter.active,
+            'queued': self.limiter.waiting,
+            'max_concurrent': self.limiter.max_concurrent,
+            'max_queue': self.limiter.max_queue,
+            'client_rate_limit': self.rate_limiter.rate,
+        }
+
+
+def client_key(remote_addr, forwarded_for=None, trusted_proxies=TRUSTED_PROXIES):
+    """
+    IP del cliente. Cada proxy añade la suya al final de X-Forwarded-For, así que
+    se toma la que dejó el proxy de confianza más externo (las anteriores las
+    puede inventar el cliente).
+    """
+    hops = [hop.strip() for hop in (forwarded_for or '').split(',') if hop.strip()]
+    if trusted_proxies > 0 and hops:
+        return hops[-min(trusted_proxies, len(hops))]
+    return remote_addr or 'unknown'
@@ -1,23 +1,142 @@
 # src/api/app.py
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, Response, send_from_directory
 from flask_cors import CORS
 import subprocess
 import sys
 import os
 import json
+import time
+import functools
 from datetime import datetime
 
 def create_app():
     app = Flask(__name__)
     CORS(app)
+    # Títulos y sinopsis en UTF-8 tal cual (sin escapes \uXXXX) y JSON sin espacios
+    app.json.ensure_ascii = False
+    app.json.compact = True
 
     # Configurar paths - desde src/api/
     ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     sys.path.insert(0, ROOT_DIR)
+    sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
 
-    def run_pipeline(username):
-        """Ejecutar el pipeline completo de recomendación"""
+    from model.filters import parse_filter_params
+    from services import serving
+    from services.serving import load_blacklist_ids, load_user_blacklist_ids
+    from services import fallback
+    from services.deadline import BUDGET_HEADER, Deadline, DeadlineExceeded, parse_budget
+    from services.pagination import check_cursor, decode_cursor, fingerprint, page, page_limit, parse_limit
+    from data.blacklist_store import get_store as get_blacklist_store, parse_ids, user_scope
+    from services.warmup import warmup, start_background_threads
+    from services.model_refresher import refresher
+    from monitoring.metrics import REGISTRY, REQUEST_DURATION, IN_FLIGHT, stage, import_events
+    from monitoring import tracing
+    from monitoring.tracing import span, import_spans
+    from monitoring import profiling
+    from api.admission import Admission, Rejected, client_key
+    from api.payload import parse_fields, parse_description_length, shape_records, compress_response
+
+    # Calentamiento en segundo plano (/api/ready responde 503 hasta que termina) y
+    # refresco azul/verde del modelo. Con gunicorn.conf.py los arranca post_fork en
+    # cada worker: el maestro (preload_app) no debe tener hilos antes del fork.
+    if os.environ.get('BACKGROUND_THREADS_ON_IMPORT', '1') != '0':
+        start_background_threads()
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_t0 = time.perf_counter()
+        IN_FLIGHT.inc(kind='http')
+        # Span raíz de la petición (vacío si TRACING no está activo)
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        g.trace = tracing.start_trace(f"{request.method} {endpoint}",
+                                      request_id=request.headers.get(tracing.REQUEST_ID_HEADER),
+                                      path=request.path)
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'metrics_t0' in g:
+            endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            REQUEST_DURATION.observe(time.perf_counter() - g.metrics_t0, endpoint=endpoint,
+                                     method=request.method, status=response.status_code)
+        trace = g.get('trace')
+        if trace is not None and trace.trace_id is not None:
+            trace.set('http.status', response.status_code)
+            trace.set('response_bytes', response.content_length)
+            response.headers[tracing.REQUEST_ID_HEADER] = trace.trace_id
+        return response
+
+    @app.after_request
+    def compress(response):
+        # Registrado después que las métricas, se ejecuta antes: response_bytes es el tamaño comprimido
+        return compress_response(response, request.accept_encodings)
+
+    @app.teardown_request
+    def finish_request_metrics(exc=None):
+        trace = g.pop('trace', None)
+        if trace is not None and trace.trace_id is not None:
+            if exc is not None:
+                trace.error = f"{type(exc).__name__}: {exc}"
+            trace.end()
+        if g.pop('metrics_t0', None) is not None:
+            IN_FLIGHT.dec(kind='http')
+            REGISTRY.flush()
+
+    # Control de admisión de los endpoints pesados (los ligeros no pasan por aquí)
+    recommendations_admission = Admission('recommendations')
+
+    def admission_controlled(view):
+        """Rechaza en el acto (429/503 con Retry-After) en vez de encolar hasta el timeout"""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            client = client_key(request.remote_addr, request.headers.get('X-Forwarded-For'))
+            try:
+                with recommendations_admission.admit(client):
+                    return view(*args, **kwargs)
+            except Rejected as e:
+                print(f"🚦 Petición rechazada ({e.reason}) para {client}")
+                tracing.set_attributes(admission=e.reason)
+                return jsonify({
+                    "status": "error",
+                    "message": str(e),
+                    "reason": e.reason,
+                    "retry_after": e.retry_after,
+                    "timestamp": datetime.now().isoformat()
+                }), e.status, {'Retry-After': str(e.retry_after)}
+        return wrapper
+
+    # 'auto': recomendaciones en el proceso (solo NumPy) si hay artefactos de serving,
+    # con el pipeline en subproceso como respaldo; 'subprocess': siempre el pipeline
+    SERVING_MODE = os.environ.get('SERVING_MODE', 'auto').strip().lower()
+    if SERVING_MODE != 'subprocess' and not serving.in_process_supported():
+        print(f"⚠️ RECOMMENDER_ENGINE={serving.RECOMMENDER_ENGINE} no se sirve en proceso: "
+              f"las recomendaciones usan el pipeline en subproceso")
+
+    def in_process_enabled():
+        return SERVING_MODE != 'subprocess' and serving.in_process_available()
+
+    def run_in_process(username, filters=None, profile_id=None, limit=10, cursor=None):
+        """Recomendaciones con el serving ligero; (None, None) si no está disponible"""
+        if not in_process_enabled():
+            return None, None
+        try:
+            with IN_FLIGHT.track(kind='in_process'), span('in_process'), profiling.profile(profile_id, 'in_process'):
+                output = serving.recommend_for_user(username, filters, top_n=limit, cursor=cursor)
+            return output, output.get('message') if output.get('status') != 'success' else None
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            print(f"⚠️ Serving en proceso no disponible, usando el pipeline: {e}")
+            return None, None
+
+    def run_pipeline(username, filters=None, profile_id=None, deadline=None, top_n=10):
+        """
+        Ejecutar el pipeline completo de recomendación. Con `deadline` el subproceso
+        hereda el plazo (REQUEST_DEADLINE) y se corta al agotarse: DeadlineExceeded.
+        """
         try:
+            if deadline is not None:
+                deadline.check('pipeline')
             print(f"🚀 Iniciando pipeline para usuario: {username}")
             
             script_path = os.path.join(ROOT_DIR, 'src', 'services', 'get_recommendations_for_user.py')
@@ -35,10 +154,25 @@ def create_app():
             env = os.environ.copy()
             env['PYTHONIOENCODING'] = 'utf-8'
             env['PYTHONUTF8'] = '1'
+            if profile_id:
+                # El subproceso se perfila a sí mismo (ahí corren pandas, TF-IDF, SVD...)
+                env['PROFILE_ID'] = profile_id
+            
+            timeout = 300
+            if deadline is not None:
+                env = deadline.child_env(env)
+                timeout = deadline.stage_timeout('pipeline')
+
+            cmd = [sys.executable, '-u', script_path, username]
+            if filters or top_n != 10:
+                cmd.append(json.dumps(filters or {}))
+            if top_n != 10:
+                cmd.append(str(top_n))
             
-            result = subprocess.run([
-                sys.executable, '-u', script_path, username
-            ], capture_output=True, text=True, cwd=ROOT_DIR, timeout=300, env=env)
+            with IN_FLIGHT.track(kind='pipeline'), span('pipeline_subprocess'):
+                # El subproceso continúa la traza de esta petición (TRACE_REQUEST_ID)
+                result = subprocess.run(cmd, capture_output=True, text=True, cwd=ROOT_DIR, timeout=timeout,
+                                        env=tracing.child_env(env))
             
             print(f"📋 Return code: {result.returncode}")
             print(f"📋 STDOUT length: {len(result.stdout)}")
@@ -65,6 +199,11 @@ def create_app():
                     
                     print(f"📋 JSON a parsear: {json_text[:100]}...")
                     output = json.loads(json_text)
+                    # Etapas medidas en el subproceso (descarga, parseo, merge, TF-IDF, SVD...)
+                    import_events(output.pop('metrics', None))
+                    import_spans(output.pop('trace', None))
+                    if output.get('deadline_exceeded'):
+                        raise DeadlineExceeded(output['deadline_exceeded'], output.get('partial_entries'))
                     return output, None
                     
                 except json.JSONDecodeError as e:
@@ -77,8 +216,12 @@ def create_app():
                 return None, error_msg
                 
         except subprocess.TimeoutExpired:
+            if deadline is not None:
+                raise DeadlineExceeded('pipeline')
             print("❌ Error de timeout del subproceso (5 minutos).")
             return None, "El proceso de recomendación tardó más de 5 minutos."
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"❌ Error al ejecutar el subproceso: {e}")
             return None, f"Error interno al ejecutar el pipeline: {str(e)}"
@@ -96,7 +239,14 @@ def create_app():
                 "health": "/api/health",
                 "status": "/api/status", 
                 "recommendations": "/api/recommendations/<username>",
-                "blacklist": "/api/blacklist"
+                "recommendation_filters": "genre, tag, studio, type, status, min_score, min_episodes, max_episodes",
+                "recommendation_payload": "fields=title,MAL_ID,... description_length=<n> (gzip con Accept-Encoding)",
+                "recommendation_pages": "limit=<1-100> cursor=<next_cursor de la página anterior>",
+                "batch_recommendations": "POST /api/recommendations/batch",
+                "ready": "/api/ready",
+                "metrics": "/api/metrics",
+                "traces": "/api/debug/traces (TRACING=1)",
+                "blacklist": "/api/blacklist?user=<username>&since=<version>"
             },
             "example": "https://anime-recommender-aykp.onrender.com/api/recommendations/SrAlex16"
         })
@@ -127,33 +277,197 @@ def create_app():
                 "timestamp": datetime.now().isoformat()
             }), 500
 
+    @app.route('/api/ready', methods=['GET'])
+    def readiness_check():
+        """
+        Readiness para el balanceador: 200 solo cuando este proceso ya cargó
+        catálogo y modelo y completó una recomendación sintética (/api/health
+        solo indica que el proceso está vivo).
+        """
+        warmup.ensure_started()
+        warmup.retry()
+        status = warmup.status()
+        return jsonify({
+            "status": "ready" if status['ready'] else status['state'],
+            "model_version": status['model_version'],
+            "timings": status['timings'],
+            "warmup": status,
+            "timestamp": datetime.now().isoformat()
+        }), 200 if status['ready'] else 503
+
+    @app.route('/api/metrics', methods=['GET'])
+    def get_metrics():
+        """Métricas en formato texto de Prometheus (latencias por petición y etapa, cachés, memoria)"""
+        return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    @app.route('/api/debug/traces', methods=['GET'])
+    def list_traces():
+        """Últimas trazas de este proceso (solo con TRACING=1)"""
+        if not tracing.ENABLED:
+            return jsonify({"status": "error", "message": "Trazado desactivado (TRACING=1)"}), 404
+        limit = request.args.get('limit', '50')
+        traces = tracing.recent_traces(int(limit) if limit.isdigit() else 50)
+        return jsonify({
+            "status": "success",
+            "pid": os.getpid(),
+            "count": len(traces),
+            "traces": traces,
+            "timestamp": datetime.now().isoformat()
+        })
+
+    @app.route('/api/debug/traces/<request_id>', methods=['GET'])
+    def get_trace(request_id):
+        """Spans de una petición anidados por padre (de memoria o del JSONL exportado)"""
+        if not tracing.ENABLED:
+            return jsonify({"status": "error", "message": "Trazado desactivado (TRACING=1)"}), 404
+        spans = tracing.get_trace(request_id)
+        if not spans:
+            return jsonify({"status": "error", "message": f"Traza '{request_id}' no encontrada"}), 404
+        return jsonify({
+            "status": "success",
+            "request_id": request_id,
+            "span_count": len(spans),
+            "spans": tracing.build_tree(spans),
+            "timestamp": datetime.now().isoformat()
+        })
+
+    def profile_access_error():
+        """Los perfiles solo se sirven con PROFILE_TOKEN configurado y la cabecera X-Profile correcta"""
+        if not profiling.PROFILE_TOKEN:
+            return jsonify({"status": "error", "message": "Perfilado desactivado (PROFILE_TOKEN)"}), 404
+        if not profiling.authorized(request.headers.get(profiling.PROFILE_HEADER)):
+            return jsonify({"status": "error", "message": "Token de perfilado inválido"}), 403
+        return None
+
+    @app.route('/api/debug/profiles', methods=['GET'])
+    def list_profiles():
+        """Perfiles de peticiones guardados en PROFILE_DIR"""
+        error = profile_access_error()
+        if error:
+            return error
+        profiles = profiling.list_profiles(profiling.PROFILE_DIR)
+        return jsonify({
+            "status": "success",
+            "count": len(profiles),
+            "profiles": profiles,
+            "timestamp": datetime.now().isoformat()
+        })
+
+    @app.route('/api/debug/profiles/<profile_id>', methods=['GET'])
+    @app.route('/api/debug/profiles/<profile_id>/<filename>', methods=['GET'])
+    def get_profile(profile_id, filename=None):
+        """Ficheros del perfil de una petición; con <filename>, descarga uno (.prof o .txt)"""
+        error = profile_access_error()
+        if error:
+            return error
+        files = profiling.files_for(profile_id, profiling.PROFILE_DIR)
+        if not files or (filename is not None and filename not in files):
+            return jsonify({"status": "error", "message": f"Perfil '{profile_id}' no encontrado"}), 404
+        if filename is not None:
+            return send_from_directory(profiling.PROFILE_DIR, filename, as_attachment=True)
+        return jsonify({
+            "status": "success",
+            "profile_id": profile_id,
+            "files": files,
+            "timestamp": datetime.now().isoformat()
+        })
+
     @app.route('/api/status', methods=['GET'])
     def get_api_status():
         """Endpoint para verificar estado del servicio"""
         return jsonify({
             "status": "running",
             "service": "anime-recommender",
+            "serving_mode": "in_process" if in_process_enabled() else "subprocess",
+            "startup": serving.timings(),
+            "model_refresh": refresher.status(),
+            "admission": recommendations_admission.status(),
             "timestamp": datetime.now().isoformat()
         })
 
     @app.route('/api/recommendations/<username>', methods=['GET'])
+    @admission_controlled
     def get_user_recommendations(username):
-        """Endpoint principal para generar recomendaciones"""
+        """Endpoint principal para generar recomendaciones (admite filtros por query params)"""
         print(f"🎯 Solicitando recomendaciones para: {username}")
         
         try:
-            response_data, error = run_pipeline(username)
+            filters = parse_filter_params(request.args)
+            # Proyección de campos y recorte de sinopsis (api/payload.py)
+            fields = parse_fields(request.args.get('fields'))
+            description_length = parse_description_length(request.args.get('description_length'))
+            # Paginación: ?limit=&cursor= (services/pagination.py)
+            limit = parse_limit(request.args.get('limit'))
+            cursor = decode_cursor(request.args.get('cursor'))
+            page_key = fingerprint(username, filters)
+            offset = check_cursor(cursor, None, page_key)
+            # offset + limit nunca pasa de RANKED_CANDIDATES (trabajo acotado por petición)
+            limit = page_limit(offset, limit)
+            # Presupuesto de latencia de la petición (services/deadline.py)
+            deadline = Deadline(parse_budget(request.headers.get(BUDGET_HEADER)))
+        except ValueError as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e),
+                "timestamp": datetime.now().isoformat()
+            }), 400
+        
+        # Perfilado bajo demanda: cabecera X-Profile con PROFILE_TOKEN (o PROFILE_REQUESTS=1)
+        profile_id = None
+        if profiling.requested(request.headers.get(profiling.PROFILE_HEADER)):
+            profile_id = profiling.profile_id_for(tracing.current_request_id()
+                                                  or request.headers.get(tracing.REQUEST_ID_HEADER))
+            tracing.set_attributes(profile_id=profile_id)
+        profile_headers = {'X-Profile-Id': profile_id} if profile_id else {}
+        
+        try:
+            try:
+                with deadline.activate():
+                    response_data, error = run_in_process(username, filters, profile_id, limit, cursor)
+                    if response_data is None:
+                        # El pipeline no cachea el ranking: calcula offset + limit y se corta aquí
+                        response_data, error = run_pipeline(username, filters, profile_id, deadline,
+                                                            top_n=offset + limit)
+                        if response_data and response_data.get('status') == 'success':
+                            recommendations = response_data['recommendations']
+                            recommendations, next_cursor = page(recommendations, offset, limit, None, page_key,
+                                                                has_more=len(recommendations) == offset + limit)
+                            response_data.update(recommendations=recommendations, count=len(recommendations),
+                                                 offset=offset, next_cursor=next_cursor)
+                if response_data and response_data.get('status') == 'success' and offset == 0:
+                    fallback.remember(username, filters, response_data)
+            except DeadlineExceeded as e:
+                # Presupuesto agotado: se responde ya con el mejor nivel de respaldo disponible
+                print(f"⏱️ {e}; sirviendo respaldo para {username}")
+                response_data, error = fallback.fallback_recommendations(
+                    username, filters, top_n=offset + limit, entries=e.partial, stage=e.stage), None
+                if response_data is not None:
+                    # Sin ranking cacheado no hay páginas siguientes
+                    recommendations = response_data['recommendations'][offset:]
+                    response_data.update(recommendations=recommendations, count=len(recommendations),
+                                         offset=offset, next_cursor=None)
+                if response_data is None:
+                    return jsonify({
+                        "status": "error",
+                        "message": f"{e} y no hay recomendaciones de respaldo",
+                        "timestamp": datetime.now().isoformat()
+                    }), 503, profile_headers
+                profile_headers = dict(profile_headers, **{'X-Degraded': response_data['fallback']})
             
             if response_data and response_data.get('status') == 'success':
                 print(f"🎉 Éxito. Recomendaciones generadas: {len(response_data['recommendations'])} animes")
-                return jsonify(response_data), 200
+                with stage('serialization'):
+                    response_data = dict(response_data, recommendations=shape_records(
+                        response_data['recommendations'], fields, description_length))
+                    response = jsonify(response_data)
+                return response, 200, profile_headers
             else:
                 error_msg = error or response_data.get('message', 'Error desconocido en el pipeline')
                 return jsonify({
                     "status": "error",
                     "message": error_msg,
                     "timestamp": datetime.now().isoformat()
-                }), 400
+                }), 400, profile_headers
             
         except Exception as e:
             print(f"❌ Error en endpoint: {e}")
@@ -163,31 +477,115 @@ def create_app():
                 "timestamp": datetime.now().isoformat()
             }), 500
 
+    @app.route('/api/recommendations/batch', methods=['POST'])
+    @admission_controlled
+    def get_batch_recommendations():
+        """
+        Recomendaciones para muchos usuarios en una sola pasada del motor en memoria.
+
+        Body JSON: {"usernames": [...], "seeds": {"nombre": [{"anime_id": 1, "score": 9}, ...]},
+                    "top_n": 10, "filters": {"genre": ["Action"], "min_score": 75},
+                    "fields": ["MAL_ID", "title"], "description_length": 200}
+        """
+        try:
+            data = request.get_json(silent=True) or {}
+            usernames = data.get('usernames') or []
+            seeds = data.get('seeds') or {}
+            if not isinstance(usernames, list) or not isinstance(seeds, dict):
+                raise ValueError("'usernames' debe ser una lista y 'seeds' un objeto")
+            if not usernames and not seeds:
+                raise ValueError("No se proporcionaron usuarios ni listas semilla")
+
+            top_n = int(data.get('top_n', 10))
+            if not 1 <= top_n <= 100:
+                raise ValueError("'top_n' debe estar entre 1 y 100")
+            filters = parse_filter_params(data.get('filters') or {})
+            fields = parse_fields(data.get('fields'))
+            description_length = parse_description_length(data.get('description_length'))
+        except (TypeError, ValueError) as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e),
+                "timestamp": datetime.now().isoformat()
+            }), 400
+
+        try:
+            from services.recommendation_engine import get_batch_recommendations as run_batch
+
+            with IN_FLIGHT.track(kind='batch'):
+                response_data = run_batch(usernames, seeds, top_n=top_n, filters=filters,
+                                          exclude_mal_ids=load_blacklist_ids(),
+                                          exclusions_for=load_user_blacklist_ids)
+            print(f"🎉 Lote completado: {response_data['count']} usuarios")
+            with stage('serialization'):
+                for result in response_data['results'].values():
+                    if 'recommendations' in result:
+                        result['recommendations'] = shape_records(result['recommendations'], fields,
+                                                                  description_length)
+                response = jsonify(response_data)
+            return response, 200
+
+        except ValueError as e:
+            return jsonify({
+                "status": "error",
+                "message": str(e),
+                "timestamp": datetime.now().isoformat()
+            }), 400
+        except Exception as e:
+            print(f"❌ Error en lote de recomendaciones: {e}")
+            return jsonify({
+                "status": "error",
+                "message": f"Error interno del servidor: {str(e)}",
+                "timestamp": datetime.now().isoformat()
+            }), 500
+
     # ========== BLACKLIST ENDPOINTS ==========
     
+    def blacklist_scope(data=None):
+        """Ámbito pedido: ?user=<username> (o "user" en el cuerpo); sin usuario, la blacklist global"""
+        return user_scope(request.args.get('user') or (data or {}).get('user'))
+
     @app.route('/api/blacklist', methods=['GET'])
     def get_blacklist():
-        """Obtener la lista completa de IDs en blacklist"""
+        """
+        Obtener la blacklist de un ámbito. Con ?since=<versión> solo devuelve los
+        cambios posteriores (added/removed). El ETag lleva la versión del ámbito,
+        así que las escrituras en otros ámbitos no invalidan la caché del cliente.
+        """
         try:
-            blacklist_path = os.path.join(ROOT_DIR, 'data', 'blacklist.json')
-            
-            if not os.path.exists(blacklist_path):
+            scope = blacklist_scope()
+            store = get_blacklist_store()
+            version = store.version()
+            etag = f'W/"blacklist-{scope}-{store.scope_version(scope)}"'
+            if request.headers.get('If-None-Match') == etag:
+                return '', 304, {'ETag': etag}
+
+            since = request.args.get('since')
+            if since is not None:
+                if not since.isdigit():
+                    return jsonify({
+                        "status": "error",
+                        "message": "'since' debe ser un número de versión",
+                        "timestamp": datetime.now().isoformat()
+                    }), 400
+                delta = store.changes(int(since), scope)
                 return jsonify({
                     "status": "success",
-                    "blacklist": [],
-                    "count": 0,
+                    "scope": scope,
+                    "since": int(since),
+                    **delta,
                     "timestamp": datetime.now().isoformat()
-                }), 200
-            
-            with open(blacklist_path, 'r', encoding='utf-8') as f:
-                blacklist = json.load(f)
-            
+                }), 200, {'ETag': etag}
+
+            blacklist = store.ids(scope)
             return jsonify({
                 "status": "success",
+                "scope": scope,
+                "version": version,
                 "blacklist": blacklist,
                 "count": len(blacklist),
                 "timestamp": datetime.now().isoformat()
-            }), 200
+            }), 200, {'ETag': etag}
             
         except Exception as e:
             print(f"❌ Error obteniendo blacklist: {e}")
@@ -196,114 +594,57 @@ def create_app():
                 "message": str(e),
                 "timestamp": datetime.now().isoformat()
             }), 500
-    
-    @app.route('/api/blacklist', methods=['POST'])
-    def add_to_blacklist():
-        """Añadir IDs a la blacklist"""
+
+    def update_blacklist(add):
+        """Añade o elimina IDs de un ámbito: solo se escriben los IDs que cambian"""
+        action = "añadir" if add else "eliminar"
         try:
-            data = request.get_json()
-            anime_ids = data.get('anime_ids', [])
+            data = request.get_json(silent=True) or {}
+            anime_ids = parse_ids(data.get('anime_ids', []))
             
             if not anime_ids:
                 return jsonify({
                     "status": "error",
-                    "message": "No se proporcionaron IDs para añadir",
+                    "message": f"No se proporcionaron IDs para {action}",
                     "timestamp": datetime.now().isoformat()
                 }), 400
-            
-            # Convertir a enteros
-            anime_ids = [int(id) for id in anime_ids if str(id).isdigit()]
-            
-            blacklist_path = os.path.join(ROOT_DIR, 'data', 'blacklist.json')
-            os.makedirs(os.path.dirname(blacklist_path), exist_ok=True)
-            
-            # Cargar blacklist existente
-            existing_blacklist = []
-            if os.path.exists(blacklist_path):
-                with open(blacklist_path, 'r', encoding='utf-8') as f:
-                    existing_blacklist = json.load(f)
-            
-            # Añadir nuevos IDs (sin duplicados)
-            updated_blacklist = list(set(existing_blacklist + anime_ids))
-            
-            # Guardar
-            with open(blacklist_path, 'w', encoding='utf-8') as f:
-                json.dump(updated_blacklist, f, indent=2)
-            
-            print(f"✅ {len(anime_ids)} IDs añadidos a blacklist. Total: {len(updated_blacklist)}")
+
+            scope = blacklist_scope(data)
+            store = get_blacklist_store()
+            changed, version = (store.add if add else store.remove)(anime_ids, scope)
+            blacklist = store.ids(scope)
+
+            print(f"✅ {len(changed)} IDs {'añadidos a' if add else 'eliminados de'} blacklist ({scope}). "
+                  f"Total: {len(blacklist)}")
             
             return jsonify({
                 "status": "success",
-                "message": f"{len(anime_ids)} animes añadidos a la blacklist",
-                "blacklist": updated_blacklist,
-                "count": len(updated_blacklist),
+                "message": f"{len(changed)} animes {'añadidos a' if add else 'eliminados de'} la blacklist",
+                "scope": scope,
+                "version": version,
+                "added" if add else "removed": changed,
+                "blacklist": blacklist,
+                "count": len(blacklist),
                 "timestamp": datetime.now().isoformat()
             }), 200
             
         except Exception as e:
-            print(f"❌ Error añadiendo a blacklist: {e}")
+            print(f"❌ Error al {action} en blacklist: {e}")
             return jsonify({
                 "status": "error",
                 "message": str(e),
                 "timestamp": datetime.now().isoformat()
             }), 500
     
+    @app.route('/api/blacklist', methods=['POST'])
+    def add_to_blacklist():
+        """Añadir IDs a la blacklist"""
+        return update_blacklist(add=True)
+    
     @app.route('/api/blacklist', methods=['DELETE'])
     def remove_from_blacklist():
         """Eliminar IDs de la blacklist"""
-        try:
-            data = request.get_json()
-            anime_ids = data.get('anime_ids', [])
-            
-            if not anime_ids:
-                return jsonify({
-                    "status": "error",
-                    "message": "No se proporcionaron IDs para eliminar",
-                    "timestamp": datetime.now().isoformat()
-                }), 400
-            
-            # Convertir a enteros
-            anime_ids = [int(id) for id in anime_ids if str(id).isdigit()]
-            
-            blacklist_path = os.path.join(ROOT_DIR, 'data', 'blacklist.json')
-            
-            if not os.path.exists(blacklist_path):
-                return jsonify({
-                    "status": "success",
-                    "message": "La blacklist está vacía",
-                    "blacklist": [],
-                    "count": 0,
-                    "timestamp": datetime.now().isoformat()
-                }), 200
-            
-            # Cargar blacklist
-            with open(blacklist_path, 'r', encoding='utf-8') as f:
-                existing_blacklist = json.load(f)
-            
-            # Eliminar IDs
-            updated_blacklist = [id for id in existing_blacklist if id not in anime_ids]
-            
-            # Guardar
-            with open(blacklist_path, 'w', encoding='utf-8') as f:
-                json.dump(updated_blacklist, f, indent=2)
-            
-            print(f"✅ {len(anime_ids)} IDs eliminados de blacklist. Total: {len(updated_blacklist)}")
-            
-            return jsonify({
-                "status": "success",
-                "message": f"{len(anime_ids)} animes eliminados de la blacklist",
-                "blacklist": updated_blacklist,
-                "count": len(updated_blacklist),
-                "timestamp": datetime.now().isoformat()
-            }), 200
-            
-        except Exception as e:
-            print(f"❌ Error eliminando de blacklist: {e}")
-            return jsonify({
-                "status": "error",
-                "message": str(e),
-                "timestamp": datetime.now().isoformat()
-            }), 500
+        return update_blacklist(add=False)
 
     return app
 
@@ -0,0 +1,101 @@
+# src/api/payload.py - Respuestas de recomendación compactas: proyección, recorte y compresión
+"""
+Reduce el tamaño de las respuestas para clientes móviles con enlaces lentos:
+
+  - `?fields=title,MAL_ID,score`: solo esos campos de cada recomendación
+    (model.engine.RECORD_FIELDS; un campo desconocido es un 400).
+  - `?description_length=200`: recorta la sinopsis a N caracteres (por palabra, con '…').
+  - Compresión gzip (o br si está instalado `brotli`) según Accept-Encoding, para
+    respuestas JSON/texto de más de COMPRESS_MIN_BYTES.
+"""
+import os
+import gzip
+
+from model.engine import RECORD_FIELDS
+
+try:
+    import brotli
+except ImportError:  # opcional: sin brotli solo se ofrece gzip
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+COMPRESS_LEVEL = 6
+COMPRESSIBLE_TYPES = ('application/json', 'text/plain', 'text/html')
+
+
+def parse_fields(value):
+    """Campos pedidos (tupla en el orden de RECORD_FIELDS) o None para todos; ValueError si hay desconocidos"""
+    if value is None:
+        return None
+    raw = value if isinstance(value, (list, tuple)) else str(value).split(',')
+    requested = {field.strip() for field in raw if str(field).strip()}
+    if not requested:
+        return None
+    unknown = sorted(requested - set(RECORD_FIELDS))
+    if unknown:
+        raise ValueError(f"Campos desconocidos en 'fields': {', '.join(unknown)} "
+                         f"(disponibles: {', '.join(RECORD_FIELDS)})")
+    return tuple(field for field in RECORD_FIELDS if field in requested)
+
+
+def parse_description_length(value):
+    """Longitud máxima de la sinopsis (None sin recorte); ValueError si no es un entero positivo"""
+    if value is None or str(value).strip() == '':
+        return None
+    try:
+        length = int(str(value).strip())
+    except ValueError:
+        raise ValueError(f"Parámetro 'description_length' inválido: {value}")
+    if length <= 0:
+        raise ValueError("Parámetro 'description_length' debe ser positivo")
+    return length
+
+
+def truncate(text, length):
+    if len(text) <= length:
+        return text
+    cut = text[:length]
+    # Sin cortar palabras, salvo que la primera ya sea más larga que el límite
+    space = cut.rfind(' ')
+    return (cut[:space] if space > length // 2 else cut).rstrip(' ,.;:') + '…'
+
+
+def shape_records(records, fields=None, description_length=None):
+    """Aplica proyección y recorte de sinopsis a una lista de recomendaciones"""
+    if fields is None and description_length is None:
+        return records
+    shaped = []
+    for record in records:
+        if description_length is not None and isinstance(record.get('description'), str):
+            record = dict(record, description=truncate(record['description'], description_length))
+        if fields is not None:
+            record = {field: record[field] for field in fields if field in record}
+        shaped.append(record)
+    return shaped
+
+
+def choose_encoding(accept_encodings):
+    """'br', 'gzip' o None según la calidad que da el cliente a cada codificación (werkzeug Accept)"""
+    gzip_quality = accept_encodings.quality('gzip')
+    if brotli is not None and accept_encodings.quality('br') and accept_encodings.quality('br') >= gzip_quality:
+        return 'br'
+    return 'gzip' if gzip_quality else None
+
+
+def compress_response(response, accept_encodings, min_bytes=COMPRESS_MIN_BYTES):
+    """Comprime el cuerpo de `response` si el cliente lo admite y merece la pena"""
+    if (response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(accept_encodings)
+    data = response.get_data()
+    if encoding is None or len(data) < min_bytes:
+        return response
+    if encoding == 'br':
+        compressed = brotli.compress(data, quality=COMPRESS_LEVEL)
+    else:
+        compressed = gzip.compress(data, compresslevel=COMPRESS_LEVEL)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,300 @@
+# src/benchmarks/evaluate_quality.py - Calidad de las recomendaciones frente a coste (tiempo y memoria)
+"""
+Evaluación offline por retención ("holdout"): de la lista puntuada de cada
+usuario se aparta una fracción (--holdout). El resto forma el perfil y se mide
+si las recomendaciones recuperan los títulos apartados que el usuario puntuó
+bien (score >= --relevant-score):
+
+  - precision@k: aciertos / k
+  - recall@k:    aciertos / títulos relevantes apartados
+  - NDCG@k:      ganancia acumulada descontada por posición (relevancia binaria)
+
+Barre el tamaño del vocabulario TF-IDF (max_features), las dimensiones de SVD,
+la precisión de los embeddings (float64/float32), el motor (svd o sparse) y el
+score mínimo del catálogo. En cada punto mide el tiempo de ajuste (TF-IDF + SVD),
+el pico de memoria del ajuste, la latencia de puntuación por usuario y el tamaño
+del modelo en memoria. Al final marca los puntos Pareto-óptimos (NDCG frente a
+latencia y memoria) y propone la configuración más barata cuya calidad no baja
+más de --tolerance respecto de la mejor.
+
+Datos: el catálogo y las listas reales (data/merged_anime.csv y una o más
+listas en formato load.json con --lists), o --synthetic N usuarios sintéticos con
+gustos sobre un catálogo sintético de --titles títulos.
+
+Uso:
+  python src/benchmarks/evaluate_quality.py --synthetic 200 --titles 5000
+  python src/benchmarks/evaluate_quality.py --lists data/user_mal_list.json listas/*.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import ExitStack
+
+import numpy as np
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+sys.path.insert(0, SRC_DIR)
+
+DEFAULT_OUTPUT = os.path.join(ROOT_DIR, "data", "benchmarks", "evaluation.json")
+PRECISIONS = {"float64": np.float64, "float32": np.float32}
+ENGINES = ("svd", "sparse")
+
+
+def split_user(entries, row_of, holdout, relevant_score, rng):
+    """
+    Separa una lista de MAL en (filas de entrenamiento, pesos, filas apartadas
+    relevantes). Solo se apartan títulos puntuados; None si el usuario no tiene
+    ningún relevante apartado. Las filas de entrenamiento se excluyen de las
+    recomendaciones; las apartadas siguen siendo candidatas.
+    """
+    from model.engine import normalize_entries
+
+    pairs = [(row_of[mal_id], score) for mal_id, score in normalize_entries(entries) if mal_id in row_of]
+    rated = [i for i, (_, score) in enumerate(pairs) if score > 0]
+    if len(rated) < 2:
+        return None
+    held = set(rng.choice(rated, max(1, int(round(len(rated) * holdout))), replace=False).tolist())
+    train = [pair for i, pair in enumerate(pairs) if i not in held]
+    relevant = {pairs[i][0] for i in held if pairs[i][1] >= relevant_score}
+    if not relevant:
+        return None
+    return (np.array([row for row, _ in train], dtype=np.int64),
+            np.array([score for _, score in train], dtype=np.float64) / 10.0,
+            relevant)
+
+
+def ranking_metrics(recommended, relevant, k):
+    """precision@k, recall@k y NDCG@k (relevancia binaria) de una lista de filas"""
+    hits = [1.0 if row in relevant else 0.0 for row in recommended[:k]]
+    dcg = sum(hit / np.log2(i + 2) for i, hit in enumerate(hits))
+    ideal = sum(1.0 / np.log2(i + 2) for i in range(min(k, len(relevant))))
+    return sum(hits) / k, sum(hits) / len(relevant), dcg / ideal if ideal else 0.0
+
+
+def fit(df, engine, max_features, n_svd, precision):
+    """Ajusta el modelo de un punto del barrido (los tokens ya están cacheados)"""
+    from model.train_model import build_tfidf_matrix, fit_latent_matrix
+    from model.latent_model import LatentModel
+    from model.sparse_engine import build_inverted_index
+
+    tfidf_matrix = build_tfidf_matrix(df, max_features=max_features)
+    if engine == "sparse":
+        return build_inverted_index(tfidf_matrix)
+    latent_matrix = fit_latent_matrix(tfidf_matrix, n_svd=n_svd)
+    if latent_matrix is None:
+        raise ValueError("No hay suficientes componentes para SVD")
+    return LatentModel(latent_matrix.astype(PRECISIONS[precision]), df["id"].values)
+
+
+def model_bytes(model):
+    """Memoria que ocupa el modelo servido (embeddings o índice invertido)"""
+    from model.sparse_engine import InvertedIndex
+
+    if isinstance(model, InvertedIndex):
+        return int(sum(m.data.nbytes + m.indices.nbytes + m.indptr.nbytes
+                       for m in (model.doc_terms, model.postings)) + model.term_max.nbytes)
+    return int(model.embeddings.nbytes)
+
+
+def recommend(model, rows, weights, eligible, k):
+    """Top-k filas para un perfil de entrenamiento (mismo cálculo que get_recommendations)"""
+    from model.sparse_engine import InvertedIndex
+
+    if isinstance(model, InvertedIndex):
+        rated = weights > 0
+        terms, term_weights = model.query_vector(rows[rated], weights[rated])
+        return model.search(terms, term_weights, eligible, k)[0]
+    rated = weights > 0
+    profile = model.profile(rows[rated], weights[rated]).astype(model.embeddings.dtype)
+    return model.top_n(profile, eligible, k)[0]
+
+
+def evaluate_point(df, users, masks, k, **config):
+    """
+    Calidad y coste de una configuración: ajusta una vez y evalúa cada máscara
+    de catálogo ({score mínimo: máscara}). Devuelve un resultado por máscara.
+    """
+    t0 = time.perf_counter()
+    model = fit(df, **config)
+    fit_seconds = time.perf_counter() - t0
+
+    tracemalloc.start()
+    fit(df, **config)
+    fit_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    results = []
+    for min_score, base_mask in masks.items():
+        metrics, latencies = [], []
+        for rows, weights, relevant in users:
+            eligible = base_mask.copy()
+            eligible[rows] = False
+            t0 = time.perf_counter()
+            recommended = recommend(model, rows, weights, eligible, k)
+            latencies.append(time.perf_counter() - t0)
+            metrics.append(ranking_metrics(recommended.tolist(), relevant, k))
+
+        precision, recall, ndcg = np.mean(metrics, axis=0)
+        latencies_ms = np.array(latencies) * 1000
+        results.append({
+            **config,
+            "min_score": min_score,
+            f"precision@{k}": round(float(precision), 4),
+            f"recall@{k}": round(float(recall), 4),
+            f"ndcg@{k}": round(float(ndcg), 4),
+            "fit_seconds": round(fit_seconds, 3),
+            "fit_peak_bytes": int(fit_peak),
+            "model_bytes": model_bytes(model),
+            "scoring_ms_mean": round(float(latencies_ms.mean()), 3),
+            "scoring_ms_p95": round(float(np.percentile(latencies_ms, 95)), 3),
+        })
+    return results
+
+
+def sweep_points(engines, max_features, n_svd, precisions):
+    """Configuraciones de modelo del barrido (el motor disperso no usa SVD ni precisión)"""
+    points = []
+    for engine in engines:
+        for features in max_features:
+            if engine == "sparse":
+                points.append(dict(engine=engine, max_features=features, n_svd=None, precision="float64"))
+                continue
+            for dims in n_svd:
+                for precision in precisions:
+                    points.append(dict(engine=engine, max_features=features, n_svd=dims, precision=precision))
+    return points
+
+
+def pareto_front(results, quality, costs=("scoring_ms_mean", "model_bytes")):
+    """Marca cada resultado como Pareto-óptimo si ningún otro es igual o mejor en todo y mejor en algo"""
+    for result in results:
+        result["pareto"] = not any(
+            other is not result
+            and other[quality] >= result[quality] and all(other[c] <= result[c] for c in costs)
+            and (other[quality] > result[quality] or any(other[c] < result[c] for c in costs))
+            for other in results
+        )
+    return results
+
+
+def cheapest_within(results, quality, tolerance):
+    """Configuración más barata (memoria, luego latencia y ajuste) con calidad >= mejor·(1 - tolerance)"""
+    if not results:
+        return None
+    best = max(result[quality] for result in results)
+    keep = [result for result in results if result[quality] >= best * (1 - tolerance)]
+    return min(keep, key=lambda r: (r["model_bytes"], r["scoring_ms_mean"], r["fit_seconds"]))
+
+
+def print_table(results, quality, k):
+    print(f"\n{'motor':<7} {'features':>8} {'svd':>4} {'precisión':>9} {'min':>4} {'P@' + str(k):>7} "
+          f"{'R@' + str(k):>7} {'NDCG':>7} {'ajuste s':>9} {'pico MiB':>9} {'modelo MiB':>10} {'ms/usuario':>10}  pareto")
+    for r in sorted(results, key=lambda r: r[quality], reverse=True):
+        print(f"{r['engine']:<7} {r['max_features']:>8} {r['n_svd'] or '-':>4} {r['precision']:>9} {r['min_score']:>4} "
+              f"{r[f'precision@{k}']:>7.4f} {r[f'recall@{k}']:>7.4f} {r[quality]:>7.4f} {r['fit_seconds']:>9.3f} "
+              f"{r['fit_peak_bytes'] / 2**20:>9.1f} {r['model_bytes'] / 2**20:>10.2f} {r['scoring_ms_mean']:>10.3f}"
+              f"  {'★' if r['pareto'] else ''}")
+
+
+def _load_lists(paths):
+    lists = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            lists.append(json.load(f))
+    return lists
+
+
+def _int_list(text):
+    return [int(value) for value in text.split(",") if value]
+
+
+def main(argv=None):
+    from data.storage import write_json
+
+    parser = argparse.ArgumentParser(description="Evaluación offline de calidad frente a coste del recomendador")
+    parser.add_argument("--lists", nargs="*", default=[], help="Listas de MAL (load.json) a evaluar")
+    parser.add_argument("--synthetic", type=int, default=0, help="Usuarios sintéticos con gustos (sin datos reales)")
+    parser.add_argument("--titles", type=int, default=5000, help="Títulos del catálogo sintético")
+    parser.add_argument("--entries", type=int, default=150, help="Entradas de cada lista sintética")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fracción de la lista puntuada que se aparta")
+    parser.add_argument("--relevant-score", type=int, default=7, help="Score mínimo para contar como acierto")
+    parser.add_argument("--engines", default=",".join(ENGINES))
+    parser.add_argument("--max-features", default="2000,5000,10000,20000")
+    parser.add_argument("--n-svd", default="50,100,200")
+    parser.add_argument("--precisions", default="float64,float32")
+    parser.add_argument("--min-scores", default="0,70", help="Score mínimo de catálogo (filtro por defecto: 70)")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Pérdida de NDCG aceptable (relativa)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    engines = [engine for engine in args.engines.split(",") if engine]
+    precisions = [precision for precision in args.precisions.split(",") if precision]
+    if set(engines) - set(ENGINES) or set(precisions) - set(PRECISIONS):
+        parser.error(f"Motores válidos: {', '.join(ENGINES)}; precisiones: {', '.join(PRECISIONS)}")
+    if not args.lists and not args.synthetic:
+        default_list = os.path.join(ROOT_DIR, "data", "user_mal_list.json")
+        if not os.path.exists(default_list):
+            parser.error("Indica --lists con listas de MAL o --synthetic N")
+        args.lists = [default_list]
+
+    with ExitStack() as stack:
+        if args.synthetic:
+            from benchmarks.synthetic import generate_media, generate_taste_list, catalog_frame, redirect_data_dir
+
+            directory = stack.enter_context(tempfile.TemporaryDirectory(prefix="evaluate_"))
+            stack.enter_context(redirect_data_dir(directory))
+            media = generate_media(args.titles, args.seed)
+            catalog_frame(media).to_csv(os.path.join(directory, "merged_anime.csv"), index=False)
+            lists = [generate_taste_list(media, args.entries, seed=args.seed * 100000 + u)
+                     for u in range(args.synthetic)]
+        else:
+            lists = _load_lists(args.lists)
+
+        from model.train_model import read_catalog, add_combined_features, build_tfidf_matrix
+        from model.filters import FilterIndex
+
+        df = add_combined_features(read_catalog())
+        row_of = {}
+        for row, mal_id in enumerate(df["MAL_ID"].tolist()):
+            row_of.setdefault(int(mal_id), row)
+        rng = np.random.default_rng(args.seed)
+        users = [split for split in (split_user(entries, row_of, args.holdout, args.relevant_score, rng)
+                                     for entries in lists) if split is not None]
+        if not users:
+            print("❌ Ninguna lista tiene títulos puntuados relevantes en el catálogo")
+            return 1
+        print(f"📊 {len(users)} usuarios evaluados sobre {len(df)} títulos (holdout {args.holdout:.0%}, k={args.k})")
+
+        build_tfidf_matrix(df)  # tokeniza y cachea una vez: el barrido mide solo TF-IDF + SVD
+        filter_index = FilterIndex.build(df)
+        masks = {min_score: filter_index.mask({"min_score": min_score}) for min_score in _int_list(args.min_scores)}
+        points = sweep_points(engines, _int_list(args.max_features), _int_list(args.n_svd), precisions)
+        results = []
+        for i, point in enumerate(points, 1):
+            print(f"⏱️ [{i}/{len(points)}] {point}")
+            results.extend(evaluate_point(df, users, masks, args.k, **point))
+
+    quality = f"ndcg@{args.k}"
+    pareto_front(results, quality)
+    print_table(results, quality, args.k)
+    choice = cheapest_within(results, quality, args.tolerance)
+    config = {key: choice[key] for key in ("engine", "max_features", "n_svd", "precision", "min_score")}
+    print(f"\n✅ Más barata con NDCG a menos de {args.tolerance:.0%} de la mejor: {config} "
+          f"(NDCG {choice[quality]:.4f}, modelo {choice['model_bytes'] / 2**20:.2f} MiB, "
+          f"{choice['scoring_ms_mean']:.3f} ms/usuario)")
+
+    write_json(args.output, {"config": vars(args), "users": len(users), "titles": len(df),
+                             "results": results, "recommended": choice}, indent=2)
+    print(f"💾 Resultados guardados en {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
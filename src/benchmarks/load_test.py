@@ -0,0 +1,325 @@
+# src/benchmarks/load_test.py - Prueba de carga de la API con MAL y AniList sustituidos por servidores locales
+"""
+Arranca los sustitutos de MAL y AniList (stand_ins.py) y la API real apuntada a
+ellos, y lanza peticiones concurrentes contra:
+
+  - recommendations     GET    /api/recommendations/<usuario>
+  - blacklist_get       GET    /api/blacklist?user=<usuario>
+  - blacklist_add       POST   /api/blacklist {"user": ..., "anime_ids": [...]}
+  - blacklist_remove    DELETE /api/blacklist {"user": ..., "anime_ids": [...]}
+
+en la proporción de --mix. Informa por escenario del throughput, los percentiles
+de latencia, la tasa de errores y los códigos HTTP, y lo guarda en JSON. La API
+se arranca con Flask (--server flask) o con gunicorn.conf.py (--server gunicorn),
+o se usa una ya arrancada (--target, exportando antes las variables que imprime
+stand_ins.py).
+
+Los usuarios de la prueba (load_user_<n>) tienen sus propias blacklists por
+ámbito. Al terminar se vacían, así que la blacklist global no se toca.
+
+La API arrancada usa el catálogo real de data/merged_anime.csv (si falta, la
+prueba no arranca: la API descargaría el catálogo sintético del sustituto de
+AniList y lo guardaría como catálogo de producción). Lo que escribe por su
+cuenta (blacklist.db, locks, trazas y perfiles) va a un directorio temporal que
+se borra al terminar.
+
+Uso: python src/benchmarks/load_test.py --concurrency 16 --duration 60 --server gunicorn --workers 4
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import Counter
+
+import numpy as np
+import requests
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+sys.path.insert(0, SRC_DIR)
+
+from benchmarks.stand_ins import add_arguments, stand_ins_from_args
+
+DEFAULT_MIX = "recommendations=7,blacklist_get=1,blacklist_add=1,blacklist_remove=1"
+DEFAULT_OUTPUT = os.path.join(ROOT_DIR, "data", "benchmarks", "load_test.json")
+CATALOG_PATH = os.path.join(ROOT_DIR, "data", "merged_anime.csv")
+# Fuera del repositorio por defecto (--log para elegir otra ruta)
+DEFAULT_SERVER_LOG = os.path.join(tempfile.gettempdir(), "load_test_server.log")
+PERCENTILES = (50, 90, 95, 99)
+# IDs que añaden y quitan los escenarios de blacklist
+BLACKLIST_ID_RANGE = (1, 60000)
+
+
+def _recommendations(session, base_url, rng, options):
+    user = rng.choice(options["users"])
+    return session.get(f"{base_url}/api/recommendations/{user}", params=options["filters"],
+                       timeout=options["timeout"])
+
+
+def _blacklist_get(session, base_url, rng, options):
+    return session.get(f"{base_url}/api/blacklist", params={"user": rng.choice(options["users"])},
+                       timeout=options["timeout"])
+
+
+def _blacklist_update(method):
+    def scenario(session, base_url, rng, options):
+        payload = {"user": rng.choice(options["users"]), "anime_ids": [rng.randint(*BLACKLIST_ID_RANGE)]}
+        return session.request(method, f"{base_url}/api/blacklist", json=payload, timeout=options["timeout"])
+    return scenario
+
+
+SCENARIOS = {
+    "recommendations": _recommendations,
+    "blacklist_get": _blacklist_get,
+    "blacklist_add": _blacklist_update("POST"),
+    "blacklist_remove": _blacklist_update("DELETE"),
+}
+
+
+def parse_mix(text):
+    """'recommendations=7,blacklist_get=1' -> {'recommendations': 7.0, 'blacklist_get': 1.0}"""
+    mix = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Escenario desconocido '{name}'. Disponibles: {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("El mix de escenarios está vacío")
+    return mix
+
+
+def run_load(base_url, mix, users, concurrency=8, duration=30.0, max_requests=None, filters=None,
+             timeout=120.0, seed=0):
+    """
+    Lanza `concurrency` clientes contra `base_url` hasta agotar `duration`
+    segundos o `max_requests` peticiones. Devuelve (muestras, segundos), con
+    una muestra (escenario, código HTTP o None, latencia en s, error) por petición.
+    """
+    names, weights = list(mix), list(mix.values())
+    options = {"users": list(users), "filters": filters or {}, "timeout": timeout}
+    samples = []
+    lock = threading.Lock()
+    issued = [0]
+    deadline = time.perf_counter() + duration if duration else None
+
+    def client(worker):
+        rng = random.Random(seed * 1000 + worker)
+        with requests.Session() as session:
+            while deadline is None or time.perf_counter() < deadline:
+                with lock:
+                    if max_requests is not None and issued[0] >= max_requests:
+                        return
+                    issued[0] += 1
+                name = rng.choices(names, weights)[0]
+                t0 = time.perf_counter()
+                try:
+                    response = SCENARIOS[name](session, base_url, rng, options)
+                    status, error = response.status_code, None
+                except requests.exceptions.RequestException as e:
+                    status, error = None, type(e).__name__
+                sample = (name, status, time.perf_counter() - t0, error)
+                with lock:
+                    samples.append(sample)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - started
+
+
+def _stats(samples, elapsed):
+    latencies = np.array([latency for _, _, latency, _ in samples]) * 1000
+    errors = sum(1 for _, status, _, _ in samples if status is None or status >= 400)
+    stats = {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "status": dict(sorted(Counter(str(status or error) for _, status, _, error in samples).items())),
+    }
+    if samples:
+        stats["latency_ms"] = {
+            **{f"p{p}": round(float(v), 1) for p, v in zip(PERCENTILES, np.percentile(latencies, PERCENTILES))},
+            "mean": round(float(latencies.mean()), 1),
+            "max": round(float(latencies.max()), 1),
+        }
+    return stats
+
+
+def summarize(samples, elapsed):
+    """Estadísticas totales y por escenario"""
+    by_scenario = {}
+    for sample in samples:
+        by_scenario.setdefault(sample[0], []).append(sample)
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "total": _stats(samples, elapsed),
+        "scenarios": {name: _stats(rows, elapsed) for name, rows in sorted(by_scenario.items())},
+    }
+
+
+def print_report(summary):
+    print(f"\n{'escenario':<18} {'peticiones':>10} {'req/s':>8} {'errores':>8} "
+          + " ".join(f"{'p' + str(p):>8}" for p in PERCENTILES) + f" {'max':>8}  códigos")
+    for name, stats in [*summary["scenarios"].items(), ("TOTAL", summary["total"])]:
+        latency = stats.get("latency_ms", {})
+        print(f"{name:<18} {stats['requests']:>10} {stats['throughput_rps']:>8.1f} {stats['error_rate']:>7.1%} "
+              + " ".join(f"{latency.get('p' + str(p), 0):>8.1f}" for p in PERCENTILES)
+              + f" {latency.get('max', 0):>8.1f}  {stats['status']}")
+    print("(latencias en ms)")
+
+
+def isolated_env(state_dir):
+    """Variables que llevan a `state_dir` todo lo que la API escribe fuera del catálogo"""
+    return {
+        "BLACKLIST_DB_PATH": os.path.join(state_dir, "blacklist.db"),
+        "DATA_LOCK_DIR": os.path.join(state_dir, "locks"),
+        "TRACE_EXPORT_PATH": os.path.join(state_dir, "traces.jsonl"),
+        "PROFILE_DIR": os.path.join(state_dir, "profiles"),
+    }
+
+
+def start_server(kind, port, env, workers=2, log_path=DEFAULT_SERVER_LOG, state_dir=None):
+    """
+    Arranca la API real en un subproceso con el entorno de los sustitutos; su
+    salida va a `log_path` y su estado (blacklist, locks, trazas) a `state_dir`.
+    """
+    env = {**os.environ, **env, "PORT": str(port), "PYTHONIOENCODING": "utf-8"}
+    if state_dir is not None:
+        env.update(isolated_env(state_dir))
+    # Todo el tráfico sale de la misma IP: sin límite por cliente (el de concurrencia sigue activo)
+    env.setdefault("CLIENT_RATE_LIMIT", "0")
+    if kind == "gunicorn":
+        env["WEB_CONCURRENCY"] = str(workers)
+        cmd = [sys.executable, "-m", "gunicorn", "src.api.app:app"]
+    else:
+        cmd = [sys.executable, os.path.join(SRC_DIR, "api", "app.py")]
+    os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+    print(f"🚀 Arrancando la API ({kind}) en el puerto {port}; log en {log_path}")
+    # El subproceso hereda su propia copia del descriptor
+    with open(log_path, "w", encoding="utf-8") as log:
+        return subprocess.Popen(cmd, cwd=ROOT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_for_server(base_url, process=None, timeout=60):
+    """Espera a que /api/health responda 200"""
+    start = time.time()
+    while time.time() - start < timeout:
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            if requests.get(f"{base_url}/api/health", timeout=2).status_code == 200:
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def clear_blacklists(base_url, users):
+    """Vacía las blacklists de los usuarios de la prueba"""
+    for user in users:
+        try:
+            ids = requests.get(f"{base_url}/api/blacklist", params={"user": user}, timeout=10).json().get("blacklist")
+            if ids:
+                requests.delete(f"{base_url}/api/blacklist", json={"user": user, "anime_ids": ids}, timeout=10)
+        except (requests.exceptions.RequestException, ValueError):
+            pass
+
+
+def main(argv=None):
+    from data.storage import write_json
+
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API con MAL y AniList locales")
+    add_arguments(parser)
+    parser.add_argument("--target", help="URL de una API ya arrancada (no se arranca ninguna)")
+    parser.add_argument("--server", choices=["flask", "gunicorn"], default="flask")
+    parser.add_argument("--workers", type=int, default=2, help="Workers de gunicorn")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--concurrency", type=int, default=8, help="Clientes simultáneos")
+    parser.add_argument("--duration", type=float, default=30, help="Segundos de carga")
+    parser.add_argument("--requests", type=int, default=None, help="Límite de peticiones (además de --duration)")
+    parser.add_argument("--users", type=int, default=20, help="Usuarios distintos de MAL")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Peso de cada escenario")
+    parser.add_argument("--filters", default="", help="Query de filtros de las recomendaciones, p. ej. 'genre=Action'")
+    parser.add_argument("--timeout", type=float, default=120, help="Timeout por petición (s)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--log", default=DEFAULT_SERVER_LOG, help="Fichero con la salida de la API arrancada")
+    parser.add_argument("--max-error-rate", type=float, default=None, help="Falla (código 1) si se supera")
+    parser.add_argument("--max-p95-ms", type=float, default=None, help="Falla (código 1) si el p95 total lo supera")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    users = [f"load_user_{i}" for i in range(args.users)]
+    filters = dict(part.split("=", 1) for part in args.filters.split("&") if "=" in part)
+    if not args.target and not os.path.exists(CATALOG_PATH):
+        print(f"❌ No existe {CATALOG_PATH}: la API guardaría ahí el catálogo sintético del sustituto. "
+              f"Descarga el catálogo real (src/data/fetch_datasets.py) o usa --target")
+        return 1
+    if args.catalog is None and os.path.exists(CATALOG_PATH):
+        # La API usa el catálogo que ya está en data/: las listas de MAL deben usar sus IDs
+        args.catalog = CATALOG_PATH
+
+    process = None
+    state_dir = None if args.target else tempfile.mkdtemp(prefix="load_test_")
+    with stand_ins_from_args(args) as stand_ins:
+        print(f"🧪 MAL en {stand_ins.mal.url}, AniList en {stand_ins.anilist.url}")
+        base_url = (args.target or f"http://127.0.0.1:{args.port}").rstrip("/")
+        try:
+            if not args.target:
+                process = start_server(args.server, args.port, stand_ins.env(), args.workers, args.log, state_dir)
+                if not wait_for_server(base_url, process):
+                    print(f"❌ La API no arrancó; revisa {args.log}")
+                    return 1
+
+            print(f"🔥 {args.concurrency} clientes durante {args.duration:.0f} s contra {base_url} ({args.mix})")
+            samples, elapsed = run_load(base_url, mix, users, concurrency=args.concurrency, duration=args.duration,
+                                        max_requests=args.requests, filters=filters, timeout=args.timeout,
+                                        seed=args.seed)
+            clear_blacklists(base_url, users)
+        finally:
+            if process is not None:
+                stop_server(process)
+            if state_dir is not None:
+                shutil.rmtree(state_dir, ignore_errors=True)
+
+        summary = summarize(samples, elapsed)
+        summary["config"] = {key: value for key, value in vars(args).items() if key != "output"}
+        summary["upstream"] = stand_ins.counters()
+
+    print_report(summary)
+    print(f"📡 Peticiones a los sustitutos: {summary['upstream']}")
+    write_json(args.output, summary, indent=2)
+    print(f"💾 Resultados guardados en {args.output}")
+
+    failed = []
+    if args.max_error_rate is not None and summary["total"]["error_rate"] > args.max_error_rate:
+        failed.append(f"tasa de errores {summary['total']['error_rate']:.1%} > {args.max_error_rate:.1%}")
+    p95 = summary["total"].get("latency_ms", {}).get("p95", 0)
+    if args.max_p95_ms is not None and p95 > args.max_p95_ms:
+        failed.append(f"p95 {p95:.0f} ms > {args.max_p95_ms:.0f} ms")
+    if failed:
+        print(f"❌ Umbrales superados: {'; '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
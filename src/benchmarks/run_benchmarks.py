@@ -0,0 +1,299 @@
+# src/benchmarks/run_benchmarks.py - Benchmark offline del pipeline de recomendación con datos sintéticos
+"""
+Mide tiempo y pico de memoria de cada etapa del pipeline (sin red) sobre
+catálogos y listas sintéticos de varios tamaños:
+
+  prepare_data          parse_xml + merge_and_clean_data
+  load_data             train_model.load_data
+  preprocess_data       TF-IDF + SVD (latent), índice invertido (sparse) o matriz N×N (dense)
+  get_recommendations   ranking con filtros, exclusiones y top-N
+  get_anime_statistics  estadísticas del usuario
+  serialization         DataFrame -> JSON de la respuesta
+
+Cada caso se repite --repeat veces en frío (sin cachés de modelo ni de tokens)
+y se guardan la mediana y el mínimo; el pico de memoria se mide en una pasada
+aparte con tracemalloc (que ralentiza el código Python y falsearía los tiempos).
+
+Los resultados se escriben en JSON y se comparan con una línea base guardada
+(src/benchmarks/baselines/<engine>.json): si el mínimo de tiempo o el pico de
+memoria de una etapa empeora más del umbral el proceso termina con código 1.
+La línea base depende de la máquina: regenérala con --save-baseline en la
+máquina donde se vaya a comparar.
+
+Uso:
+  python src/benchmarks/run_benchmarks.py --titles 1000,10000 --entries 10,500
+  python src/benchmarks/run_benchmarks.py --save-baseline
+"""
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+from datetime import datetime
+from contextlib import redirect_stdout, redirect_stderr
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.synthetic import generate_media, generate_user_list, catalog_frame, redirect_data_dir
+
+BASELINE_DIR = os.path.join(SRC_DIR, "benchmarks", "baselines")
+DEFAULT_OUTPUT = os.path.join(ROOT_DIR, "data", "benchmarks", "latest.json")
+STAGES = ("prepare_data", "load_data", "preprocess_data", "get_recommendations", "get_anime_statistics",
+          "serialization")
+ENGINES = ("latent", "sparse", "dense")
+# La matriz N×N del motor denso no cabe en memoria con catálogos grandes
+DENSE_MAX_ROWS = 10000
+# Empeoramientos relativos que se consideran regresión (el tiempo es más ruidoso que la memoria)
+TIME_THRESHOLD = 0.5
+MEMORY_THRESHOLD = 0.2
+# Diferencias absolutas por debajo de estas se consideran ruido
+MIN_SECONDS = 0.02
+MIN_BYTES = 1024 * 1024
+RESULTS_SCHEMA = 1
+
+
+def parse_sizes(text):
+    return [int(value) for value in str(text).split(',') if value.strip()]
+
+
+def case_key(titles, entries):
+    return f"{titles}x{entries}"
+
+
+def environment():
+    import numpy
+    import pandas
+    import sklearn
+    return {
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "sklearn": sklearn.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _pipeline_stages(engine):
+    """Funciones de cada etapa; comparten estado a través de `state`"""
+    import model.train_model as train_model
+    from data.parse_xml import parse_and_save_ratings
+    from data.prepare_data import merge_and_clean_data
+
+    def prepare_data(state):
+        parse_and_save_ratings()
+        merge_and_clean_data()
+
+    def load_data(state):
+        state["df"] = train_model.load_data()
+
+    def preprocess_data(state):
+        if engine == "latent":
+            state["model"] = train_model.build_latent_model(state["df"])
+        else:
+            state["model"] = train_model.preprocess_data(state["df"], engine="sparse" if engine == "sparse" else "svd")
+        if state["model"] is None:
+            raise RuntimeError("preprocess_data no devolvió modelo")
+
+    def get_recommendations(state):
+        state["recs"] = train_model.get_recommendations(state["df"], state["model"], top_n=10)
+        if state["recs"].empty:
+            raise RuntimeError("get_recommendations no devolvió recomendaciones")
+
+    def get_anime_statistics(state):
+        state["stats"] = train_model.get_anime_statistics(state["df"])
+
+    def serialization(state):
+        # Misma serialización que get_recommendations_for_user.py: campos de la respuesta sin to_json/json.loads
+        from model.engine import frame_records
+        records = frame_records(state["recs"], state["recs"]["hybrid_score"].values)
+        state["output"] = json.dumps({"statistics": state["stats"], "recommendations": records},
+                                     ensure_ascii=False, separators=(',', ':'))
+
+    stages = [prepare_data, load_data, preprocess_data, get_recommendations, get_anime_statistics, serialization]
+    return [(func.__name__, func) for func in stages]
+
+
+def _run_once(directory, engine, measure_memory):
+    """Una pasada en frío de todas las etapas; devuelve {etapa: (segundos, pico_bytes)}"""
+    shutil.rmtree(os.path.join(directory, "cache"), ignore_errors=True)
+    measurements = {}
+    state = {}
+    # Los logs de depuración del pipeline no se mezclan con el informe
+    sink = io.StringIO()
+    with redirect_data_dir(directory), redirect_stdout(sink), redirect_stderr(sink):
+        for name, func in _pipeline_stages(engine):
+            if measure_memory:
+                tracemalloc.reset_peak()
+                start_bytes = tracemalloc.get_traced_memory()[0]
+            t0 = time.perf_counter()
+            func(state)
+            seconds = time.perf_counter() - t0
+            peak = tracemalloc.get_traced_memory()[1] - start_bytes if measure_memory else None
+            measurements[name] = (seconds, peak)
+            sink.seek(0)
+            sink.truncate()
+    return measurements
+
+
+def run_case(titles, entries, engine="latent", repeat=3, seed=0, workdir=None):
+    """Genera el dataset sintético del caso y mide todas sus etapas"""
+    from data.storage import write_json
+
+    if engine == "dense" and titles > DENSE_MAX_ROWS:
+        return {"titles": titles, "entries": entries, "skipped": f"dense con más de {DENSE_MAX_ROWS} títulos"}
+
+    directory = tempfile.mkdtemp(prefix=f"bench-{case_key(titles, entries)}-", dir=workdir)
+    try:
+        media = generate_media(titles, seed)
+        catalog_frame(media).to_csv(os.path.join(directory, "merged_anime.csv"), index=False)
+        write_json(os.path.join(directory, "user_mal_list.json"), generate_user_list(media, entries, seed))
+        del media
+
+        runs = [_run_once(directory, engine, measure_memory=False) for _ in range(max(1, repeat))]
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            memory = _run_once(directory, engine, measure_memory=True)
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    stages = {}
+    for name in STAGES:
+        seconds = [run[name][0] for run in runs]
+        stages[name] = {
+            "seconds": round(statistics.median(seconds), 6),
+            "seconds_min": round(min(seconds), 6),
+            "seconds_max": round(max(seconds), 6),
+            "peak_bytes": int(memory[name][1]),
+        }
+    return {"titles": titles, "entries": entries, "stages": stages}
+
+
+def run_benchmarks(titles_list, entries_list, engine="latent", repeat=3, seed=0, workdir=None):
+    cases = {}
+    for titles in titles_list:
+        for entries in entries_list:
+            key = case_key(titles, entries)
+            if entries * 2 > titles:
+                # Con la lista casi igual al catálogo no quedan candidatos que recomendar
+                cases[key] = {"titles": titles, "entries": entries, "skipped": "lista mayor que medio catálogo"}
+                continue
+            print(f"⏱️ Caso {key} ({engine})...", file=sys.stderr, flush=True)
+            try:
+                cases[key] = run_case(titles, entries, engine, repeat, seed, workdir)
+            except Exception as e:
+                print(f"❌ Caso {key} fallido: {e}", file=sys.stderr, flush=True)
+                cases[key] = {"titles": titles, "entries": entries, "error": str(e)}
+    return {
+        "schema": RESULTS_SCHEMA,
+        "timestamp": datetime.now().isoformat(),
+        "environment": environment(),
+        "config": {"engine": engine, "repeat": repeat, "seed": seed},
+        "cases": cases,
+    }
+
+
+def compare(results, baseline, time_threshold=TIME_THRESHOLD, memory_threshold=MEMORY_THRESHOLD,
+            min_seconds=MIN_SECONDS, min_bytes=MIN_BYTES):
+    """
+    Compara cada etapa con la línea base. Devuelve una fila por métrica comparable
+    con `regression` True si empeora más del umbral relativo y del mínimo absoluto.
+    """
+    rows = []
+    for key, case in results.get("cases", {}).items():
+        base_case = baseline.get("cases", {}).get(key)
+        if not base_case or "stages" not in case or "stages" not in base_case:
+            continue
+        for stage, current in case["stages"].items():
+            base = base_case["stages"].get(stage)
+            if not base:
+                continue
+            # El mínimo de las repeticiones es más estable que la mediana frente al ruido de la máquina
+            for metric, threshold, minimum in (("seconds_min", time_threshold, min_seconds),
+                                               ("peak_bytes", memory_threshold, min_bytes)):
+                before, after = base.get(metric), current.get(metric)
+                if before is None or after is None:
+                    continue
+                ratio = after / before if before else float('inf') if after else 1.0
+                rows.append({
+                    "case": key, "stage": stage, "metric": metric,
+                    "baseline": before, "current": after, "ratio": round(ratio, 3),
+                    "regression": after > before * (1 + threshold) and after - before > minimum,
+                })
+    return rows
+
+
+def _format_value(metric, value):
+    return f"{value * 1000:.1f} ms" if metric.startswith("seconds") else f"{value / 1024 / 1024:.1f} MiB"
+
+
+def print_report(results, comparison=None):
+    print(f"{'caso':<12} {'etapa':<22} {'mediana':>12} {'pico mem':>12}")
+    for key, case in results["cases"].items():
+        if "stages" not in case:
+            print(f"{key:<12} ({'omitido: ' + case['skipped'] if 'skipped' in case else '❌ ' + case['error']})")
+            continue
+        for stage, values in case["stages"].items():
+            print(f"{key:<12} {stage:<22} {_format_value('seconds', values['seconds']):>12} "
+                  f"{_format_value('peak_bytes', values['peak_bytes']):>12}")
+    regressions = [row for row in comparison or [] if row["regression"]]
+    if comparison is not None:
+        print(f"\n📏 {len(comparison)} métricas comparadas con la línea base, {len(regressions)} regresiones")
+    for row in regressions:
+        print(f"❌ {row['case']} {row['stage']} {row['metric']}: {_format_value(row['metric'], row['baseline'])} -> "
+              f"{_format_value(row['metric'], row['current'])} (x{row['ratio']})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline del pipeline con datos sintéticos")
+    parser.add_argument("--titles", default="1000,10000", help="Tamaños de catálogo separados por comas (1k-100k)")
+    parser.add_argument("--entries", default="10,500", help="Tamaños de la lista del usuario (10-10k)")
+    parser.add_argument("--engine", choices=ENGINES, default="latent")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones en frío por caso (se guarda la mediana)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Fichero JSON de resultados")
+    parser.add_argument("--baseline", help="Línea base (por defecto src/benchmarks/baselines/<engine>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Guarda los resultados como nueva línea base")
+    parser.add_argument("--time-threshold", type=float, default=TIME_THRESHOLD)
+    parser.add_argument("--memory-threshold", type=float, default=MEMORY_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    from data.storage import write_json
+
+    results = run_benchmarks(parse_sizes(args.titles), parse_sizes(args.entries), args.engine, args.repeat, args.seed)
+    write_json(args.output, results, indent=2)
+    print(f"💾 Resultados en {args.output}")
+
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f"{args.engine}.json")
+    if args.save_baseline:
+        write_json(baseline_path, results, indent=2)
+        print(f"💾 Línea base actualizada: {baseline_path}")
+        print_report(results)
+        return 0
+
+    comparison = None
+    if os.path.exists(baseline_path):
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            comparison = compare(results, json.load(f), args.time_threshold, args.memory_threshold)
+    regressions = print_report(results, comparison)
+    failed = [key for key, case in results["cases"].items() if "error" in case]
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+# src/benchmarks/stand_ins.py - Servidores locales que imitan MAL (load.json) y AniList (GraphQL)
+"""
+Sustitutos HTTP locales de las dos APIs externas, para pruebas de carga sin red:
+
+  - MAL: GET /animelist/<usuario>/load.json?status=7&offset=N, con páginas de 300
+    entradas y una lista vacía al final, como el endpoint real. Cada usuario
+    tiene una lista sintética estable (semilla = hash del nombre). Los usuarios
+    de --missing-users devuelven 404.
+  - AniList: POST / con la consulta GraphQL `Page(page, perPage)` de
+    fetch_datasets.py sobre un catálogo sintético ordenado por popularidad.
+
+Ambos admiten latencia configurable (fija + jitter) y un límite de peticiones por
+segundo (token bucket). Al superarlo responden 429 con Retry-After, como AniList.
+
+El código real se apunta a los sustitutos por entorno:
+  MAL_ENDPOINT_BASE=http://127.0.0.1:<puerto>/animelist/{user}/load.json?status=7&offset={offset}
+  ANILIST_API=http://127.0.0.1:<puerto>/
+
+Uso: python src/benchmarks/stand_ins.py --titles 2000 --entries 300 --latency 0.05 --rate-limit 20
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+sys.path.insert(0, SRC_DIR)
+
+from benchmarks.synthetic import generate_media, generate_user_list
+
+MAL_PAGE_SIZE = 300
+ANILIST_MAX_PER_PAGE = 50
+
+
+class RateLimiter:
+    """Token bucket: `rate` peticiones por segundo con ráfagas de hasta `burst`"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """0 si la petición pasa; si no, segundos hasta que haya un token libre"""
+        if not self.rate:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+
+def media_from_catalog(path):
+    """Entradas media mínimas a partir de un merged_anime.csv ya existente"""
+    import pandas as pd
+
+    catalog = pd.read_csv(path)
+    catalog = catalog[catalog["MalID"].notna()]
+    return [{
+        "idMal": int(row.MalID),
+        "title": {"english": row.title if isinstance(row.title, str) else None, "romaji": f"Anime {int(row.MalID)}"},
+        "episodes": int(row.episodes) if row.episodes == row.episodes else None,
+        "format": "TV",
+    } for row in catalog.itertuples()]
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Manejador común: latencia, límite de peticiones, respuestas JSON y contadores"""
+    protocol_version = "HTTP/1.1"
+    stand_in = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _admit(self):
+        """Aplica la latencia y el límite; False si ya se respondió con 429"""
+        stand_in = self.stand_in
+        stand_in.count("requests")
+        delay = stand_in.latency + (random.uniform(0, stand_in.jitter) if stand_in.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        wait = stand_in.limiter.acquire()
+        if wait:
+            stand_in.count("rate_limited")
+            self._send_json(429, {"errors": [{"message": "Too Many Requests.", "status": 429}]},
+                            {"Retry-After": str(max(1, round(wait)))})
+            return False
+        return True
+
+
+class _MalHandler(_StandInHandler):
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 3 or parts[0] != "animelist" or parts[2] != "load.json":
+            self._send_json(404, {"errors": [{"message": "not found"}]})
+            return
+        if not self._admit():
+            return
+        username = unquote(parts[1])
+        entries = self.stand_in.user_list(username)
+        if entries is None:
+            self._send_json(404, {"errors": [{"message": "invalid request"}]})
+            return
+        try:
+            offset = int(parse_qs(url.query).get("offset", ["0"])[0])
+        except ValueError:
+            offset = 0
+        self._send_json(200, entries[offset:offset + MAL_PAGE_SIZE])
+
+
+class _AniListHandler(_StandInHandler):
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"errors": [{"message": "Invalid JSON"}]})
+            return
+        if not self._admit():
+            return
+        variables = body.get("variables") or {}
+        page = max(1, int(variables.get("page") or 1))
+        per_page = min(ANILIST_MAX_PER_PAGE, max(1, int(variables.get("perPage") or ANILIST_MAX_PER_PAGE)))
+        media = self.stand_in.media[(page - 1) * per_page:page * per_page]
+        self._send_json(200, {"data": {"Page": {"media": media}}})
+
+
+class StandIn:
+    """Un servidor sustituto en un hilo de fondo (puerto 0 = uno libre)"""
+
+    def __init__(self, handler, media, entries=300, latency=0.0, jitter=0.0, rate_limit=0, burst=None,
+                 missing_users=(), seed=0, host="127.0.0.1", port=0):
+        self.media = media
+        self.entries = entries
+        self.latency = latency
+        self.jitter = jitter
+        self.limiter = RateLimiter(rate_limit, burst)
+        self.missing_users = {user.lower() for user in missing_users}
+        self.seed = seed
+        self.counters = {"requests": 0, "rate_limited": 0}
+        self._lists = {}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), type(handler.__name__, (handler,), {"stand_in": self}))
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def user_list(self, username):
+        """Lista estable por usuario; None si el usuario no existe"""
+        key = username.lower()
+        if key in self.missing_users:
+            return None
+        with self._lock:
+            if key not in self._lists:
+                self._lists[key] = generate_user_list(self.media, self.entries,
+                                                      seed=self.seed + zlib.crc32(key.encode("utf-8")))
+            return self._lists[key]
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StandIns:
+    """Los sustitutos de MAL y AniList sobre el mismo catálogo"""
+
+    def __init__(self, titles=2000, entries=300, latency=0.0, jitter=0.0, rate_limit=0, burst=None,
+                 missing_users=(), catalog=None, seed=0, host="127.0.0.1", mal_port=0, anilist_port=0):
+        media = generate_media(titles, seed)
+        # Con un catálogo real, las listas de MAL usan sus IDs para que el modelo los encuentre
+        user_media = media_from_catalog(catalog) if catalog else media
+        options = dict(latency=latency, jitter=jitter, rate_limit=rate_limit, burst=burst, seed=seed, host=host)
+        self.mal = StandIn(_MalHandler, user_media, entries=entries, missing_users=missing_users,
+                           port=mal_port, **options)
+        self.anilist = StandIn(_AniListHandler, media, port=anilist_port, **options)
+
+    def env(self):
+        """Variables de entorno que apuntan download_mal_list y fetch_datasets a los sustitutos"""
+        return {
+            "MAL_ENDPOINT_BASE": self.mal.url + "/animelist/{user}/load.json?status=7&offset={offset}",
+            "ANILIST_API": self.anilist.url + "/",
+        }
+
+    def counters(self):
+        return {"mal": dict(self.mal.counters), "anilist": dict(self.anilist.counters)}
+
+    def __enter__(self):
+        self.mal.start()
+        self.anilist.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.mal.stop()
+        self.anilist.stop()
+
+
+def add_arguments(parser):
+    """Opciones de los sustitutos (compartidas con load_test.py)"""
+    parser.add_argument("--titles", type=int, default=2000, help="Títulos del catálogo de AniList sintético")
+    parser.add_argument("--entries", type=int, default=300, help="Entradas de cada lista de MAL")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latencia fija por petición (s)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Latencia aleatoria añadida (s)")
+    parser.add_argument("--rate-limit", type=float, default=0, help="Peticiones por segundo (0 = sin límite)")
+    parser.add_argument("--burst", type=int, default=None, help="Ráfaga máxima del límite")
+    parser.add_argument("--missing-users", default="", help="Usuarios que devuelven 404, separados por comas")
+    parser.add_argument("--catalog", default=None,
+                        help="merged_anime.csv del que sacar los IDs de las listas de MAL")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def stand_ins_from_args(args, mal_port=0, anilist_port=0):
+    return StandIns(titles=args.titles, entries=args.entries, latency=args.latency, jitter=args.jitter,
+                    rate_limit=args.rate_limit, burst=args.burst,
+                    missing_users=[u for u in args.missing_users.split(",") if u], catalog=args.catalog,
+                    seed=args.seed, mal_port=mal_port, anilist_port=anilist_port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sustitutos locales de MAL y AniList")
+    add_arguments(parser)
+    parser.add_argument("--mal-port", type=int, default=5101)
+    parser.add_argument("--anilist-port", type=int, default=5102)
+    args = parser.parse_args(argv)
+
+    with stand_ins_from_args(args, args.mal_port, args.anilist_port) as stand_ins:
+        print("🧪 Sustitutos en marcha. Exporta estas variables antes de arrancar la API:")
+        for name, value in stand_ins.env().items():
+            print(f"export {name}='{value}'")
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            print(f"\n🛑 Deteniendo sustitutos: {stand_ins.counters()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+# src/benchmarks/synthetic.py - Catálogos de AniList y listas de MAL sintéticos para benchmarks sin red
+"""
+Genera datos con la misma forma que los reales, de cualquier tamaño y
+reproducibles por semilla:
+
+  - generate_media(n): entradas `media` de la consulta GraphQL `Page` de AniList
+    (id, idMal, title, description, genres, tags, averageScore, episodes...),
+    ordenadas por popularidad como las descarga fetch_datasets.py.
+  - generate_user_list(media, n): entradas del endpoint load.json de MAL
+    (anime_id, anime_title, score, status...), con sesgo hacia los títulos populares.
+  - generate_taste_list(media, n): lista de un usuario con géneros y tags
+    favoritos que predicen su puntuación (para evaluar la calidad).
+  - write_dataset(dir, ...): escribe merged_anime.csv y user_mal_list.json y
+    genera user_ratings.csv y final_dataset.csv con el código real del
+    pipeline (normalize, parse_xml, merge_and_clean_data).
+
+Uso: python src/benchmarks/synthetic.py --titles 10000 --entries 500 --output data/synthetic
+"""
+import os
+import sys
+import json
+import argparse
+from contextlib import contextmanager
+
+import numpy as np
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+GENRES = ["Action", "Adventure", "Comedy", "Drama", "Ecchi", "Fantasy", "Horror", "Mahou Shoujo", "Mecha",
+          "Music", "Mystery", "Psychological", "Romance", "Sci-Fi", "Slice of Life", "Sports", "Supernatural",
+          "Thriller"]
+FORMATS = ["TV", "TV_SHORT", "MOVIE", "SPECIAL", "OVA", "ONA", "MUSIC"]
+STATUSES = ["FINISHED", "RELEASING", "NOT_YET_RELEASED", "CANCELLED", "HIATUS"]
+# Estados de MAL en load.json: 1 viendo, 2 completado, 3 en pausa, 4 abandonado, 6 planeado
+MAL_STATUSES = [1, 2, 3, 4, 6]
+MAL_STATUS_WEIGHTS = [0.08, 0.62, 0.05, 0.05, 0.20]
+
+N_TAGS = 300
+N_STUDIOS = 400
+VOCABULARY_SIZE = 5000
+# Palabras propias de cada género en las descripciones (sin stop words, como tras el tokenizador)
+GENRE_WORDS = 60
+
+
+def _zipf_choice(rng, n, size, a=1.2):
+    """Índices en [0, n) con distribución tipo Zipf (unos pocos muy frecuentes)"""
+    weights = 1.0 / np.arange(1, n + 1) ** a
+    return rng.choice(n, size=size, p=weights / weights.sum())
+
+
+def generate_media(n_titles, seed=0):
+    """`n_titles` entradas media de AniList, de más a menos popular"""
+    rng = np.random.default_rng(seed)
+    vocabulary = [f"w{i}" for i in range(VOCABULARY_SIZE)]
+    tags = [f"Tag {i}" for i in range(N_TAGS)]
+    studios = [f"Studio {i}" for i in range(N_STUDIOS)]
+
+    # En AniList muchos títulos antiguos conservan el ID de MAL; el resto tiene uno propio
+    mal_ids = rng.permutation(np.arange(1, n_titles * 3))[:n_titles] + 1
+    same_id = rng.random(n_titles) < 0.7
+    anilist_ids = np.where(same_id, mal_ids, n_titles * 3 + 1 + np.arange(n_titles))
+
+    n_genres = rng.integers(1, 5, n_titles)
+    n_tags = rng.integers(0, 12, n_titles)
+    description_words = rng.integers(20, 120, n_titles)
+    scores = np.clip(rng.normal(68, 10, n_titles).round(), 20, 95).astype(int)
+    episodes = rng.choice([1, 12, 13, 24, 25, 26, 50, 64, 100], n_titles)
+
+    media = []
+    for i in range(n_titles):
+        title = f"Synthetic Anime {i}"
+        genre_rows = rng.choice(len(GENRES), n_genres[i], replace=False)
+        # La mitad de la descripción sale del vocabulario de sus géneros y el resto del general
+        words = [vocabulary[w] for w in _zipf_choice(rng, VOCABULARY_SIZE, description_words[i] // 2, a=0.8)]
+        words += [f"g{g}w{w}" for g, w in zip(rng.choice(genre_rows, description_words[i] - len(words)),
+                                              rng.integers(0, GENRE_WORDS, description_words[i] - len(words)))]
+        media.append({
+            "id": int(anilist_ids[i]),
+            "idMal": int(mal_ids[i]),
+            "title": {"romaji": f"Gousei Anime {i}", "english": title if rng.random() < 0.8 else None,
+                      "native": None},
+            "description": " ".join(rng.permutation(words).tolist()),
+            "genres": [GENRES[g] for g in genre_rows],
+            "tags": [{"name": tags[t]} for t in sorted(set(_zipf_choice(rng, N_TAGS, n_tags[i]).tolist()))],
+            "averageScore": int(scores[i]) if rng.random() < 0.95 else None,
+            "episodes": int(episodes[i]) if rng.random() < 0.9 else None,
+            "status": STATUSES[min(int(rng.exponential(0.4)), len(STATUSES) - 1)],
+            "type": "ANIME",
+            "format": FORMATS[min(int(rng.exponential(0.8)), len(FORMATS) - 1)],
+            "siteUrl": f"https://anilist.co/anime/{int(anilist_ids[i])}",
+            "studios": {"nodes": [{"name": studios[int(_zipf_choice(rng, N_STUDIOS, 1)[0])]}]},
+        })
+    return media
+
+
+def generate_user_list(media, n_entries, seed=0):
+    """`n_entries` entradas de load.json de MAL sobre títulos de `media` (sin repetir)"""
+    rng = np.random.default_rng(seed + 1)
+    n_entries = min(n_entries, len(media))
+    # Los usuarios ven sobre todo títulos populares (media está ordenado por popularidad)
+    weights = 1.0 / (np.arange(len(media)) + 10.0)
+    picked = rng.choice(len(media), size=n_entries, replace=False, p=weights / weights.sum())
+    statuses = rng.choice(MAL_STATUSES, size=n_entries, p=MAL_STATUS_WEIGHTS)
+
+    entries = []
+    for row, status in zip(picked.tolist(), statuses.tolist()):
+        m = media[row]
+        scored = status in (1, 2, 3, 4) and rng.random() < 0.85
+        n_episodes = m["episodes"] or 0
+        entries.append({
+            "status": int(status),
+            "score": int(np.clip(round(rng.normal(7.2, 1.5)), 1, 10)) if scored else 0,
+            "tags": "",
+            "is_rewatching": 0,
+            "num_watched_episodes": n_episodes if status == 2 else int(rng.integers(0, n_episodes + 1)),
+            "anime_title": m["title"]["english"] or m["title"]["romaji"],
+            "anime_num_episodes": n_episodes,
+            "anime_airing_status": 2,
+            "anime_id": m["idMal"],
+            "anime_media_type_string": m["format"],
+            "anime_mpaa_rating_string": "PG-13",
+        })
+    return entries
+
+
+def generate_taste_list(media, n_entries, seed=0, favorite_genres=2, favorite_tags=4):
+    """
+    Lista de MAL de un usuario con gustos: elige y puntúa mejor los títulos que
+    comparten sus géneros y tags favoritos. A diferencia de generate_user_list,
+    el contenido predice la puntuación, así que sirve para medir la calidad de
+    las recomendaciones (evaluate_quality.py).
+    """
+    rng = np.random.default_rng(seed + 2)
+    n_entries = min(n_entries, len(media))
+    genres = set(rng.choice(GENRES, favorite_genres, replace=False).tolist())
+    tag_pool = sorted({t["name"] for m in media[:200] for t in m["tags"]})
+    tags = set(rng.choice(tag_pool, min(favorite_tags, len(tag_pool)), replace=False).tolist()) if tag_pool else set()
+
+    affinity = np.array([len(genres.intersection(m["genres"])) + len(tags.intersection(t["name"] for t in m["tags"]))
+                         for m in media], dtype=float)
+    # Preferencia fuerte por afinidad (exponencial) y suave por popularidad
+    weights = (1.0 / np.sqrt(np.arange(len(media)) + 10.0)) * np.exp(3.0 * affinity)
+    picked = rng.choice(len(media), size=n_entries, replace=False, p=weights / weights.sum())
+
+    entries = []
+    for row in picked.tolist():
+        m = media[row]
+        score = int(np.clip(round(3.0 + 2.5 * affinity[row] + rng.normal(0, 0.8)), 1, 10))
+        entries.append({
+            "status": 2,
+            "score": score if rng.random() < 0.9 else 0,
+            "tags": "",
+            "is_rewatching": 0,
+            "num_watched_episodes": m["episodes"] or 0,
+            "anime_title": m["title"]["english"] or m["title"]["romaji"],
+            "anime_num_episodes": m["episodes"] or 0,
+            "anime_airing_status": 2,
+            "anime_id": m["idMal"],
+            "anime_media_type_string": m["format"],
+            "anime_mpaa_rating_string": "PG-13",
+        })
+    return entries
+
+
+def catalog_frame(media):
+    """merged_anime.csv a partir de las entradas media (misma normalización que fetch_datasets.py)"""
+    from data.fetch_datasets import normalize
+    return normalize(media)
+
+
+@contextmanager
+def redirect_data_dir(directory):
+    """
+    Apunta las rutas de data/ de los módulos del pipeline a `directory` (y el
+    caché de modelo y tokens a <directory>/cache) mientras dura el bloque.
+    """
+    import data.parse_xml as parse_xml
+    import data.prepare_data as prepare_data
+    import model.train_model as train_model
+    import model.feature_store as feature_store
+
+    cache_dir = os.path.join(directory, "cache")
+    patches = [
+        (parse_xml, "JSON_INPUT_FILE", os.path.join(directory, "user_mal_list.json")),
+        (parse_xml, "CSV_OUTPUT_FILE", os.path.join(directory, "user_ratings.csv")),
+        (prepare_data, "MERGED_ANIME_PATH", os.path.join(directory, "merged_anime.csv")),
+        (prepare_data, "USER_RATINGS_PATH", os.path.join(directory, "user_ratings.csv")),
+        (prepare_data, "FINAL_DATA_PATH", os.path.join(directory, "final_dataset.csv")),
+        (train_model, "DATA_DIR", directory),
+        (train_model, "FINAL_DATASET_PATH", os.path.join(directory, "final_dataset.csv")),
+        (train_model, "MERGED_ANIME_PATH", os.path.join(directory, "merged_anime.csv")),
+        (train_model, "USER_RATINGS_PATH", os.path.join(directory, "user_ratings.csv")),
+        (train_model, "BLACKLIST_PATH", os.path.join(directory, "blacklist.json")),
+        (train_model, "MODEL_CACHE_DIR", cache_dir),
+        (train_model, "_context_cache", {}),
+        (feature_store, "_default_store", feature_store.FeatureStore(os.path.join(cache_dir, "feature_store.pkl"))),
+    ]
+    originals = [(module, name, getattr(module, name)) for module, name, _ in patches]
+    for module, name, value in patches:
+        setattr(module, name, value)
+    try:
+        yield directory
+    finally:
+        for module, name, value in originals:
+            setattr(module, name, value)
+
+
+def write_dataset(directory, n_titles, n_entries, seed=0):
+    """
+    Escribe un dataset sintético completo en `directory`: merged_anime.csv,
+    user_mal_list.json, user_ratings.csv y final_dataset.csv. Devuelve las rutas.
+    """
+    from data.storage import write_json
+    from data.parse_xml import parse_and_save_ratings
+    from data.prepare_data import merge_and_clean_data
+
+    os.makedirs(directory, exist_ok=True)
+    media = generate_media(n_titles, seed)
+    entries = generate_user_list(media, n_entries, seed)
+    paths = {
+        "catalog": os.path.join(directory, "merged_anime.csv"),
+        "user_list": os.path.join(directory, "user_mal_list.json"),
+        "ratings": os.path.join(directory, "user_ratings.csv"),
+        "final": os.path.join(directory, "final_dataset.csv"),
+    }
+    catalog_frame(media).to_csv(paths["catalog"], index=False)
+    write_json(paths["user_list"], entries)
+    with redirect_data_dir(directory):
+        parse_and_save_ratings()
+        merge_and_clean_data()
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera un catálogo de AniList y una lista de MAL sintéticos")
+    parser.add_argument("--titles", type=int, default=5000, help="Títulos del catálogo (1k-100k)")
+    parser.add_argument("--entries", type=int, default=300, help="Entradas de la lista del usuario (10-10k)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.path.join(ROOT_DIR, "data", "synthetic"))
+    args = parser.parse_args(argv)
+
+    paths = write_dataset(args.output, args.titles, args.entries, args.seed)
+    print(json.dumps(paths, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+# src/data/blacklist_store.py - Blacklist de animes por ámbitos (global y por usuario) sobre SQLite
+"""
+La blacklist vive en data/blacklist.db (SQLite en modo WAL):
+
+  - entries(scope, mal_id, present, version): una fila por ID y ámbito. Al
+    borrar un ID se marca present=0 (lápida), para poder servir deltas.
+  - meta('version'): contador global que sube en cada escritura con cambios.
+
+Cada escritura es una transacción BEGIN IMMEDIATE (cerrojo de SQLite, válido
+entre procesos) que solo toca los IDs que cambian. Cada proceso mantiene los
+ámbitos en memoria como sets (pertenencia O(1)); antes de leer compara el
+contador con el de la base y, si otro worker escribió, aplica solo las filas
+con versión posterior a la suya.
+
+El ámbito global se aplica a todos los usuarios; el de cada usuario solo a sus
+recomendaciones. La primera vez se importa el antiguo data/blacklist.json al
+ámbito global.
+"""
+import os
+import json
+import sqlite3
+import threading
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+BLACKLIST_DB_PATH = os.environ.get("BLACKLIST_DB_PATH") or os.path.join(DATA_DIR, "blacklist.db")
+LEGACY_BLACKLIST_PATH = os.path.join(DATA_DIR, "blacklist.json")
+
+GLOBAL_SCOPE = "global"
+# IDs por consulta IN (...): por debajo del límite de variables de SQLite (999 en versiones antiguas)
+QUERY_CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    scope TEXT NOT NULL,
+    mal_id INTEGER NOT NULL,
+    present INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (scope, mal_id)
+);
+CREATE INDEX IF NOT EXISTS entries_version ON entries (version);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+def user_scope(username=None):
+    """Ámbito de un usuario de MAL (los nombres no distinguen mayúsculas); None -> global"""
+    username = (username or "").strip().lower()
+    return f"user:{username}" if username else GLOBAL_SCOPE
+
+
+def parse_ids(values):
+    """IDs enteros válidos de una lista recibida por la API (ignora el resto)"""
+    return [int(value) for value in values or [] if str(value).isdigit()]
+
+
+class BlacklistStore:
+    """Blacklist persistente con caché en memoria por proceso (ver docstring del módulo)"""
+
+    def __init__(self, path=BLACKLIST_DB_PATH, legacy_path=LEGACY_BLACKLIST_PATH):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._version = 0
+        self._scopes = {}
+        self._scope_versions = {}
+        self._excluded = {}
+
+    # --- Conexión ---
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            # Una conexión por proceso (no se comparten conexiones SQLite tras un fork)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+            self._version, self._scopes, self._scope_versions, self._excluded = 0, {}, {}, {}
+            self._import_legacy()
+        return self._conn
+
+    def _import_legacy(self):
+        """Importa data/blacklist.json al ámbito global (una sola vez, en la primera apertura)"""
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+                return
+            conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', 1)")
+            if self.legacy_path and os.path.exists(self.legacy_path):
+                try:
+                    with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                        ids = parse_ids(json.load(f))
+                except (OSError, ValueError):
+                    ids = []
+                self._apply(conn, GLOBAL_SCOPE, ids, present=1)
+
+    def _transaction(self):
+        return _Transaction(self._conn)
+
+    @staticmethod
+    def _db_version(conn):
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return row[0] if row else 0
+
+    # --- Escritura ---
+
+    @classmethod
+    def _apply(cls, conn, scope, ids, present):
+        """Marca `ids` como presentes/ausentes; solo escribe los que cambian. Devuelve los cambiados"""
+        ids = sorted(set(ids))
+        if not ids:
+            return []
+        current = {}
+        for start in range(0, len(ids), QUERY_CHUNK):
+            chunk = ids[start:start + QUERY_CHUNK]
+            current.update(conn.execute(
+                f"SELECT mal_id, present FROM entries WHERE scope = ? AND mal_id IN ({','.join('?' * len(chunk))})",
+                [scope, *chunk]).fetchall())
+        changed = [mal_id for mal_id in ids if current.get(mal_id, 0) != present]
+        if not changed:
+            return []
+        version = cls._db_version(conn) + 1
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (version,))
+        conn.executemany("INSERT OR REPLACE INTO entries (scope, mal_id, present, version) VALUES (?, ?, ?, ?)",
+                         [(scope, mal_id, present, version) for mal_id in changed])
+        return changed
+
+    def _write(self, ids, scope, present):
+        with self._lock:
+            self._connection()
+            with self._transaction() as conn:
+                changed = self._apply(conn, scope, parse_ids(ids), present)
+            self._sync()
+            return changed, self._version
+
+    def add(self, ids, scope=GLOBAL_SCOPE):
+        """Añade IDs a un ámbito. Devuelve (IDs realmente añadidos, versión)"""
+        return self._write(ids, scope, 1)
+
+    def remove(self, ids, scope=GLOBAL_SCOPE):
+        """Quita IDs de un ámbito. Devuelve (IDs realmente quitados, versión)"""
+        return self._write(ids, scope, 0)
+
+    # --- Lectura ---
+
+    def _sync(self):
+        """Aplica en memoria los cambios que otros procesos hayan escrito desde la última lectura"""
+        conn = self._connection()
+        version = self._db_version(conn)
+        if version == self._version:
+            return
+        rows = conn.execute("SELECT scope, mal_id, present, version FROM entries WHERE version > ?",
+                            (self._version,))
+        for scope, mal_id, present, row_version in rows:
+            ids = self._scopes.setdefault(scope, set())
+            if present:
+                ids.add(mal_id)
+            else:
+                ids.discard(mal_id)
+            self._scope_versions[scope] = max(self._scope_versions.get(scope, 0), row_version)
+        self._version = version
+        self._excluded = {}
+
+    def version(self):
+        with self._lock:
+            self._sync()
+            return self._version
+
+    def scope_version(self, scope=GLOBAL_SCOPE):
+        """Última versión que cambió `scope` (0 si nunca tuvo entradas): no sube con escrituras de otros ámbitos"""
+        with self._lock:
+            self._sync()
+            return self._scope_versions.get(scope, 0)
+
+    def ids(self, scope=GLOBAL_SCOPE):
+        """IDs de un ámbito, ordenados"""
+        with self._lock:
+            self._sync()
+            return sorted(self._scopes.get(scope, ()))
+
+    def excluded_ids(self, username=None):
+        """IDs a excluir de las recomendaciones de `username`: ámbito global + el suyo (cacheado por versión)"""
+        scope = user_scope(username)
+        with self._lock:
+            self._sync()
+            if scope not in self._excluded:
+                self._excluded[scope] = frozenset(self._scopes.get(GLOBAL_SCOPE, set()) | self._scopes.get(scope, set()))
+            return self._excluded[scope]
+
+    def contains(self, mal_id, username=None):
+        return int(mal_id) in self.excluded_ids(username)
+
+    def changes(self, since, scope=GLOBAL_SCOPE):
+        """Delta de un ámbito desde la versión `since`: IDs añadidos y quitados y versión actual"""
+        with self._lock:
+            self._sync()
+            rows = self._conn.execute(
+                "SELECT mal_id, present FROM entries WHERE scope = ? AND version > ? AND version <= ? ORDER BY mal_id",
+                (scope, int(since), self._version)).fetchall()
+            return {
+                'version': self._version,
+                'added': [mal_id for mal_id, present in rows if present],
+                'removed': [mal_id for mal_id, present in rows if not present],
+            }
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT (ROLLBACK si hay excepción): serializa escrituras entre procesos"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path=BLACKLIST_DB_PATH, legacy_path=LEGACY_BLACKLIST_PATH):
+    """Store compartido por el proceso para una ruta"""
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = BlacklistStore(path, legacy_path)
+        return _stores[path]
@@ -14,19 +14,37 @@ DATA_DIR = os.path.join(ROOT_DIR, "data")
 USER_JSON_OUTPUT_FILE = os.path.join(DATA_DIR, "user_mal_list.json")
 # -----------------------------
 
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from data.storage import write_json, USER_LIST_LOCK
+from monitoring.metrics import timed
+from monitoring.tracing import add_attribute, set_attributes
+from services import deadline
+from services.deadline import DeadlineExceeded
+
 PAGE_SIZE = 300 
-ENDPOINT_BASE = "https://myanimelist.net/animelist/{user}/load.json?status=7&offset={offset}"
+# MAL_ENDPOINT_BASE permite apuntar a un servidor local (src/benchmarks/stand_ins.py)
+ENDPOINT_BASE = (os.environ.get("MAL_ENDPOINT_BASE")
+                 or "https://myanimelist.net/animelist/{user}/load.json?status=7&offset={offset}")
 
 
-def download_user_list(username):
+@timed("mal_download")
+def fetch_user_list(username):
     """
     Descarga la lista completa de anime de un usuario de MAL usando el endpoint JSON paginado.
+    Devuelve la lista de entradas (vacía si no hay ninguna) o None si la descarga falla.
+    No escribe nada en disco, así que es seguro para varias descargas concurrentes.
+
+    Con un plazo activo (services/deadline.py) cada página usa el tiempo que
+    quede y, si se agota, lanza DeadlineExceeded con las entradas ya descargadas.
     """
     username = username.strip()
     
     if not username:
         print("❌ Error: El nombre de usuario no puede estar vacío.")
-        return False
+        return None
 
     full_list = []
     offset = 0
@@ -38,16 +56,20 @@ def download_user_list(username):
         url = ENDPOINT_BASE.format(user=username, offset=offset)
         
         try:
+            deadline.check('mal_page')
             time.sleep(0.5) 
-            response = requests.get(url, headers={'User-Agent': 'MAL-List-Downloader-IA-App'})
+            response = requests.get(url, headers={'User-Agent': 'MAL-List-Downloader-IA-App'},
+                                    timeout=deadline.stage_timeout('mal_page'))
             
             if response.status_code != 200:
                 print(f"❌ Error HTTP {response.status_code} al solicitar offset {offset}. La descarga se detiene.")
                 if response.status_code == 404:
                     print(f"💡 Consejo: Verifica el nombre de usuario '{username}' y que la lista sea pública.")
-                return False
+                return None
 
             data = response.json()
+            add_attribute('bytes', len(response.content))
+            add_attribute('pages')
             
             if not data:
                 break
@@ -58,20 +80,39 @@ def download_user_list(username):
             
             offset += len(data)
 
+        except DeadlineExceeded as e:
+            print(f"\n⏱️ Presupuesto agotado tras {len(full_list)} entradas (offset: {offset})")
+            set_attributes(entries=len(full_list), partial=True)
+            e.partial = full_list
+            raise
         except requests.exceptions.RequestException as e:
+            if isinstance(e, requests.exceptions.Timeout) and deadline.expired():
+                print(f"\n⏱️ Presupuesto agotado esperando a MAL (offset: {offset})")
+                set_attributes(entries=len(full_list), partial=True)
+                raise DeadlineExceeded('mal_page', partial=full_list)
             print(f"\n❌ Error de conexión al descargar el bloque (offset: {offset}): {e}")
-            return False
+            return None
         except json.JSONDecodeError:
             print(f"\n❌ Error al decodificar JSON en el offset {offset}. Respuesta inválida.")
-            return False
+            return None
+
+    set_attributes(entries=len(full_list))
+    return full_list
+
+
+def download_user_list(username):
+    """
+    Descarga la lista completa de anime de un usuario de MAL y la guarda en user_mal_list.json.
+    """
+    full_list = fetch_user_list(username)
+    if full_list is None:
+        return False
 
     if full_list:
         print(f"\n🎉 Descarga completa. Se encontraron {len(full_list)} entradas de anime.")
         
-        # Guardar la lista completa como un único archivo JSON
-        os.makedirs(DATA_DIR, exist_ok=True)
-        with open(USER_JSON_OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(full_list, f, indent=4)
+        # Guardar la lista completa como un único archivo JSON (escritura atómica)
+        write_json(USER_JSON_OUTPUT_FILE, full_list, lock=USER_LIST_LOCK, indent=4)
         
         print(f"El archivo '{os.path.basename(USER_JSON_OUTPUT_FILE)}' se guardó en {os.path.abspath(DATA_DIR)}.")
         return True
@@ -11,7 +11,14 @@ ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__fil
 DATA_DIR = os.path.join(ROOT_DIR, "data")
 MERGED_PATH = os.path.join(DATA_DIR, "merged_anime.csv")
 
-ANILIST_API = "https://graphql.anilist.co"
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from data.storage import atomic_write, CATALOG_LOCK
+
+# ANILIST_API permite apuntar a un servidor local (src/benchmarks/stand_ins.py)
+ANILIST_API = os.environ.get("ANILIST_API") or "https://graphql.anilist.co"
 QUERY = """
 query ($page: Int, $perPage: Int) {
   Page(page: $page, perPage: $perPage) {
@@ -113,8 +120,8 @@ def fetch_all(max_pages=25):
 def main():
     print("🚀 Iniciando descarga de dataset de AniList (versión optimizada)...")
     df = fetch_all()
-    os.makedirs(DATA_DIR, exist_ok=True)
-    df.to_csv(MERGED_PATH, index=False, encoding="utf-8")
+    with atomic_write(MERGED_PATH, lock=CATALOG_LOCK) as f:
+        df.to_csv(f, index=False)
     print(f"\n✅ merged_anime.csv generado en {os.path.abspath(MERGED_PATH)} ({len(df)} filas).")
 
 if __name__ == "__main__":
@@ -12,6 +12,12 @@ DATA_DIR = os.path.join(ROOT_DIR, "data")
 JSON_INPUT_FILE = os.path.join(DATA_DIR, "user_mal_list.json") # 💡 CAMBIO: Archivo de entrada
 CSV_OUTPUT_FILE = os.path.join(DATA_DIR, "user_ratings.csv")
 
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from data.storage import atomic_write, RATINGS_LOCK
+
 # ⚠️ La función find_mal_xml_file y el parser de XML han sido reemplazados
 
 def parse_and_save_ratings():
@@ -62,8 +68,7 @@ def parse_and_save_ratings():
             continue # Saltar si un item está corrupto
 
     if ratings:
-        os.makedirs(DATA_DIR, exist_ok=True)
-        with open(CSV_OUTPUT_FILE, 'w', encoding='utf-8', newline='') as f:
+        with atomic_write(CSV_OUTPUT_FILE, newline='', lock=RATINGS_LOCK) as f:
             writer = csv.DictWriter(f, fieldnames=['user_id', 'anime_id', 'title', 'my_score', 'my_status'])
             writer.writeheader()
             writer.writerows(ratings)
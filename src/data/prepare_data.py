@@ -14,9 +14,21 @@ MERGED_ANIME_PATH = os.path.join(DATA_DIR, "merged_anime.csv") # Output de fetch
 USER_RATINGS_PATH = os.path.join(DATA_DIR, "user_ratings.csv") # Output de parse_xml.py
 FINAL_DATA_PATH = os.path.join(DATA_DIR, "final_dataset.csv") # Output de este script
 
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from data.storage import atomic_write, build_once, is_complete, CATALOG_LOCK, RATINGS_LOCK, DATASET_LOCK
+from monitoring.metrics import stage, timed
+from monitoring.tracing import set_attributes
+
 # Rutas de los scripts que se ejecutarán como subprocesos
 FETCH_SCRIPT_PATH = "fetch_datasets.py"
 PARSE_SCRIPT_PATH = "parse_xml.py"
+# Etapa (métricas) que mide cada script
+SCRIPT_STAGES = {FETCH_SCRIPT_PATH: "catalog_download", PARSE_SCRIPT_PATH: "parse"}
+# Cerrojo del artefacto compartido que genera cada script
+SCRIPT_LOCKS = {FETCH_SCRIPT_PATH: CATALOG_LOCK, PARSE_SCRIPT_PATH: RATINGS_LOCK}
 
 # === FUNCIONES DE UTILIDAD ===
 def get_script_full_path(script_name):
@@ -31,41 +43,50 @@ def run_script_if_missing(file_path, script_name):
     Ejecuta un script como subproceso si el archivo de salida
     está ausente, es demasiado pequeño o ha fallado previamente.
     """
-    is_missing = not os.path.exists(file_path) or os.path.getsize(file_path) < MIN_FILE_SIZE
+    # Solo un proceso regenera el fichero; el resto espera y reutiliza el resultado
+    def run():
+        with stage(SCRIPT_STAGES.get(script_name, script_name)):
+            _run_script(file_path, script_name)
+
+    build_once(file_path, run, SCRIPT_LOCKS[script_name],
+               is_ready=lambda path: is_complete(path, MIN_FILE_SIZE))
+
+
+def _run_script(file_path, script_name):
+    """Ejecuta el script de src/data/ que genera `file_path`"""
+    full_script_path = get_script_full_path(script_name)
     
-    if is_missing:
-        full_script_path = get_script_full_path(script_name)
-        
-        print(f"⚙️ Ejecutando script: {script_name} para generar {os.path.basename(file_path)}")
+    print(f"⚙️ Ejecutando script: {script_name} para generar {os.path.basename(file_path)}")
+    
+    try:
+        # Ejecutar el script usando el intérprete actual (sys.executable)
+        result = subprocess.run(
+            [sys.executable, full_script_path], 
+            capture_output=True, 
+            text=True, 
+            check=True, # Lanza CalledProcessError si el código de salida no es 0
+            cwd=DATA_DIR # Asegurarse de que el directorio de trabajo sea 'data' si los scripts lo necesitan
+        )
+        # Imprimir salida del script para logs de Render
+        print(result.stdout)
+        print(result.stderr)
         
-        try:
-            # Ejecutar el script usando el intérprete actual (sys.executable)
-            result = subprocess.run(
-                [sys.executable, full_script_path], 
-                capture_output=True, 
-                text=True, 
-                check=True, # Lanza CalledProcessError si el código de salida no es 0
-                cwd=DATA_DIR # Asegurarse de que el directorio de trabajo sea 'data' si los scripts lo necesitan
-            )
-            # Imprimir salida del script para logs de Render
-            print(result.stdout)
-            print(result.stderr)
+        if result.returncode != 0:
+            raise subprocess.CalledProcessError(result.returncode, result.args, output=result.stdout, stderr=result.stderr)
             
-            if result.returncode != 0:
-                raise subprocess.CalledProcessError(result.returncode, result.args, output=result.stdout, stderr=result.stderr)
-                
-            print(f"✅ Ejecución de {script_name} completada.")
-        
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Error al ejecutar {script_name}. Salida: {e.stderr.strip()}")
-            # Re-lanzar el error para que sea capturado por el servicio principal
-            raise e
-        except Exception as e:
-            print(f"❌ Error desconocido al ejecutar {script_name}: {str(e)}")
-            raise e
+        print(f"✅ Ejecución de {script_name} completada.")
+    
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Error al ejecutar {script_name}. Salida: {e.stderr.strip()}")
+        # Re-lanzar el error para que sea capturado por el servicio principal
+        raise e
+    except Exception as e:
+        print(f"❌ Error desconocido al ejecutar {script_name}: {str(e)}")
+        raise e
 
 
 # === FUNCIÓN DE LÓGICA PRINCIPAL ===
+@timed("merge")
 def merge_and_clean_data():
     """
     Carga el dataset principal y los ratings del usuario, los fusiona
@@ -128,9 +149,10 @@ def merge_and_clean_data():
     
     df_final = df_final[[c for c in columnas if c in df_final.columns]].copy()
     
-    # Asegurarse de que el directorio exista
-    os.makedirs(DATA_DIR, exist_ok=True)
-    df_final.to_csv(FINAL_DATA_PATH, index=False)
+    # Escritura atómica: los lectores nunca ven un CSV a medio escribir
+    with atomic_write(FINAL_DATA_PATH, lock=DATASET_LOCK) as f:
+        df_final.to_csv(f, index=False)
+    set_attributes(rows=len(df_final), user_ratings=len(df_ratings))
     
     print(f"🎉 Dataset final de {len(df_final)} filas guardado en: {FINAL_DATA_PATH}")
 
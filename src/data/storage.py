@@ -0,0 +1,141 @@
+# src/data/storage.py - Escrituras atómicas y cerrojos de fichero para los datos compartidos en data/
+"""
+Todos los ficheros que se comparten entre peticiones, subprocesos y workers
+(catálogo, listas de usuario, datasets intermedios, cachés de modelo) se
+escriben con `atomic_write`:
+
+  1. se escribe en un temporal oculto del mismo directorio
+  2. flush + fsync del temporal
+  3. os.replace sobre el destino (atómico en POSIX) y fsync del directorio
+
+Un lector ve siempre el fichero anterior completo o el nuevo completo, nunca uno
+truncado, así que la lectura no necesita cerrojos. Cada escritor usa su propio
+temporal, así que tampoco se pisan entre sí. Solo los artefactos compartidos de
+data/ (catálogo, listas de usuario, dataset final, CURRENT...) se escriben además
+bajo un cerrojo advisory (flock) con nombre fijo (LOCK_NAMES), para serializar a
+sus escritores. Hay un fichero de cerrojo por nombre, no por ruta, así que
+data/.locks/ no crece con los usuarios ni con las peticiones.
+
+`build_once` cubre la regeneración costosa (p. ej. descargar el catálogo): si
+varios procesos detectan a la vez que falta el fichero, solo uno lo genera y el
+resto espera y reutiliza el resultado.
+"""
+import os
+import json
+import fcntl
+import threading
+from contextlib import contextmanager
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Ficheros de cerrojo, fuera de los directorios de datos para no mezclarse con ellos
+LOCK_DIR = os.environ.get('DATA_LOCK_DIR') or os.path.join(ROOT_DIR, "data", ".locks")
+
+# Cerrojos de los artefactos compartidos (un fichero por nombre y tipo)
+CATALOG_LOCK = "catalog"                  # merged_anime.csv
+USER_LIST_LOCK = "user_list"              # user_mal_list.json
+RATINGS_LOCK = "ratings"                  # user_ratings.csv
+DATASET_LOCK = "dataset"                  # final_dataset.csv
+RECOMMENDATIONS_LOCK = "recommendations"  # recommendations.json
+ARTIFACTS_LOCK = "artifacts"              # CURRENT de data/artifacts/
+TRACES_LOCK = "traces"                    # exportación JSONL de trazas
+LOCK_NAMES = frozenset({CATALOG_LOCK, USER_LIST_LOCK, RATINGS_LOCK, DATASET_LOCK,
+                        RECOMMENDATIONS_LOCK, ARTIFACTS_LOCK, TRACES_LOCK})
+
+
+def _lock_path(name, kind):
+    if name not in LOCK_NAMES:
+        raise ValueError(f"Cerrojo desconocido: {name} (disponibles: {', '.join(sorted(LOCK_NAMES))})")
+    return os.path.join(LOCK_DIR, f"{name}.{kind}")
+
+
+@contextmanager
+def file_lock(name, kind="lock", shared=False):
+    """
+    Cerrojo advisory con nombre `name` (uno de LOCK_NAMES) en data/.locks/.
+    Bloquea hasta obtenerlo; `shared` para lectores que necesiten exclusión.
+    """
+    lock_path = _lock_path(name, kind)
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    with open(lock_path, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _fsync_directory(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def _maybe_lock(name):
+    if name is None:
+        yield
+    else:
+        with file_lock(name):
+            yield
+
+
+@contextmanager
+def atomic_write(path, mode='w', encoding='utf-8', newline=None, lock=None):
+    """
+    Abre un temporal para escribir `path`; al salir sin error lo publica con un
+    rename atómico. Si hay excepción se borra el temporal y `path` queda intacto.
+    `lock`: nombre del cerrojo de escritores (artefactos compartidos de data/).
+    """
+    path = os.path.abspath(path)
+    directory, name = os.path.split(path)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    binary = 'b' in mode
+
+    with _maybe_lock(lock):
+        try:
+            with open(tmp_path, mode, encoding=None if binary else encoding, newline=None if binary else newline) as f:
+                yield f
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    _fsync_directory(directory)
+
+
+def write_json(path, data, lock=None, **kwargs):
+    """json.dump atómico (kwargs se pasan a json.dump)"""
+    with atomic_write(path, lock=lock) as f:
+        json.dump(data, f, **kwargs)
+
+
+def write_text(path, text, lock=None):
+    with atomic_write(path, lock=lock) as f:
+        f.write(text)
+
+
+def is_complete(path, min_size=1):
+    """El fichero existe y tiene al menos `min_size` bytes"""
+    return os.path.exists(path) and os.path.getsize(path) >= min_size
+
+
+def build_once(path, build, lock, is_ready=is_complete):
+    """
+    Genera `path` con `build()` si `is_ready(path)` es falso, con doble
+    comprobación bajo el cerrojo `lock`: entre procesos concurrentes solo uno lo
+    genera. Usa un fichero distinto del cerrojo de escritura, así que `build`
+    puede escribir `path` con atomic_write(lock=lock) (también desde un subproceso).
+    Devuelve True si lo generó este proceso.
+    """
+    if is_ready(path):
+        return False
+    with file_lock(lock, kind="build.lock"):
+        if is_ready(path):
+            return False
+        build()
+        return True
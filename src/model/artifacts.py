@@ -0,0 +1,269 @@
+# src/model/artifacts.py - Artefactos de serving en disco (arrays .npy mapeables en memoria)
+import os
+import json
+import shutil
+import hashlib
+from datetime import datetime
+
+import numpy as np
+
+from model.filters import FilterIndex
+from model.engine import RecommendationEngine, build_crosswalk
+from data.storage import write_text, ARTIFACTS_LOCK
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(SCRIPT_DIR))
+ARTIFACTS_DIR = os.path.join(ROOT_DIR, "data", "artifacts")
+# Fichero con la versión activa (se reemplaza de forma atómica)
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+
+# Campos de cada recomendación, en el orden en que se serializan
+NUMERIC_FIELDS = (('id', np.int64), ('MAL_ID', np.int64), ('score', np.float64), ('episodes', np.int64))
+TEXT_FIELDS = ('title', 'genres', 'description', 'type', 'siteUrl', 'studios')
+RECORD_FIELDS = ('id', 'MAL_ID', 'title', 'score', 'genres', 'description', 'type', 'episodes', 'siteUrl', 'studios')
+
+
+class ColumnarCatalog:
+    """
+    Catálogo de serving por columnas: numéricas como arrays y textos como un único
+    blob UTF-8 + offsets. Todo se puede mapear en memoria, así que varios workers
+    comparten las mismas páginas; cada registro se construye solo al pedirlo.
+    """
+
+    def __init__(self, numeric, text):
+        self.numeric = numeric
+        self.text = text
+
+    def __len__(self):
+        return len(self.numeric['id'])
+
+    def value(self, field, row):
+        if field in self.text:
+            blob, offsets = self.text[field]
+            return bytes(blob[offsets[row]:offsets[row + 1]]).decode('utf-8')
+        value = self.numeric[field][row]
+        return float(value) if self.numeric[field].dtype.kind == 'f' else int(value)
+
+    def __getitem__(self, row):
+        return {field: self.value(field, row) for field in RECORD_FIELDS}
+
+    @classmethod
+    def from_records(cls, records):
+        numeric = {field: np.array([r[field] for r in records], dtype=dtype) for field, dtype in NUMERIC_FIELDS}
+        text = {}
+        for field in TEXT_FIELDS:
+            encoded = [str(r[field]).encode('utf-8') for r in records]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(e) for e in encoded])
+            text[field] = (np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+        return cls(numeric, text)
+
+    def save(self, directory):
+        for field, values in self.numeric.items():
+            np.save(os.path.join(directory, f"catalog_{field}.npy"), values)
+        for field, (blob, offsets) in self.text.items():
+            np.save(os.path.join(directory, f"catalog_{field}.blob.npy"), blob)
+            np.save(os.path.join(directory, f"catalog_{field}.offsets.npy"), offsets)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        numeric = {field: np.load(os.path.join(directory, f"catalog_{field}.npy"), mmap_mode=mmap_mode)
+                   for field, _ in NUMERIC_FIELDS}
+        text = {field: (np.load(os.path.join(directory, f"catalog_{field}.blob.npy"), mmap_mode=mmap_mode),
+                        np.load(os.path.join(directory, f"catalog_{field}.offsets.npy"), mmap_mode=mmap_mode))
+                for field in TEXT_FIELDS}
+        return cls(numeric, text)
+
+
+def current_version(root=ARTIFACTS_DIR):
+    """Versión activa de los artefactos (None si no se han generado)"""
+    path = os.path.join(root, CURRENT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        version = f.read().strip()
+    return version if version and os.path.isdir(os.path.join(root, version)) else None
+
+
+def activate_version(root, version):
+    """Marca `version` como activa (reemplazo atómico de CURRENT)"""
+    write_text(os.path.join(root, CURRENT_FILE), version, lock=ARTIFACTS_LOCK)
+
+
+def write_artifacts(engine, root=ARTIFACTS_DIR, extra=None, metadata=None, version=None, activate=True):
+    """
+    Escribe los arrays del motor en root/<versión>/ y (si `activate`) la marca como activa.
+
+    Cada versión es inmutable: se escribe en un directorio temporal y se publica
+    con un rename, así que un worker nunca ve artefactos a medio escribir.
+    `extra` (dict nombre -> array) añade arrays adicionales al mismo directorio y
+    `metadata` (dict) se guarda en el manifiesto (p. ej. la huella del CSV de origen).
+    `version` sustituye a la versión del motor como nombre del directorio.
+    Devuelve la ruta del directorio de la versión.
+    """
+    version = version or engine.version or 'unversioned'
+    target = os.path.join(root, version)
+    if not os.path.isdir(target):
+        os.makedirs(root, exist_ok=True)
+        tmp_dir = os.path.join(root, f".tmp-{version}-{os.getpid()}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        arrays = {
+            'embeddings': np.ascontiguousarray(engine.embeddings),
+            'ids': engine.ids,
+            'mal_ids': engine.mal_ids,
+            'filter_bits': engine.filter_index.bits,
+            'filter_score': engine.filter_index.score,
+            'filter_episodes': engine.filter_index.episodes,
+            'filter_ids': engine.filter_index.ids,
+        }
+        arrays['crosswalk_mal_ids'], arrays['crosswalk_rows'] = build_crosswalk(engine.mal_ids)
+        if engine.popularity is not None:
+            arrays['popularity'] = np.asarray(engine.popularity, dtype=np.int64)
+        arrays.update(extra or {})
+        for name, values in arrays.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), values)
+        with open(os.path.join(tmp_dir, "filter_keys.json"), 'w', encoding='utf-8') as f:
+            json.dump({'keys': engine.filter_index.keys, 'version': engine.filter_index.version}, f)
+
+        catalog = (engine.records if isinstance(engine.records, ColumnarCatalog)
+                   else ColumnarCatalog.from_records(engine.records))
+        catalog.save(tmp_dir)
+
+        manifest = {
+            'version': version,
+            'created_at': datetime.now().isoformat(),
+            'n_rows': int(engine.n_rows),
+            'n_components': int(engine.embeddings.shape[1]),
+            'files': sorted(os.listdir(tmp_dir)),
+            'checksums': {name: _file_checksum(os.path.join(tmp_dir, name)) for name in sorted(os.listdir(tmp_dir))},
+        }
+        manifest.update(metadata or {})
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        try:
+            os.rename(tmp_dir, target)
+        except OSError:
+            # Otro proceso publicó la misma versión a la vez: se usa la suya
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if activate:
+        activate_version(root, version)
+    return target
+
+
+def _file_checksum(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(root=ARTIFACTS_DIR, version=None):
+    version = version or current_version(root)
+    if version is None:
+        return None
+    with open(os.path.join(root, version, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _optional_array(directory, name, mmap_mode='r'):
+    path = os.path.join(directory, f"{name}.npy")
+    return np.load(path, mmap_mode=mmap_mode) if os.path.exists(path) else None
+
+
+def load_array(name, root=ARTIFACTS_DIR, version=None, mmap_mode='r'):
+    """Array adicional de los artefactos (None si esa versión no lo incluye)"""
+    version = version or current_version(root)
+    return _optional_array(os.path.join(root, version), name, mmap_mode) if version else None
+
+
+def load_engine(root=ARTIFACTS_DIR, version=None, mmap_mode='r'):
+    """
+    RecommendationEngine sobre los artefactos mapeados en memoria (sin leer el
+    catálogo ni entrenar). Devuelve None si no hay artefactos.
+    """
+    version = version or current_version(root)
+    if version is None:
+        return None
+    directory = os.path.join(root, version)
+
+    def array(name):
+        return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+
+    with open(os.path.join(directory, "filter_keys.json"), 'r', encoding='utf-8') as f:
+        filter_meta = json.load(f)
+    embeddings = array('embeddings')
+    filter_index = FilterIndex(embeddings.shape[0], filter_meta['keys'], array('filter_bits'),
+                               array('filter_score'), array('filter_episodes'), array('filter_ids'),
+                               filter_meta.get('version'))
+    crosswalk = None
+    if os.path.exists(os.path.join(directory, "crosswalk_rows.npy")):
+        crosswalk = (array('crosswalk_mal_ids'), array('crosswalk_rows'))
+        # Versiones anteriores guardaban solo la primera fila de cada MAL_ID: se reconstruye
+        if crosswalk[1].shape[0] != embeddings.shape[0]:
+            crosswalk = None
+    return RecommendationEngine(embeddings, array('ids'), array('mal_ids'), filter_index,
+                                ColumnarCatalog.load(directory, mmap_mode), version, artifacts_dir=directory,
+                                popularity=_optional_array(directory, 'popularity', mmap_mode), crosswalk=crosswalk)
+
+
+def validate_artifacts(root=ARTIFACTS_DIR, version=None):
+    """
+    Comprueba integridad y coherencia de una versión de artefactos: checksums del
+    manifiesto, número de filas de cada array, valores finitos, crosswalk de IDs,
+    grafo de vecinos y ranking de popularidad. Devuelve la lista de errores
+    (vacía si todo es correcto).
+    """
+    version = version or current_version(root)
+    if version is None:
+        return ["No hay artefactos"]
+    directory = os.path.join(root, version)
+    manifest = read_manifest(root, version)
+    errors = []
+
+    for name, checksum in manifest.get('checksums', {}).items():
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            errors.append(f"Falta {name}")
+        elif _file_checksum(path) != checksum:
+            errors.append(f"Checksum incorrecto en {name}")
+    if errors:
+        return errors
+
+    engine = load_engine(root, version)
+    n_rows = manifest['n_rows']
+    if engine.embeddings.shape != (n_rows, manifest['n_components']):
+        errors.append(f"embeddings con forma {engine.embeddings.shape}")
+    elif not np.isfinite(engine.embeddings).all():
+        errors.append("embeddings con valores no finitos")
+    for name, values in [('ids', engine.ids), ('mal_ids', engine.mal_ids), ('filter_score', engine.filter_index.score)]:
+        if len(values) != n_rows:
+            errors.append(f"{name} tiene {len(values)} filas (esperadas {n_rows})")
+    if len(engine.records) != n_rows:
+        errors.append(f"El catálogo tiene {len(engine.records)} filas (esperadas {n_rows})")
+    if engine.filter_index.bits.shape[1] != (n_rows + 7) // 8:
+        errors.append("Los bitmaps de filtros no cubren todas las filas")
+
+    known = engine.mal_ids[engine.mal_ids > 0]
+    unique_known = np.unique(known)
+    owners, rows = engine.all_rows_for_mal_ids(unique_known)
+    if rows.size != known.size or (engine.mal_ids[rows] != unique_known[owners]).any():
+        errors.append("El crosswalk MAL_ID -> fila no es coherente")
+
+    neighbors = _optional_array(directory, 'neighbors')
+    if neighbors is not None and neighbors.size:
+        if neighbors.shape[0] != n_rows or neighbors.min() < 0 or neighbors.max() >= n_rows:
+            errors.append("El grafo de vecinos tiene índices fuera de rango")
+        elif (neighbors == np.arange(n_rows)[:, None]).any():
+            errors.append("El grafo de vecinos incluye al propio anime")
+
+    if engine.popularity is not None and not np.array_equal(np.sort(engine.popularity), np.arange(n_rows)):
+        errors.append("El ranking de popularidad no es una permutación de las filas")
+
+    return errors
+
@@ -0,0 +1,55 @@
+# src/model/dataset_context.py - Dataset compartido por entrenamiento, ranking, estadísticas y serialización
+import os
+
+
+class DatasetContext:
+    """
+    Dataset final cargado una sola vez por versión (hash de contenido del CSV).
+
+    Todas las etapas de una petición (entrenamiento, ranking, estadísticas y
+    serialización) reciben el mismo contexto en lugar de volver a llamar a
+    load_data(). Las columnas y estructuras derivadas se calculan bajo demanda y
+    se memorizan; la lista del usuario se relee solo si su fichero cambia.
+    """
+
+    def __init__(self, df, version, feature_builder=None, user_ids_loader=None, user_list_path=None,
+                 catalog_version=None):
+        self.df = df
+        self.version = version
+        # Versión del catálogo del que salen las filas (sin datos del usuario): las
+        # estructuras que solo dependen del catálogo, como los bitmaps de filtros, se
+        # cachean con ella en vez de recorrer df para calcular su huella
+        self.catalog_version = catalog_version
+        self._feature_builder = feature_builder
+        self._user_ids_loader = user_ids_loader
+        self._user_list_path = user_list_path
+        self._user_ids = None
+        self._user_ids_key = None
+        self._derived = {}
+
+    def derived(self, name, builder):
+        """Valor derivado memorizado (p. ej. índice de filtros, vector de scores)."""
+        if name not in self._derived:
+            self._derived[name] = builder()
+        return self._derived[name]
+
+    def features(self):
+        """DataFrame con combined_features (se calcula la primera vez que se necesita)."""
+        if 'combined_features' not in self.df.columns and self._feature_builder is not None:
+            self._feature_builder(self.df)
+        return self.df
+
+    def _user_list_key(self):
+        if not self._user_list_path or not os.path.exists(self._user_list_path):
+            return None
+        stat = os.stat(self._user_list_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @property
+    def user_anime_ids(self):
+        """IDs (MAL) de la lista del usuario; se releen solo si el fichero cambió."""
+        key = self._user_list_key()
+        if self._user_ids is None or key != self._user_ids_key:
+            self._user_ids = self._user_ids_loader() if self._user_ids_loader else set()
+            self._user_ids_key = key
+        return self._user_ids
@@ -0,0 +1,345 @@
+# src/model/engine.py - Motor de recomendación en memoria (un usuario o lotes de usuarios)
+import os
+import time
+import numpy as np
+
+from model.ranking import top_n_rows
+from model.filters import with_default_min_score
+from monitoring.metrics import observe_stage, cache_result
+
+# Motor de recomendación: 'svd' (similitud densa en espacio latente),
+# 'sparse' (índice invertido sobre los términos TF-IDF) o 'sharded' (espacio
+# latente con el catálogo repartido en bloques entre varios procesos)
+RECOMMENDER_ENGINE = os.environ.get('RECOMMENDER_ENGINE', 'svd').strip().lower()
+# Número de bloques/procesos del motor 'sharded' (por defecto, uno por núcleo)
+RECOMMENDER_SHARDS = int(os.environ.get('RECOMMENDER_SHARDS', '0')) or None
+
+
+def normalize_entries(entries):
+    """
+    Normaliza una lista de usuario a pares (MAL_ID, score 0-10).
+
+    Acepta entradas del JSON de MAL ({'anime_id', 'score'}), pares (id, score) o
+    IDs sueltos (se tratan como puntuados con 10).
+    """
+    pairs = []
+    for entry in entries or []:
+        try:
+            if isinstance(entry, dict):
+                anime_id, score = entry.get('anime_id'), entry.get('score', 0)
+            elif isinstance(entry, (list, tuple)):
+                anime_id, score = entry[0], entry[1]
+            else:
+                anime_id, score = entry, 10
+            if anime_id is None:
+                continue
+            score = float(score) if str(score).replace('.', '', 1).isdigit() else 0.0
+            pairs.append((int(anime_id), score))
+        except (TypeError, ValueError):
+            continue
+    return pairs
+
+
+class RecommendationEngine:
+    """
+    Catálogo + embeddings latentes + índice de filtros listos para servir.
+
+    Puntúa a uno o muchos usuarios a la vez: los perfiles de todos los usuarios se
+    obtienen como Lᵀ Sᵀ (S = matriz usuario×anime de puntuaciones) y todas las
+    puntuaciones con una única multiplicación L @ P; las exclusiones por usuario y
+    el top-N se aplican con máscaras vectorizadas.
+    """
+
+    def __init__(self, embeddings, ids, mal_ids, filter_index, records, version=None, shards=None,
+                 artifacts_dir=None, popularity=None, crosswalk=None):
+        self.embeddings = embeddings
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.mal_ids = np.asarray(mal_ids, dtype=np.int64)
+        self.filter_index = filter_index
+        self.records = records
+        self.version = version
+        # ShardedLatentModel opcional: reparte la puntuación entre procesos por bloques de filas
+        self.shards = shards
+        # Directorio de artefactos si los arrays están mapeados desde disco (model/artifacts.py)
+        self.artifacts_dir = artifacts_dir
+        # Filas de más a menos populares (respaldo para usuarios sin animes puntuados)
+        self.popularity = popularity
+        # ProfileCache opcional: perfiles por usuario con actualización incremental
+        self.profile_cache = None
+        self._row_of = None
+
+        # Crosswalk MAL_ID -> filas: todos los MAL_ID ordenados (con repetidos) y su fila
+        self._mal_sorted, self._mal_rows = crosswalk if crosswalk is not None else build_crosswalk(self.mal_ids)
+
+    @classmethod
+    def from_context(cls, context, latent_model, filter_index, shards=None):
+        """Construye el motor a partir del DatasetContext del catálogo y su modelo latente."""
+        df = context.df
+        records = []
+        for row in df.to_dict('records'):
+            records.append(_clean_record(row))
+        return cls(latent_model.embeddings, df['id'].values, df['MAL_ID'].fillna(0).values,
+                   filter_index, records, latent_model.version, shards)
+
+    @property
+    def n_rows(self):
+        return self.embeddings.shape[0]
+
+    @property
+    def row_of(self):
+        """Mapa id de catálogo (AniList) -> fila (para ProfileCache)."""
+        if self._row_of is None:
+            self._row_of = {int(i): row for row, i in enumerate(self.ids.tolist())}
+        return self._row_of
+
+    def profile(self, rows, weights):
+        """Perfil latente Σ peso·embedding de las filas indicadas."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.size == 0:
+            return np.zeros(self.embeddings.shape[1], dtype=np.float64)
+        return np.asarray(weights, dtype=np.float64) @ self.embeddings[rows]
+
+    def rows_for_mal_ids(self, mal_ids):
+        """Primera fila del catálogo de cada MAL_ID indicado (-1 si no está en el catálogo)."""
+        mal_ids = np.asarray(mal_ids, dtype=np.int64)
+        if mal_ids.size == 0 or self._mal_sorted.size == 0:
+            return np.full(mal_ids.size, -1, dtype=np.int64)
+        pos = np.clip(np.searchsorted(self._mal_sorted, mal_ids, side='left'), 0, self._mal_sorted.size - 1)
+        found = self._mal_sorted[pos] == mal_ids
+        return np.where(found, self._mal_rows[pos], -1)
+
+    def all_rows_for_mal_ids(self, mal_ids):
+        """
+        Todas las filas de cada MAL_ID (el catálogo puede repetir un MAL_ID en
+        varias filas). Devuelve (posiciones en `mal_ids`, filas), agrupadas por
+        posición y con la primera fila de cada MAL_ID delante; los MAL_ID que no
+        están en el catálogo no aparecen.
+        """
+        mal_ids = np.asarray(mal_ids, dtype=np.int64)
+        left = np.searchsorted(self._mal_sorted, mal_ids, side='left')
+        counts = np.searchsorted(self._mal_sorted, mal_ids, side='right') - left
+        owners = np.repeat(np.arange(mal_ids.size, dtype=np.int64), counts)
+        offsets = np.arange(owners.size, dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+        return owners, self._mal_rows[np.repeat(left, counts) + offsets]
+
+    def user_matrix(self, user_lists):
+        """
+        Representación dispersa (COO) de S: usuario, fila de catálogo y peso
+        (score/10) de cada entrada. Las entradas sin puntuar tienen peso 0: no
+        aportan al perfil pero sí se excluyen de las recomendaciones. Si un MAL_ID
+        ocupa varias filas, todas se excluyen pero solo la primera aporta al perfil.
+        """
+        users, rows, weights = [], [], []
+        for u, entries in enumerate(user_lists):
+            pairs = normalize_entries(entries)
+            if not pairs:
+                continue
+            owners, found = self.all_rows_for_mal_ids([p[0] for p in pairs])
+            first = np.r_[True, owners[1:] != owners[:-1]] if owners.size else np.empty(0, dtype=bool)
+            scores = np.array([p[1] for p in pairs], dtype=np.float64) / 10.0
+            users.append(np.full(found.size, u, dtype=np.int64))
+            rows.append(found)
+            weights.append(np.where(first, scores[owners], 0.0))
+
+        if not users:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0, dtype=np.float64)
+        return np.concatenate(users), np.concatenate(rows), np.concatenate(weights)
+
+    def profiles(self, users, rows, weights, n_users, usernames=None):
+        """
+        P = Lᵀ Sᵀ (k × usuarios) sin materializar S. Con `usernames` (mismo orden
+        que los usuarios; None para los anónimos) y un profile_cache, el perfil de
+        cada usuario con nombre sale del caché: se reutiliza o se actualiza con el
+        delta de su lista en lugar de recalcularse.
+        """
+        profiles = np.zeros((n_users, self.embeddings.shape[1]), dtype=np.float64)
+        rated = weights > 0
+        if usernames is not None and self.profile_cache is not None:
+            named = [u for u, name in enumerate(usernames) if name]
+            for u in named:
+                own = rated & (users == u)
+                ratings = dict(zip(self.ids[rows[own]].tolist(), weights[own].tolist()))
+                profiles[u], info = self.profile_cache.get_profile(usernames[u], ratings, self)
+                cache_result('profile', info['mode'])
+            rated &= ~np.isin(users, named)
+        if rated.any():
+            # Las entradas llegan agrupadas por usuario: suma por bloques contiguos
+            users, rows, weights = users[rated], rows[rated], weights[rated]
+            contrib = self.embeddings[rows] * weights[:, None]
+            starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+            profiles[users[starts]] = np.add.reduceat(contrib, starts, axis=0)
+        return profiles.T
+
+    def base_mask(self, filters=None, exclude_mal_ids=()):
+        """
+        Máscara común a todos los usuarios: filtros de catálogo (con el min_score
+        por defecto si no se indica) y exclusiones globales.
+        """
+        mask = self.filter_index.mask(with_default_min_score(filters))
+        exclude_mal_ids = list(exclude_mal_ids or [])
+        if exclude_mal_ids:
+            mask[self.all_rows_for_mal_ids(exclude_mal_ids)[1]] = False
+        return mask
+
+    def exclusion_pairs(self, user_exclusions):
+        """(usuarios, filas) de los MAL_ID que cada usuario excluye además de su lista (su blacklist)"""
+        users, rows = [], []
+        for u, mal_ids in enumerate(user_exclusions):
+            mal_ids = np.fromiter((int(m) for m in mal_ids or ()), dtype=np.int64)
+            if mal_ids.size:
+                found = self.all_rows_for_mal_ids(mal_ids)[1]
+                users.append(np.full(found.size, u, dtype=np.int64))
+                rows.append(found)
+        if not users:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+        return np.concatenate(users), np.concatenate(rows)
+
+    def recommend_batch(self, user_lists, top_n=10, filters=None, exclude_mal_ids=(), chunk_size=256,
+                        mask=None, user_exclusions=None, usernames=None):
+        """
+        Recomendaciones para varios usuarios. Devuelve una lista de (filas, scores)
+        por usuario, en el mismo orden que `user_lists`.
+
+        `mask`: máscara base ya calculada (sustituye a filters/exclude_mal_ids).
+        `user_exclusions`: MAL_IDs a excluir solo para cada usuario (mismo orden que
+        `user_lists`); se aplican como sus animes vistos, sin tocar la máscara común.
+        `usernames`: nombres de los usuarios, para tomar su perfil del profile_cache.
+        """
+        n_users = len(user_lists)
+        users, rows, weights = self.user_matrix(user_lists)
+        profiles = self.profiles(users, rows, weights, n_users, usernames)
+        if user_exclusions is not None:
+            excluded_users, excluded_rows = self.exclusion_pairs(user_exclusions)
+            users, rows = np.concatenate([users, excluded_users]), np.concatenate([rows, excluded_rows])
+
+        if mask is None:
+            mask = self.base_mask(filters, exclude_mal_ids)
+        if self.shards is not None:
+            results = self.shards.top_n_batch(profiles, mask, users, rows, top_n)
+        else:
+            results = score_block(self.embeddings, profiles, mask, users, rows, top_n, chunk_size=chunk_size)
+
+        if self.popularity is not None:
+            # Sin animes puntuados el perfil es nulo: se recomiendan los más populares
+            for u in np.flatnonzero(~profiles.any(axis=0)).tolist():
+                results[u] = self.popular_rows(mask, rows[users == u], top_n)
+        return results
+
+    def popular_rows(self, mask, excluded_rows=(), top_n=10):
+        """Top-N por popularidad entre las filas elegibles (score 0)."""
+        allowed = np.array(mask, dtype=bool)
+        allowed[np.asarray(excluded_rows, dtype=np.int64)] = False
+        popularity = np.asarray(self.popularity)
+        top = popularity[allowed[popularity]][:top_n].astype(np.int64)
+        return top, np.zeros(top.size, dtype=np.float64)
+
+    def recommend(self, entries, top_n=10, filters=None, exclude_mal_ids=(), username=None):
+        """Recomendaciones para un único usuario (lista de MAL); `username` usa su perfil cacheado."""
+        return self.recommend_batch([entries], top_n, filters, exclude_mal_ids,
+                                    usernames=[username] if username else None)[0]
+
+    def to_records(self, rows, scores):
+        return [dict(self.records[r], hybrid_score=float(s)) for r, s in zip(rows.tolist(), scores.tolist())]
+
+
+def build_crosswalk(mal_ids):
+    """
+    MAL_IDs ordenados (con repetidos) y la fila de cada uno, para searchsorted.
+    El orden estable deja las filas de un mismo MAL_ID contiguas y crecientes:
+    [searchsorted left, right) son todas sus filas y la de `left` es la primera.
+    """
+    mal_ids = np.asarray(mal_ids, dtype=np.int64)
+    order = np.argsort(mal_ids, kind='stable')
+    return mal_ids[order], order
+
+
+def score_block(embeddings, profiles, mask, users, rows, top_n, start=0, chunk_size=256):
+    """
+    Top-N por usuario dentro del bloque de filas [start, start + len(mask)).
+
+    `profiles` es k × usuarios; `users`/`rows` son las entradas de las listas
+    (filas globales), que se excluyen para su usuario. Devuelve una lista de
+    (filas globales, scores) por usuario.
+    """
+    n_users = profiles.shape[1]
+    candidates = start + np.flatnonzero(mask)
+    position = np.full(len(mask), -1, dtype=np.int64)
+    position[candidates - start] = np.arange(candidates.size)
+    cand_embeddings = embeddings[candidates]
+
+    in_block = (rows >= start) & (rows < start + len(mask))
+    users, rows = users[in_block], rows[in_block]
+
+    results = []
+    scoring_s = ranking_s = 0.0
+    for first in range(0, n_users, chunk_size):
+        last = min(first + chunk_size, n_users)
+        t0 = time.perf_counter()
+        # Una sola multiplicación para todo el bloque de usuarios
+        scores = cand_embeddings @ profiles[:, first:last]
+
+        # Exclusiones por usuario: todo lo que ya está en su lista
+        in_chunk = (users >= first) & (users < last)
+        pos = position[rows[in_chunk] - start]
+        valid = pos >= 0
+        scores[pos[valid], users[in_chunk][valid] - first] = -np.inf
+        t_scores = time.perf_counter()
+
+        if candidates.size > top_n > 0:
+            kth = np.partition(scores, candidates.size - top_n, axis=0)[candidates.size - top_n]
+            keep = (scores >= kth) & np.isfinite(scores)
+        else:
+            keep = np.isfinite(scores)
+
+        for u in range(last - first):
+            selected = np.flatnonzero(keep[:, u])
+            results.append(top_n_rows(scores[selected, u], candidates[selected], top_n))
+        scoring_s += t_scores - t0
+        ranking_s += time.perf_counter() - t_scores
+
+    observe_stage('scoring', scoring_s)
+    observe_stage('ranking', ranking_s)
+    return results
+
+
+# Campos de cada recomendación en la respuesta (catálogo + hybrid_score)
+RECORD_FIELDS = ('id', 'MAL_ID', 'title', 'score', 'genres', 'description', 'type', 'episodes', 'siteUrl',
+                 'studios', 'hybrid_score')
+# Columnas del catálogo de las que salen esos campos
+RECORD_COLUMNS = ('id', 'MAL_ID', 'title', 'score', 'genres', 'description', 'Tipo', 'type', 'episodes',
+                  'siteUrl', 'studios')
+
+
+def frame_records(frame, scores):
+    """
+    Registros de respuesta de las filas top-N de un DataFrame de catálogo: solo
+    las columnas de RECORD_COLUMNS, sin pasar por JSON (mismo formato que to_records).
+    """
+    columns = [c for c in RECORD_COLUMNS if c in frame.columns]
+    return [dict(_clean_record(row), hybrid_score=float(score))
+            for row, score in zip(frame[columns].to_dict('records'), np.asarray(scores).tolist())]
+
+
+def _clean_record(row):
+    def text(key, default=''):
+        value = row.get(key)
+        return str(value) if value is not None and value == value else default
+
+    def number(key, cast):
+        value = row.get(key)
+        return cast(value) if value is not None and value == value else cast(0)
+
+    return {
+        'id': number('id', int),
+        'MAL_ID': number('MAL_ID', int),
+        'title': text('title', 'Unknown'),
+        'score': number('score', float),
+        'genres': text('genres'),
+        'description': text('description'),
+        'type': text('Tipo', text('type', 'Unknown')),
+        'episodes': number('episodes', int),
+        'siteUrl': text('siteUrl'),
+        'studios': text('studios'),
+    }
@@ -0,0 +1,138 @@
+# src/model/feature_store.py - Caché de tokens por contenido de cada título
+import os
+import ast
+import pickle
+
+from data.storage import atomic_write
+from monitoring.metrics import cache_result
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(SCRIPT_DIR))
+FEATURE_STORE_PATH = os.path.join(ROOT_DIR, "data", "cache", "feature_store.pkl")
+
+# Cambiar si cambia la configuración del analizador (invalida el caché)
+ANALYZER_VERSION = "word-english-v1"
+
+
+def identity_analyzer(tokens):
+    """Analizador para TfidfVectorizer cuando los documentos ya están tokenizados."""
+    return tokens
+
+
+def _default_analyzer():
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    # Mismo preprocesado/tokenización/stop words que TfidfVectorizer(stop_words='english')
+    return TfidfVectorizer(stop_words='english').build_analyzer()
+
+
+class FeatureStore:
+    """
+    Tokens de combined_features cacheados por hash de contenido de cada título.
+
+    En cada reentrenamiento solo se tokenizan los títulos nuevos o modificados;
+    el resto se reutiliza del caché en disco. El resultado alimenta a
+    TfidfVectorizer(analyzer=identity_analyzer), que produce la misma matriz que
+    ajustar sobre el texto original.
+    """
+
+    def __init__(self, path=FEATURE_STORE_PATH, analyzer=None):
+        self.path = path
+        self._analyzer = analyzer
+        self._tokens = None
+        self.last_stats = {'hits': 0, 'misses': 0}
+
+    @property
+    def analyzer(self):
+        if self._analyzer is None:
+            self._analyzer = _default_analyzer()
+        return self._analyzer
+
+    def _load(self):
+        if self._tokens is not None:
+            return
+        self._tokens = {}
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                payload = pickle.load(f)
+            if payload.get('analyzer_version') == ANALYZER_VERSION:
+                self._tokens = payload['tokens']
+        except Exception:
+            self._tokens = {}
+
+    def _save(self, keep):
+        # Solo se conservan los títulos del catálogo actual para acotar el tamaño
+        tokens = {h: self._tokens[h] for h in keep}
+        with atomic_write(self.path, 'wb') as f:
+            pickle.dump({'analyzer_version': ANALYZER_VERSION, 'tokens': tokens}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        self._tokens = tokens
+
+    def tokens(self, texts):
+        """Lista de tokens por documento (Serie de pandas con el texto combinado)."""
+        import pandas as pd
+
+        self._load()
+        texts = texts.fillna('').astype(str)
+        hashes = pd.util.hash_pandas_object(texts, index=False).values.tolist()
+
+        missing = [i for i, h in enumerate(hashes) if h not in self._tokens]
+        if missing:
+            analyzer = self.analyzer
+            values = texts.values
+            for i in missing:
+                self._tokens[hashes[i]] = analyzer(values[i])
+
+        self.last_stats = {'hits': len(hashes) - len(missing), 'misses': len(missing)}
+        cache_result('feature_tokens', 'hit', self.last_stats['hits'])
+        cache_result('feature_tokens', 'miss', self.last_stats['misses'])
+        if missing or len(self._tokens) != len(set(hashes)):
+            try:
+                self._save(set(hashes))
+            except OSError:
+                pass
+
+        return [self._tokens[h] for h in hashes]
+
+
+_default_store = None
+
+
+def get_feature_store():
+    global _default_store
+    if _default_store is None:
+        _default_store = FeatureStore()
+    return _default_store
+
+
+# Lista "simple": elementos entre comillas sin barras invertidas ni comas dentro
+_SIMPLE_ITEM = r"""(?:'[^'\\,]*'|"[^"\\,]*")"""
+SIMPLE_LIST_PATTERN = rf"\[(?:{_SIMPLE_ITEM}(?:,\s*{_SIMPLE_ITEM})*)?\]"
+
+
+def _join_literal(value):
+    return ' '.join(str(item).replace(" ", "") for item in ast.literal_eval(value))
+
+
+def join_list_column(series):
+    """
+    Convierte una columna de listas serializadas ("['Slice of Life', 'Drama']") en
+    tokens unidos por espacios ("SliceofLife Drama"), igual que ast.literal_eval
+    por fila + join. Las listas simples se procesan con operaciones vectorizadas;
+    las demás (barras invertidas, comas dentro de un elemento, elementos no
+    textuales...) pasan por ast.literal_eval.
+    """
+    is_text = series.map(lambda x: isinstance(x, str)).astype(bool)
+    text = series.where(is_text, '').astype(str)
+    has_list = is_text & text.str.contains('[', regex=False)
+    simple = has_list & text.str.fullmatch(SIMPLE_LIST_PATTERN)
+    # "['A b', "C's"]" -> "A b\x00C's" -> "Ab\x00C's" -> "Ab C's"
+    inner = text.str.slice(2, -2).str.replace(r"""['"],\s*['"]""", '\x00', regex=True)
+    joined = inner.str.replace(' ', '', regex=False).str.replace('\x00', ' ', regex=False)
+    joined = joined.where(simple, '')
+    fallback = has_list & ~simple
+    if fallback.any():
+        joined[fallback] = text[fallback].map(_join_literal)
+    return joined.values
@@ -0,0 +1,277 @@
+# src/model/filters.py - Bitmaps de filtros precalculados por versión de catálogo
+import os
+import ast
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from model.fingerprint import frame_fingerprint
+from data.storage import atomic_write
+from monitoring.metrics import cache_result
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(SCRIPT_DIR))
+CACHE_DIR = os.path.join(ROOT_DIR, "data", "cache")
+
+# Campos categóricos: multivaluados (el anime debe tener TODOS los valores pedidos)
+# y univaluados (basta con que coincida ALGUNO de los valores pedidos)
+MULTI_VALUE_FIELDS = ('genre', 'tag', 'studio')
+SINGLE_VALUE_FIELDS = ('type', 'status')
+NUMERIC_PARAMS = ('min_score', 'min_episodes', 'max_episodes')
+# Score mínimo que se aplica si la petición no indica min_score
+DEFAULT_MIN_SCORE = 70
+
+# Columnas del catálogo de las que dependen los bitmaps (definen su versión)
+FILTER_COLUMNS = ['id', 'genres', 'tags', 'studios', 'Tipo', 'status', 'score', 'episodes']
+# Cambiar si cambia cómo se construyen los bitmaps (invalida los índices guardados por versión de catálogo)
+INDEX_FORMAT = "bits-v1"
+
+# Índices en memoria por versión de catálogo: el actual y el anterior mientras se recarga
+INDEX_CACHE_SIZE = 2
+_INDEX_CACHE = OrderedDict()
+_INDEX_CACHE_LOCK = threading.Lock()
+
+
+def normalize_token(value):
+    """Normaliza un valor de filtro igual que load_data normaliza géneros y tags."""
+    return str(value).replace(' ', '').strip().lower()
+
+
+def _split_tokens(value):
+    if not isinstance(value, str):
+        return []
+    return [normalize_token(v) for v in value.split() if v.strip()]
+
+
+def _parse_list(value):
+    if isinstance(value, (list, tuple)):
+        return [normalize_token(v) for v in value]
+    if isinstance(value, str) and value.startswith('['):
+        try:
+            return [normalize_token(v) for v in ast.literal_eval(value)]
+        except (ValueError, SyntaxError):
+            return []
+    return []
+
+
+def _single(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    return [normalize_token(value)]
+
+
+class FilterIndex:
+    """
+    Bitsets empaquetados (np.packbits) por valor de género, tag, estudio, tipo y
+    estado, más arrays numéricos de score y episodios.
+
+    Se construye una vez por versión de catálogo; cada consulta combina bitsets con
+    AND/OR a nivel de bytes y solo desempaqueta la máscara final, sin recorrer las
+    columnas de texto del DataFrame.
+    """
+
+    def __init__(self, n_rows, keys, bits, score, episodes, ids, version=None):
+        self.n_rows = int(n_rows)
+        self.keys = list(keys)
+        self.key_to_row = {k: i for i, k in enumerate(self.keys)}
+        self.bits = bits
+        self.score = score
+        self.episodes = episodes
+        self.ids = ids
+        self.version = version
+
+    @classmethod
+    def build(cls, df, version=None):
+        n_rows = len(df)
+        type_col = 'Tipo' if 'Tipo' in df.columns else 'type'
+        sources = [
+            ('genre', df['genres'] if 'genres' in df.columns else None, _split_tokens),
+            ('tag', df['tags'] if 'tags' in df.columns else None, _split_tokens),
+            ('studio', df['studios'] if 'studios' in df.columns else None, _parse_list),
+            ('type', df[type_col] if type_col in df.columns else None, _single),
+            ('status', df['status'] if 'status' in df.columns else None, _single),
+        ]
+
+        keys, blocks = [], []
+        for field, column, tokenize in sources:
+            if column is None:
+                continue
+            rows, tokens = [], []
+            for row, value in enumerate(column.tolist()):
+                for token in tokenize(value):
+                    rows.append(row)
+                    tokens.append(token)
+            if not tokens:
+                continue
+            values, codes = np.unique(np.array(tokens, dtype=object), return_inverse=True)
+            matrix = np.zeros((len(values), n_rows), dtype=bool)
+            matrix[codes, np.array(rows)] = True
+            keys.extend(f"{field}:{v}" for v in values)
+            blocks.append(np.packbits(matrix, axis=1))
+
+        n_bytes = (n_rows + 7) // 8
+        bits = np.vstack(blocks) if blocks else np.zeros((0, n_bytes), dtype=np.uint8)
+
+        score = np.nan_to_num(
+            np.asarray(df['score'], dtype=float) if 'score' in df.columns else np.zeros(n_rows),
+            nan=0.0,
+        )
+        episodes = (np.asarray(df['episodes'], dtype=float) if 'episodes' in df.columns
+                    else np.full(n_rows, np.nan))
+        ids = np.asarray(df['id'], dtype=np.int64) if 'id' in df.columns else np.arange(n_rows)
+        return cls(n_rows, keys, bits, score, episodes, ids, version)
+
+    def _key_bits(self, field, value):
+        row = self.key_to_row.get(f"{field}:{normalize_token(value)}")
+        if row is None:
+            # Valor inexistente en el catálogo: ningún anime coincide
+            return np.zeros(self.bits.shape[1], dtype=np.uint8)
+        return self.bits[row]
+
+    def mask(self, filters=None):
+        """Máscara booleana (n_rows,) con los animes que cumplen todos los filtros."""
+        filters = filters or {}
+        packed = None
+
+        for field in MULTI_VALUE_FIELDS:
+            for value in filters.get(field) or []:
+                bits = self._key_bits(field, value)
+                packed = bits.copy() if packed is None else np.bitwise_and(packed, bits)
+
+        for field in SINGLE_VALUE_FIELDS:
+            values = filters.get(field) or []
+            if not values:
+                continue
+            any_bits = np.zeros(self.bits.shape[1], dtype=np.uint8)
+            for value in values:
+                any_bits |= self._key_bits(field, value)
+            packed = any_bits if packed is None else np.bitwise_and(packed, any_bits)
+
+        if packed is None:
+            result = np.ones(self.n_rows, dtype=bool)
+        else:
+            result = np.unpackbits(packed, count=self.n_rows).astype(bool)
+
+        if filters.get('min_score') is not None:
+            result &= self.score >= float(filters['min_score'])
+        # Animes sin número de episodios conocido no cumplen un rango de episodios
+        if filters.get('min_episodes') is not None:
+            result &= np.nan_to_num(self.episodes, nan=-1) >= float(filters['min_episodes'])
+        if filters.get('max_episodes') is not None:
+            result &= np.nan_to_num(self.episodes, nan=np.inf) <= float(filters['max_episodes'])
+
+        return result
+
+    def save(self, path):
+        with atomic_write(path, 'wb') as f:
+            np.savez(
+                f, n_rows=self.n_rows, keys=np.array(self.keys, dtype=str), bits=self.bits,
+                score=self.score, episodes=self.episodes, ids=self.ids,
+                version=np.array(self.version or ''),
+            )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                int(data['n_rows']), data['keys'].tolist(), data['bits'], data['score'],
+                data['episodes'], data['ids'], str(data['version']) or None,
+            )
+
+
+def get_filter_index(df, cache_dir=CACHE_DIR, catalog_version=None):
+    """
+    Devuelve el FilterIndex de la versión de catálogo de `df`, reutilizando el de
+    memoria o el de disco (data/cache/filters_<version>.npz) si ya existe.
+
+    `catalog_version`: versión ya calculada del catálogo del que sale `df`
+    (DatasetContext.catalog_version). Sin ella se calcula la huella de las
+    columnas de filtros, que recorre todo el DataFrame.
+    """
+    if catalog_version:
+        version = hashlib.sha1(f"{INDEX_FORMAT}:{catalog_version}".encode('utf-8')).hexdigest()[:16]
+    else:
+        version = frame_fingerprint(df, FILTER_COLUMNS)
+    with _INDEX_CACHE_LOCK:
+        index = _INDEX_CACHE.get(version)
+        if index is not None:
+            _INDEX_CACHE.move_to_end(version)
+    if index is not None:
+        cache_result('filter_index', 'hit')
+        return index
+
+    path = os.path.join(cache_dir, f"filters_{version}.npz")
+    index = None
+    if os.path.exists(path):
+        try:
+            index = FilterIndex.load(path)
+            if index.n_rows != len(df):
+                index = None
+        except Exception:
+            index = None
+
+    cache_result('filter_index', 'hit' if index is not None else 'miss')
+    if index is None:
+        index = FilterIndex.build(df, version)
+        try:
+            index.save(path)
+        except OSError:
+            pass
+
+    with _INDEX_CACHE_LOCK:
+        _INDEX_CACHE[version] = index
+        _INDEX_CACHE.move_to_end(version)
+        while len(_INDEX_CACHE) > INDEX_CACHE_SIZE:
+            _INDEX_CACHE.popitem(last=False)
+    return index
+
+
+def with_default_min_score(filters=None):
+    """Copia de `filters` con DEFAULT_MIN_SCORE si la petición no indica min_score"""
+    filters = dict(filters or {})
+    if filters.get('min_score') is None:
+        filters['min_score'] = DEFAULT_MIN_SCORE
+    return filters
+
+
+def parse_filter_params(args):
+    """
+    Convierte los query params del endpoint en un dict de filtros.
+
+    Acepta valores repetidos (?genre=Action&genre=Drama) o separados por comas.
+    Lanza ValueError si un parámetro numérico no es válido (tampoco nan ni inf).
+    """
+    def get_list(name):
+        if hasattr(args, 'getlist'):
+            raw = args.getlist(name)
+        else:
+            raw = args.get(name) or []
+            raw = raw if isinstance(raw, list) else [raw]
+        return [v.strip() for item in raw for v in str(item).split(',') if v.strip()]
+
+    filters = {}
+    for field in MULTI_VALUE_FIELDS + SINGLE_VALUE_FIELDS:
+        values = get_list(field)
+        if values:
+            filters[field] = values
+
+    for name in NUMERIC_PARAMS:
+        raw = args.get(name)
+        if raw is None or str(raw).strip() == '':
+            continue
+        try:
+            value = float(raw)
+        except (TypeError, ValueError):
+            raise ValueError(f"Parámetro '{name}' inválido: {raw}")
+        if not math.isfinite(value):
+            raise ValueError(f"Parámetro '{name}' inválido: {raw}")
+        filters[name] = value
+
+    if ('min_episodes' in filters and 'max_episodes' in filters
+            and filters['min_episodes'] > filters['max_episodes']):
+        raise ValueError("'min_episodes' no puede ser mayor que 'max_episodes'")
+
+    return filters
@@ -0,0 +1,27 @@
+# src/model/fingerprint.py
+import hashlib
+
+
+def frame_fingerprint(df, columns):
+    """
+    Huella de contenido (hex corto) de las columnas indicadas de un DataFrame.
+
+    Se usa como "versión de catálogo": cualquier cambio en las filas o en los
+    valores de esas columnas produce una huella distinta e invalida los cachés.
+    """
+    import pandas as pd
+
+    present = [c for c in columns if c in df.columns]
+    hashes = pd.util.hash_pandas_object(df[present].astype(str), index=False).values
+    digest = hashlib.sha1(hashes.tobytes())
+    digest.update(','.join(present).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    """Huella de contenido (hex corto) de un fichero."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
@@ -0,0 +1,109 @@
+# src/model/latent_model.py
+import time
+import numpy as np
+
+from model.ranking import top_n_rows
+from data.storage import atomic_write
+from monitoring.metrics import observe_stage
+
+
+def row_scores(matrix, profile):
+    """
+    matrix @ profile fila a fila. A diferencia de BLAS (gemv), el resultado de cada
+    fila no depende de cuántas filas se puntúan a la vez, así que puntuar el
+    catálogo entero o por bloques da exactamente los mismos valores.
+    """
+    return np.einsum('ij,j->i', matrix, profile)
+
+
+def nearest_neighbors(embeddings, k, block_size=1024):
+    """
+    Grafo de vecinos: para cada fila, las `k` filas más similares (producto escalar
+    en espacio latente, como cosine_sim) y su similitud, sin materializar la
+    matriz N×N (se calcula por bloques de filas). Empates por fila ascendente.
+    """
+    n_rows = embeddings.shape[0]
+    k = max(0, min(k, n_rows - 1))
+    neighbors = np.zeros((n_rows, k), dtype=np.int32)
+    similarities = np.zeros((n_rows, k), dtype=np.float32)
+    if k == 0:
+        return neighbors, similarities
+
+    for start in range(0, n_rows, block_size):
+        stop = min(start + block_size, n_rows)
+        sims = np.asarray(embeddings[start:stop]) @ np.asarray(embeddings).T
+        sims[np.arange(stop - start), np.arange(start, stop)] = -np.inf  # sin el propio anime
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_sims = np.take_along_axis(sims, top, axis=1)
+        order = np.lexsort((top, -top_sims), axis=1)
+        neighbors[start:stop] = np.take_along_axis(top, order, axis=1)
+        similarities[start:stop] = np.take_along_axis(top_sims, order, axis=1)
+    return neighbors, similarities
+
+
+class LatentModel:
+    """
+    Embeddings latentes (SVD) del catálogo.
+
+    Sustituye a la matriz de similitud N×N: `cosine_sim @ s == L @ (Lᵀ s)`, así que
+    basta con el perfil del usuario en espacio latente (vector de k dimensiones)
+    para puntuar cualquier subconjunto de filas en O(filas·k).
+    """
+
+    def __init__(self, embeddings, ids, version=None):
+        self.embeddings = embeddings
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.version = version
+        self._row_of = None
+
+    @property
+    def n_rows(self):
+        return self.embeddings.shape[0]
+
+    @property
+    def n_components(self):
+        return self.embeddings.shape[1]
+
+    @property
+    def row_of(self):
+        """Mapa id de catálogo (AniList) -> fila."""
+        if self._row_of is None:
+            self._row_of = {int(i): row for row, i in enumerate(self.ids.tolist())}
+        return self._row_of
+
+    def rows_for_ids(self, ids):
+        """Filas de los ids indicados (los ids desconocidos se descartan)."""
+        row_of = self.row_of
+        return np.array([row_of[int(i)] for i in ids if int(i) in row_of], dtype=np.int64)
+
+    def profile(self, rows, weights):
+        """Perfil latente Σ peso·embedding de las filas indicadas."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.size == 0:
+            return np.zeros(self.n_components, dtype=np.float64)
+        return np.asarray(weights, dtype=np.float64) @ self.embeddings[rows]
+
+    def scores(self, profile, rows=None):
+        """Puntuación híbrida de las filas indicadas (todas si rows es None)."""
+        matrix = self.embeddings if rows is None else self.embeddings[rows]
+        return row_scores(matrix, profile)
+
+    def top_n(self, profile, eligible, top_n):
+        """Top-N (filas, scores) entre las filas elegibles (máscara booleana)."""
+        t0 = time.perf_counter()
+        candidates = np.flatnonzero(eligible)
+        scores = self.scores(profile, candidates)
+        t_scores = time.perf_counter()
+        result = top_n_rows(scores, candidates, top_n)
+        observe_stage('scoring', t_scores - t0)
+        observe_stage('ranking', time.perf_counter() - t_scores)
+        return result
+
+    def save(self, path):
+        with atomic_write(path, 'wb') as f:
+            np.savez(f, embeddings=self.embeddings, ids=self.ids, version=np.array(self.version or ''))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['embeddings'], data['ids'], str(data['version']) or None)
@@ -0,0 +1,148 @@
+# src/model/profile_cache.py - Perfiles de usuario cacheados con actualización incremental
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from data.storage import write_json
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(SCRIPT_DIR))
+PROFILE_CACHE_DIR = os.path.join(ROOT_DIR, "data", "cache", "profiles")
+
+# Si cambia más de esta fracción de la lista, se recalcula el perfil completo
+MAX_DELTA_FRACTION = 0.5
+# Recalcular desde cero tras N deltas para no acumular error de coma flotante
+MAX_DELTAS = 50
+# Perfiles en memoria por proceso (los menos recientes se vuelven a leer de disco)
+MEMORY_ENTRIES = 1024
+
+
+def ratings_fingerprint(ratings):
+    """Huella de la lista puntuada {id: score} (independiente del orden)."""
+    payload = json.dumps(sorted((int(k), float(v)) for k, v in ratings.items()))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def _safe_name(username):
+    return re.sub(r'[^A-Za-z0-9_-]', '_', username.strip().lower()) or '_'
+
+
+class ProfileCache:
+    """
+    Caché de perfiles latentes por usuario (Σ score·embedding de sus animes puntuados).
+
+    Cada entrada guarda la versión del modelo, la lista puntuada y su huella. Si la
+    huella coincide, el perfil se reutiliza tal cual; si solo cambian unos pocos
+    animes (añadidos, eliminados o re-puntuados), se aplica únicamente su delta:
+    O(cambios·k) en lugar de recorrer toda la lista.
+    """
+
+    def __init__(self, cache_dir=PROFILE_CACHE_DIR, memory_entries=MEMORY_ENTRIES):
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        # Los hilos de la API comparten el caché
+        self._lock = threading.RLock()
+
+    def _path(self, username):
+        return os.path.join(self.cache_dir, f"{_safe_name(username)}.json")
+
+    def _read(self, username):
+        key = _safe_name(username)
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        path = self._path(username)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            entry['ratings'] = {int(k): float(v) for k, v in entry['ratings'].items()}
+            entry['profile'] = np.asarray(entry['profile'], dtype=np.float64)
+            self._remember(key, entry)
+            return entry
+        except Exception:
+            return None
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _write(self, username, entry):
+        self._remember(_safe_name(username), entry)
+        write_json(self._path(username), {
+            'model_version': entry['model_version'],
+            'fingerprint': entry['fingerprint'],
+            'n_deltas': entry['n_deltas'],
+            'ratings': {str(k): v for k, v in entry['ratings'].items()},
+            'profile': entry['profile'].tolist(),
+        })
+
+    def get_profile(self, username, ratings, model):
+        """
+        Devuelve (perfil, info) para `ratings` {id de catálogo: peso}. `model`
+        es un LatentModel o un RecommendationEngine (version, row_of y profile).
+
+        info['mode'] es 'hit' (sin cambios), 'delta' (actualización incremental)
+        o 'full' (recálculo completo), e info['changes'] el número de animes cuyo
+        peso cambió respecto a la entrada cacheada.
+        """
+        with self._lock:
+            return self._get_profile(username, ratings, model)
+
+    def _get_profile(self, username, ratings, model):
+        ratings = {int(k): float(v) for k, v in ratings.items() if float(v) != 0}
+        fingerprint = ratings_fingerprint(ratings)
+        entry = self._read(username)
+
+        if entry is not None and entry['model_version'] == model.version:
+            if entry['fingerprint'] == fingerprint:
+                return entry['profile'], {'mode': 'hit', 'changes': 0}
+
+            old = entry['ratings']
+            changed = {i: ratings.get(i, 0.0) - old.get(i, 0.0)
+                       for i in set(old) | set(ratings) if ratings.get(i, 0.0) != old.get(i, 0.0)}
+
+            if (len(changed) <= MAX_DELTA_FRACTION * max(len(ratings), 1)
+                    and entry['n_deltas'] < MAX_DELTAS):
+                row_of = model.row_of
+                known = [i for i in changed if i in row_of]
+                rows = np.array([row_of[i] for i in known], dtype=np.int64)
+                deltas = np.array([changed[i] for i in known], dtype=np.float64)
+                profile = entry['profile'] + model.profile(rows, deltas)
+                self._write(username, {
+                    'model_version': model.version, 'fingerprint': fingerprint,
+                    'n_deltas': entry['n_deltas'] + 1, 'ratings': ratings, 'profile': profile,
+                })
+                return profile, {'mode': 'delta', 'changes': len(changed)}
+
+        ids = list(ratings)
+        row_of = model.row_of
+        known = [i for i in ids if i in row_of]
+        rows = np.array([row_of[i] for i in known], dtype=np.int64)
+        weights = np.array([ratings[i] for i in known], dtype=np.float64)
+        profile = model.profile(rows, weights)
+        self._write(username, {
+            'model_version': model.version, 'fingerprint': fingerprint,
+            'n_deltas': 0, 'ratings': ratings, 'profile': profile,
+        })
+        return profile, {'mode': 'full', 'changes': len(ratings)}
+
+
+_default_cache = None
+
+
+def get_profile_cache():
+    """Caché de perfiles compartido por el proceso (pipeline y motor en memoria)"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ProfileCache()
+    return _default_cache
@@ -0,0 +1,26 @@
+# src/model/ranking.py
+import numpy as np
+
+
+def top_n_rows(row_scores, rows, n):
+    """
+    Devuelve las `n` filas de `rows` con mayor score, ordenadas de mayor a menor.
+
+    Los empates se resuelven por índice de fila ascendente, de modo que todos los
+    motores (denso, disperso, por shards) producen exactamente el mismo ranking.
+    `row_scores` está alineado con `rows`.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    row_scores = np.asarray(row_scores, dtype=np.float64)
+
+    if n <= 0 or rows.size == 0:
+        return rows[:0], row_scores[:0]
+
+    # Selección parcial O(len(rows)): solo se ordenan los que empatan o superan al n-ésimo
+    if rows.size > n:
+        kth = np.partition(row_scores, rows.size - n)[rows.size - n]
+        keep = row_scores >= kth
+        rows, row_scores = rows[keep], row_scores[keep]
+
+    order = np.lexsort((rows, -row_scores))[:n]
+    return rows[order], row_scores[order]
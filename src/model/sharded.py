@@ -0,0 +1,125 @@
+# src/model/sharded.py - Puntuación del catálogo repartida por bloques de filas entre procesos
+import os
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from model.latent_model import LatentModel, row_scores
+from model.ranking import top_n_rows
+from model.engine import score_block
+from data.storage import atomic_write
+
+# Por debajo de este tamaño de catálogo no compensa repartir: se puntúa en el proceso
+MIN_ROWS_PER_SHARD = 2048
+
+_shard_embeddings = None
+
+
+def _init_shard_worker(embeddings_path):
+    """Cada worker mapea el fichero de embeddings (las páginas se comparten vía caché del SO)"""
+    global _shard_embeddings
+    _shard_embeddings = np.load(embeddings_path, mmap_mode='r')
+
+
+def _shard_top_n(start, stop, profile, eligible, top_n):
+    """Top-N local de un bloque para un único perfil (exclusiones ya aplicadas en `eligible`)"""
+    candidates = start + np.flatnonzero(eligible)
+    return top_n_rows(row_scores(_shard_embeddings[candidates], profile), candidates, top_n)
+
+
+def _shard_batch(start, profiles, mask, users, rows, top_n):
+    """Top-N local de un bloque para varios perfiles (exclusiones por usuario)"""
+    return score_block(_shard_embeddings, profiles, mask, users, rows, top_n, start=start)
+
+
+def merge_top_n(partials, top_n):
+    """Fusiona los top-N locales en el top-N global (mismo orden que top_n_rows)"""
+    rows = np.concatenate([p[0] for p in partials]) if partials else np.empty(0, dtype=np.int64)
+    scores = np.concatenate([p[1] for p in partials]) if partials else np.empty(0, dtype=np.float64)
+    return top_n_rows(scores, rows, top_n)
+
+
+def export_embeddings(model, cache_dir):
+    """Vuelca los embeddings a latent_<versión>.npy (una vez por versión) para mapearlos"""
+    path = os.path.join(cache_dir, f"latent_{model.version or 'unversioned'}.npy")
+    if not os.path.exists(path):
+        with atomic_write(path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(model.embeddings))
+    return path
+
+
+def shard_bounds(n_rows, n_shards):
+    """Límites [start, stop) de bloques contiguos de filas de tamaño similar"""
+    n_shards = max(1, min(n_shards, n_rows)) if n_rows else 1
+    edges = np.linspace(0, n_rows, n_shards + 1).astype(np.int64)
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+
+class ShardedLatentModel(LatentModel):
+    """
+    LatentModel cuyos embeddings viven en un .npy mapeado en memoria y cuyo
+    ranking se reparte en bloques de filas entre un pool de procesos.
+
+    Cada worker calcula el top-N local de su bloque (con las exclusiones ya
+    aplicadas) y el coordinador fusiona los candidatos con top_n_rows. Como el
+    desempate es total (score desc., fila asc.), el top-N global siempre está
+    dentro de la unión de los top-N locales: el resultado es idéntico al de
+    LatentModel.top_n en un solo proceso.
+    """
+
+    def __init__(self, embeddings_path, ids, version=None, n_shards=None, workers=None):
+        super().__init__(np.load(embeddings_path, mmap_mode='r'), ids, version)
+        self.embeddings_path = embeddings_path
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        # Bloques de al menos MIN_ROWS_PER_SHARD filas (catálogos pequeños: un solo bloque)
+        n_shards = min(n_shards or self.workers, max(1, self.n_rows // MIN_ROWS_PER_SHARD))
+        self.bounds = shard_bounds(self.n_rows, n_shards)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @classmethod
+    def from_model(cls, model, cache_dir, n_shards=None, workers=None):
+        """Vuelca los embeddings de `model` a .npy (una vez por versión) y los mapea"""
+        return cls(export_embeddings(model, cache_dir), model.ids, model.version, n_shards, workers)
+
+    @property
+    def parallel(self):
+        return len(self.bounds) > 1
+
+    def _executor(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=min(self.workers, len(self.bounds)),
+                                                     initializer=_init_shard_worker,
+                                                     initargs=(self.embeddings_path,))
+                    atexit.register(self.close)
+        return self._pool
+
+    def top_n(self, profile, eligible, top_n):
+        if not self.parallel:
+            return super().top_n(profile, eligible, top_n)
+        pool = self._executor()
+        futures = [pool.submit(_shard_top_n, start, stop, profile, eligible[start:stop], top_n)
+                   for start, stop in self.bounds]
+        return merge_top_n([f.result() for f in futures], top_n)
+
+    def top_n_batch(self, profiles, mask, users, rows, top_n):
+        """Top-N por usuario (perfiles k × usuarios) repartido por bloques de filas"""
+        if not self.parallel:
+            return score_block(self.embeddings, profiles, mask, users, rows, top_n)
+        pool = self._executor()
+        futures = []
+        for start, stop in self.bounds:
+            in_block = (rows >= start) & (rows < stop)
+            futures.append(pool.submit(_shard_batch, start, profiles, mask[start:stop],
+                                       users[in_block], rows[in_block], top_n))
+        per_shard = [f.result() for f in futures]
+        return [merge_top_n([shard[u] for shard in per_shard], top_n) for u in range(profiles.shape[1])]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,142 @@
+# src/model/sparse_engine.py - Motor alternativo basado en índice invertido TF-IDF
+import numpy as np
+from scipy import sparse
+
+from model.ranking import top_n_rows
+
+
+class InvertedIndex:
+    """
+    Índice invertido sobre la matriz TF-IDF (filas normalizadas L2).
+
+    Guarda la matriz en CSR (documento -> términos) para construir el perfil del
+    usuario y en CSC (término -> postings) para acumular puntuaciones. La
+    puntuación de un documento es la similitud léxica exacta `x_d · Σ s_i x_i`,
+    equivalente a `(X Xᵀ) @ score_vector` sin materializar la matriz N×N.
+    """
+
+    def __init__(self, tfidf_matrix):
+        self.doc_terms = sparse.csr_matrix(tfidf_matrix, dtype=np.float64)
+        self.postings = self.doc_terms.tocsc()
+        self.postings.sort_indices()
+        self.n_docs, self.n_terms = self.doc_terms.shape
+
+        # Cota superior por término: peso máximo en su lista de postings
+        self.term_max = self.postings.max(axis=0).toarray().ravel()
+
+    def query_vector(self, rows, weights):
+        """Perfil léxico del usuario (términos, pesos) a partir de sus animes puntuados."""
+        rows = np.asarray(rows, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+        if rows.size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        sub = self.doc_terms[rows]
+        contrib = sub.data * np.repeat(weights, np.diff(sub.indptr))
+        terms, inverse = np.unique(sub.indices, return_inverse=True)
+        term_weights = np.bincount(inverse, weights=contrib, minlength=terms.size)
+
+        # La poda por cotas solo es válida con contribuciones positivas
+        keep = term_weights > 0
+        return terms[keep].astype(np.int64), term_weights[keep]
+
+    def search(self, terms, term_weights, eligible, top_n=10, stats=None):
+        """
+        Top-N exacto acumulando postings término a término con poda por cotas
+        (estilo WAND/MaxScore).
+
+        Los términos se recorren por contribución máxima descendente. En cuanto el
+        N-ésimo mejor candidato elegible supera la suma de cotas de los términos
+        restantes, ningún documento aún no visto puede entrar en el top-N: a partir
+        de ahí solo se puntúan los candidatos ya acumulados, buscándolos en cada
+        lista de postings (searchsorted) en vez de recorrerla entera, y se
+        descartan los que ni con todas las cotas restantes alcanzan el N-ésimo.
+
+        `stats` (dict opcional) recibe 'postings' (entradas de postings recorridas o
+        sondeadas) y 'pruned_terms' (términos puntuados solo sobre candidatos).
+        Devuelve (filas, scores) ordenados de mayor a menor.
+        """
+        eligible = np.asarray(eligible, dtype=bool)
+        acc = np.zeros(self.n_docs, dtype=np.float64)
+        seen = np.zeros(self.n_docs, dtype=bool)
+        candidates = []
+        pool = None
+        visited = pruned_terms = 0
+
+        if top_n > 0 and len(terms) > 0:
+            bounds = term_weights * self.term_max[terms]
+            order = np.argsort(-bounds, kind='stable')
+            terms, term_weights, bounds = terms[order], term_weights[order], bounds[order]
+            # remaining[i]: cota máxima que aún pueden sumar los términos posteriores a i
+            remaining = np.append(np.cumsum(bounds[::-1])[::-1][1:], 0.0)
+
+            indptr, indices, data = self.postings.indptr, self.postings.indices, self.postings.data
+            n_candidates = 0
+
+            for i, term in enumerate(terms):
+                start, end = indptr[term], indptr[term + 1]
+
+                if pool is not None:
+                    # Solo candidatos: sondear cada uno en la lista de postings (ordenada)
+                    pruned_terms += 1
+                    if pool.size < end - start:
+                        pos = start + np.searchsorted(indices[start:end], pool)
+                        hit = pos < end
+                        hit[hit] = indices[pos[hit]] == pool[hit]
+                        docs, vals = pool[hit], data[pos[hit]]
+                        visited += pool.size
+                    else:
+                        docs, vals = indices[start:end], data[start:end]
+                        in_pool = np.isin(docs, pool, assume_unique=True)
+                        docs, vals = docs[in_pool], vals[in_pool]
+                        visited += end - start
+                    acc[docs] += term_weights[i] * vals
+
+                    # Los que ni sumando todas las cotas restantes llegan al N-ésimo quedan fuera
+                    kth = np.partition(acc[pool], pool.size - top_n)[pool.size - top_n]
+                    pool = pool[acc[pool] + remaining[i] >= kth]
+                    continue
+
+                docs, vals = indices[start:end], data[start:end]
+                visited += end - start
+                new_docs = docs[~seen[docs]]
+                seen[new_docs] = True
+                new_docs = new_docs[eligible[new_docs]]
+                if new_docs.size:
+                    candidates.append(new_docs)
+                    n_candidates += new_docs.size
+                acc[docs] += term_weights[i] * vals
+
+                if n_candidates >= top_n:
+                    merged = np.concatenate(candidates)
+                    candidates = [merged]
+                    kth = np.partition(acc[merged], merged.size - top_n)[merged.size - top_n]
+                    if kth > remaining[i]:
+                        pool = merged[acc[merged] + remaining[i] >= kth]
+
+        if pool is None:
+            pool = np.concatenate(candidates) if candidates else np.empty(0, dtype=np.int64)
+        if stats is not None:
+            stats.update(postings=int(visited), pruned_terms=pruned_terms)
+        rows, scores = top_n_rows(acc[pool], pool, top_n)
+
+        # Sin suficientes coincidencias léxicas: completar con elegibles de score 0
+        missing = top_n - rows.size
+        if missing > 0:
+            filler = np.flatnonzero(eligible & ~seen)[:missing]
+            rows = np.concatenate([rows, filler])
+            scores = np.concatenate([scores, np.zeros(filler.size)])
+
+        return rows, scores
+
+    def recommend(self, score_vector, eligible, top_n=10):
+        """Atajo: perfil desde el vector de puntuaciones del usuario + búsqueda top-N."""
+        score_vector = np.asarray(score_vector, dtype=np.float64)
+        rated_rows = np.flatnonzero(score_vector > 0)
+        terms, term_weights = self.query_vector(rated_rows, score_vector[rated_rows])
+        return self.search(terms, term_weights, eligible, top_n)
+
+
+def build_inverted_index(tfidf_matrix):
+    """Construye el índice invertido a partir de la matriz TF-IDF ya ajustada."""
+    return InvertedIndex(tfidf_matrix)
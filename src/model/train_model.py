@@ -9,7 +9,6 @@ import json
 import subprocess
 import numpy as np
 from collections import Counter
-import ast
 import traceback
 from datetime import datetime
 
@@ -18,24 +17,43 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 ROOT_DIR = os.path.dirname(os.path.dirname(SCRIPT_DIR))
 DATA_DIR = os.path.join(ROOT_DIR, "data")
 FINAL_DATASET_PATH = os.path.join(DATA_DIR, "final_dataset.csv")
+MERGED_ANIME_PATH = os.path.join(DATA_DIR, "merged_anime.csv")
 USER_RATINGS_PATH = os.path.join(DATA_DIR, "user_ratings.csv") 
 BLACKLIST_PATH = os.path.join(DATA_DIR, "blacklist.json")
 PREPARE_SCRIPT_PATH = os.path.join(ROOT_DIR, 'src', 'data', 'prepare_data.py')
-
-def debug_log(message):
-    """Función de logging para debug - FORZAR FLUSH"""
-    print(f"🔍 [DEBUG] {message}", file=sys.stderr, flush=True)
+SRC_DIR = os.path.join(ROOT_DIR, 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from model.ranking import top_n_rows
+from model.filters import get_filter_index, with_default_min_score, DEFAULT_MIN_SCORE
+from model.fingerprint import frame_fingerprint, file_fingerprint
+from model.dataset_context import DatasetContext
+from model.latent_model import LatentModel
+from data.storage import write_json, build_once, DATASET_LOCK, RECOMMENDATIONS_LOCK
+from monitoring.metrics import timed, cache_result
+from monitoring.tracing import debug_log, set_attributes
+from model.profile_cache import get_profile_cache
+from model.feature_store import get_feature_store, identity_analyzer, join_list_column
+from model.sparse_engine import InvertedIndex, build_inverted_index
+from model.sharded import ShardedLatentModel
+from model.engine import RECOMMENDER_ENGINE, RECOMMENDER_SHARDS
+
+MIN_SCORE = DEFAULT_MIN_SCORE
+N_SVD_COMPONENTS = 100
+TFIDF_MAX_FEATURES = 10000
+MODEL_CACHE_DIR = os.path.join(DATA_DIR, "cache")
+
+_context_cache = {}
 
 def get_project_root():
     return ROOT_DIR
 
-def load_blacklist():
-    if not os.path.exists(BLACKLIST_PATH):
-        return []
+def load_blacklist(username=None):
+    """IDs en blacklist para `username` (ámbito global + el suyo)"""
+    from data.blacklist_store import get_store
     try:
-        with open(BLACKLIST_PATH, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return [int(id) for id in data if str(id).isdigit()]
+        return sorted(get_store(os.path.join(DATA_DIR, "blacklist.db"), BLACKLIST_PATH).excluded_ids(username))
     except Exception:
         return []
 
@@ -92,8 +110,8 @@ def debug_user_animes(df):
     
     return user_anime_ids
 
-def load_data():
-    if not os.path.exists(FINAL_DATASET_PATH) or os.path.getsize(FINAL_DATASET_PATH) <= 100:
+def ensure_final_dataset():
+    def generate():
         debug_log("⚠️ Archivo 'final_dataset.csv' no encontrado. Generando...")
         try:
             subprocess.run([sys.executable, PREPARE_SCRIPT_PATH], check=True)
@@ -101,52 +119,202 @@ def load_data():
             debug_log(f"❌ Error al ejecutar prepare_data.py: {e}")
             sys.exit(1)
 
-    df = pd.read_csv(FINAL_DATASET_PATH)
-    
+    build_once(FINAL_DATASET_PATH, generate, DATASET_LOCK, is_ready=lambda path: os.path.exists(path) and os.path.getsize(path) > 100)
+
+def read_final_dataset():
+    """Lee y limpia final_dataset.csv (sin combined_features)"""
+    return clean_dataset(pd.read_csv(FINAL_DATASET_PATH))
+
+def read_catalog():
+    """
+    Lee merged_anime.csv como catálogo independiente del usuario, con las mismas
+    filas y columnas que final_dataset.csv (mismo orden, sin datos de usuario).
+    """
+    df = pd.read_csv(MERGED_ANIME_PATH)
+    df['AniListID'] = df['AniListID'].astype(str).str.split('.').str[0].astype(int)
+    df = df.rename(columns={'AniListID': 'id', 'MalID': 'MAL_ID'})
+    df = df.drop_duplicates(subset=['id'], keep='first').reset_index(drop=True)
+    df['user_score'] = 0.0
+    df['my_status'] = 'NO_INTERACTUADO'
+    df['MAL_ID'] = df['MAL_ID'].fillna(0).astype(int)
+    return clean_dataset(df)
+
+def clean_dataset(df):
+    """Limpieza común de final_dataset.csv y del catálogo"""
     # Limpieza y preparación de datos
     df['user_score'] = df['user_score'].fillna(0.0)
     df['my_status'] = df['my_status'].fillna('NO_INTERACTUADO')
     df['my_status'] = df['my_status'].replace('', 'NO_INTERACTUADO') 
 
-    # Procesar listas de géneros y tags
+    # Procesar listas de géneros y tags (vectorizado: "['Slice of Life']" -> "SliceofLife")
     for col in ['genres', 'tags']:
-        df[col] = df[col].apply(lambda x: ast.literal_eval(x) if pd.notna(x) and isinstance(x, str) and '[' in x else [])
-        df[col] = df[col].apply(lambda x: ' '.join([str(i).replace(" ", "") for i in x]))
+        df[col] = join_list_column(df[col])
 
-    # Combinar características para TF-IDF
-    df['combined_features'] = df.apply(
-        lambda row: f"{row['title']} {row['genres']} {row['tags']} {row['description']}", 
-        axis=1
-    )
-    
     df = df.rename(columns={'type': 'Tipo'})
     df['AniListID'] = df['id']
+    return df
+
+def add_combined_features(df):
+    """Combinar características para TF-IDF"""
+    df['combined_features'] = (
+        df['title'].astype(str) + ' ' + df['genres'] + ' ' + df['tags'] + ' ' + df['description'].astype(str)
+    )
+    return df
+
+def load_data():
+    ensure_final_dataset()
+    df = add_combined_features(read_final_dataset())
 
     debug_log(f"✅ Dataset cargado: {len(df)} filas, columnas: {list(df.columns)}")
     return df
 
-def preprocess_data(df):
-    """Preprocesa los datos y calcula la matriz de similitud"""
+@timed("load_data")
+def load_dataset_context():
+    """
+    Devuelve el DatasetContext de final_dataset.csv, reutilizando el ya cargado en
+    este proceso mientras el hash de contenido del fichero no cambie.
+    """
+    ensure_final_dataset()
+    version = file_fingerprint(FINAL_DATASET_PATH)
+    context = _context_cache.get(FINAL_DATASET_PATH)
+    if context is not None and context.version == version:
+        debug_log(f"⚡ Reutilizando dataset cargado (versión {version})")
+        cache_result('dataset_context', 'hit')
+        return context
+    cache_result('dataset_context', 'miss')
+
+    df = read_final_dataset()
+    # Las filas de final_dataset.csv salen de merged_anime.csv (prepare_data); solo cambia user_score
+    catalog_version = (f"dataset-{file_fingerprint(MERGED_ANIME_PATH)}"
+                       if os.path.exists(MERGED_ANIME_PATH) else None)
+    context = DatasetContext(
+        df, version,
+        feature_builder=add_combined_features,
+        user_ids_loader=get_user_anime_ids_from_source,
+        user_list_path=os.path.join(DATA_DIR, "user_mal_list.json"),
+        catalog_version=catalog_version,
+    )
+    _context_cache[FINAL_DATASET_PATH] = context
+    set_attributes(rows=len(df), version=version)
+    debug_log(f"✅ Dataset cargado: {len(df)} filas (versión {version})")
+    return context
+
+@timed("load_data")
+def load_catalog_context():
+    """
+    DatasetContext del catálogo base (merged_anime.csv), sin datos de ningún
+    usuario. Lo usa el motor en memoria para servir a varios usuarios a la vez.
+    """
+    if not os.path.exists(MERGED_ANIME_PATH):
+        raise FileNotFoundError(f"Catálogo no encontrado: {MERGED_ANIME_PATH}")
+
+    version = file_fingerprint(MERGED_ANIME_PATH)
+    context = _context_cache.get(MERGED_ANIME_PATH)
+    if context is not None and context.version == version:
+        cache_result('dataset_context', 'hit')
+        return context
+    cache_result('dataset_context', 'miss')
+
+    df = read_catalog()
+    context = DatasetContext(df, version, feature_builder=add_combined_features, catalog_version=f"catalog-{version}")
+    _context_cache[MERGED_ANIME_PATH] = context
+    debug_log(f"✅ Catálogo cargado: {len(df)} filas (versión {version})")
+    return context
+
+@timed("tfidf")
+def build_tfidf_matrix(df, max_features=TFIDF_MAX_FEATURES):
+    """Ajusta TF-IDF sobre combined_features (compartido por los motores SVD y disperso)"""
+    # Tokens cacheados por contenido: solo se tokenizan los títulos nuevos o modificados
+    df['combined_features'] = df['combined_features'].fillna('')
+    store = get_feature_store()
+    tokens = store.tokens(df['combined_features'])
+
+    tfidf = TfidfVectorizer(analyzer=identity_analyzer, max_features=max_features)
+    tfidf_matrix = tfidf.fit_transform(tokens)
+
+    debug_log(f"✅ TF-IDF completado: {tfidf_matrix.shape} (tokens cacheados: {store.last_stats['hits']}, nuevos: {store.last_stats['misses']})")
+    return tfidf_matrix
+
+@timed("svd")
+def fit_latent_matrix(tfidf_matrix, n_svd=N_SVD_COMPONENTS):
+    """Aplica SVD para reducción de dimensionalidad (None si no hay componentes suficientes)"""
+    n_components = min(tfidf_matrix.shape) - 1
+    if n_components <= 0:
+        debug_log("❌ No hay suficientes componentes para SVD")
+        return None
+        
+    n_svd = min(n_svd, n_components)  # Reducir para mayor estabilidad
+    svd = TruncatedSVD(n_components=n_svd, random_state=42)
+    latent_matrix = svd.fit_transform(tfidf_matrix)
+    
+    debug_log(f"✅ SVD aplicado: {latent_matrix.shape}")
+    return latent_matrix
+
+def latent_model_version(df):
+    """Versión del modelo latente: contenido del catálogo + parámetros de entrenamiento"""
+    return f"{frame_fingerprint(df, ['id', 'combined_features'])}-svd{N_SVD_COMPONENTS}"
+
+def build_latent_model(df):
+    """Entrena TF-IDF + SVD y devuelve los embeddings sin calcular la matriz N×N"""
+    try:
+        debug_log("Iniciando preprocesamiento TF-IDF y SVD (modelo latente)...")
+        latent_matrix = fit_latent_matrix(build_tfidf_matrix(df))
+        if latent_matrix is None:
+            return None
+        return LatentModel(latent_matrix, df['id'].values, latent_model_version(df))
+    except Exception as e:
+        debug_log(f"❌ Error en build_latent_model: {e}")
+        debug_log(f"❌ Traceback: {traceback.format_exc()}")
+        return None
+
+def load_or_build_latent_model(df, cache_dir=MODEL_CACHE_DIR):
+    """Reutiliza los embeddings cacheados de esta versión de catálogo o los entrena y guarda"""
+    version = latent_model_version(df)
+    cache_path = os.path.join(cache_dir, f"latent_{version}.npz")
+
+    if os.path.exists(cache_path):
+        try:
+            model = LatentModel.load(cache_path)
+            if model.n_rows == len(df):
+                debug_log(f"⚡ Reutilizando modelo latente cacheado ({version})")
+                cache_result('latent_model', 'hit')
+                return model
+        except Exception as e:
+            debug_log(f"⚠️ Caché de modelo latente inválido, regenerando: {e}")
+
+    cache_result('latent_model', 'miss')
+    debug_log("🔧 Entrenando modelo latente (nueva versión de catálogo)...")
+    model = build_latent_model(df)
+    if model is not None:
+        model.save(cache_path)
+        debug_log(f"✅ Modelo latente guardado en caché: {cache_path}")
+    return model
+
+def load_sharded_model(df, cache_dir=MODEL_CACHE_DIR):
+    """Modelo latente mapeado en memoria con el ranking repartido entre procesos"""
+    model = load_or_build_latent_model(df, cache_dir)
+    if model is None:
+        return None
+    sharded = ShardedLatentModel.from_model(model, cache_dir, n_shards=RECOMMENDER_SHARDS,
+                                            workers=RECOMMENDER_SHARDS)
+    debug_log(f"🧩 Motor por bloques: {len(sharded.bounds)} bloques, {sharded.workers} procesos")
+    return sharded
+
+def preprocess_data(df, engine=None):
+    """Preprocesa los datos y calcula la matriz de similitud (o el índice invertido si engine='sparse')"""
+    engine = (engine or RECOMMENDER_ENGINE).lower()
     try:
+        if engine == 'sparse':
+            debug_log("Iniciando preprocesamiento TF-IDF (motor disperso)...")
+            index = build_inverted_index(build_tfidf_matrix(df))
+            debug_log(f"✅ Índice invertido construido: {index.n_docs} documentos, {index.n_terms} términos")
+            return index
+
         debug_log("Iniciando preprocesamiento TF-IDF y SVD...")
         
-        tfidf = TfidfVectorizer(stop_words='english', max_features=10000)
-        df['combined_features'] = df['combined_features'].fillna('')
-        tfidf_matrix = tfidf.fit_transform(df['combined_features'])
-        
-        debug_log(f"✅ TF-IDF completado: {tfidf_matrix.shape}")
-        
-        # Aplicar SVD para reducción de dimensionalidad
-        n_components = min(tfidf_matrix.shape) - 1
-        if n_components <= 0:
-            debug_log("❌ No hay suficientes componentes para SVD")
+        latent_matrix = fit_latent_matrix(build_tfidf_matrix(df))
+        if latent_matrix is None:
             return None
-            
-        n_svd = min(100, n_components)  # Reducir para mayor estabilidad
-        svd = TruncatedSVD(n_components=n_svd, random_state=42)
-        latent_matrix = svd.fit_transform(tfidf_matrix)
-        
-        debug_log(f"✅ SVD aplicado: {latent_matrix.shape}")
         
         # Calcular similitud coseno
         cosine_sim = linear_kernel(latent_matrix, latent_matrix)
@@ -159,13 +327,22 @@ def preprocess_data(df):
         debug_log(f"❌ Traceback: {traceback.format_exc()}")
         return None
 
-def get_recommendations(df, cosine_sim, top_n=10):
-    """Función CORREGIDA: recomienda animes excluyendo los que el usuario ya vio Y los de la blacklist"""
+def get_recommendations(df, cosine_sim, top_n=10, filters=None, username=None, context=None):
+    """
+    Función CORREGIDA: recomienda animes excluyendo los que el usuario ya vio Y los de la blacklist.
+
+    `cosine_sim` puede ser la matriz de similitud densa, un LatentModel o un
+    InvertedIndex. `filters` (opcional) admite genre, tag, studio, type, status
+    (listas), min_score, min_episodes y max_episodes; por defecto solo se exige
+    score >= MIN_SCORE. Con un LatentModel y `username`, el perfil del usuario se
+    reutiliza del caché y solo se aplican los cambios de su lista. Con `context`
+    (DatasetContext) se reutilizan la lista del usuario y el índice de filtros ya cargados.
+    """
     try:
         debug_log("🎯 Calculando recomendaciones...")
 
         # 🔥 1. Obtener IDs del usuario directamente del JSON
-        user_anime_ids_from_json = get_user_anime_ids_from_source()
+        user_anime_ids_from_json = context.user_anime_ids if context is not None else get_user_anime_ids_from_source()
         if not user_anime_ids_from_json:
             debug_log("❌ No se pudieron obtener IDs del usuario desde el JSON")
             return pd.DataFrame()
@@ -173,7 +350,7 @@ def get_recommendations(df, cosine_sim, top_n=10):
         debug_log(f"🛑 Excluyendo {len(user_anime_ids_from_json)} animes del usuario (por MAL_ID)")
 
         # 🔥 2. Cargar blacklist
-        blacklist = load_blacklist()
+        blacklist = load_blacklist(username)
         debug_log(f"🚫 Blacklist cargada: {len(blacklist)} IDs bloqueados")
         
         # 🔥 3. Combinar exclusiones: usuario + blacklist
@@ -186,36 +363,55 @@ def get_recommendations(df, cosine_sim, top_n=10):
         # 5. Calcular scores híbridos
         score_vector = df['user_score'].values.astype(float) / 10.0
 
-        # 6. Ajustar dimensiones si es necesario
-        if score_vector.shape[0] != cosine_sim.shape[1]:
-            debug_log(f"⚠️ Ajustando dimensiones: score_vector {score_vector.shape} vs cosine_sim {cosine_sim.shape}")
-            min_dim = min(score_vector.shape[0], cosine_sim.shape[1])
-            score_vector = score_vector[:min_dim]
-            cosine_sim = cosine_sim[:min_dim, :min_dim]
-
-        # 7. Calcular puntuaciones híbridas
-        total_scores = np.dot(cosine_sim, score_vector)
-        recs = df.copy()
-        recs['hybrid_score'] = total_scores
+        # 6. Candidatos elegibles: bitmaps de filtros (score mínimo incluido) AND no vistos/blacklist
+        filters = with_default_min_score(filters)
+        filter_index = (context.derived('filter_index',
+                                        lambda: get_filter_index(df, catalog_version=context.catalog_version))
+                        if context is not None else get_filter_index(df))
+        eligible = filter_index.mask(filters)
+        eligible &= ~df['MAL_ID'].isin(excluded_ids).values
+        debug_log(f"✅ Filtrado completado ({filters}). Animes disponibles: {int(eligible.sum())}")
 
-        # 🔥 8. FILTRADO: excluir animes ya vistos Y blacklist (MAL_ID)
-        recs = recs[~recs['MAL_ID'].isin(excluded_ids)].copy()
-        debug_log(f"✅ Filtrado completado. Animes disponibles: {len(recs)}")
-
-        if recs.empty:
+        if not eligible.any():
             debug_log("⚠️ No hay recomendaciones disponibles después del filtrado.")
             return pd.DataFrame()
 
-        # 9. Filtrar por score mínimo de MAL
-        recs = recs[recs['score'] >= 70]
-        if recs.empty:
-            debug_log("⚠️ No hay animes con score >= 70")
-            return pd.DataFrame()
-
-        # 10. Ordenar por score híbrido y tomar top N
-        recs = recs.sort_values(by='hybrid_score', ascending=False).head(top_n)
-
-        # 🔥 11. VERIFICACIÓN FINAL: asegurar que no se recomienden animes excluidos
+        # 7. Calcular puntuaciones híbridas y tomar top N
+        if isinstance(cosine_sim, InvertedIndex):
+            top_rows, top_scores = cosine_sim.recommend(score_vector, eligible, top_n)
+        elif isinstance(cosine_sim, LatentModel):
+            if cosine_sim.n_rows != len(df):
+                debug_log(f"❌ El modelo latente ({cosine_sim.n_rows} filas) no corresponde al dataset ({len(df)} filas)")
+                return pd.DataFrame()
+
+            rated_rows = np.flatnonzero(score_vector > 0)
+            if username:
+                ratings = dict(zip(cosine_sim.ids[rated_rows].tolist(), score_vector[rated_rows].tolist()))
+                profile, info = get_profile_cache().get_profile(username, ratings, cosine_sim)
+                cache_result('profile', info['mode'])
+                debug_log(f"👤 Perfil de {username}: {info['mode']} ({info['changes']} cambios)")
+            else:
+                profile = cosine_sim.profile(rated_rows, score_vector[rated_rows])
+
+            # En ShardedLatentModel el top-N se reparte entre procesos por bloques de filas
+            top_rows, top_scores = cosine_sim.top_n(profile, eligible, top_n)
+        else:
+            # Ajustar dimensiones si es necesario
+            if score_vector.shape[0] != cosine_sim.shape[1]:
+                debug_log(f"⚠️ Ajustando dimensiones: score_vector {score_vector.shape} vs cosine_sim {cosine_sim.shape}")
+                min_dim = min(score_vector.shape[0], cosine_sim.shape[1])
+                score_vector = score_vector[:min_dim]
+                cosine_sim = cosine_sim[:min_dim, :min_dim]
+                eligible = eligible[:min_dim]
+
+            candidates = np.flatnonzero(eligible)
+            total_scores = cosine_sim[candidates] @ score_vector
+            top_rows, top_scores = top_n_rows(total_scores, candidates, top_n)
+
+        recs = df.iloc[top_rows].copy()
+        recs['hybrid_score'] = top_scores
+
+        # 🔥 8. VERIFICACIÓN FINAL: asegurar que no se recomienden animes excluidos
         conflicts = recs[recs['MAL_ID'].isin(excluded_ids)]
         if not conflicts.empty:
             debug_log(f"❌ ERROR CRÍTICO: {len(conflicts)} animes excluidos fueron recomendados")
@@ -235,7 +431,7 @@ def get_recommendations(df, cosine_sim, top_n=10):
         debug_log(f"❌ Traceback: {traceback.format_exc()}")
         return pd.DataFrame()
 
-def get_anime_statistics(df):
+def get_anime_statistics(df, context=None):
     """Calcula estadísticas del usuario"""
     stats = {}
     
@@ -265,7 +461,7 @@ def get_anime_statistics(df):
             stats['average_user_score'] = round(avg_score, 2) if pd.notna(avg_score) else 0.0
 
         # Total de animes en la lista del usuario
-        user_anime_ids = get_user_anime_ids_from_source()
+        user_anime_ids = context.user_anime_ids if context is not None else get_user_anime_ids_from_source()
         stats['total_anime_in_list'] = len(user_anime_ids)
             
         debug_log(f"📊 Estadísticas generadas: {stats}")
@@ -276,7 +472,7 @@ def get_anime_statistics(df):
     
     return stats
 
-def save_recommendations_to_json(recommendations_df, filename="recommendations.json"):
+def save_recommendations_to_json(recommendations_df, filename="recommendations.json", context=None):
     """Guarda las recomendaciones en formato JSON, usando MAL_ID de forma consistente"""
     try:
         if recommendations_df.empty:
@@ -303,23 +499,22 @@ def save_recommendations_to_json(recommendations_df, filename="recommendations.j
             }
             recommendations_json.append(clean_rec)
 
-        # Generar estadísticas
-        stats = generate_statistics()
+        # Generar estadísticas (reutilizando el dataset ya cargado)
+        stats = generate_statistics(context)
 
         # Guardar JSON final
         output_path = os.path.join(DATA_DIR, filename)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump({
-                'timestamp': datetime.now().isoformat(),
-                'count': len(recommendations_json),
-                'statistics': stats,
-                'recommendations': recommendations_json
-            }, f, indent=2, ensure_ascii=False)
+        write_json(output_path, {
+            'timestamp': datetime.now().isoformat(),
+            'count': len(recommendations_json),
+            'statistics': stats,
+            'recommendations': recommendations_json
+        }, lock=RECOMMENDATIONS_LOCK, indent=2, ensure_ascii=False)
 
         debug_log(f"✅ {len(recommendations_json)} recomendaciones guardadas en: {output_path}")
 
         # 🔥 Verificación final: asegurar que no se guarden animes ya vistos
-        user_anime_ids = get_user_anime_ids_from_source()
+        user_anime_ids = context.user_anime_ids if context is not None else get_user_anime_ids_from_source()
         conflicts = [rec for rec in recommendations_json if rec['MAL_ID'] in user_anime_ids]
         if conflicts:
             debug_log(f"❌ ALERTA: Se están guardando {len(conflicts)} animes ya vistos: {[c['title'] for c in conflicts]}")
@@ -333,11 +528,12 @@ def save_recommendations_to_json(recommendations_df, filename="recommendations.j
         return None
 
 
-def generate_statistics():
+def generate_statistics(context=None):
     """Genera estadísticas del sistema (función de respaldo)"""
     try:
-        df = load_data()
-        stats = get_anime_statistics(df)
+        context = context or load_dataset_context()
+        df = context.df
+        stats = get_anime_statistics(df, context=context)
         
         # Agregar información adicional
         stats['total_animes_catalog'] = len(df)
@@ -358,7 +554,8 @@ def main_with_json():
     try:
         debug_log("🚀 Iniciando generación de recomendaciones...")
         
-        df = load_data() 
+        context = load_dataset_context()
+        df = context.features()
         debug_log(f"✅ Dataset cargado: {len(df)} filas.")
         
         debug_log("🔧 Entrenando modelo...")
@@ -368,13 +565,13 @@ def main_with_json():
             debug_log("❌ No se pudo entrenar el modelo")
             return None
 
-        recs = get_recommendations(df, sim)
+        recs = get_recommendations(df, sim, context=context)
         
         if recs.empty:
             debug_log("❌ No se generaron recomendaciones")
             return None
             
-        output_file = save_recommendations_to_json(recs)
+        output_file = save_recommendations_to_json(recs, context=context)
         
         debug_log(f"🎯 {len(recs)} recomendaciones generadas exitosamente")
         return output_file
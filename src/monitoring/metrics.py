@@ -0,0 +1,389 @@
+# src/monitoring/metrics.py - Métricas de latencia por etapa y de recursos en formato texto de Prometheus
+"""
+Registro de métricas en memoria sin dependencias externas:
+
+  - recommender_request_duration_seconds{endpoint,method,status}: histograma por petición HTTP
+  - recommender_stage_duration_seconds{stage}: histograma por etapa (descarga MAL,
+    parseo, merge, load_data, TF-IDF, SVD, scoring, ranking, serialización...)
+  - recommender_cache_requests_total{cache,result} y recommender_cache_hit_ratio{cache}
+  - recommender_in_flight{kind}: peticiones HTTP y trabajos (pipeline, lotes) en curso
+  - recommender_degraded_responses_total{fallback,stage}: respuestas de respaldo por presupuesto agotado
+  - recommender_admission_queue_depth{pool} y recommender_admission_rejections_total{pool,reason}:
+    cola y rechazos (429/503) del control de admisión de los endpoints pesados
+  - recommender_model_info{version}, recommender_artifact_bytes{kind}, recommender_process_resident_bytes
+
+Con varios workers de gunicorn (METRICS_MULTIPROC_DIR), cada proceso vuelca su
+registro a <dir>/<pid>.json y /api/metrics suma los de todos los workers vivos.
+El pipeline en subproceso no comparte memoria con la API: con `collect_events()`
+acumula sus etapas y aciertos de caché, los devuelve en su JSON de salida y la
+API los incorpora con `import_events()`.
+"""
+import os
+import json
+import time
+import bisect
+import functools
+import threading
+from contextlib import contextmanager
+
+from monitoring.tracing import span, add_attribute
+
+# Límites de los buckets (segundos): de 1 ms a 2 minutos
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR') or None
+# Segundos mínimos entre volcados del registro de un worker
+FLUSH_INTERVAL = 5.0
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def merge(self, samples):
+        for key, value in samples:
+            self.inc(value, **dict(zip(self.labelnames, key)))
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """Suma 1 mientras dura el bloque (peticiones o trabajos en curso)"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), [list(counts), total]] for key, (counts, total) in self._values.items()]
+
+    def merge(self, samples):
+        with self._lock:
+            for key, (counts, total) in samples:
+                key = tuple(key)
+                current, current_total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+                self._values[key] = ([a + b for a, b in zip(current, counts)], current_total + total)
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {total!r}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Conjunto de métricas del proceso, con volcado/fusión entre workers"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._last_flush = 0.0
+
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def add_collector(self, collector):
+        """`collector()` devuelve métricas calculadas al exportar: [(nombre, tipo, ayuda, [(labels, valor)])]"""
+        self._collectors.append(collector)
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def flush(self, directory=None, force=False):
+        """Vuelca el registro de este proceso a <directory>/<pid>.json (como mucho cada FLUSH_INTERVAL s)"""
+        directory = directory or METRICS_MULTIPROC_DIR
+        now = time.monotonic()
+        if not directory or (not force and now - self._last_flush < FLUSH_INTERVAL):
+            return
+        from data.storage import write_json
+
+        self._last_flush = now
+        write_json(os.path.join(directory, f"{os.getpid()}.json"), self.snapshot())
+
+    def _merged(self, directory):
+        """Copia del registro con los volcados de los demás workers vivos sumados"""
+        merged = Registry()
+        for name, metric in self._metrics.items():
+            copy = merged._register(type(metric)(name, metric.help, metric.labelnames,
+                                                 *([metric.buckets] if isinstance(metric, Histogram) else [])))
+            copy.merge(metric.snapshot())
+        for filename in os.listdir(directory) if os.path.isdir(directory) else []:
+            pid = filename.split('.')[0]
+            if not filename.endswith('.json') or not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            path = os.path.join(directory, filename)
+            if not _pid_alive(int(pid)):
+                os.unlink(path)
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, samples in snapshot.items():
+                if name in merged._metrics:
+                    merged._metrics[name].merge(samples)
+        return merged
+
+    def render(self, directory=None):
+        """Texto de exposición de Prometheus (con los demás workers si hay directorio multiproceso)"""
+        directory = directory or METRICS_MULTIPROC_DIR
+        if directory:
+            self.flush(directory, force=True)
+        source = self._merged(directory) if directory else self
+        lines = []
+        for metric in source._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for collector in self._collectors + source._derived():
+            for name, kind, help_text, samples in (collector() if callable(collector) else [collector]):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels([k for k, _ in labels], [v for _, v in labels])} "
+                                 f"{_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def _derived(self):
+        """Métricas calculadas a partir de otras (ratio de aciertos de cada caché)"""
+        cache = self._metrics.get('recommender_cache_requests_total')
+        if cache is None:
+            return []
+        totals = {}
+        for (name, result), value in cache.snapshot():
+            hits, total = totals.get(name, (0, 0))
+            totals[name] = (hits + (value if result == 'hit' else 0), total + value)
+        samples = [([('cache', name)], hits / total) for name, (hits, total) in sorted(totals.items()) if total]
+        return [('recommender_cache_hit_ratio', 'gauge', 'Fracción de aciertos por caché', samples)]
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def resource_metrics():
+    """Versión del modelo servido y memoria: ficheros de artefactos y su parte residente en este proceso"""
+    import sys
+
+    samples = []
+    rss = _resident_bytes()
+    if rss is not None:
+        samples.append(('recommender_process_resident_bytes', 'gauge', 'Memoria residente del proceso', [([], rss)]))
+    module = sys.modules.get('services.recommendation_engine')
+    engine = getattr(module, '_engine', None)
+    if engine is None:
+        return samples
+    samples.append(('recommender_model_info', 'gauge', 'Versión del modelo servido', [([('version', engine.version)], 1)]))
+    directory = getattr(engine, 'artifacts_dir', None)
+    if directory and os.path.isdir(directory):
+        on_disk = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+        artifact_samples = [([('kind', 'disk')], on_disk)]
+        resident = _mapped_resident_bytes(directory)
+        if resident is not None:
+            artifact_samples.append(([('kind', 'resident')], resident))
+        samples.append(('recommender_artifact_bytes', 'gauge',
+                        'Tamaño de los artefactos servidos (disco y residente mapeado en memoria)', artifact_samples))
+    return samples
+
+
+def _resident_bytes():
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _mapped_resident_bytes(directory):
+    """Suma de Rss de las regiones mapeadas desde `directory` (/proc/self/smaps)"""
+    try:
+        total, inside = 0, False
+        with open('/proc/self/smaps', 'r') as f:
+            for line in f:
+                if line[0] in '0123456789abcdef' and '-' in line.split(' ', 1)[0]:
+                    inside = line.rstrip().endswith('.npy') and directory in line
+                elif inside and line.startswith('Rss:'):
+                    total += int(line.split()[1]) * 1024
+        return total
+    except (OSError, ValueError):
+        return None
+
+
+REGISTRY = Registry()
+REGISTRY.add_collector(resource_metrics)
+
+REQUEST_DURATION = REGISTRY.histogram(
+    'recommender_request_duration_seconds', 'Duración de las peticiones HTTP', ('endpoint', 'method', 'status'))
+STAGE_DURATION = REGISTRY.histogram(
+    'recommender_stage_duration_seconds', 'Duración de cada etapa del pipeline de recomendación', ('stage',))
+CACHE_REQUESTS = REGISTRY.counter(
+    'recommender_cache_requests_total', 'Consultas a cachés por resultado (hit, miss, delta...)', ('cache', 'result'))
+IN_FLIGHT = REGISTRY.gauge(
+    'recommender_in_flight', 'Peticiones HTTP y trabajos de recomendación en curso', ('kind',))
+DEGRADED_RESPONSES = REGISTRY.counter(
+    'recommender_degraded_responses_total', 'Respuestas servidas por un nivel de respaldo al agotarse el presupuesto',
+    ('fallback', 'stage'))
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge(
+    'recommender_admission_queue_depth', 'Peticiones esperando un hueco en el control de admisión', ('pool',))
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    'recommender_admission_rejections_total', 'Peticiones rechazadas por el control de admisión',
+    ('pool', 'reason'))
+
+# Eventos de este proceso pendientes de enviar al proceso padre (None: no se recogen)
+_events = None
+
+
+def observe_stage(name, seconds):
+    STAGE_DURATION.observe(seconds, stage=name)
+    if _events is not None:
+        _events['stages'].append([name, seconds])
+
+
+@contextmanager
+def stage(name):
+    """Mide el bloque como una etapa del pipeline (y lo traza como un span)"""
+    t0 = time.perf_counter()
+    try:
+        with span(name):
+            yield
+    finally:
+        observe_stage(name, time.perf_counter() - t0)
+
+
+def timed(name):
+    """Decorador: cada llamada a la función se mide como la etapa `name`"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def cache_result(cache, result, amount=1):
+    """Registra `amount` consultas a `cache` con resultado 'hit', 'miss' u otro ('delta', 'full'...)"""
+    if not amount:
+        return
+    CACHE_REQUESTS.inc(amount, cache=cache, result=result)
+    add_attribute(f"cache.{cache}.{result}", amount)
+    if _events is not None:
+        _events['caches'].append([cache, result, amount])
+
+
+def collect_events():
+    """Empieza a acumular etapas y consultas a cachés para exportarlas (procesos hijos)"""
+    global _events
+    _events = {'stages': [], 'caches': []}
+
+
+def export_events():
+    return dict(_events) if _events is not None else {'stages': [], 'caches': []}
+
+
+def import_events(events):
+    """Incorpora al registro las etapas y cachés medidas en un subproceso"""
+    for name, seconds in (events or {}).get('stages', []):
+        observe_stage(name, float(seconds))
+    for cache, result, amount in (events or {}).get('caches', []):
+        cache_result(cache, result, amount)
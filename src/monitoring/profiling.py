@@ -0,0 +1,190 @@
+# src/monitoring/profiling.py - Perfilado bajo demanda (CPU y asignaciones) de una petición de recomendación
+"""
+Perfila una sola petición en producción, sin reiniciar ni reproducir nada:
+
+  - Se activa por petición con la cabecera `X-Profile: <PROFILE_TOKEN>` o para
+    todas las peticiones con PROFILE_REQUESTS=1 (entornos de prueba).
+  - La ruta de recomendación corre bajo cProfile y tracemalloc. Si la atiende el
+    pipeline en subproceso, el perfil se toma dentro del subproceso (PROFILE_ID
+    por entorno), que es donde están pandas, TF-IDF, SVD...
+  - Por cada parte perfilada se escriben en PROFILE_DIR (data/profiles/):
+      <id>.<parte>.prof  estadísticas de cProfile (pstats, snakeviz...)
+      <id>.<parte>.txt   informe legible: funciones por tiempo acumulado y propio
+                         y líneas que más memoria asignaron (neto) durante la petición
+  - /api/debug/profiles/<id> lista y descarga los ficheros, siempre con el token.
+
+Solo se perfila una petición a la vez por proceso (tracemalloc es global): si
+ya hay otra en curso, la nueva se sirve sin perfilar.
+"""
+import os
+import io
+import re
+import hmac
+import uuid
+import time
+import pstats
+import marshal
+import cProfile
+import threading
+import tracemalloc
+from datetime import datetime
+from contextlib import contextmanager
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(ROOT_DIR, 'data', 'profiles')
+# Sin token no se puede pedir un perfil por cabecera ni descargarlo
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN') or None
+PROFILE_REQUESTS = os.environ.get('PROFILE_REQUESTS', '0') == '1'
+PROFILE_HEADER = 'X-Profile'
+# Peticiones perfiladas que se conservan en disco (las más recientes)
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', '50'))
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+TRACEMALLOC_FRAMES = 10
+
+_active = threading.Lock()
+
+
+def profile_id_for(request_id=None):
+    """Id del perfil: el request ID si sirve como nombre de fichero, si no uno nuevo"""
+    if request_id and re.fullmatch(r'[A-Za-z0-9_-]{1,128}', request_id):
+        return request_id
+    return uuid.uuid4().hex
+
+
+def authorized(token):
+    """El token recibido coincide con PROFILE_TOKEN (comparación en tiempo constante)"""
+    return bool(PROFILE_TOKEN) and bool(token) and hmac.compare_digest(str(token), PROFILE_TOKEN)
+
+
+def requested(header_value):
+    """La petición debe perfilarse: PROFILE_REQUESTS=1 o cabecera X-Profile con el token"""
+    return PROFILE_REQUESTS or authorized(header_value)
+
+
+@contextmanager
+def profile(profile_id, part, directory=None):
+    """
+    Perfila el bloque (CPU + asignaciones) y escribe el informe de `profile_id`.
+    Devuelve el id, o None si no se perfiló (otro perfil en curso o sin id).
+    """
+    if not profile_id or not _active.acquire(blocking=False):
+        yield None
+        return
+    try:
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        profiler = cProfile.Profile()
+        t0 = time.perf_counter()
+        profiler.enable()
+        try:
+            yield profile_id
+        finally:
+            profiler.disable()
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            after = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            if started_tracing:
+                tracemalloc.stop()
+            try:
+                write_report(profile_id, part, profiler, before, after, elapsed_ms, peak, directory or PROFILE_DIR)
+            except OSError as e:
+                print(f"⚠️ No se pudo escribir el perfil {profile_id}: {e}")
+    finally:
+        _active.release()
+
+
+def _allocation_lines(before, after):
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    ]
+    diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+    diff = sorted((stat for stat in diff if stat.size_diff > 0), key=lambda stat: stat.size_diff, reverse=True)
+    lines = []
+    for stat in diff[:TOP_ALLOCATIONS]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size_diff / 1024:>12.1f} KiB {stat.count_diff:>+9d} bloques  {frame.filename}:{frame.lineno}")
+    return lines
+
+
+def write_report(profile_id, part, profiler, before, after, elapsed_ms, peak_bytes, directory=PROFILE_DIR):
+    """Escribe <id>.<parte>.prof (pstats) y <id>.<parte>.txt (informe legible)"""
+    from data.storage import atomic_write
+
+    base = os.path.join(directory, f"{profile_id}.{part}")
+    profiler.create_stats()
+    with atomic_write(base + '.prof', 'wb') as f:
+        marshal.dump(profiler.stats, f)
+
+    report = io.StringIO()
+    report.write(f"Perfil {profile_id} ({part}) - {datetime.now().isoformat()} - pid {os.getpid()}\n")
+    report.write(f"Duración: {elapsed_ms:.1f} ms; pico de memoria trazada: {peak_bytes / 1024 / 1024:.1f} MiB\n\n")
+    for title, sort_key in (("tiempo acumulado", pstats.SortKey.CUMULATIVE), ("tiempo propio", pstats.SortKey.TIME)):
+        report.write(f"== CPU: funciones por {title} (top {TOP_FUNCTIONS}) ==\n")
+        stats = pstats.Stats(profiler, stream=report)
+        stats.strip_dirs().sort_stats(sort_key).print_stats(TOP_FUNCTIONS)
+    report.write(f"== Memoria: líneas con más asignación neta durante la petición (top {TOP_ALLOCATIONS}) ==\n")
+    report.write('\n'.join(_allocation_lines(before, after)) + '\n')
+    with atomic_write(base + '.txt') as f:
+        f.write(report.getvalue())
+
+    prune(directory)
+    print(f"🔬 Perfil guardado: {base}.txt")
+    return base
+
+
+def _profile_files(directory):
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return [name for name in names if name.endswith(('.prof', '.txt')) and not name.startswith('.')]
+
+
+def prune(directory=PROFILE_DIR, keep=None):
+    """Conserva solo los perfiles de las `keep` peticiones más recientes"""
+    keep = PROFILE_KEEP if keep is None else keep
+    by_id = {}
+    for name in _profile_files(directory):
+        path = os.path.join(directory, name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        profile_id = name.split('.', 1)[0]
+        by_id[profile_id] = max(by_id.get(profile_id, 0), mtime)
+    for profile_id in sorted(by_id, key=by_id.get, reverse=True)[keep:]:
+        for name in files_for(profile_id, directory):
+            try:
+                os.unlink(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def files_for(profile_id, directory=PROFILE_DIR):
+    """Ficheros de un perfil (nombres dentro de `directory`)"""
+    return sorted(name for name in _profile_files(directory) if name.split('.', 1)[0] == profile_id)
+
+
+def list_profiles(directory=PROFILE_DIR):
+    """Perfiles disponibles, del más reciente al más antiguo"""
+    profiles = {}
+    for name in _profile_files(directory):
+        path = os.path.join(directory, name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        entry = profiles.setdefault(name.split('.', 1)[0], {'files': [], 'modified': 0})
+        entry['files'].append(name)
+        entry['modified'] = max(entry['modified'], mtime)
+    return [{'profile_id': profile_id, 'files': sorted(entry['files']),
+             'modified': datetime.fromtimestamp(entry['modified']).isoformat()}
+            for profile_id, entry in sorted(profiles.items(), key=lambda item: item[1]['modified'], reverse=True)]
@@ -0,0 +1,342 @@
+# src/monitoring/tracing.py - Trazas por petición con spans anidados y exportador JSONL local
+"""
+Trazado ligero sin dependencias externas (activar con TRACING=1):
+
+  - Cada petición HTTP abre un span raíz con un request ID (cabecera
+    X-Request-ID entrante o uno nuevo) que se devuelve en la respuesta.
+  - `span(nombre, **atributos)` abre un span hijo del actual (contextvars, así
+    que cada hilo/petición tiene su propia pila). Las etapas de
+    monitoring.metrics (`stage`/`timed`) abren su span automáticamente.
+  - `set_attributes(...)` añade atributos al span actual (filas, bytes...),
+    `add_attribute(...)` los acumula (aciertos/fallos de caché) y `debug_log`
+    imprime el mensaje y lo guarda como evento del span.
+  - Los spans terminados van a un buffer circular en memoria (`/api/debug/traces`)
+    y, al cerrarse el span raíz, la traza completa se añade a TRACE_EXPORT_PATH (JSONL).
+
+El pipeline en subproceso recibe el request ID y el span padre por entorno
+(TRACE_REQUEST_ID, TRACE_PARENT_ID); con `collect_spans()` acumula sus spans,
+los devuelve en su JSON de salida y la API los incorpora con `import_spans()`.
+
+Con el trazado desactivado `span()` devuelve un span vacío compartido: no se
+generan IDs, ni se mide tiempo, ni se guarda nada.
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import threading
+import contextvars
+from collections import deque
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENABLED = os.environ.get('TRACING', '0') == '1'
+TRACE_EXPORT_PATH = os.environ.get('TRACE_EXPORT_PATH') or os.path.join(ROOT_DIR, 'logs', 'traces.jsonl')
+# Spans guardados en memoria por proceso
+TRACE_BUFFER_SIZE = int(os.environ.get('TRACE_BUFFER_SIZE', '2000'))
+# Al superar este tamaño el JSONL se rota a <ruta>.1
+TRACE_MAX_BYTES = int(os.environ.get('TRACE_MAX_BYTES', str(20 * 1024 * 1024)))
+# Eventos (debug_log) máximos por span
+MAX_EVENTS = 100
+# Trazas abiertas como máximo a la espera de su span raíz
+MAX_PENDING_TRACES = 1000
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+_REQUEST_ID_RE = re.compile(r'[A-Za-z0-9._-]{1,128}')
+
+_current = contextvars.ContextVar('trace_span', default=None)
+_buffer = deque(maxlen=TRACE_BUFFER_SIZE)
+_buffer_lock = threading.Lock()
+# Spans terminados de trazas cuyo span raíz sigue abierto en este proceso
+_pending = {}
+# Spans a devolver al proceso padre (None: se exportan aquí)
+_collected = None
+# Traza y span padre heredados del proceso padre
+_remote_parent = (None, None)
+
+
+def _new_id():
+    return uuid.uuid4().hex[:16]
+
+
+class Span:
+    """Un tramo medido de una traza; se cierra con `end()` o al salir del `with`"""
+
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'attributes', 'events',
+                 'start', '_t0', 'duration_ms', 'error', '_token', 'is_root')
+
+    def __init__(self, name, trace_id, parent_id, attributes, is_root):
+        self.trace_id = trace_id
+        self.span_id = _new_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = dict(attributes)
+        self.events = []
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.duration_ms = None
+        self.error = None
+        self._token = None
+        self.is_root = is_root
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def add(self, key, amount=1):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def event(self, message):
+        if len(self.events) < MAX_EVENTS:
+            self.events.append({'t_ms': round((time.perf_counter() - self._t0) * 1000, 3), 'message': str(message)})
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self.error is None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.end()
+        return False
+
+    def end(self):
+        if self.duration_ms is not None:
+            return
+        self.duration_ms = round((time.perf_counter() - self._t0) * 1000, 3)
+        if self._token is not None:
+            try:
+                _current.reset(self._token)
+            except ValueError:
+                # Cerrado desde otro contexto (hooks de Flask en otro hilo): basta con no restaurar
+                pass
+            self._token = None
+        _record(self.to_dict(), root=self.is_root)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': self.duration_ms,
+            'status': 'error' if self.error else 'ok',
+            'error': self.error,
+            'attributes': self.attributes,
+            'events': self.events,
+            'pid': os.getpid(),
+        }
+
+
+class _NoopSpan:
+    """Span vacío para cuando el trazado está desactivado"""
+
+    trace_id = span_id = parent_id = None
+
+    def set(self, key, value):
+        pass
+
+    def add(self, key, amount=1):
+        pass
+
+    def event(self, message):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def configure(enabled=None, export_path=None, buffer_size=None):
+    """Cambia la configuración en caliente (tests y scripts)"""
+    global ENABLED, TRACE_EXPORT_PATH, _buffer
+    if enabled is not None:
+        ENABLED = bool(enabled)
+    if export_path is not None:
+        TRACE_EXPORT_PATH = export_path
+    if buffer_size is not None:
+        with _buffer_lock:
+            _buffer = deque(_buffer, maxlen=buffer_size)
+
+
+def span(name, **attributes):
+    """Span hijo del actual (o raíz de una traza nueva); usar con `with`"""
+    if not ENABLED:
+        return NOOP_SPAN
+    parent = _current.get()
+    if parent is not None:
+        return Span(name, parent.trace_id, parent.span_id, attributes, is_root=False)
+    trace_id, parent_id = _remote_parent
+    return Span(name, trace_id or _new_id(), parent_id, attributes, is_root=trace_id is None)
+
+
+def start_trace(name, request_id=None, **attributes):
+    """
+    Span raíz de una petición con `request_id` como ID de traza (sin `with`: cerrar
+    con `end()`). Un request ID entrante que no sea un token simple se sustituye.
+    """
+    if not ENABLED:
+        return NOOP_SPAN
+    if not valid_request_id(request_id):
+        request_id = uuid.uuid4().hex
+    root = Span(name, request_id, None, attributes, is_root=True)
+    root.__enter__()
+    return root
+
+
+def valid_request_id(value):
+    """Request IDs aceptados desde fuera: tokens simples (se usan en nombres de fichero)"""
+    return bool(value) and _REQUEST_ID_RE.fullmatch(value) is not None
+
+
+def current_span():
+    return (_current.get() or NOOP_SPAN) if ENABLED else NOOP_SPAN
+
+
+def current_request_id():
+    current = _current.get() if ENABLED else None
+    return current.trace_id if current is not None else None
+
+
+def set_attributes(**attributes):
+    current = current_span()
+    for key, value in attributes.items():
+        current.set(key, value)
+
+
+def add_attribute(key, amount=1):
+    current_span().add(key, amount)
+
+
+def debug_log(message):
+    """Función de logging para debug - FORZAR FLUSH (y evento del span actual si se traza)"""
+    print(f"🔍 [DEBUG] {message}", file=sys.stderr, flush=True)
+    if ENABLED:
+        current_span().event(message)
+
+
+def bind(func):
+    """Ejecuta `func` con el contexto de traza actual (para pools de hilos)"""
+    if not ENABLED:
+        return func
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(func, *args, **kwargs)
+
+
+# --- Propagación a subprocesos ---
+
+def child_env(env=None):
+    """Variables de entorno para que un subproceso continúe la traza actual"""
+    env = dict(os.environ if env is None else env)
+    current = _current.get() if ENABLED else None
+    if current is not None:
+        env.update({'TRACING': '1', 'TRACE_REQUEST_ID': current.trace_id, 'TRACE_PARENT_ID': current.span_id})
+    return env
+
+
+def collect_spans():
+    """
+    En un subproceso: continúa la traza del padre (TRACE_REQUEST_ID/TRACE_PARENT_ID)
+    y acumula los spans para devolverlos con `export_spans()` en vez de escribirlos.
+    """
+    global _collected, _remote_parent
+    request_id = os.environ.get('TRACE_REQUEST_ID')
+    if not ENABLED or not request_id:
+        return
+    _collected = []
+    _remote_parent = (request_id, os.environ.get('TRACE_PARENT_ID') or None)
+
+
+def export_spans():
+    return list(_collected) if _collected is not None else []
+
+
+def import_spans(spans):
+    """Incorpora los spans de un subproceso (se exportan con la traza del padre)"""
+    if not ENABLED:
+        return
+    for record in spans or []:
+        _record(record, root=False)
+
+
+# --- Buffer y exportador ---
+
+def _record(record, root):
+    if _collected is not None:
+        _collected.append(record)
+        return
+    with _buffer_lock:
+        _buffer.append(record)
+        if not root:
+            if record['trace_id'] not in _pending and len(_pending) >= MAX_PENDING_TRACES:
+                # Spans que terminan después de su raíz: se descarta la traza pendiente más antigua
+                _pending.pop(next(iter(_pending)))
+            _pending.setdefault(record['trace_id'], []).append(record)
+            return
+        trace = _pending.pop(record['trace_id'], []) + [record]
+    _export(trace)
+
+
+def _export(records):
+    if not TRACE_EXPORT_PATH:
+        return
+    lines = ''.join(json.dumps(record, ensure_ascii=False, default=str) + '\n' for record in records)
+    try:
+        from data.storage import file_lock, TRACES_LOCK
+        os.makedirs(os.path.dirname(os.path.abspath(TRACE_EXPORT_PATH)), exist_ok=True)
+        # Cerrojo compartido con los demás workers: las trazas no se intercalan y la rotación es segura
+        with file_lock(TRACES_LOCK):
+            if os.path.exists(TRACE_EXPORT_PATH) and os.path.getsize(TRACE_EXPORT_PATH) > TRACE_MAX_BYTES:
+                os.replace(TRACE_EXPORT_PATH, TRACE_EXPORT_PATH + '.1')
+            with open(TRACE_EXPORT_PATH, 'a', encoding='utf-8') as f:
+                f.write(lines)
+    except OSError as e:
+        print(f"⚠️ No se pudo exportar la traza: {e}", file=sys.stderr)
+
+
+def recent_traces(limit=50):
+    """Resumen de las últimas trazas completas de este proceso (más reciente primero)"""
+    with _buffer_lock:
+        roots = [record for record in _buffer if record['parent_id'] is None]
+    return [{
+        'request_id': record['trace_id'],
+        'name': record['name'],
+        'start': record['start'],
+        'duration_ms': record['duration_ms'],
+        'status': record['status'],
+    } for record in reversed(roots[-limit:])]
+
+
+def get_trace(request_id):
+    """Spans de una traza: del buffer en memoria o, si no está (otro worker), del JSONL exportado"""
+    with _buffer_lock:
+        spans = [record for record in _buffer if record['trace_id'] == request_id]
+    if not spans and TRACE_EXPORT_PATH:
+        for path in (TRACE_EXPORT_PATH, TRACE_EXPORT_PATH + '.1'):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    spans.extend(record for record in map(json.loads, filter(str.strip, f))
+                                 if record['trace_id'] == request_id)
+            except (OSError, ValueError):
+                continue
+    return sorted(spans, key=lambda record: record['start'])
+
+
+def build_tree(spans):
+    """Anida los spans por parent_id (los huérfanos quedan en la raíz)"""
+    nodes = {record['span_id']: dict(record, children=[]) for record in spans}
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node['parent_id'])
+        (parent['children'] if parent is not None else roots).append(node)
+    return roots
@@ -0,0 +1,146 @@
+# src/services/compile_artifacts.py - Compilación offline de todos los artefactos de serving
+"""
+Uso (lo ejecuta build.sh tras descargar el catálogo):
+    python src/services/compile_artifacts.py [--neighbors 20] [--no-validate]
+
+A partir de data/merged_anime.csv genera en data/artifacts/<versión>/:
+  - catálogo por columnas (textos en blob UTF-8 + offsets)
+  - crosswalk de IDs (AniList / MAL_ID -> fila)
+  - embeddings latentes (TF-IDF + SVD)
+  - grafo de vecinos (top-K animes más similares de cada anime)
+  - bitmaps de filtros
+  - ranking de popularidad (respaldo para usuarios sin animes puntuados)
+  - manifest.json con versión, parámetros y checksums
+
+La versión solo se activa (CURRENT) si pasa la validación, así que la primera
+petición tras el despliegue ya no entrena nada.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+
+import numpy as np
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from model.artifacts import ARTIFACTS_DIR, write_artifacts, validate_artifacts, activate_version, load_engine
+from model.latent_model import nearest_neighbors
+from monitoring.tracing import debug_log
+
+DEFAULT_NEIGHBORS = 20
+
+
+def popularity_order(df):
+    """
+    Filas de más a menos populares. fetch_datasets descarga el catálogo ordenado
+    por popularidad (POPULARITY_DESC), así que sin columna 'popularity' el orden
+    de las filas ya es el ranking.
+    """
+    if 'popularity' in df.columns:
+        values = np.nan_to_num(np.asarray(df['popularity'], dtype=float), nan=-np.inf)
+        return np.lexsort((np.arange(len(df)), -values)).astype(np.int64)
+    return np.arange(len(df), dtype=np.int64)
+
+
+def build_engine_from_catalog():
+    """Carga catálogo, modelo latente e índice de filtros y construye el motor (en memoria)"""
+    from services.get_recommendations_for_user import check_preloaded_data
+    from model.train_model import load_catalog_context, load_or_build_latent_model
+    from model.filters import get_filter_index
+    from model.engine import RecommendationEngine
+
+    check_preloaded_data()
+    context = load_catalog_context()
+    df = context.features()
+    model = load_or_build_latent_model(df)
+    if model is None:
+        raise RuntimeError("No se pudo entrenar el modelo latente")
+    engine = RecommendationEngine.from_context(context, model,
+                                               get_filter_index(df, catalog_version=context.catalog_version))
+    engine.popularity = popularity_order(df)
+    return engine
+
+
+def check_equivalence(engine, loaded, n_users=5, top_n=10):
+    """Los artefactos cargados deben recomendar lo mismo que el motor en memoria"""
+    errors = []
+    popular = np.asarray(engine.popularity)[:n_users * 5]
+    for u in range(n_users):
+        entries = [[int(engine.mal_ids[r]), 10 - i] for i, r in enumerate(popular[u::n_users].tolist())]
+        expected, _ = engine.recommend(entries, top_n=top_n)
+        got, _ = loaded.recommend(entries, top_n=top_n)
+        if expected.tolist() != got.tolist():
+            errors.append(f"Recomendaciones distintas para el usuario sintético {u}")
+    return errors
+
+
+def compile_artifacts(root=ARTIFACTS_DIR, n_neighbors=DEFAULT_NEIGHBORS, validate=True):
+    """
+    Genera, valida y activa los artefactos de la versión actual del catálogo.
+    Devuelve (versión, directorio). Lanza RuntimeError si la validación falla.
+    """
+    from services.recommendation_engine import catalog_fingerprint
+
+    t0 = time.perf_counter()
+    engine = build_engine_from_catalog()
+    source = catalog_fingerprint() or 'nosource'
+    t_model = time.perf_counter()
+
+    debug_log(f"🕸️ Calculando grafo de vecinos (k={n_neighbors})...")
+    neighbors, similarities = nearest_neighbors(engine.embeddings, n_neighbors)
+    t_graph = time.perf_counter()
+
+    version = f"{engine.version}-{source[:8]}"
+    directory = write_artifacts(
+        engine, root,
+        extra={'neighbors': neighbors, 'neighbor_similarities': similarities},
+        metadata={
+            'source_fingerprint': source,
+            'n_neighbors': int(neighbors.shape[1]),
+            'timings_s': {
+                'model': round(t_model - t0, 2),
+                'neighbors': round(t_graph - t_model, 2),
+            },
+        },
+        version=version, activate=False,
+    )
+
+    if validate:
+        errors = validate_artifacts(root, version)
+        if not errors:
+            errors = check_equivalence(engine, load_engine(root, version))
+        if errors:
+            # La versión no se activa y se borra para que el siguiente intento la regenere
+            shutil.rmtree(directory, ignore_errors=True)
+            raise RuntimeError("Artefactos no válidos: " + "; ".join(errors))
+        debug_log("✅ Artefactos validados")
+
+    activate_version(root, version)
+    debug_log(f"✅ Artefactos {version} activos ({time.perf_counter() - t0:.1f} s): {directory}")
+    return version, directory
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compila los artefactos de serving desde el catálogo")
+    parser.add_argument('--neighbors', type=int, default=DEFAULT_NEIGHBORS, help="Vecinos por anime en el grafo")
+    parser.add_argument('--no-validate', action='store_true', help="Activar sin validar")
+    parser.add_argument('--output', default=ARTIFACTS_DIR, help="Directorio de artefactos")
+    args = parser.parse_args(argv)
+
+    print("🏗️ Compilando artefactos de serving...")
+    try:
+        version, directory = compile_artifacts(args.output, args.neighbors, validate=not args.no_validate)
+    except Exception as e:
+        print(f"❌ Error compilando artefactos: {e}")
+        return 1
+    print(f"✅ Artefactos {version} listos en {directory}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
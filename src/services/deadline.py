@@ -0,0 +1,135 @@
+# src/services/deadline.py - Presupuesto de latencia por petición, propagado a cada etapa
+"""
+Cada petición de recomendaciones lleva un presupuesto de latencia (cabecera
+X-Request-Budget-Ms o REQUEST_BUDGET_MS por defecto). El plazo resultante se
+propaga con contextvars a las etapas del mismo proceso y por entorno
+(REQUEST_DEADLINE, instante absoluto) al pipeline en subproceso:
+
+  - `stage_timeout(etapa)`: timeout de una etapa (el menor entre su límite en
+    STAGE_TIMEOUTS y lo que queda de presupuesto).
+  - `check(etapa)`: lanza DeadlineExceeded si ya no queda el tiempo mínimo de la
+    etapa (STAGE_MIN_SECONDS), en vez de empezar algo que no va a terminar.
+
+Sin plazo activo `check` no hace nada y `stage_timeout` devuelve el límite de la
+etapa, así que los usos offline (precálculo, lotes) se comportan como siempre.
+La API captura DeadlineExceeded y responde con un nivel de respaldo
+(services/fallback.py), con la lista parcial descargada si la hay.
+"""
+import os
+import time
+import contextvars
+from contextlib import contextmanager
+
+BUDGET_HEADER = 'X-Request-Budget-Ms'
+DEADLINE_ENV = 'REQUEST_DEADLINE'
+# Presupuesto por defecto (el antiguo límite fijo de 5 minutos) y máximo que puede pedir un cliente
+DEFAULT_BUDGET_MS = int(os.environ.get('REQUEST_BUDGET_MS', '300000'))
+MAX_BUDGET_MS = int(os.environ.get('MAX_REQUEST_BUDGET_MS', '300000'))
+
+# Límite de cada etapa en segundos (nunca más que el presupuesto restante)
+STAGE_TIMEOUTS = {
+    'mal_page': float(os.environ.get('MAL_PAGE_TIMEOUT', '10')),
+    'pipeline': 300.0,
+}
+# Tiempo mínimo para que merezca la pena empezar la etapa (una página de MAL
+# incluye la pausa de 0.5 s entre peticiones)
+STAGE_MIN_SECONDS = {
+    'mal_page': 0.75,
+    'pipeline': float(os.environ.get('PIPELINE_MIN_SECONDS', '5')),
+    'prepare_data': 1.0,
+    'model': 1.0,
+}
+
+_current = contextvars.ContextVar('request_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """El presupuesto de la petición no alcanza para `stage`; `partial` es la lista descargada hasta entonces"""
+
+    def __init__(self, stage, partial=None):
+        super().__init__(f"Presupuesto de latencia agotado en la etapa '{stage}'")
+        self.stage = stage
+        self.partial = partial
+
+
+class Deadline:
+    """Plazo absoluto (time.time(), válido entre procesos) de una petición"""
+
+    def __init__(self, budget_seconds=None, expires_at=None):
+        if expires_at is None:
+            expires_at = time.time() + budget_seconds
+        self.expires_at = float(expires_at)
+
+    @classmethod
+    def from_env(cls, env=None):
+        value = (os.environ if env is None else env).get(DEADLINE_ENV)
+        try:
+            return cls(expires_at=float(value)) if value else None
+        except ValueError:
+            return None
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.time())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def stage_timeout(self, stage):
+        return min(STAGE_TIMEOUTS.get(stage, float('inf')), self.remaining())
+
+    def check(self, stage):
+        if self.remaining() < STAGE_MIN_SECONDS.get(stage, 0.0):
+            raise DeadlineExceeded(stage)
+
+    def child_env(self, env=None):
+        """Variables de entorno para que un subproceso respete el mismo plazo"""
+        env = dict(os.environ if env is None else env)
+        env[DEADLINE_ENV] = repr(self.expires_at)
+        return env
+
+    @contextmanager
+    def activate(self):
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+
+def parse_budget(value):
+    """Presupuesto en segundos a partir de la cabecera (ms); ValueError si no es válido"""
+    if value is None or not str(value).strip():
+        return DEFAULT_BUDGET_MS / 1000
+    try:
+        budget_ms = int(str(value).strip())
+    except ValueError:
+        raise ValueError(f"Cabecera '{BUDGET_HEADER}' inválida: {value}")
+    if budget_ms <= 0:
+        raise ValueError(f"Cabecera '{BUDGET_HEADER}' debe ser positiva")
+    return min(budget_ms, MAX_BUDGET_MS) / 1000
+
+
+def current():
+    """Plazo activo: el de la petición en curso o el heredado del proceso padre (None si no hay)"""
+    deadline = _current.get()
+    return deadline if deadline is not None else _inherited
+
+
+def stage_timeout(stage):
+    deadline = current()
+    return deadline.stage_timeout(stage) if deadline is not None else STAGE_TIMEOUTS.get(stage)
+
+
+def check(stage):
+    deadline = current()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def expired():
+    deadline = current()
+    return deadline is not None and deadline.expired()
+
+
+# Pipeline en subproceso: plazo de la petición de la API
+_inherited = Deadline.from_env()
@@ -0,0 +1,277 @@
+# src/services/fallback.py - Respuestas degradadas cuando se agota el presupuesto de latencia
+"""
+Niveles de respaldo, del más al menos personalizado (el primero que responde gana):
+
+  1. 'cache': última respuesta correcta de este proceso para el usuario y los
+     filtros, o la precalculada (PRECOMPUTED_PATH, precompute_recommendations.py;
+     solo sin filtros, que es como se precalcula). El JSONL se indexa en el
+     calentamiento y en cada comprobación del refresco (load_precomputed), nunca
+     en una petición; la salida SQLite se consulta por clave.
+  2. 'neighbors': grafo de vecinos de los artefactos (compile_artifacts.py) sobre
+     la lista parcial que se llegó a descargar: cada anime puntuado vota por sus
+     vecinos con similitud × peso.
+  3. 'popularity': ranking de popularidad precalculado bajo la máscara de filtros.
+
+Los niveles 2 y 3 usan el motor si ya está en memoria o, si no, abren los
+artefactos activos tal cual en solo lectura: nunca comprueban la huella del
+catálogo, ni compilan, ni construyen el motor, porque el plazo ya se agotó. Las respuestas llevan
+'degraded': true, el nivel usado en 'fallback' y la etapa que agotó el plazo.
+"""
+import os
+import sys
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+from datetime import datetime
+
+import numpy as np
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from monitoring.metrics import DEGRADED_RESPONSES, cache_result
+from monitoring.tracing import debug_log, set_attributes
+
+PRECOMPUTED_PATH = (os.environ.get('PRECOMPUTED_PATH')
+                    or os.path.join(ROOT_DIR, 'data', 'precomputed', 'recommendations.jsonl'))
+# Respuestas correctas recientes guardadas por proceso
+RECENT_CACHE_SIZE = int(os.environ.get('FALLBACK_CACHE_SIZE', '1024'))
+
+TIERS = ('cache', 'neighbors', 'popularity')
+
+_recent = OrderedDict()
+_recent_lock = threading.Lock()
+# JSONL precalculado indexado por usuario: (ruta, mtime, {usuario: registro}); lo construye load_precomputed
+_precomputed_index = (None, None, {})
+_precomputed_lock = threading.Lock()
+# Grafo de vecinos por directorio de artefactos
+_graphs = {}
+# Artefactos activos abiertos en solo lectura: ((raíz, versión), motor)
+_read_only = (None, None)
+_read_only_lock = threading.Lock()
+
+
+def _key(username, filters):
+    return username.strip().lower(), json.dumps(filters or {}, sort_keys=True)
+
+
+def remember(username, filters, response):
+    """Guarda una respuesta correcta (no degradada) como primer nivel de respaldo"""
+    if response.get('status') != 'success' or response.get('degraded'):
+        return
+    entry = {key: response.get(key) for key in ('model_version', 'timestamp', 'statistics', 'recommendations')}
+    with _recent_lock:
+        _recent[_key(username, filters)] = entry
+        _recent.move_to_end(_key(username, filters))
+        while len(_recent) > RECENT_CACHE_SIZE:
+            _recent.popitem(last=False)
+
+
+def clear():
+    global _precomputed_index, _read_only
+    with _recent_lock:
+        _recent.clear()
+    _precomputed_index = (None, None, {})
+    _graphs.clear()
+    _read_only = (None, None)
+
+
+# ========== NIVEL 1: CACHÉ ==========
+
+def _is_sqlite(path):
+    return path.endswith(('.db', '.sqlite', '.sqlite3'))
+
+
+def load_precomputed(path=None):
+    """
+    Indexa por usuario el JSONL precalculado si cambió desde la última carga; lo
+    llaman el calentamiento y el refresco, fuera del camino de las peticiones.
+    Devuelve el número de usuarios indexados (None para SQLite, que no se indexa).
+    """
+    global _precomputed_index
+    path = path or PRECOMPUTED_PATH
+    if _is_sqlite(path):
+        return None
+    with _precomputed_lock:
+        if not os.path.exists(path):
+            _precomputed_index = (None, None, {})
+            return 0
+        mtime = os.path.getmtime(path)
+        cached_path, cached_mtime, index = _precomputed_index
+        if (cached_path, cached_mtime) != (path, mtime):
+            index = {}
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if record.get('status') == 'success':
+                        index[record['username'].lower()] = record
+            _precomputed_index = (path, mtime, index)
+            debug_log(f"📦 Recomendaciones precalculadas indexadas: {len(index)} usuarios")
+        return len(index)
+
+
+def _precomputed(username):
+    path = PRECOMPUTED_PATH
+    username = username.strip().lower()
+    if _is_sqlite(path):
+        if not os.path.exists(path):
+            return None
+        with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as conn:
+            row = conn.execute("SELECT payload FROM recommendations WHERE username = ? AND status = 'success'",
+                               (username,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # Solo el índice ya construido: si aún no se cargó, no hay entrada precalculada
+    cached_path, _, index = _precomputed_index
+    return index.get(username) if cached_path == path else None
+
+
+def cached_recommendations(username, filters=None, top_n=10, exclude_mal_ids=()):
+    """Recomendaciones guardadas para el usuario (sin las excluidas ahora); None si no hay"""
+    with _recent_lock:
+        entry = _recent.get(_key(username, filters))
+    source = 'recent'
+    if entry is None and not filters:
+        entry, source = _precomputed(username), 'precomputed'
+    cache_result('fallback', 'hit' if entry else 'miss')
+    if not entry:
+        return None
+    excluded = set(int(mal_id) for mal_id in exclude_mal_ids or ())
+    recommendations = [r for r in entry.get('recommendations') or [] if r.get('MAL_ID') not in excluded][:top_n]
+    if not recommendations:
+        return None
+    response = {'model_version': entry.get('model_version'), 'cached_at': entry.get('timestamp')
+                or entry.get('generated_at'), 'cache_source': source, 'recommendations': recommendations}
+    if entry.get('statistics'):
+        response['statistics'] = entry['statistics']
+    return response
+
+
+# ========== NIVELES 2 Y 3: ARTEFACTOS ==========
+
+def read_only_engine():
+    """Motor sobre los artefactos activos, mapeados tal cual (sin huella ni recompilación); None si no hay"""
+    global _read_only
+    from model.artifacts import ARTIFACTS_DIR, current_version, load_engine
+
+    version = current_version(ARTIFACTS_DIR)
+    if version is None:
+        return None
+    with _read_only_lock:
+        if _read_only[0] != (ARTIFACTS_DIR, version):
+            _read_only = ((ARTIFACTS_DIR, version), load_engine(ARTIFACTS_DIR, version))
+        return _read_only[1]
+
+
+@contextmanager
+def available_engine():
+    """El motor ya cargado en el proceso (reservado) o, si no, read_only_engine(); None si no hay ninguno"""
+    from services.recommendation_engine import engine_loaded, engine_lease
+
+    if engine_loaded():
+        with engine_lease() as engine:
+            yield engine
+    else:
+        yield read_only_engine()
+
+
+def neighbor_graph(engine):
+    """(vecinos, similitudes) de los artefactos del motor; None si esa versión no los incluye"""
+    directory = getattr(engine, 'artifacts_dir', None)
+    if directory is None:
+        return None
+    if directory not in _graphs:
+        paths = [os.path.join(directory, f"{name}.npy") for name in ('neighbors', 'neighbor_similarities')]
+        _graphs[directory] = (tuple(np.load(path, mmap_mode='r') for path in paths)
+                              if all(os.path.exists(path) for path in paths) else None)
+    return _graphs[directory]
+
+
+def neighbor_rows(engine, graph, rows, weights, mask, top_n=10):
+    """
+    Top-N por votos del grafo de vecinos: score(j) = Σ peso(i)·sim(i, j) / Σ peso(i)
+    sobre los animes puntuados i. (filas vacías si nadie vota por un candidato elegible)
+    """
+    neighbors, similarities = graph
+    rated = weights > 0
+    if not rated.any():
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    sources, source_weights = rows[rated], weights[rated]
+    votes = np.asarray(similarities[sources], dtype=np.float64) * source_weights[:, None]
+    scores = np.bincount(np.asarray(neighbors[sources]).ravel(), weights=votes.ravel(),
+                         minlength=engine.n_rows) / source_weights.sum()
+
+    allowed = np.array(mask, dtype=bool)
+    allowed[rows] = False
+    candidates = np.flatnonzero(allowed & (scores > 0))
+    top = candidates[np.argsort(-scores[candidates], kind='stable')[:top_n]]
+    return top.astype(np.int64), scores[top]
+
+
+def _engine_recommendations(username, filters, top_n, entries, exclude_mal_ids):
+    from services import serving
+
+    with available_engine() as engine:
+        if engine is None:
+            return None
+        mask = engine.base_mask(filters, exclude_mal_ids)
+        _, rows, weights = engine.user_matrix([entries or []])
+        response = {'model_version': engine.version}
+
+        graph = neighbor_graph(engine) if rows.size else None
+        if graph is not None:
+            top_rows, top_scores = neighbor_rows(engine, graph, rows, weights, mask, top_n)
+            if top_rows.size:
+                response.update(tier='neighbors', recommendations=engine.to_records(top_rows, top_scores),
+                                statistics=serving.user_statistics(engine, entries, rows, weights))
+                return response
+
+        if engine.popularity is None:
+            return None
+        top_rows, top_scores = engine.popular_rows(mask, rows, top_n)
+        if not top_rows.size:
+            return None
+        response.update(tier='popularity', recommendations=engine.to_records(top_rows, top_scores))
+        return response
+
+
+def fallback_recommendations(username, filters=None, top_n=10, entries=None, stage=None, exclude_mal_ids=None):
+    """
+    Respuesta degradada con el formato de serving.recommend_for_user, desde el
+    primer nivel disponible. `entries`: lista parcial descargada antes de agotar
+    el plazo. None si ningún nivel tiene recomendaciones.
+    """
+    if exclude_mal_ids is None:
+        from services.serving import load_blacklist_ids
+        exclude_mal_ids = load_blacklist_ids(username)
+
+    response = cached_recommendations(username, filters, top_n, exclude_mal_ids)
+    if response is not None:
+        response['tier'] = 'cache'
+    else:
+        response = _engine_recommendations(username, filters, top_n, entries, exclude_mal_ids)
+    if response is None:
+        debug_log(f"⚠️ Sin respaldo disponible para {username} (etapa: {stage})")
+        return None
+
+    tier = response.pop('tier')
+    DEGRADED_RESPONSES.inc(fallback=tier, stage=stage or 'unknown')
+    set_attributes(degraded=tier, deadline_stage=stage, partial_entries=len(entries or []))
+    debug_log(f"🛟 Respuesta degradada para {username}: nivel '{tier}' (etapa agotada: {stage})")
+    response.update({
+        'status': 'success',
+        'degraded': True,
+        'fallback': tier,
+        'deadline_stage': stage,
+        'partial_entries': len(entries) if entries is not None else None,
+        'count': len(response['recommendations']),
+        'timestamp': datetime.now().isoformat(),
+    })
+    return response
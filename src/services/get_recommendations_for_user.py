@@ -12,13 +12,16 @@ ROOT_DIR = os.path.dirname(SRC_DIR)
 sys.path.insert(0, SRC_DIR)
 sys.path.insert(0, ROOT_DIR)
 
-def debug_log(message):
-    """Función de logging para debug - FORZAR FLUSH"""
-    print(f"🔍 [DEBUG] {message}", file=sys.stderr, flush=True)
+from monitoring.tracing import debug_log, span, set_attributes, collect_spans, export_spans
+# REQUEST_DEADLINE: plazo de la petición de la API (services/deadline.py)
+from services.deadline import DeadlineExceeded, check as check_deadline
 
-def get_recommendations_service(username):
+def get_recommendations_service(username, filters=None, top_n=10):
     """
     Orquesta el proceso completo OPTIMIZADO
+
+    `filters`: dict opcional de filtros de catálogo (ver model/filters.py)
+    `top_n`: recomendaciones a devolver (la API pide offset + limit para paginar)
     """
     try:
         debug_log(f"Iniciando servicio para usuario: {username}")
@@ -30,7 +33,8 @@ def get_recommendations_service(username):
         try:
             from data.download_mal_list import download_user_list
             from data.prepare_data import run_full_preparation_flow
-            from model.train_model import load_data, preprocess_data, get_recommendations, get_anime_statistics
+            from model.train_model import (load_dataset_context, preprocess_data, load_or_build_latent_model,
+                                           load_sharded_model, get_recommendations, get_anime_statistics, RECOMMENDER_ENGINE)
             debug_log("✅ Módulos importados correctamente")
         except ImportError as e:
             debug_log(f"❌ Error importando módulos: {e}")
@@ -51,6 +55,7 @@ def get_recommendations_service(username):
             if file_age < 3600:  # 1 hora
                 debug_log(f"⚡ Reutilizando datos del usuario (edad: {int(file_age)}s)")
                 skip_download = True
+        set_attributes(user_list='reused' if skip_download else 'download')
 
         # Descargar lista del usuario solo si es necesario
         if not skip_download:
@@ -63,9 +68,11 @@ def get_recommendations_service(username):
                 })
 
         # 🔥 OPTIMIZACIÓN 3: Preparar dataset (rápido si ya existe merged_anime.csv)
+        check_deadline('prepare_data')
         debug_log("Preparando dataset...")
         try:
-            run_full_preparation_flow(username)
+            with span("prepare_data"):
+                run_full_preparation_flow(username)
             debug_log("✅ Dataset preparado")
         except Exception as e:
             debug_log(f"❌ Error preparando datos: {e}")
@@ -75,49 +82,48 @@ def get_recommendations_service(username):
                 'timestamp': datetime.now().isoformat()
             })
 
-        # 🔥 OPTIMIZACIÓN 4: Cargar y procesar (con caché de similitud si es posible)
+        # 🔥 OPTIMIZACIÓN 4: Cargar y procesar (con caché de modelo y de perfiles)
+        check_deadline('model')
         debug_log("Generando recomendaciones...")
         try:
-            df = load_data()
+            # Un único contexto de dataset para entrenamiento, ranking y estadísticas
+            context = load_dataset_context()
+            df = context.features()
             debug_log(f"✅ Dataset cargado: {len(df)} filas")
             
-            # Verificar si existe matriz de similitud cacheada
-            sim_cache_path = os.path.join(ROOT_DIR, 'similarity_matrix.npz')
-            
-            if os.path.exists(sim_cache_path):
-                # Verificar edad del caché (regenerar si tiene más de 24 horas)
-                cache_age = datetime.now().timestamp() - os.path.getmtime(sim_cache_path)
-                if cache_age < 86400:  # 24 horas
-                    debug_log(f"⚡ Reutilizando matriz de similitud cacheada (edad: {int(cache_age/3600)}h)")
-                    import numpy as np
-                    from scipy import sparse
-                    sim = sparse.load_npz(sim_cache_path).toarray()
+            with span("model", engine=RECOMMENDER_ENGINE, rows=len(df)):
+                if RECOMMENDER_ENGINE == 'sparse':
+                    # El índice invertido no usa la matriz N×N: se construye directamente
+                    debug_log("🔧 Construyendo índice invertido (motor disperso)...")
+                    sim = preprocess_data(df, engine='sparse')
+                elif RECOMMENDER_ENGINE == 'sharded':
+                    # Mismos embeddings, ranking repartido por bloques de filas entre procesos
+                    sim = load_sharded_model(df)
                 else:
-                    debug_log("🔄 Caché antiguo, regenerando matriz...")
-                    sim = preprocess_data(df)
-                    if sim is not None:
-                        sparse.save_npz(sim_cache_path, sparse.csr_matrix(sim))
-            else:
-                debug_log("🔧 Entrenando modelo (primera vez)...")
-                sim = preprocess_data(df)
-                if sim is not None:
-                    # Guardar matriz de similitud para futuros usos
-                    import numpy as np
-                    from scipy import sparse
-                    sparse.save_npz(sim_cache_path, sparse.csr_matrix(sim))
-                    debug_log("✅ Matriz de similitud guardada en caché")
+                    # Embeddings latentes cacheados por versión de catálogo (sin matriz N×N);
+                    # el perfil del usuario se actualiza de forma incremental en get_recommendations
+                    sim = load_or_build_latent_model(df)
             
             if sim is None:
                 raise Exception("No se pudo entrenar el modelo.")
 
-            recs = get_recommendations(df, sim)
+            with span("recommend", filters=sorted(filters or {})) as recommend_span:
+                recs = get_recommendations(df, sim, top_n=top_n, filters=filters, username=username,
+                                           context=context)
+                recommend_span.set('recommendations', len(recs))
             debug_log(f"✅ Recomendaciones generadas: {len(recs)} animes")
             
             if recs.empty:
                 raise Exception("No se generaron recomendaciones.")
             
-            stats = get_anime_statistics(df)
-            recommendations_json = json.loads(recs.to_json(orient='records'))
+            with span("statistics"):
+                stats = get_anime_statistics(df, context=context)
+            with span("serialization"):
+                # Solo los campos de la respuesta, directamente de las filas top-N (sin to_json/json.loads)
+                from model.engine import frame_records
+                recommendations_json = frame_records(recs, recs['hybrid_score'].values)
+
+            from monitoring.metrics import export_events
 
             output_data = {
                 'status': 'success',
@@ -125,10 +131,12 @@ def get_recommendations_service(username):
                 'count': len(recommendations_json),
                 'statistics': stats,
                 'recommendations': recommendations_json,
+                # Etapas y cachés medidas en este subproceso (la API las suma a /api/metrics)
+                'metrics': export_events(),
             }
             
             debug_log("✅ Proceso completado exitosamente")
-            return json.dumps(output_data, ensure_ascii=False)
+            return json.dumps(output_data, ensure_ascii=False, separators=(',', ':'))
             
         except Exception as e:
             debug_log(f"❌ Error en motor de recomendación: {e}")
@@ -138,6 +146,16 @@ def get_recommendations_service(username):
                 'timestamp': datetime.now().isoformat()
             })
 
+    except DeadlineExceeded as e:
+        # La API responde con un respaldo (con la lista parcial, si se llegó a descargar)
+        debug_log(f"⏱️ {e}")
+        return json.dumps({
+            'status': 'error',
+            'message': str(e),
+            'deadline_exceeded': e.stage,
+            'partial_entries': e.partial,
+            'timestamp': datetime.now().isoformat()
+        })
     except Exception as e:
         debug_log(f"❌ Error general: {e}")
         debug_log(traceback.format_exc())
@@ -152,8 +170,9 @@ def check_preloaded_data():
     ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     MERGED_ANIME_PATH = os.path.join(ROOT_DIR, "data", "merged_anime.csv")
     
-    # Verificar si el archivo existe y tiene tamaño suficiente
-    if not os.path.exists(MERGED_ANIME_PATH) or os.path.getsize(MERGED_ANIME_PATH) < 10000:
+    from data.storage import build_once, is_complete, CATALOG_LOCK
+
+    def download():
         debug_log("🔥 Dataset base no encontrado. Descargando...")
         try:
             from data.fetch_datasets import main as fetch_main
@@ -162,13 +181,22 @@ def check_preloaded_data():
         except Exception as e:
             debug_log(f"❌ Error descargando dataset: {e}")
             raise e
-    else:
+
+    # Verificar si el archivo existe y tiene tamaño suficiente (solo un proceso lo descarga)
+    if not build_once(MERGED_ANIME_PATH, download, CATALOG_LOCK, is_ready=lambda path: is_complete(path, 10000)):
         debug_log("✅ Dataset base ya está precargado")
 
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         username = sys.argv[1]
+        # Filtros opcionales como JSON en el segundo argumento (ver model/filters.py)
+        filters = json.loads(sys.argv[2]) if len(sys.argv) > 2 else None
+        top_n = int(sys.argv[3]) if len(sys.argv) > 3 else 10
         debug_log(f"Ejecutando para usuario: {username}")
+        from monitoring.metrics import collect_events
+        collect_events()
+        # Continúa la traza de la petición de la API (TRACE_REQUEST_ID)
+        collect_spans()
         
         try:
             # Forzar stdout a UTF-8 y sin buffering
@@ -176,7 +204,17 @@ if __name__ == "__main__":
                 import codecs
                 sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer)
             
-            result = get_recommendations_service(username)
+            from monitoring.profiling import profile
+            # PROFILE_ID: la API pidió perfilar esta petición (CPU + asignaciones)
+            with span("recommendation_pipeline", username=username, pid=os.getpid()), \
+                    profile(os.environ.get('PROFILE_ID'), 'pipeline'):
+                result = get_recommendations_service(username, filters, top_n)
+            spans = export_spans()
+            if result and spans:
+                # Spans de este subproceso: la API los añade a la traza de la petición
+                output = json.loads(result)
+                output['trace'] = spans
+                result = json.dumps(output, ensure_ascii=False)
             if result:
                 print(result, flush=True)
             else:
@@ -0,0 +1,222 @@
+# src/services/model_refresher.py - Refresco en segundo plano del catálogo/modelo con cambio azul/verde
+"""
+Hilo de fondo dentro del proceso de la API que mantiene el motor al día sin
+parar el servicio:
+
+  1. (opcional, CATALOG_REFRESH=1) vuelve a descargar el catálogo de AniList
+  2. si el catálogo cambió, compila y valida una versión nueva de artefactos en
+     un subproceso (services/compile_artifacts.py), fuera del camino de las
+     peticiones y sin competir por el GIL
+  3. carga la versión nueva, la calienta con una recomendación sintética y
+     sustituye la referencia del motor de forma atómica
+  4. las peticiones en curso terminan con la versión con la que empezaron; la
+     antigua se libera cuando terminan y se borran las versiones viejas del disco
+
+Con varios workers, solo uno compila a la vez (cerrojo de fichero); el resto
+ve la versión nueva en CURRENT y solo la carga.
+"""
+import os
+import sys
+import time
+import fcntl
+import shutil
+import threading
+import subprocess
+import traceback
+from datetime import datetime
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from model.artifacts import ARTIFACTS_DIR, current_version, read_manifest
+from monitoring.tracing import debug_log
+
+# Segundos entre comprobaciones (0 desactiva el refresco automático)
+MODEL_REFRESH_INTERVAL = int(os.environ.get('MODEL_REFRESH_INTERVAL', '0'))
+# Volver a descargar el catálogo en cada comprobación
+CATALOG_REFRESH = os.environ.get('CATALOG_REFRESH', '0') == '1'
+# Espera máxima a que terminen las peticiones sobre la versión sustituida
+DRAIN_TIMEOUT = 120
+# Versiones de artefactos que se conservan en disco (la activa incluida)
+KEEP_VERSIONS = 2
+COMPILE_LOCK_FILE = ".compile.lock"
+COMPILE_TIMEOUT = 1800
+
+
+def compile_in_subprocess(root):
+    """Compila y valida una versión nueva (la activa solo si pasa la validación)"""
+    result = subprocess.run([sys.executable, os.path.join(SRC_DIR, 'services', 'compile_artifacts.py'),
+                             '--output', root], capture_output=True, text=True, timeout=COMPILE_TIMEOUT, cwd=ROOT_DIR)
+    if result.returncode != 0:
+        raise RuntimeError(f"Compilación fallida: {(result.stdout + result.stderr).strip()[-500:]}")
+
+
+def fetch_catalog():
+    from services.preload_dataset import preload_static_data
+    if not preload_static_data():
+        raise RuntimeError("No se pudo descargar el catálogo")
+
+
+def prune_versions(root, keep=KEEP_VERSIONS):
+    """Borra las versiones más antiguas de artefactos (nunca la activa ni las temporales)"""
+    active = current_version(root)
+    versions = [name for name in os.listdir(root)
+                if not name.startswith('.') and os.path.isdir(os.path.join(root, name))]
+    versions.sort(key=lambda name: os.path.getmtime(os.path.join(root, name)), reverse=True)
+    removed = []
+    for name in versions[keep:]:
+        if name != active:
+            # Los workers que aún la tengan mapeada siguen leyendo sus páginas tras el borrado
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+            removed.append(name)
+    return removed
+
+
+class ModelRefresher:
+    """
+    Refresco periódico del motor (ver docstring del módulo). `refresh()` se puede
+    llamar también a mano; cada llamada devuelve un dict con el resultado.
+    """
+
+    def __init__(self, interval=MODEL_REFRESH_INTERVAL, root=ARTIFACTS_DIR, compiler=compile_in_subprocess,
+                 catalog_fetcher=fetch_catalog, refresh_catalog=CATALOG_REFRESH, drain_timeout=DRAIN_TIMEOUT):
+        self.interval = interval
+        self.root = root
+        self._compiler = compiler
+        self._catalog_fetcher = catalog_fetcher
+        self.refresh_catalog = refresh_catalog
+        self.drain_timeout = drain_timeout
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._thread = None
+        self._stop = threading.Event()
+        self._refresh_lock = threading.Lock()
+        self._fingerprint_cache = None
+        self.last_result = None
+        self.swaps = 0
+
+    def ensure_started(self):
+        """Arranca el hilo de refresco en este proceso (no hace nada si el intervalo es 0)"""
+        if self._pid != os.getpid():
+            self._reset()
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name='model-refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def _catalog_fingerprint(self):
+        """Huella del catálogo, recalculada solo si cambió el tamaño o la fecha del fichero"""
+        from services.recommendation_engine import MERGED_ANIME_PATH, catalog_fingerprint
+
+        if not os.path.exists(MERGED_ANIME_PATH):
+            return None
+        stat = os.stat(MERGED_ANIME_PATH)
+        key = (stat.st_size, stat.st_mtime_ns)
+        if self._fingerprint_cache is None or self._fingerprint_cache[0] != key:
+            self._fingerprint_cache = (key, catalog_fingerprint())
+        return self._fingerprint_cache[1]
+
+    def _compile_if_stale(self, force):
+        """Compila una versión nueva si el catálogo cambió; False si otro proceso ya está compilando"""
+        source = self._catalog_fingerprint()
+        manifest = read_manifest(self.root)
+        stale = manifest is None or (source is not None and manifest.get('source_fingerprint') != source)
+        if not (stale or force):
+            return True
+
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, COMPILE_LOCK_FILE), 'w') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            try:
+                # Otro worker pudo terminar la compilación mientras esperábamos turno
+                manifest = read_manifest(self.root)
+                if force or manifest is None or (source is not None and manifest.get('source_fingerprint') != source):
+                    debug_log("🔧 Compilando versión nueva de artefactos en segundo plano...")
+                    self._compiler(self.root)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        return True
+
+    def refresh(self, force=False):
+        """Comprueba si hay versión nueva y, si la hay, la carga y la publica sin cortar el servicio"""
+        import services.recommendation_engine as recommendation_engine
+        from services.warmup import synthetic_entries
+
+        with self._refresh_lock:
+            t0 = time.perf_counter()
+            result = {'timestamp': datetime.now().isoformat()}
+            try:
+                # El JSONL precalculado del respaldo se reindexa aquí si cambió, no en las peticiones
+                from services.fallback import load_precomputed
+                load_precomputed()
+                if self.refresh_catalog:
+                    self._catalog_fetcher()
+                if not self._compile_if_stale(force):
+                    result['status'] = 'busy'
+                    return self._finish(result)
+
+                current = recommendation_engine._engine
+                candidate = current_version(self.root)
+                if candidate is None or (current is not None and current.version == candidate):
+                    result.update(status='unchanged', version=candidate)
+                    return self._finish(result)
+
+                # Carga y calentamiento de la versión nueva (fallos de página fuera de las peticiones)
+                engine = recommendation_engine.open_engine(self.root, candidate)
+                engine.recommend(synthetic_entries(engine), top_n=10)
+                t_ready = time.perf_counter()
+
+                previous = recommendation_engine.swap_engine(engine, {
+                    'built_from_catalog': False,
+                    'load_ms': round((t_ready - t0) * 1000, 2),
+                    'refreshed_at': datetime.now().isoformat(),
+                    'previous_version': current.version if current is not None else None,
+                })
+                self.swaps += 1
+                debug_log(f"🔄 Motor sustituido: {current.version if current is not None else '-'} -> {candidate}")
+
+                drained = True
+                if previous is not None:
+                    drained = recommendation_engine.wait_for_drain(previous, self.drain_timeout)
+                    recommendation_engine.release_engine(previous)
+                result.update(status='swapped', version=candidate,
+                              previous_version=previous.version if previous is not None else None,
+                              drained=drained, pruned=prune_versions(self.root),
+                              duration_ms=round((time.perf_counter() - t0) * 1000, 2))
+            except Exception as e:
+                # La versión en servicio sigue intacta; se reintenta en la siguiente comprobación
+                debug_log(f"❌ Error refrescando el modelo: {e}")
+                debug_log(traceback.format_exc())
+                result.update(status='failed', error=str(e))
+            return self._finish(result)
+
+    def _finish(self, result):
+        self.last_result = result
+        return result
+
+    def status(self):
+        return {
+            'enabled': self.interval > 0,
+            'interval_s': self.interval,
+            'refresh_catalog': self.refresh_catalog,
+            'running': self._thread is not None and self._pid == os.getpid(),
+            'swaps': self.swaps,
+            'last_result': self.last_result,
+        }
+
+
+refresher = ModelRefresher()
@@ -0,0 +1,177 @@
+# src/services/pagination.py - Paginación por cursor sobre un ranking de candidatos cacheado
+"""
+`GET /api/recommendations/<username>?limit=20&cursor=...` pagina sobre una lista
+ordenada de RANKED_CANDIDATES candidatos por usuario. La lista se calcula una
+sola vez con selección parcial (model/ranking.py) y se guarda en memoria por
+usuario, versión del modelo, filtros y exclusiones. Las páginas siguientes son
+cortes O(tamaño de página), sin volver a descargar la lista de MAL ni a puntuar
+el catálogo.
+
+El cursor es opaco (base64 de {offset, versión, huella de usuario y filtros})
+y va firmado con HMAC (CURSOR_SECRET), así que el cliente no puede fabricar
+offsets. Un cursor alterado, de otra versión del modelo, de otro usuario o de
+otros filtros se rechaza con CursorError (400). Así el cliente vuelve a la
+primera página en vez de mezclar rankings distintos. Las páginas nunca pasan de
+RANKED_CANDIDATES: offset + limit se recorta a ese tope y un offset más allá es un 400.
+"""
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+# Candidatos ordenados que se calculan y cachean por usuario (páginas disponibles × limit)
+RANKED_CANDIDATES = int(os.environ.get('RANKED_CANDIDATES', '500'))
+RANKED_CACHE_SIZE = int(os.environ.get('RANKED_CACHE_SIZE', '2048'))
+# La lista de MAL del usuario puede cambiar: el ranking cacheado caduca
+RANKED_CACHE_TTL = float(os.environ.get('RANKED_CACHE_TTL', '600'))
+# Clave de firma de los cursores. Sin CURSOR_SECRET se genera al importar: con
+# preload_app la comparten los workers, pero no otras instancias ni reinicios
+CURSOR_SECRET = (os.environ.get('CURSOR_SECRET') or '').encode('utf-8') or os.urandom(32)
+SIGNATURE_BYTES = 12
+
+
+class CursorError(ValueError):
+    """Cursor ilegible o de otro ranking (versión del modelo, usuario o filtros distintos)"""
+
+
+def parse_limit(value):
+    if value is None or str(value).strip() == '':
+        return DEFAULT_LIMIT
+    try:
+        limit = int(str(value).strip())
+    except ValueError:
+        raise ValueError(f"Parámetro 'limit' inválido: {value}")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"Parámetro 'limit' debe estar entre 1 y {MAX_LIMIT}")
+    return limit
+
+
+def fingerprint(username, filters=None):
+    """Huella corta de usuario + filtros (el cursor solo vale para ese ranking)"""
+    raw = json.dumps([username.strip().lower(), filters or {}], sort_keys=True)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:12]
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _signature(payload):
+    return hmac.new(CURSOR_SECRET, payload, hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+
+def encode_cursor(offset, version, key):
+    payload = json.dumps({'o': int(offset), 'v': version, 'f': key}, separators=(',', ':')).encode('utf-8')
+    return f"{_b64encode(payload)}.{_b64encode(_signature(payload))}"
+
+
+def decode_cursor(cursor):
+    """{'offset', 'version', 'fingerprint'} de un cursor firmado; None sin cursor"""
+    if cursor is None or not str(cursor).strip():
+        return None
+    try:
+        payload, signature = str(cursor).strip().split('.')
+        payload, signature = _b64decode(payload), _b64decode(signature)
+    except ValueError:
+        raise CursorError("Cursor inválido")
+    if not hmac.compare_digest(signature, _signature(payload)):
+        raise CursorError("Cursor inválido")
+    try:
+        data = json.loads(payload)
+        offset = int(data['o'])
+    except (ValueError, TypeError, KeyError):
+        raise CursorError("Cursor inválido")
+    if not 0 <= offset < RANKED_CANDIDATES:
+        raise CursorError("Cursor inválido")
+    return {'offset': offset, 'version': data.get('v'), 'fingerprint': data.get('f')}
+
+
+def check_cursor(cursor, version, key):
+    """Offset de `cursor` para el ranking (`version`, `key`); 0 sin cursor"""
+    if cursor is None:
+        return 0
+    if cursor['fingerprint'] != key:
+        raise CursorError("El cursor corresponde a otro usuario o a otros filtros")
+    if cursor['version'] is not None and version is not None and cursor['version'] != version:
+        raise CursorError("El cursor caducó: el modelo se actualizó; vuelve a pedir la primera página")
+    return cursor['offset']
+
+
+def page_limit(offset, limit):
+    """`limit` recortado para que la página no pase de RANKED_CANDIDATES; CursorError si offset ya está fuera"""
+    if offset >= RANKED_CANDIDATES:
+        raise CursorError(f"No hay páginas más allá de los {RANKED_CANDIDATES} primeros candidatos")
+    return min(limit, RANKED_CANDIDATES - offset)
+
+
+def page(items, offset, limit, version, key, has_more=False):
+    """
+    Corte [offset, offset+limit) y cursor de la página siguiente (None al final
+    o al llegar a RANKED_CANDIDATES). `has_more`: hay candidatos más allá de `items`.
+    """
+    sliced = items[offset:offset + limit]
+    end = offset + len(sliced)
+    more = (end < len(items) or (has_more and len(sliced) == limit)) and end < RANKED_CANDIDATES
+    return sliced, encode_cursor(end, version, key) if more else None
+
+
+class RankedList:
+    """Ranking de candidatos de un usuario (filas y scores) y sus estadísticas"""
+
+    def __init__(self, rows, scores, statistics=None, complete=False):
+        self.rows = rows
+        self.scores = scores
+        self.statistics = statistics
+        # True si no hay más candidatos elegibles que los de la lista
+        self.complete = complete
+        self.created = time.monotonic()
+
+
+class RankedCache:
+    """LRU de RankedList con caducidad, compartido por las peticiones del proceso"""
+
+    def __init__(self, max_size=RANKED_CACHE_SIZE, ttl=RANKED_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            ranked = self._items.get(key)
+            if ranked is None:
+                return None
+            if time.monotonic() - ranked.created > self.ttl:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return ranked
+
+    def put(self, key, ranked):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items[key] = ranked
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+ranked_cache = RankedCache()
@@ -0,0 +1,326 @@
+# src/services/precompute_recommendations.py - Precálculo offline de recomendaciones para muchos usuarios
+"""
+Uso:
+    python src/services/precompute_recommendations.py usuarios.txt
+    python src/services/precompute_recommendations.py usuarios.txt -o data/precomputed/recs.db --resume
+
+Lee un fichero de usuarios de MAL (uno por línea, '#' para comentarios), descarga
+sus listas en paralelo con concurrencia acotada, las puntúa en un pool de procesos
+que comparten los embeddings mapeados en memoria (np.load(mmap_mode='r')) y va
+escribiendo cada resultado en cuanto está listo, en JSONL o en un almacén
+clave-valor SQLite (según la extensión de la salida: .db/.sqlite).
+
+Con --resume se saltan los usuarios que ya tienen un resultado correcto en la
+salida, así que una ejecución interrumpida continúa donde se quedó.
+"""
+import os
+import sys
+import json
+import sqlite3
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+DEFAULT_OUTPUT = os.path.join(ROOT_DIR, 'data', 'precomputed', 'recommendations.jsonl')
+
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 1)))
+DEFAULT_DOWNLOADS = 4
+DEFAULT_BATCH_SIZE = 64
+
+
+def read_usernames(path):
+    """Usuarios del fichero, sin vacíos, comentarios ni duplicados (conserva el orden)"""
+    seen = set()
+    usernames = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            username = line.split('#', 1)[0].strip()
+            if username and username.lower() not in seen:
+                seen.add(username.lower())
+                usernames.append(username)
+    return usernames
+
+
+# ========== SALIDAS ==========
+
+class JsonlSink:
+    """Un resultado por línea; se hace flush tras cada escritura."""
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if resume:
+            self._truncate_partial_line()
+        self._file = open(path, 'a' if resume else 'w', encoding='utf-8')
+
+    def _truncate_partial_line(self):
+        # Una interrupción a mitad de escritura deja la última línea incompleta
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+
+    def completed(self):
+        """Usuarios con un resultado correcto ya escrito"""
+        done = set()
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get('status') == 'success':
+                    done.add(record['username'].lower())
+        return done
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class SqliteSink:
+    """Almacén clave-valor: tabla recommendations(username -> JSON)."""
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS recommendations ("
+            "username TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, updated_at TEXT NOT NULL)"
+        )
+        if not resume:
+            self._conn.execute("DELETE FROM recommendations")
+        self._conn.commit()
+
+    def completed(self):
+        rows = self._conn.execute("SELECT username FROM recommendations WHERE status = 'success'")
+        return {username for (username,) in rows}
+
+    def write(self, record):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO recommendations (username, status, payload, updated_at) VALUES (?, ?, ?, ?)",
+            (record['username'].lower(), record['status'], json.dumps(record, ensure_ascii=False),
+             record['generated_at']),
+        )
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+def open_sink(path, resume=False):
+    if path.endswith(('.db', '.sqlite', '.sqlite3')):
+        return SqliteSink(path, resume)
+    return JsonlSink(path, resume)
+
+
+# ========== WORKERS ==========
+
+_worker_engine = None
+_worker_mask = None
+
+
+def _init_worker(embeddings_path, mal_ids, mask, popularity=None):
+    """
+    Cada proceso mapea los embeddings en memoria (las páginas se comparten vía
+    caché del SO). `popularity`: ruta del .npy a mapear, el array o None.
+    """
+    global _worker_engine, _worker_mask
+    from model.engine import RecommendationEngine
+
+    embeddings = np.load(embeddings_path, mmap_mode='r')
+    if isinstance(popularity, str):
+        popularity = np.load(popularity, mmap_mode='r')
+    _worker_engine = RecommendationEngine(embeddings, mal_ids, mal_ids, None, None, popularity=popularity)
+    _worker_mask = mask
+
+
+def _mmap_source(values):
+    """Ruta del .npy si `values` ya está mapeado desde disco (artefactos); si no, el propio array"""
+    if values is None:
+        return None
+    if isinstance(values, np.memmap) and values.filename:
+        return values.filename
+    return np.asarray(values)
+
+
+def _init_worker_local(engine, mask):
+    """Puntuación en el propio proceso (workers=0)"""
+    global _worker_engine, _worker_mask
+    _worker_engine, _worker_mask = engine, mask
+
+
+def _score_lists(user_lists, top_n, user_exclusions=None):
+    return [(rows.tolist(), scores.tolist())
+            for rows, scores in _worker_engine.recommend_batch(user_lists, top_n=top_n, mask=_worker_mask,
+                                                               user_exclusions=user_exclusions)]
+
+
+def save_embeddings_for_mmap(engine, cache_dir):
+    """
+    .npy de los embeddings para mapearlos desde los workers: el de los artefactos
+    si el motor se cargó de ellos; si no, se vuelcan (una vez por versión) a `cache_dir`.
+    """
+    if engine.artifacts_dir:
+        path = os.path.join(engine.artifacts_dir, 'embeddings.npy')
+        if os.path.exists(path):
+            return path
+    from model.sharded import export_embeddings
+    return export_embeddings(engine, cache_dir)
+
+
+# ========== PIPELINE ==========
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def precompute(usernames, engine, sink, fetch=None, workers=DEFAULT_WORKERS, downloads=DEFAULT_DOWNLOADS,
+               batch_size=DEFAULT_BATCH_SIZE, top_n=10, filters=None, exclude_mal_ids=(),
+               resume=False, embeddings_path=None, exclusions_for=None):
+    """
+    Precalcula y escribe las recomendaciones de `usernames`.
+
+    `filters` sigue las reglas de la petición online (min_score por defecto incluido).
+    `exclude_mal_ids` se aplica a todos (blacklist global, en la máscara común) y
+    `exclusions_for(username)` a cada usuario (su blacklist). `workers=0` puntúa
+    en el propio proceso. Devuelve un resumen con el número de usuarios
+    correctos, con error y saltados por --resume.
+    """
+    if fetch is None:
+        from services.recommendation_engine import fetch_user_entries as fetch
+
+    skipped = 0
+    if resume:
+        done = sink.completed()
+        pending = [u for u in usernames if u.lower() not in done]
+        skipped = len(usernames) - len(pending)
+        usernames = pending
+        if skipped:
+            print(f"⏭️ Reanudando: {skipped} usuarios ya calculados")
+
+    summary = {'success': 0, 'error': 0, 'skipped': skipped}
+    mask = engine.base_mask(filters, exclude_mal_ids)
+
+    pool = None
+    if workers > 0 and usernames:
+        if embeddings_path is None:
+            raise ValueError("Se necesita embeddings_path para puntuar en varios procesos")
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(embeddings_path, engine.mal_ids, mask, _mmap_source(engine.popularity)))
+    else:
+        _init_worker_local(engine, mask)
+
+    def emit(username, payload):
+        record = {'username': username, 'generated_at': datetime.now().isoformat(),
+                  'model_version': engine.version}
+        record.update(payload)
+        sink.write(record)
+        summary[record['status']] += 1
+
+    def flush(pending_batch):
+        names, future = pending_batch
+        ranked = future.result() if pool else future
+        for username, (rows, scores) in zip(names, ranked):
+            recommendations = engine.to_records(np.asarray(rows, dtype=np.int64), np.asarray(scores))
+            emit(username, {'status': 'success', 'count': len(recommendations),
+                            'recommendations': recommendations})
+
+    in_flight = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, downloads)) as downloader:
+            for chunk in _chunks(usernames, batch_size):
+                names, lists = [], []
+                for username, entries in zip(chunk, downloader.map(fetch, chunk)):
+                    if entries is None:
+                        emit(username, {'status': 'error',
+                                        'message': f"No se pudo descargar la lista de '{username}'"})
+                        continue
+                    names.append(username)
+                    lists.append(entries)
+
+                if not names:
+                    continue
+                excludes = [list(exclusions_for(name)) for name in names] if exclusions_for else None
+                if pool:
+                    # La descarga del siguiente bloque se solapa con la puntuación de este
+                    in_flight.append((names, pool.submit(_score_lists, lists, top_n, excludes)))
+                    while len(in_flight) > workers:
+                        flush(in_flight.pop(0))
+                else:
+                    in_flight.append((names, _score_lists(lists, top_n, excludes)))
+                    flush(in_flight.pop(0))
+
+                print(f"📊 Progreso: {summary['success'] + summary['error']}/{len(usernames)} usuarios", flush=True)
+
+            while in_flight:
+                flush(in_flight.pop(0))
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precalcula recomendaciones para una lista de usuarios de MAL")
+    parser.add_argument('usernames_file', help="Fichero con un usuario de MAL por línea")
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                        help="Salida .jsonl o almacén clave-valor .db/.sqlite")
+    parser.add_argument('--resume', action='store_true', help="Continuar una ejecución interrumpida")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="Procesos de puntuación (0 = en el proceso principal)")
+    parser.add_argument('--downloads', type=int, default=DEFAULT_DOWNLOADS, help="Descargas simultáneas de MAL")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="Usuarios por bloque")
+    parser.add_argument('--top-n', type=int, default=10)
+    parser.add_argument('--filters', default=None, help="Filtros en JSON (ver model/filters.py)")
+    args = parser.parse_args(argv)
+
+    from model.filters import parse_filter_params
+    from model.train_model import MODEL_CACHE_DIR
+    from services.recommendation_engine import get_engine
+    from services.serving import load_blacklist_ids, load_user_blacklist_ids
+
+    try:
+        filters = parse_filter_params(json.loads(args.filters)) if args.filters else None
+    except ValueError as e:
+        parser.error(f"Filtros no válidos: {e}")
+
+    usernames = read_usernames(args.usernames_file)
+    print(f"👥 {len(usernames)} usuarios en {args.usernames_file}")
+
+    engine = get_engine()
+    embeddings_path = save_embeddings_for_mmap(engine, MODEL_CACHE_DIR) if args.workers > 0 else None
+
+    sink = open_sink(args.output, resume=args.resume)
+    try:
+        summary = precompute(usernames, engine, sink, workers=args.workers, downloads=args.downloads,
+                             batch_size=args.batch_size, top_n=args.top_n, filters=filters,
+                             exclude_mal_ids=load_blacklist_ids(), resume=args.resume,
+                             embeddings_path=embeddings_path, exclusions_for=load_user_blacklist_ids)
+    finally:
+        sink.close()
+
+    print(f"🎉 Completado: {summary['success']} correctos, {summary['error']} con error, "
+          f"{summary['skipped']} ya calculados -> {args.output}")
+    return 0 if summary['error'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -36,6 +36,22 @@ def preload_static_data():
         print(f"❌ Error en precarga: {e}")
         return False
 
+def compile_serving_artifacts():
+    """Compila los artefactos de serving (modelo, vecinos, filtros...) a partir del catálogo"""
+    print("🏗️ Compilando artefactos de serving...")
+    result = subprocess.run([
+        sys.executable,
+        "src/services/compile_artifacts.py"
+    ], cwd=ROOT_DIR)
+    if result.returncode == 0:
+        print("✅ Artefactos de serving compilados")
+        return True
+    print("❌ Error compilando artefactos de serving")
+    return False
+
 if __name__ == "__main__":
     success = preload_static_data()
+    # --compile: además del catálogo, deja listos todos los artefactos de serving
+    if success and '--compile' in sys.argv[1:]:
+        success = compile_serving_artifacts()
     sys.exit(0 if success else 1)
\ No newline at end of file
@@ -0,0 +1,251 @@
+# src/services/recommendation_engine.py - Motor de recomendación cargado en el proceso de la API
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from monitoring.tracing import debug_log, bind
+
+MERGED_ANIME_PATH = os.path.join(ROOT_DIR, 'data', 'merged_anime.csv')
+
+MAX_BATCH_USERS = 1000
+MAX_CONCURRENT_DOWNLOADS = 4
+
+_engine = None
+_engine_lock = threading.Lock()
+_engine_info = {}
+# Peticiones en curso por motor (id -> nº): un motor sustituido se libera al llegar a 0
+_leases = {}
+_leases_cond = threading.Condition()
+
+
+def catalog_fingerprint():
+    """Huella del CSV del catálogo (None si todavía no existe)"""
+    from model.fingerprint import file_fingerprint
+
+    return file_fingerprint(MERGED_ANIME_PATH) if os.path.exists(MERGED_ANIME_PATH) else None
+
+
+def build_engine():
+    """
+    Motor sobre los artefactos de data/artifacts/ mapeados en memoria (model/artifacts.py).
+
+    Normalmente build.sh ya los compiló (services/compile_artifacts.py); si no
+    existen o son de otra versión del catálogo, se compilan aquí. Se abren
+    mapeados, de modo que todos los workers (y el proceso maestro con preload)
+    comparten las mismas páginas de memoria.
+    """
+    from model.artifacts import read_manifest
+
+    t0 = time.perf_counter()
+    source = catalog_fingerprint()
+    manifest = read_manifest()
+    rebuilt = manifest is None or (source is not None and manifest.get('source_fingerprint') != source)
+    if rebuilt:
+        debug_log("🔧 Compilando artefactos de serving desde el catálogo...")
+        from services.compile_artifacts import compile_artifacts
+        compile_artifacts()
+
+    engine = open_engine()
+    _record_load(engine, rebuilt, t0)
+    return engine
+
+
+def _record_load(engine, rebuilt, t0):
+    _engine_info.update({
+        'version': engine.version,
+        'n_rows': int(engine.n_rows),
+        'built_from_catalog': rebuilt,
+        'load_ms': round((time.perf_counter() - t0) * 1000, 2),
+    })
+    debug_log(f"✅ Motor en memoria listo: {engine.n_rows} animes (artefactos {engine.version}, "
+              f"{_engine_info['load_ms']:.0f} ms)")
+
+
+def preload_engine():
+    """
+    Precarga para el maestro de gunicorn, antes del fork: solo abre (mapeados)
+    artefactos ya compilados y vigentes. No compila, no puntúa y no arranca hilos
+    ni pools de procesos que los workers heredarían a medias. Si faltan o son de
+    otra versión del catálogo devuelve None y cada worker construye el motor tras el fork.
+    """
+    global _engine
+    from model.artifacts import read_manifest
+
+    t0 = time.perf_counter()
+    manifest = read_manifest()
+    source = catalog_fingerprint()
+    if manifest is None or (source is not None and manifest.get('source_fingerprint') != source):
+        return None
+    with _engine_lock:
+        if _engine is None:
+            engine = open_engine()
+            if engine is None:
+                return None
+            _record_load(engine, False, t0)
+            _engine = engine
+    return _engine
+
+
+def open_engine(root=None, version=None):
+    """Carga una versión de artefactos (la activa por defecto) con el modo de puntuación configurado"""
+    from model.artifacts import ARTIFACTS_DIR, load_engine
+    from model.engine import RECOMMENDER_ENGINE, RECOMMENDER_SHARDS
+    from model.profile_cache import get_profile_cache
+    from model.sharded import ShardedLatentModel
+
+    engine = load_engine(root or ARTIFACTS_DIR, version)
+    if engine is not None:
+        engine.profile_cache = get_profile_cache()
+    if engine is not None and RECOMMENDER_ENGINE == 'sharded':
+        engine.shards = ShardedLatentModel(os.path.join(engine.artifacts_dir, 'embeddings.npy'), engine.ids,
+                                           engine.version, n_shards=RECOMMENDER_SHARDS, workers=RECOMMENDER_SHARDS)
+    return engine
+
+
+def get_engine():
+    """Motor compartido por el proceso (se construye en la primera llamada)"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = build_engine()
+    return _engine
+
+
+def engine_loaded():
+    """True si el motor ya está en memoria (usarlo no obliga a construirlo)"""
+    return _engine is not None
+
+
+@contextmanager
+def engine_lease():
+    """
+    Motor actual reservado durante una petición. Si entretanto se sustituye
+    (swap_engine), la petición termina con la versión con la que empezó y el
+    motor antiguo no se libera hasta que todas sus reservas terminan.
+    """
+    get_engine()
+    with _leases_cond:
+        engine = _engine
+        _leases[id(engine)] = _leases.get(id(engine), 0) + 1
+    try:
+        yield engine
+    finally:
+        with _leases_cond:
+            _leases[id(engine)] -= 1
+            if not _leases[id(engine)]:
+                del _leases[id(engine)]
+                _leases_cond.notify_all()
+
+
+def active_leases(engine):
+    with _leases_cond:
+        return _leases.get(id(engine), 0)
+
+
+def swap_engine(engine, info=None):
+    """Publica `engine` como motor del proceso (cambio atómico de referencia); devuelve el anterior"""
+    global _engine
+    with _leases_cond:
+        previous, _engine = _engine, engine
+        _engine_info.update({'version': engine.version, 'n_rows': int(engine.n_rows)}, **(info or {}))
+    return previous
+
+
+def wait_for_drain(engine, timeout=None):
+    """Espera a que terminen las peticiones que usan `engine`; False si vence el timeout"""
+    with _leases_cond:
+        return _leases_cond.wait_for(lambda: id(engine) not in _leases, timeout)
+
+
+def release_engine(engine):
+    """Libera los recursos propios de un motor retirado (pool de shards); los mmaps se cierran con el GC"""
+    if engine is not None and engine.shards is not None:
+        engine.shards.close()
+
+
+def engine_load_info():
+    """Versión y tiempo de carga del motor de este proceso (vacío si aún no se cargó)"""
+    return dict(_engine_info)
+
+
+def fetch_user_entries(username):
+    """Lista MAL de un usuario en memoria (None si no se pudo descargar)"""
+    from data.download_mal_list import fetch_user_list
+    return fetch_user_list(username)
+
+
+def get_batch_recommendations(usernames=(), seeds=None, top_n=10, filters=None, exclude_mal_ids=(),
+                              exclusions_for=None):
+    """
+    Recomendaciones para muchos usuarios en una sola pasada sobre los embeddings.
+
+    `usernames`: usuarios de MAL cuyas listas se descargan (en paralelo, acotado).
+    `seeds`: dict nombre -> lista de entradas ({'anime_id', 'score'}, [id, score] o id).
+    `exclude_mal_ids`: exclusiones comunes (blacklist global).
+    `exclusions_for`: función nombre -> MAL_IDs que solo excluye ese usuario (su blacklist).
+    Sin min_score en `filters` se aplica el de por defecto, como en las peticiones individuales.
+    Devuelve un dict nombre -> resultado; ValueError si un nombre está en `usernames` y en `seeds`.
+    """
+    usernames = [u.strip() for u in usernames or [] if u and u.strip()]
+    seeds = dict(seeds or {})
+    if len(usernames) + len(seeds) > MAX_BATCH_USERS:
+        raise ValueError(f"Máximo {MAX_BATCH_USERS} usuarios por lote")
+    # Cada nombre es una clave de `results`: una semilla no puede pisar a un usuario
+    repeated = sorted(set(usernames) & {str(name) for name in seeds})
+    if repeated:
+        raise ValueError(f"Nombres repetidos en 'usernames' y 'seeds': {', '.join(repeated)}")
+
+    with engine_lease() as engine:
+        return _batch_recommendations(engine, usernames, seeds, top_n, filters, exclude_mal_ids, exclusions_for)
+
+
+def _batch_recommendations(engine, usernames, seeds, top_n, filters, exclude_mal_ids, exclusions_for=None):
+    results = {}
+    names, lists = [], []
+
+    if usernames:
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DOWNLOADS) as pool:
+            downloaded = list(pool.map(bind(fetch_user_entries), usernames))
+        for username, entries in zip(usernames, downloaded):
+            if not entries:
+                results[username] = {
+                    'status': 'error',
+                    'message': f"No se pudo descargar la lista de '{username}'",
+                }
+                continue
+            names.append(username)
+            lists.append(entries)
+
+    for name, entries in seeds.items():
+        names.append(str(name))
+        lists.append(entries)
+
+    user_exclusions = [exclusions_for(name) for name in names] if exclusions_for else None
+    ranked = engine.recommend_batch(lists, top_n=top_n, filters=filters, exclude_mal_ids=exclude_mal_ids,
+                                    user_exclusions=user_exclusions)
+    for name, (rows, scores) in zip(names, ranked):
+        recommendations = engine.to_records(rows, scores)
+        results[name] = {
+            'status': 'success',
+            'count': len(recommendations),
+            'recommendations': recommendations,
+        }
+
+    debug_log(f"✅ Lote completado: {len(names)} usuarios puntuados, {len(results) - len(names)} con error")
+    return {
+        'status': 'success',
+        'timestamp': datetime.now().isoformat(),
+        'model_version': engine.version,
+        'count': len(results),
+        'results': results,
+    }
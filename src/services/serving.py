@@ -0,0 +1,228 @@
+# src/services/serving.py - Serving ligero: solo NumPy sobre los artefactos precompilados
+"""
+Ruta de serving que no importa pandas, scikit-learn ni scipy: carga los
+artefactos de data/artifacts/ (model/artifacts.py) mapeados en memoria y puntúa
+con NumPy. Entrenamiento e ingesta quedan en las etapas offline.
+
+Uso (mide el tiempo desde el arranque del proceso hasta la primera respuesta):
+    python src/services/serving.py <username> [filtros_json]
+"""
+import time
+
+_MODULE_T0 = time.perf_counter()
+
+import os
+import sys
+import json
+from collections import Counter
+from datetime import datetime
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from model.artifacts import ARTIFACTS_DIR, current_version
+from model.engine import RECOMMENDER_ENGINE
+from monitoring.metrics import stage, cache_result
+from monitoring.tracing import debug_log, set_attributes
+from services.pagination import (RANKED_CANDIDATES, CursorError, RankedList, check_cursor, fingerprint, page,
+                                 page_limit, ranked_cache)
+
+# Módulos que la ruta de serving no debe necesitar
+HEAVY_MODULES = ('pandas', 'sklearn', 'scipy')
+# Motores que se puntúan en proceso sobre los artefactos; 'sparse' (índice
+# invertido TF-IDF) solo existe en el pipeline en subproceso
+IN_PROCESS_ENGINES = ('svd', 'sharded')
+
+_IMPORT_MS = (time.perf_counter() - _MODULE_T0) * 1000
+_first_response_ms = None
+
+
+def artifacts_available(root=ARTIFACTS_DIR):
+    return current_version(root) is not None
+
+
+def in_process_supported():
+    """True si el RECOMMENDER_ENGINE configurado se puede servir en proceso"""
+    return RECOMMENDER_ENGINE in IN_PROCESS_ENGINES
+
+
+def in_process_available(root=ARTIFACTS_DIR):
+    """True si hay artefactos y el motor configurado se sirve en proceso"""
+    return in_process_supported() and artifacts_available(root)
+
+
+def heavy_modules_loaded():
+    """Módulos pesados ya importados en este proceso (idealmente ninguno)"""
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+def load_blacklist_ids(username=None):
+    """IDs a excluir para `username`: blacklist global + la del usuario (data/blacklist_store.py)"""
+    from data.blacklist_store import get_store
+    return get_store().excluded_ids(username)
+
+
+def load_user_blacklist_ids(username):
+    """Solo la blacklist propia de `username` (para lotes, donde la global va en la máscara común)"""
+    from data.blacklist_store import get_store, user_scope, GLOBAL_SCOPE
+    scope = user_scope(username)
+    return get_store().ids(scope) if scope != GLOBAL_SCOPE else []
+
+
+def process_uptime_ms():
+    """Milisegundos desde que arrancó el proceso (Linux); None si no se puede medir"""
+    try:
+        with open('/proc/self/stat', 'r') as f:
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime', 'r') as f:
+            system_uptime = float(f.read().split()[0])
+        return (system_uptime - start_ticks / os.sysconf('SC_CLK_TCK')) * 1000
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def serving_engine():
+    """
+    Motor sobre los artefactos mapeados (compartido con recommendation_engine),
+    reservado mientras dura la petición por si el refresco lo sustituye.
+    """
+    from services.recommendation_engine import engine_lease
+    return engine_lease()
+
+
+def user_statistics(engine, entries, rows, weights):
+    """Mismas estadísticas que train_model.get_anime_statistics, a partir de la lista en memoria"""
+    stats = {}
+    rated = weights > 0
+    genre_counter = Counter()
+    for row in rows[rated].tolist():
+        genre_counter.update(str(engine.records[row]['genres']).split())
+    most_watched_genre = genre_counter.most_common(1)
+    stats['most_watched_genre'] = most_watched_genre[0][0] if most_watched_genre else 'N/A'
+    stats['average_user_score'] = round(float(weights[rated].mean()) * 10, 2) if rated.any() else 0.0
+    stats['total_anime_in_list'] = len(entries)
+    return stats
+
+
+def recommend_for_user(username, filters=None, top_n=10, entries=None, exclude_mal_ids=None, cursor=None):
+    """
+    Recomendaciones para un usuario de MAL con el mismo formato de respuesta que
+    get_recommendations_for_user.py. `entries` evita la descarga (lista ya obtenida).
+
+    Devuelve `top_n` recomendaciones a partir de `cursor` (services/pagination.py)
+    y el cursor de la página siguiente en 'next_cursor'. Sin `entries`, el ranking
+    de RANKED_CANDIDATES candidatos se cachea y las páginas siguientes no
+    descargan ni puntúan de nuevo.
+    """
+    t0 = time.perf_counter()
+    with serving_engine() as engine:
+        return _recommend(engine, username, filters, top_n, entries, exclude_mal_ids, t0, cursor)
+
+
+def _ranked_list(engine, username, filters, entries, exclude_mal_ids, n_candidates):
+    """Ranking de `n_candidates` candidatos (selección parcial) y estadísticas; None si no hay lista"""
+    if entries is None:
+        from data.download_mal_list import fetch_user_list
+        entries = fetch_user_list(username)
+    if not entries:
+        return None
+    set_attributes(user_entries=len(entries))
+    top_rows, top_scores = engine.recommend(entries, top_n=n_candidates, filters=filters,
+                                            exclude_mal_ids=exclude_mal_ids, username=username)
+    _, rows, weights = engine.user_matrix([entries])
+    return RankedList(top_rows, top_scores, user_statistics(engine, entries, rows, weights),
+                      complete=top_rows.size < n_candidates)
+
+
+def _recommend(engine, username, filters, top_n, entries, exclude_mal_ids, t0, cursor=None):
+    global _first_response_ms
+    key = fingerprint(username, filters)
+    try:
+        offset = check_cursor(cursor, engine.version, key)
+        top_n = page_limit(offset, top_n)
+    except CursorError as e:
+        return {'status': 'error', 'message': str(e), 'timestamp': datetime.now().isoformat()}
+
+    if exclude_mal_ids is None:
+        exclude_mal_ids = load_blacklist_ids(username)
+    set_attributes(model_version=engine.version, excluded=len(exclude_mal_ids), offset=offset)
+
+    t_rank = time.perf_counter()
+    # Con una lista ya dada no se cachea: puede no ser la actual del usuario
+    cache_key = (key, engine.version, frozenset(exclude_mal_ids)) if entries is None else None
+    ranked = ranked_cache.get(cache_key) if cache_key is not None else None
+    if cache_key is not None:
+        cache_result('ranked', 'hit' if ranked is not None else 'miss')
+    if ranked is None:
+        ranked = _ranked_list(engine, username, filters, entries, exclude_mal_ids, RANKED_CANDIDATES)
+        if ranked is None:
+            return {
+                'status': 'error',
+                'message': f"No se pudo descargar la lista de '{username}'. Verifica que el usuario existe y la lista es pública.",
+                'timestamp': datetime.now().isoformat()
+            }
+        if cache_key is not None:
+            ranked_cache.put(cache_key, ranked)
+
+    if ranked.rows.size == 0:
+        return {
+            'status': 'error',
+            'message': "No se generaron recomendaciones.",
+            'timestamp': datetime.now().isoformat()
+        }
+    top_rows, next_cursor = page(ranked.rows, offset, top_n, engine.version, key, has_more=not ranked.complete)
+    top_scores = ranked.scores[offset:offset + top_rows.size]
+    with stage('serialization'):
+        recommendations = engine.to_records(top_rows, top_scores)
+    rank_ms = (time.perf_counter() - t_rank) * 1000
+
+    if _first_response_ms is None:
+        _first_response_ms = process_uptime_ms()
+        debug_log(f"⏱️ Primera respuesta a los {_first_response_ms or 0:.0f} ms del arranque "
+                  f"(módulos pesados: {heavy_modules_loaded() or 'ninguno'})")
+    debug_log(f"✅ {len(recommendations)} recomendaciones para {username} en {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    return {
+        'status': 'success',
+        'timestamp': datetime.now().isoformat(),
+        'model_version': engine.version,
+        'count': len(recommendations),
+        'statistics': ranked.statistics,
+        'recommendations': recommendations,
+        'offset': offset,
+        'next_cursor': next_cursor,
+        'timings': {'rank_ms': round(rank_ms, 2)},
+    }
+
+
+def timings():
+    """Tiempos de arranque del serving en este proceso"""
+    from services.recommendation_engine import engine_load_info
+    return {
+        'import_ms': round(_IMPORT_MS, 2),
+        'engine': engine_load_info(),
+        'first_response_ms': round(_first_response_ms, 2) if _first_response_ms is not None else None,
+        'heavy_modules_loaded': heavy_modules_loaded(),
+    }
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print(json.dumps({'status': 'error', 'message': 'Uso: serving.py <username> [filtros_json]'}))
+        return 1
+    if not artifacts_available():
+        print(json.dumps({'status': 'error', 'message': 'No hay artefactos de serving en data/artifacts/'}))
+        return 1
+
+    filters = json.loads(argv[1]) if len(argv) > 1 else None
+    result = recommend_for_user(argv[0], filters)
+    result['startup'] = timings()
+    print(json.dumps(result, ensure_ascii=False))
+    return 0 if result['status'] == 'success' else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
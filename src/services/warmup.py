@@ -0,0 +1,152 @@
+# src/services/warmup.py - Calentamiento en segundo plano y estado de readiness del proceso
+import os
+import sys
+import time
+import threading
+import traceback
+from datetime import datetime
+
+import numpy as np
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from monitoring.tracing import debug_log
+
+# Usuarios sintéticos: los N animes más populares puntuados con 10
+SYNTHETIC_LIST_SIZE = 5
+# Segundos mínimos entre reintentos tras un calentamiento fallido
+RETRY_INTERVAL = 30
+
+
+def default_loader():
+    from services.recommendation_engine import get_engine
+    return get_engine()
+
+
+def synthetic_entries(engine, size=SYNTHETIC_LIST_SIZE):
+    """Lista MAL sintética con los animes más populares del catálogo"""
+    rows = np.asarray(engine.popularity)[:size] if engine.popularity is not None else np.arange(min(size, engine.n_rows))
+    return [{'anime_id': int(engine.mal_ids[r]), 'score': 10} for r in rows.tolist()]
+
+
+class Warmup:
+    """
+    Calentamiento del proceso en un hilo de fondo: carga catálogo y modelo y
+    ejecuta una recomendación sintética completa. Hasta que termina bien, el
+    proceso no está listo (/api/ready responde 503).
+
+    El estado es por proceso: con gunicorn el maestro no arranca el hilo (solo
+    abre los artefactos) y cada worker hace su calentamiento tras el fork
+    (inmediato si el motor ya venía cargado del maestro).
+    """
+
+    def __init__(self, loader=default_loader):
+        self._loader = loader
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.state = 'pending'
+        self.error = None
+        self.model_version = None
+        self.timings = {}
+        self.started_at = None
+        self.finished_at = None
+        self._finished_monotonic = None
+
+    @property
+    def ready(self):
+        return self._pid == os.getpid() and self.state == 'ready'
+
+    def ensure_started(self):
+        """Arranca el calentamiento si aún no se hizo en este proceso (idempotente)"""
+        if self._pid != os.getpid():
+            self._reset()
+        with self._lock:
+            if self._thread is not None or self.state == 'ready':
+                return
+            self.state = 'warming'
+            self.started_at = datetime.now().isoformat()
+            self._thread = threading.Thread(target=self._run, name='warmup', daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout=None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.ready
+
+    def _run(self):
+        t0 = time.perf_counter()
+        try:
+            engine = self._loader()
+            t_load = time.perf_counter()
+
+            from services.serving import recommend_for_user
+            response = recommend_for_user('__warmup__', entries=synthetic_entries(engine), exclude_mal_ids=[])
+            if response.get('status') != 'success':
+                raise RuntimeError(f"Recomendación sintética fallida: {response.get('message')}")
+            t_done = time.perf_counter()
+
+            # Índice del respaldo precalculado, antes de declarar el proceso listo
+            from services.fallback import load_precomputed
+            load_precomputed()
+
+            self.model_version = engine.version
+            self.timings = {
+                'engine_load_ms': round((t_load - t0) * 1000, 2),
+                'synthetic_recommendation_ms': round((t_done - t_load) * 1000, 2),
+                'total_ms': round((t_done - t0) * 1000, 2),
+            }
+            self.state = 'ready'
+            debug_log(f"✅ Proceso listo en {self.timings['total_ms']:.0f} ms (modelo {engine.version})")
+        except Exception as e:
+            self.error = str(e)
+            self.state = 'failed'
+            self.timings = {'total_ms': round((time.perf_counter() - t0) * 1000, 2)}
+            debug_log(f"❌ Error en el calentamiento: {e}")
+            debug_log(traceback.format_exc())
+        finally:
+            self.finished_at = datetime.now().isoformat()
+            self._finished_monotonic = time.monotonic()
+
+    def retry(self):
+        """Reintenta tras un fallo (p. ej. el catálogo aún no estaba descargado), como mucho cada RETRY_INTERVAL s"""
+        with self._lock:
+            if self.state != 'failed' or time.monotonic() - (self._finished_monotonic or 0) < RETRY_INTERVAL:
+                return
+            self._thread = None
+            self.state = 'pending'
+        self.ensure_started()
+
+    def status(self):
+        return {
+            'ready': self.ready,
+            'state': self.state,
+            'model_version': self.model_version,
+            'timings': self.timings,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error,
+            'pid': os.getpid(),
+        }
+
+
+warmup = Warmup()
+
+
+def start_background_threads():
+    """
+    Hilos de fondo del proceso: calentamiento (salvo WARMUP_ON_START=0) y refresco
+    del modelo. Bajo gunicorn se llama desde post_fork en cada worker, nunca en el maestro.
+    """
+    from services.model_refresher import refresher
+
+    if os.environ.get('WARMUP_ON_START', '1') != '0':
+        warmup.ensure_started()
+    refresher.ensure_started()
@@ -0,0 +1,12 @@
+# src/tests/conftest.py
+
+import os
+import atexit
+import shutil
+import tempfile
+
+# Los cerrojos de data/storage.py van a un directorio temporal, no a data/.locks/ del repo
+# (también para los subprocesos, que heredan el entorno)
+_LOCK_DIR = tempfile.mkdtemp(prefix="anime_locks_")
+os.environ["DATA_LOCK_DIR"] = _LOCK_DIR
+atexit.register(shutil.rmtree, _LOCK_DIR, ignore_errors=True)
@@ -0,0 +1,98 @@
+# src/tests/test_admission.py
+
+import os
+import sys
+import time
+import threading
+import importlib.util
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _rejection(admission, client):
+    try:
+        with admission.admit(client):
+            return None
+    except Exception as e:
+        return e
+
+
+def test_client_rate_limit():
+    print("🔍 Test: admission.py - token bucket por cliente e IP detrás de proxies")
+    admission = _load_module("admission", os.path.join("api", "admission.py"))
+
+    gate = admission.Admission("test_rate", admission.ClientRateLimiter(rate=0.5, burst=2),
+                               admission.ConcurrencyLimiter("test_rate", max_concurrent=0))
+    assert _rejection(gate, "1.1.1.1") is None and _rejection(gate, "1.1.1.1") is None, \
+        "❌ La ráfaga permitida debe pasar."
+    rejected = _rejection(gate, "1.1.1.1")
+    assert isinstance(rejected, admission.Rejected) and rejected.status == 429, "❌ Debe responder 429."
+    assert 1 <= rejected.retry_after <= 2, f"❌ Retry-After inesperado: {rejected.retry_after}"
+    assert _rejection(gate, "2.2.2.2") is None, "❌ El límite de un cliente no afecta a otros."
+
+    assert admission.client_key("10.0.0.1", "6.6.6.6, 8.8.8.8", trusted_proxies=1) == "8.8.8.8", \
+        "❌ Se debe usar la IP que añadió el proxy de confianza, no la que envía el cliente."
+    assert admission.client_key("10.0.0.1", "6.6.6.6, 8.8.8.8", trusted_proxies=0) == "10.0.0.1"
+    assert admission.client_key("10.0.0.1", None) == "10.0.0.1"
+    if "TRUSTED_PROXIES" not in os.environ:
+        assert admission.client_key("10.0.0.1", "6.6.6.6") == "10.0.0.1", \
+            "❌ Sin TRUSTED_PROXIES no se debe confiar en X-Forwarded-For."
+    print("✅ Rate limit por cliente correcto.")
+
+
+def test_concurrency_limit_and_bounded_queue():
+    print("🔍 Test: admission.py - límite de concurrencia, cola acotada y métricas de rechazos")
+    admission = _load_module("admission", os.path.join("api", "admission.py"))
+    from monitoring.metrics import ADMISSION_REJECTIONS, ADMISSION_QUEUE_DEPTH
+
+    limiter = admission.ConcurrencyLimiter("test_queue", max_concurrent=1, max_queue=1, queue_timeout=0.3)
+    gate = admission.Admission("test_queue", admission.ClientRateLimiter(rate=0), limiter)
+    release, started = threading.Event(), threading.Event()
+    results = {}
+
+    def hold():
+        with gate.admit("a"):
+            started.set()
+            release.wait(5)
+
+    def queued(name, timeout):
+        limiter.queue_timeout = timeout
+        results[name] = _rejection(gate, name)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    started.wait(5)
+
+    # El único hueco de cola vence antes de que termine la petición activa
+    queued("b", 0.3)
+    assert isinstance(results["b"], admission.Rejected) and results["b"].reason == "queue_timeout" \
+        and results["b"].status == 503, f"❌ Se esperaba 503 por espera vencida: {results['b']}"
+
+    waiter = threading.Thread(target=queued, args=("c", 5))
+    waiter.start()
+    while limiter.waiting == 0:
+        time.sleep(0.01)
+    assert ADMISSION_QUEUE_DEPTH.get(pool="test_queue") == 1, "❌ La profundidad de cola no se exporta."
+    full = _rejection(gate, "d")
+    assert isinstance(full, admission.Rejected) and full.reason == "queue_full" and full.retry_after >= 1, \
+        "❌ Con la cola llena se debe rechazar en el acto."
+
+    release.set()
+    holder.join(5)
+    waiter.join(5)
+    assert results["c"] is None, "❌ La petición en cola debe entrar al liberarse el hueco."
+    assert limiter.active == 0 and limiter.waiting == 0
+    assert ADMISSION_REJECTIONS.get(pool="test_queue", reason="queue_full") == 1
+    assert ADMISSION_REJECTIONS.get(pool="test_queue", reason="queue_timeout") == 1
+    print("✅ Concurrencia acotada con rechazos rápidos.")
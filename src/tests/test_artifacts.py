@@ -0,0 +1,73 @@
+# src/tests/test_artifacts.py
+
+import os
+import sys
+import tempfile
+import importlib.util
+import numpy as np
+import pandas as pd
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _mock_engine(n_rows=120, k=6):
+    from model.engine import RecommendationEngine, _clean_record
+    from model.filters import FilterIndex
+
+    rng = np.random.default_rng(2)
+    catalog = pd.DataFrame({
+        "id": np.arange(1, n_rows + 1),
+        "MAL_ID": np.arange(1, n_rows + 1) + 100,
+        "title": [f"Anime {i} — ñ" for i in range(n_rows)],
+        "genres": rng.choice(["Action", "Drama", "Action Comedy"], n_rows),
+        "description": ["" if i % 7 == 0 else f"Descripción {i}" for i in range(n_rows)],
+        "Tipo": rng.choice(["TV", "MOVIE"], n_rows),
+        "score": rng.integers(50, 95, n_rows).astype(float),
+        "episodes": rng.integers(1, 50, n_rows),
+    })
+    records = [_clean_record(row) for row in catalog.to_dict("records")]
+    return RecommendationEngine(rng.normal(size=(n_rows, k)), catalog["id"].values, catalog["MAL_ID"].values,
+                                FilterIndex.build(catalog), records, version="v1")
+
+
+def test_artifacts_roundtrip_memory_mapped():
+    print("🔍 Test: artifacts.py - artefactos .npy mapeados en memoria")
+    artifacts = _load_module("artifacts", os.path.join("model", "artifacts.py"))
+    engine = _mock_engine()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        assert artifacts.load_engine(tmp) is None, "❌ Sin artefactos no debe haber motor."
+        artifacts.write_artifacts(engine, tmp, metadata={"source_fingerprint": "abc"})
+        assert artifacts.current_version(tmp) == "v1", "❌ La versión activa debe ser v1."
+        assert artifacts.read_manifest(tmp)["source_fingerprint"] == "abc", "❌ Falta la metadata en el manifiesto."
+
+        loaded = artifacts.load_engine(tmp)
+        assert isinstance(loaded.embeddings, np.memmap), "❌ Los embeddings deben estar mapeados en memoria."
+        assert isinstance(loaded.filter_index.bits, np.memmap), "❌ Los bitmaps deben estar mapeados en memoria."
+        assert len(loaded.records) == len(engine.records), "❌ El catálogo por columnas perdió filas."
+        for row in [0, 7, 119]:
+            assert loaded.records[row] == engine.records[row], f"❌ El registro {row} no coincide."
+
+        filters = {"genre": ["Action"], "type": ["tv"], "min_score": 60}
+        assert np.array_equal(loaded.filter_index.mask(filters), engine.filter_index.mask(filters)), \
+            "❌ Los bitmaps cargados no coinciden."
+
+        entries = [{"anime_id": 101, "score": 9}, {"anime_id": 150, "score": 7}]
+        expected_rows, expected_scores = engine.recommend(entries, top_n=5, filters=filters)
+        rows, scores = loaded.recommend(entries, top_n=5, filters=filters)
+        assert rows.tolist() == expected_rows.tolist(), "❌ El motor sobre artefactos recomienda distinto."
+        assert loaded.to_records(rows, scores) == engine.to_records(expected_rows, expected_scores), \
+            "❌ Los registros serializados difieren."
+
+    print("✅ Artefactos mapeados en memoria equivalentes al motor original.")
@@ -0,0 +1,61 @@
+# src/tests/test_benchmarks.py
+
+import os
+import sys
+import importlib.util
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_synthetic_data_matches_real_shapes():
+    print("🔍 Test: synthetic.py - catálogo de AniList y lista de MAL sintéticos")
+    synthetic = _load_module("benchmarks.synthetic", os.path.join("benchmarks", "synthetic.py"))
+
+    media = synthetic.generate_media(500, seed=3)
+    assert media == synthetic.generate_media(500, seed=3), "❌ El generador no es reproducible por semilla."
+    assert {"id", "idMal", "title", "description", "genres", "tags", "averageScore", "studios"} <= set(media[0]), \
+        "❌ Las entradas no tienen la forma de la consulta de AniList."
+
+    catalog = synthetic.catalog_frame(media)
+    assert len(catalog) == 500 and {"AniListID", "MalID", "genres", "tags", "studios"} <= set(catalog.columns), \
+        "❌ El catálogo no tiene las columnas de merged_anime.csv."
+
+    entries = synthetic.generate_user_list(media, 50, seed=3)
+    assert len({e["anime_id"] for e in entries}) == 50, "❌ La lista del usuario repite títulos."
+    assert {e["anime_id"] for e in entries} <= set(catalog["MalID"]), "❌ La lista usa IDs fuera del catálogo."
+    assert all(e["status"] in synthetic.MAL_STATUSES and 0 <= e["score"] <= 10 for e in entries), \
+        "❌ Estados o puntuaciones fuera del formato de MAL."
+    print("✅ Datos sintéticos con la forma de AniList y MAL.")
+
+
+def test_benchmark_case_and_baseline_comparison():
+    print("🔍 Test: run_benchmarks.py - etapas medidas offline y regresiones frente a la línea base")
+    run_benchmarks = _load_module("run_benchmarks", os.path.join("benchmarks", "run_benchmarks.py"))
+
+    case = run_benchmarks.run_case(400, 20, engine="latent", repeat=1, seed=1)
+    assert list(case["stages"]) == list(run_benchmarks.STAGES), f"❌ Etapas inesperadas: {list(case['stages'])}"
+    assert all(values["seconds"] > 0 and values["peak_bytes"] >= 0 for values in case["stages"].values()), \
+        "❌ Faltan tiempos o memoria."
+    assert case["stages"]["preprocess_data"]["peak_bytes"] > 0, "❌ No se midió la memoria del entrenamiento."
+
+    baseline = {"cases": {"400x20": case}}
+    slower = {"cases": {"400x20": {"stages": {
+        name: dict(values, seconds_min=values["seconds_min"] * 3 + 1) for name, values in case["stages"].items()
+    }}}}
+    assert not any(row["regression"] for row in run_benchmarks.compare(baseline, baseline)), \
+        "❌ Una ejecución igual a la línea base no puede ser regresión."
+    regressions = [row for row in run_benchmarks.compare(slower, baseline) if row["regression"]]
+    assert {row["stage"] for row in regressions} == set(run_benchmarks.STAGES) and \
+        all(row["metric"] == "seconds_min" for row in regressions), "❌ No se detectaron las regresiones de tiempo."
+    print("✅ Benchmark offline y comparación con la línea base.")
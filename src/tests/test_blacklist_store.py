@@ -0,0 +1,70 @@
+# src/tests/test_blacklist_store.py
+
+import os
+import sys
+import json
+import tempfile
+import importlib.util
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_blacklist_scopes_versions_and_deltas():
+    print("🔍 Test: blacklist_store.py - ámbitos por usuario, versión y deltas")
+    blacklist_store = _load_module("blacklist_store", os.path.join("data", "blacklist_store.py"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, "blacklist.json")
+        with open(legacy, "w", encoding="utf-8") as f:
+            json.dump([5, "7", "x"], f)
+        path = os.path.join(tmp, "blacklist.db")
+        store = blacklist_store.BlacklistStore(path, legacy)
+
+        assert store.ids() == [5, 7], f"❌ No se importó la blacklist antigua: {store.ids()}"
+        base = store.version()
+
+        added, version = store.add([7, 9, 11])
+        assert added == [9, 11] and version == base + 1, "❌ Solo deben escribirse los IDs nuevos."
+        assert store.add([9]) == ([], version), "❌ Añadir IDs existentes no debe cambiar la versión."
+
+        alice = blacklist_store.user_scope("Alice")
+        store.add([42], alice)
+        assert store.excluded_ids("alice") == {5, 7, 9, 11, 42}, "❌ El usuario debe excluir global + los suyos."
+        assert 42 not in store.excluded_ids("bob") and store.contains(42, "ALICE"), "❌ Los ámbitos se mezclan."
+
+        removed, after_remove = store.remove([9, 1000])
+        assert removed == [9], "❌ Solo deben quitarse los IDs presentes."
+        delta = store.changes(version)
+        assert delta == {"version": after_remove, "added": [], "removed": [9]}, f"❌ Delta inesperado: {delta}"
+        assert store.changes(base)["added"] == [11], "❌ El delta debe combinar los cambios posteriores."
+
+        # Otro worker (otra instancia sobre el mismo fichero) ve los cambios sin releer todo
+        other = blacklist_store.BlacklistStore(path, legacy)
+        assert other.ids() == [5, 7, 11], "❌ La segunda instancia no ve el estado actual."
+        other.add([77], alice)
+        assert store.excluded_ids("alice") == {5, 7, 11, 42, 77}, "❌ No se sincronizaron los cambios de otro proceso."
+        assert store.ids() == [5, 7, 11], "❌ El JSON antiguo se reimportó."
+
+        # La versión de un ámbito (ETag) no cambia con escrituras en otros ámbitos
+        global_version = store.scope_version()
+        assert store.scope_version(alice) == store.version() and global_version == after_remove
+        store.add([500], blacklist_store.user_scope("bob"))
+        assert store.scope_version() == global_version, "❌ Otro ámbito no debe cambiar la versión de este."
+
+        # Lotes grandes: más IDs que variables admite una consulta de SQLite
+        added, _ = store.add(range(100000, 105000), alice)
+        assert len(added) == 5000 and len(store.excluded_ids("alice")) == 5005
+        removed, _ = store.remove(range(100000, 105000), alice)
+        assert len(removed) == 5000, "❌ El borrado masivo debe quitar todos los IDs."
+    print("✅ Blacklist con ámbitos, versión y deltas.")
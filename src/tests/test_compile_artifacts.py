@@ -0,0 +1,93 @@
+# src/tests/test_compile_artifacts.py
+
+import os
+import sys
+import tempfile
+import importlib.util
+import numpy as np
+import pandas as pd
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _mock_catalog(path, n_rows=200):
+    rng = np.random.default_rng(8)
+    words = ["ninja", "pirate", "mecha", "idol", "school", "magic", "sword", "space", "romance", "detective"]
+    pd.DataFrame({
+        "AniListID": np.arange(1, n_rows + 1),
+        "MalID": np.arange(1, n_rows + 1) + 500.0,
+        "title": [f"Anime {i}" for i in range(n_rows)],
+        "description": [" ".join(rng.choice(words, 6)) for _ in range(n_rows)],
+        "genres": [str(rng.choice(["Action", "Drama", "Comedy", "Slice of Life"], 2, replace=False).tolist())
+                   for _ in range(n_rows)],
+        "tags": ["['Tag A']"] * n_rows,
+        "score": rng.integers(60, 95, n_rows),
+        "episodes": rng.integers(1, 30, n_rows),
+        "status": "FINISHED",
+        "type": "ANIME",
+        "siteUrl": "https://anilist.co",
+        "studios": "['Studio A']",
+    }).to_csv(path, index=False)
+
+
+def test_compile_artifacts_builds_and_validates():
+    print("🔍 Test: compile_artifacts.py - compilación y validación de artefactos")
+    import model.train_model as train_model
+    import model.feature_store as feature_store
+    import services.recommendation_engine as recommendation_engine
+    import services.get_recommendations_for_user as user_service
+    from model import artifacts
+    compile_module = _load_module("compile_artifacts", os.path.join("services", "compile_artifacts.py"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog_path = os.path.join(tmp, "merged_anime.csv")
+        _mock_catalog(catalog_path)
+        patches = [
+            (train_model, "MERGED_ANIME_PATH", catalog_path),
+            (recommendation_engine, "MERGED_ANIME_PATH", catalog_path),
+            (user_service, "check_preloaded_data", lambda: True),
+            (feature_store, "_default_store", feature_store.FeatureStore(os.path.join(tmp, "fs.pkl"))),
+        ]
+        originals = [(module, name, getattr(module, name)) for module, name, _ in patches]
+        for module, name, value in patches:
+            setattr(module, name, value)
+        try:
+            root = os.path.join(tmp, "artifacts")
+            version, directory = compile_module.compile_artifacts(root, n_neighbors=5)
+        finally:
+            for module, name, value in originals:
+                setattr(module, name, value)
+
+        assert artifacts.current_version(root) == version, "❌ La versión compilada debe quedar activa."
+        manifest = artifacts.read_manifest(root)
+        assert manifest["n_neighbors"] == 5 and "neighbors.npy" in manifest["checksums"], \
+            "❌ El manifiesto no describe el grafo de vecinos."
+        assert artifacts.validate_artifacts(root) == [], "❌ Los artefactos compilados no validan."
+
+        neighbors = artifacts.load_array("neighbors", root)
+        assert neighbors.shape == (200, 5), "❌ Grafo de vecinos con forma incorrecta."
+
+        # Usuario sin animes puntuados: respaldo por popularidad (orden del catálogo)
+        engine = artifacts.load_engine(root)
+        rows, _ = engine.recommend([[501, 0]], top_n=3)
+        assert rows.tolist() == [1, 2, 3], f"❌ El respaldo por popularidad devolvió {rows.tolist()}."
+
+        # Un fichero alterado se detecta por checksum
+        with open(os.path.join(directory, "popularity.npy"), "r+b") as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b"\x01")
+        assert any("popularity.npy" in e for e in artifacts.validate_artifacts(root)), \
+            "❌ La validación no detectó un artefacto corrupto."
+
+    print("✅ Artefactos compilados, validados y activados.")
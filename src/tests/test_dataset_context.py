@@ -0,0 +1,72 @@
+# src/tests/test_dataset_context.py
+
+import os
+import sys
+import json
+import importlib.util
+import tempfile
+import numpy as np
+import pandas as pd
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MODEL_PATH = os.path.join(ROOT_DIR, "src", "model", "train_model.py")
+
+
+def test_dataset_loaded_once_per_version():
+    print("🔍 Test: DatasetContext - una sola carga del catálogo por versión")
+
+    spec = importlib.util.spec_from_file_location("train_model", MODEL_PATH)
+    train_model = importlib.util.module_from_spec(spec)
+    sys.modules[train_model.__name__] = train_model
+    spec.loader.exec_module(train_model)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Redirigir todas las rutas de datos al directorio temporal
+        train_model.DATA_DIR = tmp_dir
+        train_model.FINAL_DATASET_PATH = os.path.join(tmp_dir, "final_dataset.csv")
+        train_model.BLACKLIST_PATH = os.path.join(tmp_dir, "blacklist.json")
+
+        n = 40
+        pd.DataFrame({
+            "id": range(1, n + 1), "MAL_ID": range(101, n + 101),
+            "user_score": [9.0, 8.0] + [np.nan] * (n - 2),
+            "my_status": ["Completed", "Completed"] + [""] * (n - 2),
+            "status": ["FINISHED"] * n, "title": [f"Anime {i}" for i in range(n)],
+            "genres": ["['Action', 'Drama']", "['Comedy']"] * (n // 2), "tags": ["['Magic']"] * n,
+            "score": [80] * n, "description": [f"story number {i % 5} about heroes" for i in range(n)],
+            "type": ["ANIME"] * n, "episodes": [12] * n, "siteUrl": ["url"] * n, "studios": ["['Studio A']"] * n,
+        }).to_csv(train_model.FINAL_DATASET_PATH, index=False)
+
+        with open(os.path.join(tmp_dir, "user_mal_list.json"), "w", encoding="utf-8") as f:
+            json.dump([{"anime_id": 101, "score": 9, "status": 2}, {"anime_id": 102, "score": 8, "status": 2}], f)
+
+        reads = []
+        original_read = train_model.read_final_dataset
+
+        def counting_read():
+            reads.append(1)
+            return original_read()
+
+        train_model.read_final_dataset = counting_read
+
+        output = train_model.main_with_json()
+        assert output is not None, "❌ main_with_json no generó recomendaciones."
+        assert len(reads) == 1, f"❌ El catálogo se cargó {len(reads)} veces en una petición."
+
+        with open(output, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        assert saved["statistics"]["total_anime_in_list"] == 2, "❌ Estadísticas incorrectas."
+        assert saved["statistics"]["total_animes_catalog"] == n, "❌ Tamaño de catálogo incorrecto."
+
+        # Misma versión -> mismo contexto; contenido nuevo -> se invalida
+        context = train_model.load_dataset_context()
+        assert train_model.load_dataset_context() is context and len(reads) == 1, \
+            "❌ El contexto no se reutilizó para la misma versión."
+
+        with open(train_model.FINAL_DATASET_PATH, "a", encoding="utf-8") as f:
+            f.write(f"{n + 1},{n + 101},,,FINISHED,Extra,[],[],80,extra,ANIME,1,url,[]\n")
+        assert train_model.load_dataset_context() is not context and len(reads) == 2, \
+            "❌ El contexto no se invalidó al cambiar el contenido."
+
+    print("✅ Catálogo cargado una sola vez por versión.")
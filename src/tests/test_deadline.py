@@ -0,0 +1,198 @@
+# src/tests/test_deadline.py
+
+import os
+import sys
+import json
+import time
+import tempfile
+import importlib.util
+import numpy as np
+import pandas as pd
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_deadline_cuts_mal_download_with_partial_list():
+    print("🔍 Test: deadline.py - presupuesto, propagación por entorno y descarga de MAL cortada")
+    from services import deadline
+    from services.deadline import Deadline, DeadlineExceeded
+    stand_ins = _load_module("benchmarks.stand_ins", os.path.join("benchmarks", "stand_ins.py"))
+    download_mal_list = _load_module("download_mal_list", os.path.join("data", "download_mal_list.py"))
+
+    assert deadline.parse_budget("1500") == 1.5 and deadline.parse_budget(None) == deadline.DEFAULT_BUDGET_MS / 1000
+    assert deadline.parse_budget(str(10 ** 9)) == deadline.MAX_BUDGET_MS / 1000, "❌ El presupuesto debe acotarse."
+    for invalid in ("abc", "0", "-5"):
+        try:
+            deadline.parse_budget(invalid)
+            assert False, f"❌ Presupuesto inválido aceptado: {invalid}"
+        except ValueError:
+            pass
+
+    budget = Deadline(2.0)
+    inherited = Deadline.from_env(budget.child_env({}))
+    assert abs(inherited.expires_at - budget.expires_at) < 1e-6, "❌ El subproceso debe heredar el mismo plazo."
+    assert deadline.current() is None and deadline.stage_timeout('mal_page') == deadline.STAGE_TIMEOUTS['mal_page']
+    with budget.activate():
+        assert deadline.current() is budget and deadline.stage_timeout('mal_page') <= 2.0
+    deadline.check('pipeline')  # sin plazo activo no hace nada
+
+    with stand_ins.StandIns(titles=1000, entries=900, latency=0) as servers:
+        download_mal_list.ENDPOINT_BASE = servers.env()["MAL_ENDPOINT_BASE"]
+        # Cada página tarda ~0.5 s (pausa entre peticiones): la tercera ya no cabe
+        with Deadline(1.5).activate():
+            try:
+                download_mal_list.fetch_user_list("usuario")
+                assert False, "❌ La descarga debía cortarse al agotarse el presupuesto."
+            except DeadlineExceeded as e:
+                assert e.stage == "mal_page", f"❌ Etapa inesperada: {e.stage}"
+                assert 0 < len(e.partial) < 900, f"❌ Lista parcial inesperada: {len(e.partial)} entradas"
+        assert len(download_mal_list.fetch_user_list("usuario")) == 900, "❌ Sin plazo la descarga es completa."
+
+    with stand_ins.StandIns(titles=100, entries=10, latency=3) as servers:
+        download_mal_list.ENDPOINT_BASE = servers.env()["MAL_ENDPOINT_BASE"]
+        t0 = time.perf_counter()
+        with Deadline(1.0).activate():
+            try:
+                download_mal_list.fetch_user_list("lento")
+                assert False, "❌ Una página lenta debe cortarse con el plazo."
+            except DeadlineExceeded as e:
+                assert e.partial == [], "❌ No se llegó a descargar ninguna página."
+        assert time.perf_counter() - t0 < 2.0, "❌ El timeout de la página debe ser el presupuesto restante."
+    print("✅ El presupuesto se propaga y corta la descarga.")
+
+
+def test_fallback_tiers():
+    print("🔍 Test: fallback.py - niveles caché, grafo de vecinos y popularidad")
+    from model.engine import RecommendationEngine, _clean_record
+    from model.filters import FilterIndex
+    from model.latent_model import nearest_neighbors
+    import services.recommendation_engine as recommendation_engine
+    fallback = _load_module("fallback", os.path.join("services", "fallback.py"))
+
+    rng = np.random.default_rng(7)
+    n_rows = 40
+    catalog = pd.DataFrame({
+        "id": np.arange(1, n_rows + 1),
+        "MAL_ID": np.arange(1, n_rows + 1) + 1000,
+        "title": [f"Anime {i}" for i in range(n_rows)],
+        "genres": ["Action"] * n_rows,
+        "score": np.where(np.arange(n_rows) % 2 == 0, 80.0, 60.0),
+        "episodes": np.full(n_rows, 12),
+    })
+    records = [_clean_record(row) for row in catalog.to_dict("records")]
+    embeddings = rng.normal(size=(n_rows, 4))
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        neighbors, similarities = nearest_neighbors(embeddings, 5)
+        np.save(os.path.join(tmp, "neighbors.npy"), neighbors)
+        np.save(os.path.join(tmp, "neighbor_similarities.npy"), similarities)
+        engine = RecommendationEngine(embeddings, catalog["id"].values, catalog["MAL_ID"].values,
+                                      FilterIndex.build(catalog), records, version="v-test", artifacts_dir=tmp,
+                                      popularity=np.arange(n_rows)[::-1].copy())
+        fallback.clear()
+        fallback.PRECOMPUTED_PATH = os.path.join(tmp, "recommendations.jsonl")
+
+        previous = recommendation_engine._engine
+        recommendation_engine._engine = engine
+        try:
+            partial = [{"anime_id": 1001, "score": 10}, {"anime_id": 1003, "score": 8}]
+            response = fallback.fallback_recommendations("demo", {}, top_n=5, entries=partial,
+                                                         stage="mal_page", exclude_mal_ids=[])
+            assert response["degraded"] and response["fallback"] == "neighbors", f"❌ Respuesta: {response}"
+            recommended = [r["MAL_ID"] for r in response["recommendations"]]
+            expected = set((neighbors[[0, 2]].ravel() + 1001).tolist()) - {1001, 1003}
+            assert set(recommended) <= expected, "❌ El respaldo debe votar solo por vecinos de la lista parcial."
+            assert all((m - 1001) % 2 == 0 for m in recommended), "❌ No se respetó min_score por defecto."
+
+            response = fallback.fallback_recommendations("demo", {}, top_n=3, entries=None,
+                                                         stage="pipeline", exclude_mal_ids=[1039])
+            assert response["fallback"] == "popularity", f"❌ Respuesta: {response}"
+            assert [r["MAL_ID"] for r in response["recommendations"]] == [1037, 1035, 1033], \
+                "❌ Popularidad con filtros y exclusiones incorrecta."
+
+            fallback.remember("Demo", {"genre": ["Action"]}, {
+                "status": "success", "model_version": "v-test", "timestamp": "t",
+                "recommendations": [{"MAL_ID": 1010}, {"MAL_ID": 1012}, {"MAL_ID": 1014}],
+            })
+            response = fallback.fallback_recommendations("demo", {"genre": ["Action"]}, top_n=5,
+                                                         stage="pipeline", exclude_mal_ids=[1012])
+            assert response["fallback"] == "cache", f"❌ Respuesta: {response}"
+            assert [r["MAL_ID"] for r in response["recommendations"]] == [1010, 1014], \
+                "❌ La caché no debe devolver animes excluidos después."
+
+            with open(fallback.PRECOMPUTED_PATH, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"username": "precalc", "status": "success", "generated_at": "g",
+                                    "recommendations": [{"MAL_ID": 1020}]}) + "\n")
+            response = fallback.fallback_recommendations("PreCalc", {}, stage="mal_page", exclude_mal_ids=[])
+            assert response.get("cache_source") != "precomputed", \
+                "❌ La petición no debe leer el JSONL: se indexa en el calentamiento o el refresco."
+            assert fallback.load_precomputed() == 1, "❌ El JSONL precalculado no se indexó."
+            response = fallback.fallback_recommendations("PreCalc", {}, stage="mal_page", exclude_mal_ids=[])
+            assert response["fallback"] == "cache" and response["cache_source"] == "precomputed", \
+                f"❌ No se usó la recomendación precalculada: {response}"
+        finally:
+            recommendation_engine._engine = previous
+            fallback.clear()
+    print("✅ Niveles de respaldo correctos.")
+
+
+def test_fallback_never_builds_engine():
+    print("🔍 Test: fallback.py - sin motor cargado usa los artefactos en solo lectura, sin construir nada")
+    from model.engine import RecommendationEngine, _clean_record
+    from model.filters import FilterIndex
+    from model.latent_model import nearest_neighbors
+    import model.artifacts as artifacts
+    import services.recommendation_engine as recommendation_engine
+    fallback = _load_module("fallback", os.path.join("services", "fallback.py"))
+
+    n_rows = 30
+    catalog = pd.DataFrame({
+        "id": np.arange(1, n_rows + 1), "MAL_ID": np.arange(1, n_rows + 1) + 1000,
+        "title": [f"Anime {i}" for i in range(n_rows)], "genres": ["Action"] * n_rows,
+        "score": np.full(n_rows, 80.0), "episodes": np.full(n_rows, 12),
+    })
+    records = [_clean_record(row) for row in catalog.to_dict("records")]
+    embeddings = np.random.default_rng(5).normal(size=(n_rows, 4))
+    engine = RecommendationEngine(embeddings, catalog["id"].values, catalog["MAL_ID"].values,
+                                  FilterIndex.build(catalog), records, version="v-ro",
+                                  popularity=np.arange(n_rows)[::-1].copy())
+
+    def forbidden_build():
+        raise AssertionError("❌ El respaldo no debe construir ni compilar el motor.")
+
+    previous = (recommendation_engine._engine, recommendation_engine.build_engine, artifacts.ARTIFACTS_DIR)
+    with tempfile.TemporaryDirectory() as tmp:
+        recommendation_engine._engine = None
+        recommendation_engine.build_engine = forbidden_build
+        artifacts.ARTIFACTS_DIR = tmp
+        fallback.clear()
+        try:
+            assert fallback.fallback_recommendations("demo", {}, entries=None, stage="pipeline",
+                                                     exclude_mal_ids=[]) is None, \
+                "❌ Sin motor ni artefactos no hay respaldo."
+
+            neighbors, similarities = nearest_neighbors(embeddings, 5)
+            artifacts.write_artifacts(engine, root=tmp, extra={"neighbors": neighbors,
+                                                               "neighbor_similarities": similarities})
+            partial = [{"anime_id": 1001, "score": 10}]
+            response = fallback.fallback_recommendations("demo", {}, top_n=5, entries=partial,
+                                                         stage="mal_page", exclude_mal_ids=[])
+            assert response["fallback"] == "neighbors" and response["model_version"] == "v-ro", \
+                f"❌ Respuesta: {response}"
+            assert not recommendation_engine.engine_loaded(), "❌ El respaldo no debe cargar el motor compartido."
+        finally:
+            recommendation_engine._engine, recommendation_engine.build_engine, artifacts.ARTIFACTS_DIR = previous
+            fallback.clear()
+    print("✅ Respaldo sin construir el motor.")
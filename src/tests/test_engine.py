@@ -0,0 +1,134 @@
+# src/tests/test_engine.py
+
+import os
+import sys
+import importlib.util
+import numpy as np
+import pandas as pd
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _mock_engine(n_rows=300, k=12):
+    engine_module = _load_module("engine", os.path.join("model", "engine.py"))
+    filters = _load_module("filters", os.path.join("model", "filters.py"))
+
+    rng = np.random.default_rng(3)
+    catalog = pd.DataFrame({
+        "id": np.arange(1, n_rows + 1),
+        "genres": rng.choice(["Action", "Drama", "Action Comedy"], n_rows),
+        "score": rng.integers(50, 95, n_rows),
+        "episodes": rng.integers(1, 50, n_rows),
+    })
+    records = [{"id": int(i)} for i in catalog["id"]]
+    engine = engine_module.RecommendationEngine(
+        rng.normal(size=(n_rows, k)), catalog["id"].values, catalog["id"].values + 5000,
+        filters.FilterIndex.build(catalog), records, version="test",
+    )
+    return engine, rng
+
+
+def test_batch_matches_single_user_scoring():
+    print("🔍 Test: engine.py - lote de usuarios vs. puntuación individual")
+    engine, rng = _mock_engine()
+    from model.ranking import top_n_rows
+
+    # Listas de MAL: puntuadas, sin puntuar (score 0) e IDs fuera del catálogo
+    user_lists = []
+    for _ in range(7):
+        mal_ids = rng.choice(engine.mal_ids, size=rng.integers(1, 15), replace=False)
+        user_lists.append([{"anime_id": int(m), "score": int(rng.integers(0, 11))} for m in mal_ids]
+                          + [{"anime_id": 999999, "score": 10}])
+    user_lists.append([])
+    filters = {"genre": ["Action"], "min_score": 60}
+    blacklist = [int(engine.mal_ids[0]), int(engine.mal_ids[1])]
+
+    batch = engine.recommend_batch(user_lists, top_n=10, filters=filters, exclude_mal_ids=blacklist, chunk_size=3)
+    assert len(batch) == len(user_lists), "❌ Debe haber un resultado por usuario."
+
+    base = engine.filter_index.mask(filters)
+    base[:2] = False
+    for entries, (rows, scores) in zip(user_lists, batch):
+        # Referencia: cosine_sim @ score_vector sobre los elegibles del usuario
+        score_vector = np.zeros(engine.n_rows)
+        eligible = base.copy()
+        for entry in entries:
+            row = entry["anime_id"] - 5001
+            if 0 <= row < engine.n_rows:
+                score_vector[row] = entry["score"] / 10.0
+                eligible[row] = False
+        dense = engine.embeddings @ (engine.embeddings.T @ score_vector)
+        candidates = np.flatnonzero(eligible)
+        expected_rows, expected_scores = top_n_rows(dense[candidates], candidates, 10)
+
+        assert rows.tolist() == expected_rows.tolist(), "❌ El ranking por lotes difiere del individual."
+        assert np.allclose(scores, expected_scores), "❌ Las puntuaciones por lotes difieren."
+
+    single_rows, _ = engine.recommend(user_lists[0], top_n=10, filters=filters, exclude_mal_ids=blacklist)
+    assert single_rows.tolist() == batch[0][0].tolist(), "❌ recommend() no coincide con el lote."
+    print("✅ Lote de usuarios idéntico a la puntuación individual.")
+
+
+def test_batch_applies_per_user_exclusions():
+    print("🔍 Test: engine.py - blacklist por usuario dentro del lote")
+    engine, rng = _mock_engine()
+
+    user_lists = [[{"anime_id": int(m), "score": 9}] for m in rng.choice(engine.mal_ids, size=3, replace=False)]
+    global_blacklist = [int(engine.mal_ids[0])]
+    plain = engine.recommend_batch(user_lists, top_n=10, exclude_mal_ids=global_blacklist)
+    # El usuario 0 excluye sus dos primeras recomendaciones; el resto no excluye nada propio
+    own = [int(m) for m in engine.mal_ids[plain[0][0][:2]]]
+    batch = engine.recommend_batch(user_lists, top_n=10, exclude_mal_ids=global_blacklist,
+                                   user_exclusions=[own, [], None])
+
+    single_rows, _ = engine.recommend(user_lists[0], top_n=10, exclude_mal_ids=global_blacklist + own)
+    assert batch[0][0].tolist() == single_rows.tolist(), "❌ La blacklist del usuario no se aplicó en el lote."
+    assert not set(engine.mal_ids[batch[0][0]].tolist()) & set(own)
+    for (rows, _), (expected, _) in zip(batch[1:], plain[1:]):
+        assert rows.tolist() == expected.tolist(), "❌ La blacklist de un usuario afectó a otro."
+    print("✅ Blacklist por usuario aplicada solo a su dueño.")
+
+
+def test_duplicate_mal_ids_exclude_every_row():
+    print("🔍 Test: engine.py - MAL_ID repetido en varias filas: se excluyen todas")
+    engine_module = _load_module("engine", os.path.join("model", "engine.py"))
+    engine, rng = _mock_engine()
+    # Las filas 200-259 repiten los MAL_ID de las filas 0-59 (catálogo con duplicados)
+    mal_ids = engine.mal_ids.copy()
+    mal_ids[200:260] = mal_ids[:60]
+    engine = engine_module.RecommendationEngine(engine.embeddings, engine.ids, mal_ids, engine.filter_index,
+                                                engine.records, version="test")
+
+    owners, rows = engine.all_rows_for_mal_ids([mal_ids[5], 999999, mal_ids[100]])
+    assert owners.tolist() == [0, 0, 2] and rows.tolist() == [5, 205, 100], f"❌ Filas inesperadas: {rows}"
+    assert engine.rows_for_mal_ids([mal_ids[5], 999999]).tolist() == [5, -1], "❌ La primera fila debe ser la 5."
+
+    seen = [int(m) for m in rng.choice(mal_ids[:60], size=10, replace=False)]
+    blacklist = [int(m) for m in mal_ids[60:120] if m not in seen][:5] + [int(mal_ids[30])]
+    own = [int(mal_ids[45])]
+    user_lists = [[{"anime_id": m, "score": 8} for m in seen], [{"anime_id": int(mal_ids[150]), "score": 9}]]
+    results = engine.recommend_batch(user_lists, top_n=engine.n_rows, exclude_mal_ids=blacklist,
+                                     user_exclusions=[own, []])
+    for u, (result_rows, _) in enumerate(results):
+        recommended = set(mal_ids[result_rows].tolist())
+        assert not recommended & set(blacklist), "❌ Una fila duplicada de la blacklist global se recomendó."
+        if u == 0:
+            assert not recommended & set(seen), "❌ Una fila duplicada de un anime visto se recomendó."
+            assert not recommended & set(own), "❌ Una fila duplicada de la blacklist del usuario se recomendó."
+
+    # Las filas repetidas no cuentan dos veces en el perfil
+    users, rows, weights = engine.user_matrix(user_lists[:1])
+    assert rows.size == 2 * len(seen) and np.count_nonzero(weights) == len(seen), \
+        "❌ Solo la primera fila de cada MAL_ID debe aportar al perfil."
+    print("✅ Todas las filas de un MAL_ID repetido quedan excluidas.")
@@ -0,0 +1,80 @@
+# src/tests/test_evaluate_quality.py
+
+import os
+import sys
+import tempfile
+import importlib.util
+
+import numpy as np
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_ranking_metrics_and_pareto_table():
+    print("🔍 Test: evaluate_quality.py - precision/recall/NDCG, frente de Pareto y configuración más barata")
+    evaluate = _load_module("evaluate_quality", os.path.join("benchmarks", "evaluate_quality.py"))
+
+    precision, recall, ndcg = evaluate.ranking_metrics([5, 1, 7, 2], {1, 2, 9}, k=4)
+    assert (precision, round(recall, 4)) == (0.5, 0.6667), "❌ precision@k o recall@k mal calculados."
+    expected = (1 / np.log2(3) + 1 / np.log2(5)) / (1 + 1 / np.log2(3) + 1 / np.log2(4))
+    assert abs(ndcg - expected) < 1e-12, f"❌ NDCG mal calculado: {ndcg} != {expected}"
+    assert evaluate.ranking_metrics([1, 2], {1, 2}, k=2)[2] == 1.0, "❌ Un ranking perfecto debe tener NDCG 1."
+
+    results = [
+        {"name": "grande", "ndcg@10": 0.30, "scoring_ms_mean": 2.0, "model_bytes": 400, "fit_seconds": 3.0},
+        {"name": "media", "ndcg@10": 0.295, "scoring_ms_mean": 1.0, "model_bytes": 100, "fit_seconds": 1.0},
+        {"name": "peor", "ndcg@10": 0.25, "scoring_ms_mean": 1.5, "model_bytes": 200, "fit_seconds": 0.5},
+        {"name": "mínima", "ndcg@10": 0.10, "scoring_ms_mean": 0.5, "model_bytes": 50, "fit_seconds": 0.2},
+    ]
+    evaluate.pareto_front(results, "ndcg@10")
+    assert [r["name"] for r in results if r["pareto"]] == ["grande", "media", "mínima"], \
+        "❌ Un punto dominado no puede estar en el frente de Pareto."
+    assert evaluate.cheapest_within(results, "ndcg@10", tolerance=0.02)["name"] == "media", \
+        "❌ Debe elegirse la más barata que mantiene la calidad."
+    print("✅ Métricas de ranking y tabla de Pareto correctas.")
+
+
+def test_sweep_point_measures_quality_and_cost():
+    print("🔍 Test: evaluate_quality.py - un punto del barrido sobre usuarios sintéticos con gustos")
+    evaluate = _load_module("evaluate_quality", os.path.join("benchmarks", "evaluate_quality.py"))
+    synthetic = _load_module("benchmarks.synthetic", os.path.join("benchmarks", "synthetic.py"))
+
+    with tempfile.TemporaryDirectory() as tmp, synthetic.redirect_data_dir(tmp):
+        from model.train_model import read_catalog, add_combined_features
+        from model.filters import FilterIndex
+
+        media = synthetic.generate_media(600, seed=1)
+        synthetic.catalog_frame(media).to_csv(os.path.join(tmp, "merged_anime.csv"), index=False)
+        df = add_combined_features(read_catalog())
+        row_of = {int(mal_id): row for row, mal_id in enumerate(df["MAL_ID"].tolist())}
+        rng = np.random.default_rng(0)
+        users = [evaluate.split_user(synthetic.generate_taste_list(media, 60, seed=u), row_of, 0.2, 7, rng)
+                 for u in range(20)]
+        users = [user for user in users if user is not None]
+        assert users, "❌ Los usuarios sintéticos deben tener títulos relevantes apartados."
+        for rows, weights, relevant in users:
+            assert not relevant & set(rows.tolist()), "❌ Un título apartado no puede estar en el perfil."
+
+        masks = {0: FilterIndex.build(df).mask({"min_score": 0})}
+        results = []
+        for point in evaluate.sweep_points(["svd", "sparse"], [2000], [50], ["float32"]):
+            results.extend(evaluate.evaluate_point(df, users, masks, 10, **point))
+
+    assert [(r["engine"], r["precision"]) for r in results] == [("svd", "float32"), ("sparse", "float64")]
+    for result in results:
+        assert result["ndcg@10"] > 0, f"❌ Sin aciertos en {result['engine']}: los gustos deberían notarse."
+        assert result["fit_seconds"] > 0 and result["fit_peak_bytes"] > 0 and result["scoring_ms_mean"] > 0, \
+            "❌ Faltan medidas de coste."
+    assert results[0]["model_bytes"] == 600 * 50 * 4, "❌ El modelo float32 debe ocupar n×k×4 bytes."
+    print("✅ Calidad y coste medidos por configuración.")
@@ -0,0 +1,73 @@
+# src/tests/test_feature_store.py
+
+import os
+import sys
+import ast
+import importlib.util
+import tempfile
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+SCRIPT_PATH = os.path.join(SRC_DIR, "model", "feature_store.py")
+
+
+def _load_module():
+    spec = importlib.util.spec_from_file_location("feature_store", SCRIPT_PATH)
+    feature_store = importlib.util.module_from_spec(spec)
+    sys.modules[feature_store.__name__] = feature_store
+    spec.loader.exec_module(feature_store)
+    return feature_store
+
+
+def test_join_list_column_matches_literal_eval():
+    print("🔍 Test: feature_store.py - listas serializadas vectorizadas")
+    feature_store = _load_module()
+
+    series = pd.Series([
+        "['Action', 'Slice of Life']", "[]", np.nan, "['Drama']",
+        "[\"Director's Cut\", 'Boys Love']", "sin lista",
+        # Casos que el corte vectorizado no resuelve: pasan por literal_eval
+        "['Director\\'s Cut']", "['Sci-Fi, Fantasy', 'Drama']", "[\"A\\\\B\", 'C']", "['Mecha' , 'Space']",
+        "[1, 'Drama']", "[ 'Romance']", "[\"Say \\\"hi\\\"\", 'Comedy']",
+    ])
+    # Implementación original de load_data (literal_eval por fila)
+    expected = series.apply(
+        lambda x: ast.literal_eval(x) if pd.notna(x) and isinstance(x, str) and '[' in x else []
+    ).apply(lambda x: ' '.join([str(i).replace(" ", "") for i in x]))
+
+    result = feature_store.join_list_column(series)
+    assert list(result) == list(expected), f"❌ Resultado vectorizado distinto: {list(result)}"
+    print("✅ join_list_column equivale a literal_eval + join.")
+
+
+def test_feature_store_reuses_tokens():
+    print("🔍 Test: feature_store.py - tokens cacheados por contenido")
+    feature_store = _load_module()
+
+    texts = pd.Series([
+        "Naruto Action Adventure ninja village",
+        "One Piece Action pirates the grand line",
+        "K-On! SliceofLife music school club",
+    ])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "feature_store.pkl")
+        store = feature_store.FeatureStore(path)
+        tokens = store.tokens(texts)
+        assert store.last_stats == {"hits": 0, "misses": 3}, f"❌ Estadísticas inesperadas: {store.last_stats}"
+
+        # Nuevo proceso: solo el título modificado se vuelve a tokenizar
+        changed = texts.copy()
+        changed.iloc[1] = "One Piece Action pirates and treasure"
+        store = feature_store.FeatureStore(path)
+        store.tokens(changed)
+        assert store.last_stats == {"hits": 2, "misses": 1}, f"❌ Se re-tokenizaron títulos sin cambios: {store.last_stats}"
+
+    original = TfidfVectorizer(stop_words='english').fit_transform(texts)
+    cached = TfidfVectorizer(analyzer=feature_store.identity_analyzer).fit_transform(tokens)
+    assert abs(original - cached).max() == 0, "❌ La matriz TF-IDF con tokens cacheados difiere."
+    print("✅ Tokens reutilizados y TF-IDF idéntico.")
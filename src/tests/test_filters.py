@@ -0,0 +1,105 @@
+# src/tests/test_filters.py
+
+import os
+import sys
+import importlib.util
+import tempfile
+import numpy as np
+import pandas as pd
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+SCRIPT_PATH = os.path.join(SRC_DIR, "model", "filters.py")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module():
+    spec = importlib.util.spec_from_file_location("filters", SCRIPT_PATH)
+    filters = importlib.util.module_from_spec(spec)
+    sys.modules[filters.__name__] = filters
+    spec.loader.exec_module(filters)
+    return filters
+
+
+def _mock_catalog():
+    # Mismo formato que devuelve load_data: géneros/tags unidos por espacios
+    return pd.DataFrame({
+        "id": [1, 2, 3, 4, 5],
+        "genres": ["Action Drama", "Action", "SliceofLife", "Drama", ""],
+        "tags": ["Magic", "", "School Magic", "School", "Magic"],
+        "studios": ["['Studio A']", "['Studio B']", "['Studio A', 'Kyoto Animation']", "[]", None],
+        "Tipo": ["TV", "MOVIE", "TV", "TV", "OVA"],
+        "status": ["FINISHED", "FINISHED", "RELEASING", "FINISHED", "FINISHED"],
+        "score": [80, 65, 90, 75, np.nan],
+        "episodes": [12, 1, np.nan, 24, 2],
+    })
+
+
+def test_filter_index_masks():
+    print("🔍 Test: filters.py - combinación de bitmaps")
+    filters = _load_module()
+    index = filters.FilterIndex.build(_mock_catalog())
+
+    def rows(params):
+        return np.flatnonzero(index.mask(params)).tolist()
+
+    assert rows({}) == [0, 1, 2, 3, 4], "❌ Sin filtros deben pasar todas las filas."
+    assert rows({"genre": ["Action"]}) == [0, 1], "❌ Filtro por género incorrecto."
+    assert rows({"genre": ["action", "drama"]}) == [0], "❌ Los géneros deben combinarse con AND."
+    assert rows({"genre": ["Slice of Life"]}) == [2], "❌ Los nombres con espacios deben normalizarse."
+    assert rows({"studio": ["Kyoto Animation"]}) == [2], "❌ Filtro por estudio incorrecto."
+    assert rows({"type": ["MOVIE", "OVA"]}) == [1, 4], "❌ Los tipos deben combinarse con OR."
+    assert rows({"tag": ["Magic"], "status": ["FINISHED"]}) == [0, 4], "❌ Tag + estado incorrecto."
+    assert rows({"min_score": 70}) == [0, 2, 3], "❌ Filtro de score mínimo incorrecto."
+    assert rows({"min_episodes": 2, "max_episodes": 12}) == [0, 4], "❌ Rango de episodios incorrecto."
+    assert rows({"genre": ["Inexistente"]}) == [], "❌ Un valor desconocido no debe coincidir con nada."
+    print("✅ Máscaras de filtros correctas.")
+
+
+def test_filter_index_cache_and_params():
+    print("🔍 Test: filters.py - caché por versión y parseo de parámetros")
+    filters = _load_module()
+    df = _mock_catalog()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        first = filters.get_filter_index(df, cache_dir=cache_dir)
+        assert len(os.listdir(cache_dir)) == 1, "❌ El índice no se guardó en disco."
+
+        filters._INDEX_CACHE.clear()
+        reloaded = filters.get_filter_index(df, cache_dir=cache_dir)
+        assert reloaded.version == first.version, "❌ La versión del catálogo cambió sin cambios."
+        assert np.array_equal(reloaded.mask({"genre": ["Drama"]}), first.mask({"genre": ["Drama"]})), \
+            "❌ El índice recargado no coincide con el original."
+
+        # Solo se conservan en memoria las versiones más recientes del catálogo
+        for score in (81, 82, 83):
+            filters.get_filter_index(df.assign(score=score), cache_dir=cache_dir)
+        assert len(filters._INDEX_CACHE) == filters.INDEX_CACHE_SIZE, "❌ La caché de índices no debe crecer sin límite."
+        assert reloaded.version not in filters._INDEX_CACHE, "❌ Las versiones antiguas deben descartarse."
+
+        # Con la versión del catálogo ya calculada no se recorre el DataFrame
+        def no_fingerprint(*args):
+            raise AssertionError("❌ No se debe calcular la huella del DataFrame con catalog_version.")
+
+        previous, filters.frame_fingerprint = filters.frame_fingerprint, no_fingerprint
+        try:
+            by_version = filters.get_filter_index(df, cache_dir=cache_dir, catalog_version="catalog-abc")
+            filters._INDEX_CACHE.clear()  # otro proceso: se lee de disco
+            from_disk = filters.get_filter_index(df, cache_dir=cache_dir, catalog_version="catalog-abc")
+        finally:
+            filters.frame_fingerprint = previous
+        assert from_disk.version == by_version.version != first.version, "❌ Versión por catálogo inesperada."
+        assert np.array_equal(from_disk.mask({"genre": ["Drama"]}), first.mask({"genre": ["Drama"]})), \
+            "❌ El índice por versión de catálogo no coincide con el original."
+
+    params = filters.parse_filter_params({"genre": "Action,Drama", "min_score": "75"})
+    assert params == {"genre": ["Action", "Drama"], "min_score": 75.0}, f"❌ Parseo incorrecto: {params}"
+
+    for invalid in ({"min_episodes": "abc"}, {"min_score": "nan"}, {"max_episodes": "inf"}, {"min_score": "-Infinity"}):
+        try:
+            filters.parse_filter_params(invalid)
+            assert False, f"❌ Un parámetro numérico inválido debe lanzar ValueError: {invalid}"
+        except ValueError:
+            pass
+    print("✅ Caché y parseo de filtros correctos.")
@@ -0,0 +1,101 @@
+# src/tests/test_load_test.py
+
+import os
+import sys
+import importlib.util
+
+import requests
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_stand_ins_serve_mal_and_anilist_pages():
+    print("🔍 Test: stand_ins.py - paginación de MAL, consulta Page de AniList y límite de peticiones")
+    stand_ins = _load_module("benchmarks.stand_ins", os.path.join("benchmarks", "stand_ins.py"))
+    download_mal_list = _load_module("download_mal_list", os.path.join("data", "download_mal_list.py"))
+    fetch_datasets = _load_module("fetch_datasets", os.path.join("data", "fetch_datasets.py"))
+
+    with stand_ins.StandIns(titles=400, entries=350, latency=0, missing_users=["nadie"]) as servers:
+        env = servers.env()
+        download_mal_list.ENDPOINT_BASE = env["MAL_ENDPOINT_BASE"]
+        fetch_datasets.ANILIST_API = env["ANILIST_API"]
+
+        entries = download_mal_list.fetch_user_list("Usuario")
+        assert len(entries) == 350, f"❌ Se esperaban 350 entradas en dos páginas, hay {len(entries)}"
+        assert entries == download_mal_list.fetch_user_list("usuario"), "❌ La lista de un usuario no es estable."
+        assert download_mal_list.fetch_user_list("nadie") is None, "❌ Un usuario inexistente debe dar 404."
+
+        page = fetch_datasets.fetch_page(2, per_page=50)
+        assert [m["id"] for m in page] == [m["id"] for m in servers.anilist.media[50:100]], \
+            "❌ La página 2 de AniList no corresponde al catálogo."
+        assert {e["anime_id"] for e in entries} <= {m["idMal"] for m in servers.anilist.media}, \
+            "❌ Las listas de MAL usan IDs fuera del catálogo de AniList."
+        assert servers.counters()["mal"]["requests"] == 7, f"❌ Peticiones a MAL: {servers.counters()}"
+
+    with stand_ins.StandIns(titles=100, entries=10, rate_limit=1, burst=1) as servers:
+        url = servers.env()["MAL_ENDPOINT_BASE"].format(user="u", offset=0)
+        assert requests.get(url, timeout=5).status_code == 200
+        limited = requests.get(url, timeout=5)
+        assert limited.status_code == 429 and int(limited.headers["Retry-After"]) >= 1, \
+            "❌ Al superar el límite debe responder 429 con Retry-After."
+    print("✅ Sustitutos de MAL y AniList correctos.")
+
+
+def test_load_report_percentiles_and_error_rates():
+    print("🔍 Test: load_test.py - mix de escenarios e informe de throughput, percentiles y errores")
+    load_test = _load_module("load_test", os.path.join("benchmarks", "load_test.py"))
+
+    assert load_test.parse_mix("recommendations=3,blacklist_get") == {"recommendations": 3.0, "blacklist_get": 1.0}
+    try:
+        load_test.parse_mix("recommendations=1,desconocido=1")
+        assert False, "❌ Un escenario desconocido debe rechazarse."
+    except ValueError:
+        pass
+
+    samples = [("recommendations", 200, (i + 1) / 1000, None) for i in range(90)]
+    samples += [("recommendations", 400, 0.5, None)] * 5 + [("blacklist_get", None, 2.0, "ReadTimeout")] * 5
+    summary = load_test.summarize(samples, elapsed=10.0)
+
+    total = summary["total"]
+    assert total["requests"] == 100 and total["throughput_rps"] == 10.0, "❌ Throughput mal calculado."
+    assert total["errors"] == 10 and total["error_rate"] == 0.1, "❌ Tasa de errores mal calculada."
+    assert total["status"] == {"200": 90, "400": 5, "ReadTimeout": 5}, f"❌ Códigos: {total['status']}"
+    recommendations = summary["scenarios"]["recommendations"]
+    assert recommendations["latency_ms"]["p50"] == 48.0 and recommendations["latency_ms"]["max"] == 500.0, \
+        f"❌ Percentiles: {recommendations['latency_ms']}"
+    assert summary["scenarios"]["blacklist_get"]["error_rate"] == 1.0
+    print("✅ Informe de carga correcto.")
+
+
+def test_load_test_isolates_api_state():
+    print("🔍 Test: load_test.py - sin catálogo no arranca y el estado de la API va a un directorio temporal")
+    import tempfile
+    load_test = _load_module("load_test", os.path.join("benchmarks", "load_test.py"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        previous = load_test.CATALOG_PATH
+        load_test.CATALOG_PATH = os.path.join(tmp, "merged_anime.csv")
+        try:
+            assert load_test.main(["--output", os.path.join(tmp, "out.json")]) == 1, \
+                "❌ Sin catálogo real no debe arrancarse la API."
+        finally:
+            load_test.CATALOG_PATH = previous
+        assert not os.path.exists(os.path.join(tmp, "out.json")), "❌ No debe haberse lanzado la carga."
+
+        env = load_test.isolated_env(tmp)
+        assert env["BLACKLIST_DB_PATH"].startswith(tmp) and env["DATA_LOCK_DIR"].startswith(tmp), \
+            "❌ La blacklist y los locks de la API deben ir al directorio temporal."
+        blacklist_store = _load_module("blacklist_store_isolated", os.path.join("data", "blacklist_store.py"))
+        assert not blacklist_store.BLACKLIST_DB_PATH.startswith(tmp), "❌ Sin la variable se usa data/."
+    print("✅ Prueba de carga aislada de data/.")
@@ -0,0 +1,75 @@
+# src/tests/test_metrics.py
+
+import os
+import sys
+import tempfile
+import importlib.util
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_prometheus_exposition():
+    print("🔍 Test: metrics.py - histogramas por etapa y ratio de aciertos en formato Prometheus")
+    metrics = _load_module("metrics", os.path.join("monitoring", "metrics.py"))
+
+    for seconds in (0.004, 0.02, 0.3):
+        metrics.observe_stage("tfidf", seconds)
+    metrics.cache_result("latent_model", "hit", 3)
+    metrics.cache_result("latent_model", "miss")
+    with metrics.IN_FLIGHT.track(kind="pipeline"):
+        inside = metrics.REGISTRY.render()
+    text = metrics.REGISTRY.render()
+
+    assert 'recommender_in_flight{kind="pipeline"} 1' in inside, "❌ No se contó el trabajo en curso."
+    assert 'recommender_in_flight{kind="pipeline"} 0' in text, "❌ El trabajo en curso no se descontó."
+    assert 'recommender_stage_duration_seconds_bucket{stage="tfidf",le="0.005"} 1' in text, "❌ Bucket incorrecto."
+    assert 'recommender_stage_duration_seconds_bucket{stage="tfidf",le="0.025"} 2' in text, "❌ Los buckets deben ser acumulados."
+    assert 'recommender_stage_duration_seconds_bucket{stage="tfidf",le="+Inf"} 3' in text, "❌ Falta el bucket +Inf."
+    assert 'recommender_stage_duration_seconds_count{stage="tfidf"} 3' in text, "❌ Conteo incorrecto."
+    assert 'recommender_cache_hit_ratio{cache="latent_model"} 0.75' in text, "❌ Ratio de aciertos incorrecto."
+    assert "# TYPE recommender_stage_duration_seconds histogram" in text, "❌ Falta la cabecera TYPE."
+    print("✅ Exposición Prometheus correcta.")
+
+
+def test_subprocess_events_and_worker_merge():
+    print("🔍 Test: metrics.py - etapas del subproceso y suma de workers")
+    metrics = _load_module("metrics", os.path.join("monitoring", "metrics.py"))
+
+    # Subproceso del pipeline: recoge eventos y los devuelve en su salida
+    metrics.collect_events()
+    with metrics.stage("merge"):
+        pass
+    metrics.cache_result("profile", "delta")
+    events = metrics.export_events()
+    assert [name for name, _ in events["stages"]] == ["merge"], f"❌ Eventos inesperados: {events}"
+
+    # Proceso de la API: los incorpora a su registro
+    api = _load_module("metrics", os.path.join("monitoring", "metrics.py"))
+    api.import_events(events)
+    assert api.STAGE_DURATION.count(stage="merge") == 1, "❌ No se importaron las etapas del subproceso."
+    assert api.CACHE_REQUESTS.get(cache="profile", result="delta") == 1, "❌ No se importaron los cachés."
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Volcado de otro worker vivo (el proceso padre de pytest)
+        other = metrics.Registry()
+        other.histogram("recommender_stage_duration_seconds", "x", ("stage",)).observe(0.2, stage="merge")
+        from data.storage import write_json
+        write_json(os.path.join(tmp, f"{os.getppid()}.json"), other.snapshot())
+        write_json(os.path.join(tmp, "999999999.json"), other.snapshot())
+
+        text = api.REGISTRY.render(tmp)
+        assert 'recommender_stage_duration_seconds_count{stage="merge"} 2' in text, "❌ No se sumaron los workers."
+        assert os.path.exists(os.path.join(tmp, f"{os.getpid()}.json")), "❌ El worker no volcó su registro."
+        assert not os.path.exists(os.path.join(tmp, "999999999.json")), "❌ Quedó el volcado de un worker muerto."
+    print("✅ Eventos del subproceso y workers agregados.")
@@ -0,0 +1,121 @@
+# src/tests/test_model_refresher.py
+
+import os
+import sys
+import time
+import tempfile
+import threading
+import importlib.util
+import numpy as np
+import pandas as pd
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _mock_engine(version, seed, n_rows=40):
+    from model.engine import RecommendationEngine, _clean_record
+    from model.filters import FilterIndex
+
+    catalog = pd.DataFrame({
+        "id": np.arange(1, n_rows + 1),
+        "MAL_ID": np.arange(1, n_rows + 1) + 100,
+        "title": [f"Anime {i}" for i in range(n_rows)],
+        "genres": ["Action"] * n_rows,
+        "score": np.full(n_rows, 80.0),
+        "episodes": np.full(n_rows, 12),
+    })
+    records = [_clean_record(row) for row in catalog.to_dict("records")]
+    return RecommendationEngine(np.random.default_rng(seed).normal(size=(n_rows, 4)), catalog["id"].values,
+                                catalog["MAL_ID"].values, FilterIndex.build(catalog), records, version=version)
+
+
+def test_refresh_swaps_after_in_flight_requests_drain():
+    print("🔍 Test: model_refresher.py - cambio atómico sin cortar las peticiones en curso")
+    from model.artifacts import write_artifacts
+    import services.recommendation_engine as recommendation_engine
+    model_refresher = _load_module("model_refresher", os.path.join("services", "model_refresher.py"))
+
+    previous_engine, previous_path = recommendation_engine._engine, recommendation_engine.MERGED_ANIME_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        recommendation_engine.MERGED_ANIME_PATH = os.path.join(tmp, "no_catalog.csv")
+        try:
+            write_artifacts(_mock_engine("v1", 1), tmp)
+            recommendation_engine._engine = recommendation_engine.open_engine(tmp)
+            refresher = model_refresher.ModelRefresher(interval=0, root=tmp, drain_timeout=30)
+            assert refresher.refresh()["status"] == "unchanged", "❌ Sin versión nueva no debe haber cambio."
+
+            write_artifacts(_mock_engine("v2", 2), tmp)
+            results = []
+            with recommendation_engine.engine_lease() as in_flight:
+                worker = threading.Thread(target=lambda: results.append(refresher.refresh()))
+                worker.start()
+                deadline = time.time() + 30
+                while recommendation_engine._engine.version != "v2" and time.time() < deadline:
+                    time.sleep(0.01)
+                assert recommendation_engine._engine.version == "v2", "❌ No se publicó la versión nueva."
+                assert in_flight.version == "v1", "❌ La petición en curso cambió de versión."
+                assert not results, "❌ La versión antigua se liberó antes de terminar la petición."
+                rows, _ = in_flight.recommend([[101, 10]], top_n=3)
+                assert rows.size == 3, "❌ La versión antigua dejó de responder durante el cambio."
+            worker.join(30)
+        finally:
+            recommendation_engine._engine = previous_engine
+            recommendation_engine.MERGED_ANIME_PATH = previous_path
+
+        result = results[0]
+        assert result["status"] == "swapped" and result["previous_version"] == "v1", f"❌ Resultado: {result}"
+        assert result["drained"], "❌ El cambio no esperó a que terminaran las peticiones."
+        assert recommendation_engine.active_leases(in_flight) == 0, "❌ Quedaron reservas sobre v1."
+    print("✅ Motor sustituido tras drenar las peticiones en curso.")
+
+
+def test_refresh_compiles_stale_catalog_and_prunes_versions():
+    print("🔍 Test: model_refresher.py - compila si el catálogo cambió y conserva solo las últimas versiones")
+    from model.artifacts import write_artifacts, current_version
+    import services.recommendation_engine as recommendation_engine
+    model_refresher = _load_module("model_refresher", os.path.join("services", "model_refresher.py"))
+
+    previous_engine, previous_path = recommendation_engine._engine, recommendation_engine.MERGED_ANIME_PATH
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog_path = os.path.join(tmp, "merged_anime.csv")
+        with open(catalog_path, "w") as f:
+            f.write("id\n1\n")
+        recommendation_engine.MERGED_ANIME_PATH = catalog_path
+        compiled = []
+
+        def compiler(root):
+            version = f"v{len(compiled) + 2}"
+            write_artifacts(_mock_engine(version, len(compiled) + 2), root,
+                            metadata={"source_fingerprint": recommendation_engine.catalog_fingerprint()})
+            compiled.append(version)
+
+        try:
+            write_artifacts(_mock_engine("v1", 1), tmp, metadata={"source_fingerprint": "viejo"})
+            recommendation_engine._engine = recommendation_engine.open_engine(tmp)
+            refresher = model_refresher.ModelRefresher(interval=0, root=tmp, compiler=compiler)
+
+            result = refresher.refresh()
+            assert compiled == ["v2"] and result["status"] == "swapped", f"❌ No se compiló la versión nueva: {result}"
+            assert refresher.refresh()["status"] == "unchanged", "❌ Se recompiló un catálogo sin cambios."
+
+            time.sleep(0.01)
+            result = refresher.refresh(force=True)
+            assert compiled == ["v2", "v3"] and recommendation_engine._engine.version == "v3", "❌ Falló el refresco forzado."
+            assert result["pruned"] == ["v1"], f"❌ Versiones borradas inesperadas: {result['pruned']}"
+            assert current_version(tmp) == "v3" and sorted(os.listdir(tmp)).count("v2") == 1, \
+                "❌ Se debe conservar la versión anterior para los workers que aún no cambiaron."
+        finally:
+            recommendation_engine._engine = previous_engine
+            recommendation_engine.MERGED_ANIME_PATH = previous_path
+    print("✅ Versión nueva compilada, publicada y versiones antiguas podadas.")
@@ -0,0 +1,135 @@
+# src/tests/test_pagination.py
+
+import os
+import sys
+import importlib
+import importlib.util
+
+import numpy as np
+import pandas as pd
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_cursor_round_trip_and_validation():
+    print("🔍 Test: pagination.py - cursor opaco, límites y páginas")
+    pagination = _load_module("pagination", os.path.join("services", "pagination.py"))
+
+    key = pagination.fingerprint("Usuario", {"genre": ["Action"]})
+    assert key == pagination.fingerprint("usuario ", {"genre": ["Action"]}), "❌ La huella no debe depender de mayúsculas."
+    cursor = pagination.decode_cursor(pagination.encode_cursor(40, "v1", key))
+    assert cursor == {"offset": 40, "version": "v1", "fingerprint": key}
+    assert pagination.check_cursor(cursor, "v1", key) == 40 and pagination.check_cursor(None, "v1", key) == 0
+    for version, other_key in (("v2", key), ("v1", pagination.fingerprint("usuario", {}))):
+        try:
+            pagination.check_cursor(cursor, version, other_key)
+            assert False, "❌ Un cursor de otro ranking debe rechazarse."
+        except pagination.CursorError:
+            pass
+    # Cursor alterado por el cliente: mismo contenido con otro offset, sin firma válida
+    payload, signature = pagination.encode_cursor(40, "v1", key).split(".")
+    forged = pagination._b64encode(b'{"o":1000000000,"v":"v1","f":"%s"}' % key.encode()) + "." + signature
+    for invalid in ("no-es-un-cursor", payload, forged, pagination.encode_cursor(-1, None, key),
+                    pagination.encode_cursor(pagination.RANKED_CANDIDATES, None, key)):
+        try:
+            pagination.decode_cursor(invalid)
+            assert False, f"❌ Cursor inválido aceptado: {invalid}"
+        except pagination.CursorError:
+            pass
+
+    # offset + limit nunca pasa del tope de candidatos
+    cap = pagination.RANKED_CANDIDATES
+    assert pagination.page_limit(0, 20) == 20 and pagination.page_limit(cap - 5, 20) == 5
+    try:
+        pagination.page_limit(cap, 20)
+        assert False, "❌ Un offset más allá del tope debe rechazarse."
+    except pagination.CursorError:
+        pass
+    assert pagination.page(list(range(cap)), cap - 10, 10, None, key, has_more=True)[1] is None, \
+        "❌ La página que llega al tope no debe ofrecer cursor siguiente."
+
+    assert pagination.parse_limit(None) == pagination.DEFAULT_LIMIT and pagination.parse_limit("25") == 25
+    for invalid in ("0", "1000", "x"):
+        try:
+            pagination.parse_limit(invalid)
+            assert False, f"❌ limit inválido aceptado: {invalid}"
+        except ValueError:
+            pass
+
+    items = list(range(25))
+    first, next_cursor = pagination.page(items, 0, 10, "v1", key)
+    last, end = pagination.page(items, 20, 10, "v1", key)
+    assert first == list(range(10)) and pagination.decode_cursor(next_cursor)["offset"] == 10
+    assert last == [20, 21, 22, 23, 24] and end is None, "❌ La última página no debe tener cursor."
+    assert pagination.page(items[:10], 0, 10, None, key, has_more=True)[1] is not None, \
+        "❌ Una lista truncada debe ofrecer la página siguiente."
+    print("✅ Cursor y páginas correctos.")
+
+
+def test_serving_pages_reuse_cached_ranking():
+    print("🔍 Test: serving.py - páginas sucesivas desde el ranking cacheado, sin volver a descargar")
+    from model.engine import RecommendationEngine, _clean_record
+    from model.filters import FilterIndex
+    import services.recommendation_engine as recommendation_engine
+    from services import pagination
+    stand_ins = _load_module("benchmarks.stand_ins", os.path.join("benchmarks", "stand_ins.py"))
+    serving = _load_module("serving", os.path.join("services", "serving.py"))
+    download_mal_list = importlib.import_module("data.download_mal_list")
+
+    with stand_ins.StandIns(titles=300, entries=40, latency=0) as servers:
+        download_mal_list.ENDPOINT_BASE = servers.env()["MAL_ENDPOINT_BASE"]
+        media = servers.anilist.media
+        catalog = pd.DataFrame({
+            "id": [m["id"] for m in media], "MAL_ID": [m["idMal"] for m in media],
+            "title": [f"Anime {i}" for i in range(len(media))], "genres": ["Action"] * len(media),
+            "score": np.full(len(media), 80.0), "episodes": np.full(len(media), 12),
+        })
+        records = [_clean_record(row) for row in catalog.to_dict("records")]
+        engine = RecommendationEngine(np.random.default_rng(3).normal(size=(len(media), 8)), catalog["id"].values,
+                                      catalog["MAL_ID"].values, FilterIndex.build(catalog), records, version="v1")
+
+        previous = recommendation_engine._engine
+        recommendation_engine._engine = engine
+        pagination.ranked_cache.clear()
+        try:
+            entries = download_mal_list.fetch_user_list("lector")
+            expected_rows, _ = engine.recommend(entries, top_n=len(media), filters={"min_score": 70},
+                                                exclude_mal_ids=[])
+            expected = [int(m) for m in engine.mal_ids[expected_rows]]
+
+            seen, cursor, pages = [], None, 0
+            requests_before = servers.counters()["mal"]["requests"]
+            while True:
+                response = serving.recommend_for_user("lector", top_n=25, exclude_mal_ids=[], cursor=cursor)
+                assert response["status"] == "success", f"❌ Respuesta: {response}"
+                seen.extend(r["MAL_ID"] for r in response["recommendations"])
+                pages += 1
+                if response["next_cursor"] is None:
+                    break
+                cursor = pagination.decode_cursor(response["next_cursor"])
+            assert seen == expected, "❌ Las páginas concatenadas deben ser el ranking completo, sin huecos ni repetidos."
+            assert pages == -(-len(expected) // 25), f"❌ Páginas inesperadas: {pages}"
+            assert servers.counters()["mal"]["requests"] - requests_before == 2, \
+                "❌ Solo la primera página debe descargar la lista de MAL (una página y el final)."
+
+            engine.version = "v2"
+            stale = serving.recommend_for_user("lector", top_n=25, exclude_mal_ids=[],
+                                               cursor=pagination.decode_cursor(
+                                                   pagination.encode_cursor(25, "v1", pagination.fingerprint("lector"))))
+            assert stale["status"] == "error" and "caducó" in stale["message"], \
+                "❌ Un cursor de otra versión del modelo debe rechazarse."
+        finally:
+            recommendation_engine._engine = previous
+            pagination.ranked_cache.clear()
+    print("✅ Paginación sobre el ranking cacheado correcta.")
@@ -0,0 +1,99 @@
+# src/tests/test_payload.py
+
+import os
+import sys
+import gzip
+import json
+import importlib.util
+
+import numpy as np
+import pandas as pd
+from flask import Flask, jsonify, request
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_projection_and_truncation():
+    print("🔍 Test: payload.py - proyección de campos, recorte de sinopsis y registros sin JSON intermedio")
+    payload = _load_module("payload", os.path.join("api", "payload.py"))
+    from model.engine import frame_records
+
+    recs = pd.DataFrame({
+        "id": [1, 2], "MAL_ID": [101, 102], "title": ["Uno", "Dos"], "score": [81.0, np.nan],
+        "genres": ["Action", "Drama"], "description": ["palabra " * 100, "corta"], "Tipo": ["TV", "MOVIE"],
+        "episodes": [12, 1], "combined_features": ["x " * 500, "y " * 500], "user_score": [0, 0],
+    })
+    records = frame_records(recs, np.array([0.9, 0.5]))
+    assert "combined_features" not in records[0] and "user_score" not in records[0], \
+        "❌ Las columnas internas no deben llegar a la respuesta."
+    assert records[1]["type"] == "MOVIE" and records[1]["score"] == 0.0 and records[0]["hybrid_score"] == 0.9
+    json.dumps(records)  # tipos nativos, serializables sin conversión
+
+    fields = payload.parse_fields("title, MAL_ID,hybrid_score")
+    assert fields == ("MAL_ID", "title", "hybrid_score"), f"❌ Campos inesperados: {fields}"
+    assert payload.parse_fields(None) is None and payload.parse_fields("") is None
+    try:
+        payload.parse_fields("title,combined_features")
+        assert False, "❌ Un campo desconocido debe rechazarse."
+    except ValueError as e:
+        assert "combined_features" in str(e)
+
+    shaped = payload.shape_records(records, ("MAL_ID", "description"), payload.parse_description_length("30"))
+    assert list(shaped[0]) == ["MAL_ID", "description"], "❌ Solo deben quedar los campos pedidos."
+    assert shaped[0]["description"] == "palabra palabra palabra…" and shaped[1]["description"] == "corta", \
+        f"❌ Recorte inesperado: {shaped[0]['description']!r}"
+    assert len(records[0]["description"]) == 800, "❌ El recorte no debe modificar los registros originales."
+    for invalid in ("0", "abc"):
+        try:
+            payload.parse_description_length(invalid)
+            assert False, f"❌ Longitud inválida aceptada: {invalid}"
+        except ValueError:
+            pass
+    print("✅ Proyección y recorte correctos.")
+
+
+def test_gzip_compression():
+    print("🔍 Test: payload.py - compresión gzip según Accept-Encoding")
+    payload = _load_module("payload", os.path.join("api", "payload.py"))
+
+    app = Flask(__name__)
+    body = {"recommendations": [{"title": f"Anime {i}", "description": "texto repetido " * 20} for i in range(20)]}
+
+    @app.route("/big")
+    def big():
+        return jsonify(body)
+
+    @app.route("/small")
+    def small():
+        return jsonify({"status": "ok"})
+
+    @app.after_request
+    def compress(response):
+        return payload.compress_response(response, request.accept_encodings)
+
+    client = app.test_client()
+    plain = client.get("/big")
+    assert "Content-Encoding" not in plain.headers and plain.json == body, "❌ Sin Accept-Encoding no se comprime."
+
+    compressed = client.get("/big", headers={"Accept-Encoding": "gzip, deflate"})
+    assert compressed.headers["Content-Encoding"] == "gzip", "❌ Se esperaba gzip."
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    assert json.loads(gzip.decompress(compressed.data)) == body, "❌ El cuerpo comprimido no es el original."
+    assert len(compressed.data) * 5 < len(plain.data), "❌ La compresión debería reducir mucho el tamaño."
+
+    assert "Content-Encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers, \
+        "❌ Las respuestas pequeñas no se comprimen."
+    assert "Content-Encoding" not in client.get("/big", headers={"Accept-Encoding": "gzip;q=0"}).headers, \
+        "❌ gzip;q=0 significa que el cliente no lo acepta."
+    print("✅ Compresión correcta.")
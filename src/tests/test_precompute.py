@@ -0,0 +1,135 @@
+# src/tests/test_precompute.py
+
+import os
+import sys
+import json
+import tempfile
+import importlib.util
+import numpy as np
+import pandas as pd
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _mock_engine(n_rows=200, k=8):
+    from model.engine import RecommendationEngine
+    from model.filters import FilterIndex
+
+    rng = np.random.default_rng(11)
+    catalog = pd.DataFrame({
+        "id": np.arange(1, n_rows + 1),
+        "score": rng.integers(50, 95, n_rows),
+        "episodes": rng.integers(1, 50, n_rows),
+    })
+    records = [{"id": int(i)} for i in catalog["id"]]
+    engine = RecommendationEngine(rng.normal(size=(n_rows, k)), catalog["id"].values, catalog["id"].values,
+                                  FilterIndex.build(catalog), records, version="test")
+    return engine, rng
+
+
+def test_precompute_parallel_and_resume():
+    print("🔍 Test: precompute_recommendations.py - pool de procesos, JSONL/SQLite y --resume")
+    precompute_module = _load_module("precompute_recommendations",
+                                     os.path.join("services", "precompute_recommendations.py"))
+    engine, rng = _mock_engine()
+
+    lists = {f"user{i}": [{"anime_id": int(a), "score": int(rng.integers(1, 11))}
+                          for a in rng.choice(engine.mal_ids, size=8, replace=False)] for i in range(9)}
+    lists["ghost"] = None  # descarga fallida
+    fetched = []
+
+    def fake_fetch(username):
+        fetched.append(username)
+        return lists[username]
+
+    # Blacklist propia de user1: sus dos primeras recomendaciones
+    own = {"user1": [int(m) for m in engine.mal_ids[engine.recommend(lists["user1"], top_n=2)[0]]]}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        embeddings_path = precompute_module.save_embeddings_for_mmap(engine, tmp)
+        output = os.path.join(tmp, "recs.jsonl")
+
+        first = ["user0", "user1", "ghost", "user2", "user3"]
+        sink = precompute_module.open_sink(output)
+        summary = precompute_module.precompute(first, engine, sink, fetch=fake_fetch, workers=2, batch_size=2,
+                                               top_n=5, embeddings_path=embeddings_path,
+                                               exclusions_for=lambda username: own.get(username, []))
+        sink.close()
+        assert summary == {"success": 4, "error": 1, "skipped": 0}, f"❌ Resumen inesperado: {summary}"
+
+        with open(output, encoding="utf-8") as f:
+            records = {r["username"]: r for r in map(json.loads, f)}
+        for username in ["user0", "user1", "user2", "user3"]:
+            rows, _ = engine.recommend(lists[username], top_n=5, exclude_mal_ids=own.get(username, []))
+            got = [rec["id"] for rec in records[username]["recommendations"]]
+            assert got == [int(engine.ids[r]) for r in rows], f"❌ Resultado distinto para {username}."
+        assert records["ghost"]["status"] == "error", "❌ La descarga fallida debe quedar registrada."
+
+        # Simular interrupción: línea a medio escribir al final del fichero
+        with open(output, "a", encoding="utf-8") as f:
+            f.write('{"username": "user4", "sta')
+
+        fetched.clear()
+        sink = precompute_module.open_sink(output, resume=True)
+        summary = precompute_module.precompute(first + ["user4", "user5"], engine, sink, fetch=fake_fetch,
+                                               workers=0, top_n=5, resume=True)
+        sink.close()
+        assert sorted(fetched) == ["ghost", "user4", "user5"], f"❌ --resume repitió usuarios: {fetched}"
+        assert summary["skipped"] == 4, "❌ Deben saltarse los usuarios ya calculados."
+        with open(output, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        assert len(lines) == 8, "❌ La línea incompleta debe descartarse al reanudar."
+
+        # Almacén clave-valor
+        db_path = os.path.join(tmp, "recs.db")
+        sink = precompute_module.open_sink(db_path)
+        precompute_module.precompute(["user6", "user7"], engine, sink, fetch=fake_fetch, workers=0, top_n=5)
+        assert sink.completed() == {"user6", "user7"}, "❌ El almacén SQLite no guardó los resultados."
+        sink.close()
+
+    print("✅ Precálculo en paralelo y reanudación correctos.")
+
+
+def test_precompute_workers_match_in_process():
+    print("🔍 Test: precompute_recommendations.py - mismo resultado con y sin pool (popularidad y min_score)")
+    precompute_module = _load_module("precompute_recommendations",
+                                     os.path.join("services", "precompute_recommendations.py"))
+    from model.filters import DEFAULT_MIN_SCORE
+    engine, rng = _mock_engine()
+
+    lists = {f"user{i}": [{"anime_id": int(a), "score": int(rng.integers(1, 11))}
+                          for a in rng.choice(engine.mal_ids, size=8, replace=False)] for i in range(4)}
+    # Sin animes puntuados: solo el respaldo por popularidad tiene recomendaciones
+    lists["unrated"] = [{"anime_id": int(engine.mal_ids[0]), "score": 0}]
+
+    def run(tmp, name, workers):
+        sink = precompute_module.open_sink(os.path.join(tmp, name))
+        precompute_module.precompute(list(lists), engine, sink, fetch=lists.get, workers=workers, top_n=5,
+                                     embeddings_path=precompute_module.save_embeddings_for_mmap(engine, tmp))
+        sink.close()
+        with open(os.path.join(tmp, name), encoding="utf-8") as f:
+            return {r["username"]: [rec["id"] for rec in r["recommendations"]] for r in map(json.loads, f)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        popularity_path = os.path.join(tmp, "popularity.npy")
+        np.save(popularity_path, rng.permutation(engine.n_rows))
+        for popularity in (np.load(popularity_path), np.load(popularity_path, mmap_mode="r")):
+            engine.popularity = popularity
+            local, pooled = run(tmp, "local.jsonl", 0), run(tmp, "pooled.jsonl", 1)
+            assert local == pooled, "❌ El pool de procesos debe dar el mismo resultado que workers=0."
+            assert local["unrated"], "❌ Sin puntuaciones debe usarse el respaldo por popularidad."
+            for ids in local.values():
+                scores = engine.filter_index.score[np.asarray(ids) - 1]
+                assert (scores >= DEFAULT_MIN_SCORE).all(), "❌ El precálculo debe aplicar el min_score por defecto."
+    print("✅ Pool y proceso principal dan el mismo precálculo.")
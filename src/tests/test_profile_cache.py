@@ -0,0 +1,122 @@
+# src/tests/test_profile_cache.py
+
+import os
+import sys
+import importlib.util
+import tempfile
+import numpy as np
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_profile_cache_incremental_updates():
+    print("🔍 Test: profile_cache.py - perfiles latentes incrementales")
+    latent_model = _load_module("latent_model", os.path.join("model", "latent_model.py"))
+    profile_cache = _load_module("profile_cache", os.path.join("model", "profile_cache.py"))
+
+    rng = np.random.default_rng(7)
+    embeddings = rng.normal(size=(200, 16))
+    ids = np.arange(1000, 1200)
+    model = latent_model.LatentModel(embeddings, ids, version="v1")
+
+    def full_profile(ratings):
+        rows = model.rows_for_ids(ratings)
+        return model.profile(rows, [ratings[i] for i in ratings if i in model.row_of])
+
+    ratings = {int(i): float(rng.integers(1, 11)) / 10 for i in rng.choice(ids, 20, replace=False)}
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = profile_cache.ProfileCache(cache_dir)
+
+        profile, info = cache.get_profile("SrAlex16", ratings, model)
+        assert info["mode"] == "full", f"❌ La primera petición debe ser un cálculo completo: {info}"
+        assert np.allclose(profile, full_profile(ratings)), "❌ Perfil completo incorrecto."
+
+        _, info = cache.get_profile("SrAlex16", dict(ratings), model)
+        assert info["mode"] == "hit", f"❌ Una lista sin cambios debe reutilizar el perfil: {info}"
+
+        # Añadir uno, eliminar otro y re-puntuar un tercero
+        changed = dict(ratings)
+        removed, rescored = list(changed)[:2]
+        del changed[removed]
+        changed[rescored] = 1.0
+        changed[int(next(i for i in ids if int(i) not in ratings))] = 0.8
+
+        profile, info = cache.get_profile("SrAlex16", changed, model)
+        assert info == {"mode": "delta", "changes": 3}, f"❌ Se esperaba un delta de 3 cambios: {info}"
+        assert np.allclose(profile, full_profile(changed)), "❌ El delta no coincide con el recálculo."
+
+        # Un caché nuevo (otro proceso) lee el perfil persistido en disco
+        _, info = profile_cache.ProfileCache(cache_dir).get_profile("SrAlex16", changed, model)
+        assert info["mode"] == "hit", "❌ El perfil no se persistió en disco."
+
+        # Otra versión del modelo invalida el perfil cacheado
+        retrained = latent_model.LatentModel(embeddings * 2, ids, version="v2")
+        _, info = cache.get_profile("SrAlex16", changed, retrained)
+        assert info["mode"] == "full", "❌ Un modelo nuevo debe recalcular el perfil."
+
+    # Las puntuaciones latentes equivalen a cosine_sim @ score_vector
+    score_vector = np.zeros(200)
+    score_vector[:5] = 0.9
+    dense = (embeddings @ embeddings.T) @ score_vector
+    assert np.allclose(model.scores(model.profile(np.arange(5), score_vector[:5])), dense), \
+        "❌ L @ (Lᵀ s) no coincide con la similitud densa."
+
+    print("✅ Perfiles cacheados, deltas e invalidación correctos.")
+
+
+def test_serving_engine_reuses_cached_profiles():
+    print("🔍 Test: engine.py - el motor en memoria del serving usa el caché de perfiles")
+    import pandas as pd
+    from model.engine import RecommendationEngine, _clean_record
+    from model.filters import FilterIndex
+    import services.recommendation_engine as recommendation_engine
+    profile_cache = _load_module("profile_cache", os.path.join("model", "profile_cache.py"))
+    serving = _load_module("serving", os.path.join("services", "serving.py"))
+
+    rng = np.random.default_rng(8)
+    n_rows = 120
+    catalog = pd.DataFrame({
+        "id": np.arange(1, n_rows + 1), "MAL_ID": np.arange(1, n_rows + 1) + 3000,
+        "title": [f"Anime {i}" for i in range(n_rows)], "genres": ["Action"] * n_rows,
+        "score": np.full(n_rows, 80.0), "episodes": np.full(n_rows, 12),
+    })
+    records = [_clean_record(row) for row in catalog.to_dict("records")]
+    engine = RecommendationEngine(rng.normal(size=(n_rows, 8)), catalog["id"].values, catalog["MAL_ID"].values,
+                                  FilterIndex.build(catalog), records, version="v-profiles")
+    entries = [{"anime_id": int(m), "score": int(rng.integers(1, 11))}
+               for m in rng.choice(catalog["MAL_ID"].values, 12, replace=False)]
+    changed = entries[1:] + [{"anime_id": int(catalog["MAL_ID"].values[-1]), "score": 9}]
+
+    def served(entry_list):
+        response = serving.recommend_for_user("SrAlex16", entries=entry_list, top_n=10, exclude_mal_ids=[])
+        return [r["MAL_ID"] for r in response["recommendations"]]
+
+    previous = recommendation_engine._engine
+    recommendation_engine._engine = engine
+    try:
+        expected = [served(entries), served(changed)]
+        with tempfile.TemporaryDirectory() as cache_dir:
+            engine.profile_cache = cache = profile_cache.ProfileCache(cache_dir)
+            got = [served(entries), served(changed)]
+            entry = cache._read("SrAlex16")
+            assert entry is not None and entry["n_deltas"] == 1, \
+                "❌ La segunda petición debe actualizar el perfil con el delta, no recalcularlo."
+            assert np.allclose(entry["profile"], engine.profiles(*engine.user_matrix([changed]), 1)[:, 0]), \
+                "❌ El perfil cacheado no coincide con el recalculado."
+    finally:
+        engine.profile_cache = None
+        recommendation_engine._engine = previous
+    assert got == expected, "❌ El caché de perfiles no debe cambiar las recomendaciones."
+    print("✅ El motor en memoria reutiliza y actualiza los perfiles cacheados.")
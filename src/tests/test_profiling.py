@@ -0,0 +1,67 @@
+# src/tests/test_profiling.py
+
+import os
+import sys
+import time
+import pstats
+import tempfile
+import importlib.util
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def slow_row_loop(n):
+    """Simula un hotspot tipo iterrows: muchas asignaciones pequeñas en Python puro"""
+    rows = []
+    for i in range(n):
+        rows.append({'id': i, 'title': f"anime {i}", 'genres': [str(i % 7)] * 3})
+    return rows
+
+
+def test_profile_writes_cpu_and_allocation_report():
+    print("🔍 Test: profiling.py - perfil de CPU y asignaciones por request ID")
+    profiling = _load_module("profiling", os.path.join("monitoring", "profiling.py"))
+    profiling.PROFILE_TOKEN = "s3cret"
+
+    assert profiling.authorized("s3cret") and not profiling.authorized("otro") and not profiling.authorized(None), \
+        "❌ El token de perfilado no se valida bien."
+    assert profiling.profile_id_for("req-1") == "req-1", "❌ Debe reutilizarse el request ID."
+    assert profiling.profile_id_for("../etc") != "../etc", "❌ Un request ID inválido no puede ser nombre de fichero."
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with profiling.profile("req-1", "in_process", tmp) as profile_id:
+            # Solo un perfil a la vez por proceso: el anidado no se toma
+            with profiling.profile("req-2", "in_process", tmp) as nested:
+                rows = slow_row_loop(20000)
+        assert profile_id == "req-1" and nested is None, "❌ Se perfilaron dos peticiones a la vez."
+        assert len(rows) == 20000
+
+        assert profiling.files_for("req-1", tmp) == ["req-1.in_process.prof", "req-1.in_process.txt"], \
+            f"❌ Ficheros inesperados: {os.listdir(tmp)}"
+        with open(os.path.join(tmp, "req-1.in_process.txt"), "r", encoding="utf-8") as f:
+            report = f.read()
+        assert "slow_row_loop" in report, "❌ El informe de CPU no muestra el hotspot."
+        assert "test_profiling.py" in report.split("== Memoria")[1], "❌ El informe de memoria no muestra la línea que asigna."
+        stats = pstats.Stats(os.path.join(tmp, "req-1.in_process.prof"))
+        assert any(func[2] == "slow_row_loop" for func in stats.stats), "❌ El .prof no se puede cargar con pstats."
+
+        # Retención: solo los perfiles más recientes
+        for i in range(3):
+            with profiling.profile(f"old-{i}", "pipeline", tmp):
+                pass
+            time.sleep(0.01)
+        profiling.prune(tmp, keep=2)
+        assert [entry["profile_id"] for entry in profiling.list_profiles(tmp)] == ["old-2", "old-1"], \
+            "❌ No se borraron los perfiles antiguos."
+    print("✅ Perfil de CPU y memoria escrito y descargable.")
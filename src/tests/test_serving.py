@@ -0,0 +1,139 @@
+# src/tests/test_serving.py
+
+import os
+import sys
+import json
+import subprocess
+import importlib.util
+import numpy as np
+import pandas as pd
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_serving_imports_only_numpy():
+    print("🔍 Test: serving.py - la ruta de serving no importa pandas/sklearn/scipy")
+    code = ("import sys; sys.path.insert(0, %r); import services.serving, model.artifacts; "
+            "print([m for m in ('pandas', 'sklearn', 'scipy') if m in sys.modules])" % SRC_DIR)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT_DIR)
+    assert result.returncode == 0, f"❌ Error importando serving: {result.stderr}"
+    assert json.loads(result.stdout.strip().replace("'", '"')) == [], \
+        f"❌ Módulos pesados importados: {result.stdout.strip()}"
+    print("✅ Serving sin módulos pesados.")
+
+
+def test_serving_response_format():
+    print("🔍 Test: serving.py - formato de respuesta y estadísticas")
+    from model.engine import RecommendationEngine, _clean_record
+    from model.filters import FilterIndex
+    import services.recommendation_engine as recommendation_engine
+    serving = _load_module("serving", os.path.join("services", "serving.py"))
+
+    rng = np.random.default_rng(4)
+    n_rows = 50
+    catalog = pd.DataFrame({
+        "id": np.arange(1, n_rows + 1),
+        "MAL_ID": np.arange(1, n_rows + 1) + 1000,
+        "title": [f"Anime {i}" for i in range(n_rows)],
+        "genres": ["Drama Romance" if i < 5 else "Action" for i in range(n_rows)],
+        "score": np.full(n_rows, 80.0),
+        "episodes": np.full(n_rows, 12),
+    })
+    records = [_clean_record(row) for row in catalog.to_dict("records")]
+    engine = RecommendationEngine(rng.normal(size=(n_rows, 4)), catalog["id"].values, catalog["MAL_ID"].values,
+                                  FilterIndex.build(catalog), records, version="v-test")
+
+    previous = recommendation_engine._engine
+    recommendation_engine._engine = engine
+    try:
+        entries = [{"anime_id": 1001, "score": 10}, {"anime_id": 1002, "score": 6},
+                   {"anime_id": 1003, "score": 0}, {"anime_id": 999999, "score": 9}]
+        response = serving.recommend_for_user("demo", entries=entries, top_n=5, exclude_mal_ids=[1010])
+    finally:
+        recommendation_engine._engine = previous
+
+    assert response["status"] == "success", f"❌ Respuesta inesperada: {response}"
+    assert response["count"] == 5 and response["model_version"] == "v-test", "❌ Faltan campos de la respuesta."
+    recommended = {r["MAL_ID"] for r in response["recommendations"]}
+    assert not recommended & {1001, 1002, 1003, 1010}, "❌ Se recomendaron animes vistos o en blacklist."
+    assert {"title", "genres", "type", "description", "hybrid_score"} <= set(response["recommendations"][0]), \
+        "❌ Faltan campos que usa el frontend."
+    assert response["statistics"] == {
+        "most_watched_genre": "Drama", "average_user_score": 8.0, "total_anime_in_list": 4,
+    }, f"❌ Estadísticas inesperadas: {response['statistics']}"
+    print("✅ Respuesta del serving con el formato del pipeline.")
+
+
+def test_batch_uses_default_min_score_like_single_user():
+    print("🔍 Test: recommendation_engine.py - el lote aplica el min_score por defecto y rechaza nombres repetidos")
+    from model.engine import RecommendationEngine, _clean_record
+    from model.filters import FilterIndex, DEFAULT_MIN_SCORE
+    import services.recommendation_engine as recommendation_engine
+    serving = _load_module("serving", os.path.join("services", "serving.py"))
+
+    rng = np.random.default_rng(5)
+    n_rows = 80
+    catalog = pd.DataFrame({
+        "id": np.arange(1, n_rows + 1), "MAL_ID": np.arange(1, n_rows + 1) + 2000,
+        "title": [f"Anime {i}" for i in range(n_rows)], "genres": ["Action"] * n_rows,
+        "score": rng.integers(40, 95, n_rows).astype(float), "episodes": np.full(n_rows, 12),
+    })
+    records = [_clean_record(row) for row in catalog.to_dict("records")]
+    engine = RecommendationEngine(rng.normal(size=(n_rows, 6)), catalog["id"].values, catalog["MAL_ID"].values,
+                                  FilterIndex.build(catalog), records, version="v-batch")
+    seed = [{"anime_id": 2001, "score": 9}, {"anime_id": 2002, "score": 7}]
+
+    previous = recommendation_engine._engine
+    recommendation_engine._engine = engine
+    try:
+        batch = recommendation_engine.get_batch_recommendations(seeds={"semilla": seed}, top_n=n_rows)
+        single = serving.recommend_for_user("semilla", entries=seed, top_n=n_rows, exclude_mal_ids=[])
+        try:
+            recommendation_engine.get_batch_recommendations(["ana"], seeds={"ana": seed})
+            assert False, "❌ Una semilla con el nombre de un usuario debe rechazarse."
+        except ValueError as e:
+            assert "ana" in str(e)
+    finally:
+        recommendation_engine._engine = previous
+
+    recommendations = batch["results"]["semilla"]["recommendations"]
+    assert recommendations and min(r["score"] for r in recommendations) >= DEFAULT_MIN_SCORE, \
+        "❌ El lote no debe recomendar títulos por debajo del min_score por defecto."
+    assert [r["MAL_ID"] for r in recommendations] == [r["MAL_ID"] for r in single["recommendations"]], \
+        "❌ El lote y la petición individual deben dar el mismo ranking."
+    print("✅ Lote con el mismo min_score por defecto que las peticiones individuales.")
+
+
+def test_sparse_engine_switch_uses_pipeline():
+    print("🔍 Test: app.py - RECOMMENDER_ENGINE=sparse no se ignora en SERVING_MODE=auto")
+    # Artefactos disponibles: con 'svd' se sirve en proceso; con 'sparse', el pipeline (que sí tiene el índice)
+    script = (
+        "import services.serving as serving\n"
+        "serving.artifacts_available = lambda root=None: True\n"
+        "from api.app import create_app\n"
+        "status = create_app().test_client().get('/api/status').json\n"
+        "print(serving.in_process_available(), status['serving_mode'])\n"
+    )
+    modes = {}
+    for engine in ("svd", "sparse"):
+        env = dict(os.environ, RECOMMENDER_ENGINE=engine, SERVING_MODE="auto", BACKGROUND_THREADS_ON_IMPORT="0",
+                   PYTHONPATH=SRC_DIR)
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, env=env,
+                                cwd=ROOT_DIR, timeout=120)
+        assert result.returncode == 0, f"❌ Error arrancando la app: {result.stderr}"
+        modes[engine] = result.stdout.strip().splitlines()[-1]
+        if engine == "sparse":
+            assert "pipeline en subproceso" in result.stdout, "❌ Debe avisarse de que 'sparse' usa el pipeline."
+    assert modes == {"svd": "True in_process", "sparse": "False subprocess"}, f"❌ Modos inesperados: {modes}"
+    print("✅ El motor 'sparse' se sirve con el pipeline en subproceso.")
@@ -0,0 +1,71 @@
+# src/tests/test_sharded.py
+
+import os
+import sys
+import tempfile
+import importlib.util
+import numpy as np
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_sharded_matches_single_process():
+    print("🔍 Test: sharded.py - top-K por bloques idéntico al ranking en un proceso")
+    from model.latent_model import LatentModel
+    from model.engine import score_block
+    from model import sharded
+
+    rng = np.random.default_rng(5)
+    n_rows, k = 3000, 16
+    embeddings = rng.normal(size=(n_rows, k))
+    # Filas duplicadas en bloques distintos: empates exactos que cruzan fronteras
+    embeddings[2500] = embeddings[10]
+    embeddings[1500] = embeddings[10]
+    model = LatentModel(embeddings, np.arange(1, n_rows + 1), version="test")
+
+    original_min_rows = sharded.MIN_ROWS_PER_SHARD
+    sharded.MIN_ROWS_PER_SHARD = 500
+    with tempfile.TemporaryDirectory() as tmp:
+        shards = sharded.ShardedLatentModel.from_model(model, tmp, n_shards=4, workers=2)
+        try:
+            assert shards.parallel and len(shards.bounds) == 4, "❌ El catálogo debe repartirse en 4 bloques."
+
+            # Un perfil: exclusiones en la máscara de elegibles
+            for _ in range(3):
+                profile = model.profile(rng.choice(n_rows, 20, replace=False), rng.integers(1, 11, 20) / 10.0)
+                eligible = rng.random(n_rows) > 0.2
+                expected_rows, expected_scores = model.top_n(profile, eligible, 10)
+                rows, scores = shards.top_n(profile, eligible, 10)
+                assert rows.tolist() == expected_rows.tolist(), "❌ El ranking por bloques difiere."
+                assert np.array_equal(scores, expected_scores), "❌ Las puntuaciones por bloques difieren."
+
+            # Empates: el perfil igual a la fila duplicada puntúa igual 10, 1500 y 2500
+            rows, _ = shards.top_n(embeddings[10], np.ones(n_rows, dtype=bool), 2)
+            assert rows.tolist() == [10, 1500], "❌ Los empates deben resolverse por fila ascendente."
+
+            # Lote de perfiles con exclusiones por usuario
+            profiles = rng.normal(size=(k, 6))
+            users = np.repeat(np.arange(6), 30)
+            rows = rng.integers(0, n_rows, users.size)
+            mask = rng.random(n_rows) > 0.1
+            expected = score_block(embeddings, profiles, mask, users, rows, 10)
+            got = shards.top_n_batch(profiles, mask, users, rows, 10)
+            for (r1, s1), (r2, s2) in zip(expected, got):
+                assert r1.tolist() == r2.tolist(), "❌ El lote por bloques difiere del lote en un proceso."
+                assert np.allclose(s1, s2), "❌ Las puntuaciones del lote difieren."
+        finally:
+            shards.close()
+            sharded.MIN_ROWS_PER_SHARD = original_min_rows
+
+    print("✅ Ranking por bloques idéntico al de un solo proceso.")
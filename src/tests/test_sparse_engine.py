@@ -0,0 +1,111 @@
+# src/tests/test_sparse_engine.py
+
+import os
+import sys
+import importlib.util
+import numpy as np
+from scipy import sparse
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+SCRIPT_PATH = os.path.join(SRC_DIR, "model", "sparse_engine.py")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module():
+    spec = importlib.util.spec_from_file_location("sparse_engine", SCRIPT_PATH)
+    sparse_engine = importlib.util.module_from_spec(spec)
+    sys.modules[sparse_engine.__name__] = sparse_engine
+    spec.loader.exec_module(sparse_engine)
+    return sparse_engine
+
+
+def test_sparse_engine_matches_brute_force():
+    print("🔍 Test: sparse_engine.py - índice invertido vs. producto denso")
+    sparse_engine = _load_module()
+
+    rng = np.random.default_rng(42)
+    n_docs, n_terms = 400, 120
+    tfidf = sparse.random(n_docs, n_terms, density=0.05, random_state=42, format='csr')
+    # Normalización L2 por fila, como TfidfVectorizer
+    norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    tfidf = sparse.diags(1.0 / norms) @ tfidf
+
+    score_vector = np.zeros(n_docs)
+    rated = rng.choice(n_docs, size=8, replace=False)
+    score_vector[rated] = rng.integers(5, 11, size=8) / 10.0
+
+    eligible = np.ones(n_docs, dtype=bool)
+    eligible[rated] = False
+    eligible[rng.choice(n_docs, size=50, replace=False)] = False
+
+    index = sparse_engine.build_inverted_index(tfidf)
+    rows, scores = index.recommend(score_vector, eligible, top_n=10)
+
+    # Referencia: (X Xᵀ) @ s con el mismo desempate (score desc, fila asc)
+    dense = (tfidf @ tfidf.T).toarray() @ score_vector
+    candidates = np.flatnonzero(eligible)
+    expected = candidates[np.lexsort((candidates, -dense[candidates]))][:10]
+
+    assert len(rows) == 10, f"❌ Se esperaban 10 recomendaciones, se obtuvieron {len(rows)}."
+    assert rows.tolist() == expected.tolist(), "❌ El ranking disperso no coincide con el denso."
+    assert np.allclose(scores, dense[expected]), "❌ Las puntuaciones léxicas no son exactas."
+    assert eligible[rows].all(), "❌ Se recomendaron animes excluidos."
+
+    print("✅ Índice invertido: top-N exacto y exclusiones respetadas.")
+
+
+def test_sparse_engine_fills_without_matches():
+    print("🔍 Test: sparse_engine.py - usuario sin animes puntuados")
+    sparse_engine = _load_module()
+
+    tfidf = sparse.identity(20, format='csr')
+    index = sparse_engine.build_inverted_index(tfidf)
+    eligible = np.ones(20, dtype=bool)
+    eligible[:3] = False
+
+    rows, scores = index.recommend(np.zeros(20), eligible, top_n=5)
+
+    assert rows.tolist() == [3, 4, 5, 6, 7], "❌ El relleno debe usar los primeros elegibles."
+    assert not scores.any(), "❌ Sin perfil, las puntuaciones deben ser 0."
+    print("✅ Relleno con elegibles de score 0 correcto.")
+
+
+def test_sparse_engine_pruning_skips_postings():
+    print("🔍 Test: sparse_engine.py - la poda por cotas evita recorrer postings")
+    sparse_engine = _load_module()
+
+    rng = np.random.default_rng(0)
+    n_docs, n_long_terms, long_size = 3000, 40, 1500
+    # Término 0: pocos documentos con peso alto; el resto, listas largas con pesos pequeños
+    strong = rng.choice(n_docs, size=30, replace=False)
+    doc_ids, term_ids, values = [strong], [np.zeros(strong.size, dtype=int)], [rng.uniform(0.5, 1.0, strong.size)]
+    for term in range(1, n_long_terms + 1):
+        docs = rng.choice(n_docs, size=long_size, replace=False)
+        doc_ids.append(docs)
+        term_ids.append(np.full(docs.size, term))
+        values.append(rng.uniform(0.001, 0.01, docs.size))
+    tfidf = sparse.csr_matrix((np.concatenate(values), (np.concatenate(doc_ids), np.concatenate(term_ids))),
+                              shape=(n_docs, n_long_terms + 1))
+
+    terms = np.arange(n_long_terms + 1)
+    term_weights = np.ones(terms.size)
+    eligible = np.ones(n_docs, dtype=bool)
+    eligible[strong[:5]] = False
+
+    index = sparse_engine.build_inverted_index(tfidf)
+    stats = {}
+    rows, scores = index.search(terms, term_weights, eligible, top_n=10, stats=stats)
+
+    dense = tfidf @ term_weights
+    candidates = np.flatnonzero(eligible)
+    expected = candidates[np.lexsort((candidates, -dense[candidates]))][:10]
+    assert rows.tolist() == expected.tolist(), "❌ La poda cambió el ranking."
+    assert np.allclose(scores, dense[expected]), "❌ La poda cambió las puntuaciones."
+
+    total = tfidf.nnz
+    assert stats["pruned_terms"] == n_long_terms, f"❌ La poda debía activarse tras el primer término: {stats}"
+    assert stats["postings"] * 10 < total, f"❌ Se recorrieron {stats['postings']} de {total} postings."
+    print(f"✅ Poda exacta: {stats['postings']} de {total} postings recorridos.")
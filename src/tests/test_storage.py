@@ -0,0 +1,82 @@
+# src/tests/test_storage.py
+
+import os
+import sys
+import time
+import tempfile
+import threading
+import importlib.util
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_atomic_write_never_exposes_partial_files():
+    print("🔍 Test: storage.py - escritura atómica (temporal + fsync + rename)")
+    storage = _load_module("storage", os.path.join("data", "storage.py"))
+
+    with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as locks:
+        storage.LOCK_DIR = locks
+        path = os.path.join(tmp, "dataset.csv")
+        storage.write_text(path, "a,b\n1,2\n", lock=storage.DATASET_LOCK)
+
+        try:
+            with storage.atomic_write(path) as f:
+                f.write("a,b\n")
+                assert open(path).read() == "a,b\n1,2\n", "❌ El lector vio el fichero a medio escribir."
+                raise RuntimeError("fallo a mitad de escritura")
+        except RuntimeError:
+            pass
+        assert open(path).read() == "a,b\n1,2\n", "❌ Un fallo a mitad de escritura dañó el fichero."
+        assert os.listdir(tmp) == ["dataset.csv"], f"❌ Quedaron temporales o cerrojos: {os.listdir(tmp)}"
+
+        storage.write_json(path, {"ok": True})
+        assert open(path).read() == '{"ok": true}', "❌ write_json no reemplazó el fichero."
+
+        # Un fichero de cerrojo por nombre, nunca uno por ruta escrita
+        for i in range(50):
+            storage.write_json(os.path.join(tmp, f"perfil_{i}.json"), {"i": i})
+            storage.write_json(os.path.join(tmp, f"lista_{i}.json"), {"i": i}, lock=storage.USER_LIST_LOCK)
+        assert sorted(os.listdir(locks)) == ["dataset.lock", "user_list.lock"], \
+            f"❌ Cerrojos inesperados: {sorted(os.listdir(locks))}"
+        try:
+            storage.write_text(path, "x", lock=path)
+            assert False, "❌ Un cerrojo con nombre libre debe rechazarse."
+        except ValueError:
+            pass
+    print("✅ Escritura atómica sin ficheros truncados.")
+
+
+def test_build_once_across_concurrent_callers():
+    print("🔍 Test: storage.py - una sola regeneración con varios procesos/hilos a la vez")
+    storage = _load_module("storage", os.path.join("data", "storage.py"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.LOCK_DIR = os.path.join(tmp, ".locks")
+        path = os.path.join(tmp, "merged_anime.csv")
+        builds = []
+
+        def build():
+            builds.append(1)
+            time.sleep(0.2)
+            storage.write_text(path, "x" * 100, lock=storage.CATALOG_LOCK)
+
+        threads = [threading.Thread(target=storage.build_once, args=(path, build, storage.CATALOG_LOCK))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(builds) == 1, f"❌ El fichero se regeneró {len(builds)} veces."
+        assert not storage.build_once(path, build, storage.CATALOG_LOCK), "❌ Se regeneró un fichero ya completo."
+    print("✅ Regeneración única bajo cerrojo.")
@@ -0,0 +1,84 @@
+# src/tests/test_tracing.py
+
+import os
+import sys
+import json
+import tempfile
+import subprocess
+import importlib.util
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+CHILD_SCRIPT = """
+import sys, json
+sys.path.insert(0, sys.argv[1])
+from monitoring.tracing import collect_spans, export_spans, span, set_attributes
+collect_spans()
+with span("child_pipeline"):
+    set_attributes(rows=3)
+print(json.dumps(export_spans()))
+"""
+
+
+def test_nested_spans_across_processes():
+    print("🔍 Test: tracing.py - spans anidados, request ID propagado al subproceso y exportación JSONL")
+    tracing = _load_module("monitoring.tracing", os.path.join("monitoring", "tracing.py"))
+    metrics = _load_module("metrics", os.path.join("monitoring", "metrics.py"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        export_path = os.path.join(tmp, "traces.jsonl")
+        tracing.configure(enabled=True, export_path=export_path)
+        try:
+            root = tracing.start_trace("GET /api/recommendations/<username>", request_id="req-42")
+            with metrics.stage("scoring"):
+                tracing.set_attributes(rows=120)
+                metrics.cache_result("filter_index", "hit")
+                tracing.debug_log("puntuando")
+                env = tracing.child_env({"PATH": os.environ.get("PATH", "")})
+            result = subprocess.run([sys.executable, "-c", CHILD_SCRIPT, SRC_DIR], env=env,
+                                    capture_output=True, text=True, timeout=60)
+            tracing.import_spans(json.loads(result.stdout))
+            assert not os.path.exists(export_path), "❌ La traza no debe exportarse antes de cerrar el span raíz."
+            root.end()
+
+            spans = tracing.get_trace("req-42")
+            by_name = {record["name"]: record for record in spans}
+            assert set(by_name) == {"GET /api/recommendations/<username>", "scoring", "child_pipeline"}, \
+                f"❌ Spans inesperados: {sorted(by_name)}"
+            scoring = by_name["scoring"]
+            assert scoring["attributes"] == {"rows": 120, "cache.filter_index.hit": 1}, \
+                f"❌ Atributos incorrectos: {scoring['attributes']}"
+            assert scoring["events"][0]["message"] == "puntuando", "❌ debug_log no quedó como evento."
+            child = by_name["child_pipeline"]
+            assert child["parent_id"] == scoring["span_id"] and child["pid"] != os.getpid(), \
+                "❌ El subproceso no continuó la traza del span que lo lanzó."
+
+            tree = tracing.build_tree(spans)
+            assert len(tree) == 1 and tree[0]["children"][0]["children"][0]["name"] == "child_pipeline", \
+                "❌ El árbol de spans no está anidado."
+            with open(export_path, "r", encoding="utf-8") as f:
+                exported = [json.loads(line) for line in f]
+            assert {record["trace_id"] for record in exported} == {"req-42"} and len(exported) == 3, \
+                "❌ El JSONL debe contener la traza completa."
+            assert tracing.recent_traces()[0]["request_id"] == "req-42", "❌ Falta la traza en el buffer."
+            invalid = tracing.start_trace("x", request_id="bad id\n")
+            invalid.end()
+            assert invalid.trace_id != "bad id\n", "❌ Se aceptó un request ID inválido."
+        finally:
+            tracing.configure(enabled=False)
+
+    assert tracing.span("scoring") is tracing.NOOP_SPAN, "❌ Con el trazado desactivado no debe crearse ningún span."
+    assert tracing.child_env({}) == {}, "❌ Sin trazado no se propaga nada al subproceso."
+    print("✅ Trazas anidadas y propagadas entre procesos.")
@@ -0,0 +1,110 @@
+# src/tests/test_warmup.py
+
+import os
+import sys
+import importlib.util
+import numpy as np
+import pandas as pd
+
+# --- Rutas ---
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+sys.path.insert(0, SRC_DIR)
+
+
+def _load_module(name, relative_path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module.__name__] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _toy_engine():
+    from model.engine import RecommendationEngine, _clean_record
+    from model.filters import FilterIndex
+
+    n_rows = 30
+    catalog = pd.DataFrame({
+        "id": np.arange(1, n_rows + 1),
+        "MAL_ID": np.arange(1, n_rows + 1) + 500,
+        "title": [f"Anime {i}" for i in range(n_rows)],
+        "genres": ["Action"] * n_rows,
+        "score": np.full(n_rows, 80.0),
+        "episodes": np.full(n_rows, 12),
+    })
+    records = [_clean_record(row) for row in catalog.to_dict("records")]
+    engine = RecommendationEngine(np.random.default_rng(2).normal(size=(n_rows, 4)), catalog["id"].values,
+                                  catalog["MAL_ID"].values, FilterIndex.build(catalog), records, version="v-warm")
+    engine.popularity = np.arange(n_rows)[::-1].copy()
+    return engine
+
+
+def test_warmup_becomes_ready():
+    print("🔍 Test: warmup.py - listo tras cargar el motor y recomendar a un usuario sintético")
+    import services.recommendation_engine as recommendation_engine
+    warmup = _load_module("warmup", os.path.join("services", "warmup.py"))
+
+    engine = _toy_engine()
+    entries = warmup.synthetic_entries(engine, size=3)
+    assert [e["anime_id"] for e in entries] == [530, 529, 528], f"❌ Usuario sintético inesperado: {entries}"
+
+    previous = recommendation_engine._engine
+    recommendation_engine._engine = engine
+    try:
+        state = warmup.Warmup(loader=lambda: engine)
+        assert not state.ready and state.status()["state"] == "pending", "❌ Listo antes de calentar."
+        state.ensure_started()
+        assert state.wait(timeout=30), f"❌ El calentamiento no terminó: {state.status()}"
+    finally:
+        recommendation_engine._engine = previous
+
+    status = state.status()
+    assert status["ready"] and status["model_version"] == "v-warm", f"❌ Estado inesperado: {status}"
+    assert {"engine_load_ms", "synthetic_recommendation_ms", "total_ms"} <= set(status["timings"]), \
+        "❌ Faltan los tiempos de carga."
+    print("✅ Warmup listo con versión y tiempos.")
+
+
+def test_warmup_failure_is_not_ready():
+    print("🔍 Test: warmup.py - un fallo al cargar deja el proceso no listo y permite reintentar")
+    warmup = _load_module("warmup", os.path.join("services", "warmup.py"))
+
+    def broken_loader():
+        raise RuntimeError("sin artefactos")
+
+    state = warmup.Warmup(loader=broken_loader)
+    state.ensure_started()
+    assert not state.wait(timeout=30), "❌ Un calentamiento fallido no debe dejar el proceso listo."
+    status = state.status()
+    assert status["state"] == "failed" and "sin artefactos" in status["error"], f"❌ Estado inesperado: {status}"
+
+    # Dentro del intervalo de reintento no se relanza; pasado el intervalo, sí
+    state.retry()
+    assert state.status()["state"] == "failed", "❌ Reintento antes de RETRY_INTERVAL."
+    state._finished_monotonic -= warmup.RETRY_INTERVAL
+    state.retry()
+    state.wait(timeout=30)
+    assert state.status()["state"] == "failed" and state._thread is not None, "❌ No se reintentó el calentamiento."
+    print("✅ Fallo de calentamiento detectado y reintentable.")
+
+
+def test_gunicorn_master_starts_no_threads():
+    print("🔍 Test: gunicorn.conf.py - importar la app en el maestro no arranca hilos de fondo")
+    import subprocess
+
+    # Como el maestro de gunicorn: se carga la configuración y después la app (preload_app)
+    script = (
+        "import runpy, threading\n"
+        f"runpy.run_path({os.path.join(ROOT_DIR, 'gunicorn.conf.py')!r})\n"
+        "from api.app import create_app\n"
+        "create_app()\n"
+        "print(sorted(t.name for t in threading.enumerate()))\n"
+    )
+    env = dict(os.environ, MODEL_REFRESH_INTERVAL="60", PYTHONPATH=SRC_DIR)
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, env=env,
+                            cwd=ROOT_DIR, timeout=120)
+    assert result.returncode == 0, f"❌ Error importando la app: {result.stderr}"
+    threads = result.stdout.strip().splitlines()[-1]
+    assert threads == "['MainThread']", f"❌ El maestro arrancó hilos antes del fork: {threads}"
+    print("✅ Sin hilos de fondo en el maestro.")